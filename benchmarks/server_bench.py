@@ -0,0 +1,414 @@
+"""Micro-benchmarks for the server's hot paths, with JSON baselines.
+
+Run from the repository root:
+
+    python -m benchmarks.server_bench run --save-baseline   # benchmarks/baselines/<host>.json
+    python -m benchmarks.server_bench run -o current.json    # measure again later
+    python -m benchmarks.server_bench compare current.json   # exit 1 if anything regressed
+
+Each case runs its operation repeatedly for at least ``--min-time`` seconds per
+round and reports the median seconds per operation over ``--rounds`` rounds.
+Inputs are synthetic and grow in size, so scaling problems show up as well as
+constant-factor ones. HTTP cases go through a real ``ThreadingHTTPServer`` on
+an ephemeral port with its output directed at a temporary directory.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.dom.minidom
+from datetime import datetime
+
+from server.server import PlotterHandler, build_config_comment, create_server
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_THRESHOLD = 0.25  # Slowdown ratio above which compare reports a regression
+FULL_SVG_MEGABYTES = (1, 10, 50)
+QUICK_SVG_MEGABYTES = (1,)
+SAMPLE_CONFIG = {
+    'paper': {'id': 'a3', 'name': 'A3', 'width': 297, 'height': 420, 'margin': 20},
+    'medium': {'id': 'sakura', 'metadata': {'name': 'Sakura Pigma Micron'}, 'disabledColors': []},
+    'hatch': {'style': 'scanline', 'spacing': 2},
+    'drawingControls': {'pointCount': 2000, 'seed': 7},
+    'drawingData': {'seed': 42, 'points': list(range(200))},
+}
+
+
+def default_baseline_path():
+    return os.path.join(BASELINE_DIR, f"{socket.gethostname() or 'local'}.json")
+
+
+def measure(operation, min_time=0.2, rounds=5):
+    """Median and best seconds per call of ``operation`` over ``rounds`` timed rounds."""
+    operation()  # Warm caches and imports outside the timed rounds
+    per_call = []
+    calls = 0
+    for _ in range(rounds):
+        count = 0
+        started = time.perf_counter()
+        while True:
+            operation()
+            count += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        per_call.append(elapsed / count)
+        calls += count
+    median = statistics.median(per_call)
+    return {
+        'median_s': median,
+        'min_s': min(per_call),
+        'ops_per_s': 1.0 / median if median > 0 else None,
+        'calls': calls,
+    }
+
+
+class NullWriter(io.RawIOBase):
+    """``wfile`` stand-in that accepts and discards bytes."""
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return len(data)
+
+
+def fake_sse_client():
+    client = PlotterHandler.__new__(PlotterHandler)
+    client.wfile = NullWriter()
+    client.sse_write_lock = threading.Lock()
+    return client
+
+
+def synthetic_svg(megabytes, layers=4):
+    """An Inkscape-layered SVG of roughly ``megabytes`` MB made of short polyline paths."""
+    target = int(megabytes * 1024 * 1024)
+    header = ('<svg xmlns="http://www.w3.org/2000/svg" '
+              'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" '
+              'width="297mm" height="420mm" viewBox="0 0 297 420">')
+    paths = []
+    size = len(header)
+    index = 0
+    while size < target:
+        x, y = index % 277 + 10, (index * 7) % 400 + 10
+        path = (f'<path d="M {x} {y} L {x + 5.25} {y + 3.5} L {x + 9.75} {y - 1.25} '
+                f'L {x + 14.5} {y + 2.75}"/>')
+        paths.append(path)
+        size += len(path)
+        index += 1
+    per_layer = max(1, len(paths) // layers)
+    groups = []
+    for layer in range(layers):
+        chunk = paths[layer * per_layer:(layer + 1) * per_layer if layer < layers - 1 else None]
+        groups.append(f'<g inkscape:groupmode="layer" inkscape:label="{layer}-Pen{layer}">'
+                      f'{"".join(chunk)}</g>')
+    return header + ''.join(groups) + '</svg>'
+
+
+def progress_lines(count):
+    lines = []
+    for index in range(count):
+        kind = index % 4
+        if kind == 0:
+            done = index % 6530
+            lines.append(f"Plot Progress: {done * 100 // 6530:3d}%|###       | {done}/6530 "
+                         f"[00:{index % 60:02d}<02:00, 50.{index % 10} mm/s]")
+        elif kind == 1:
+            event = {'status': f'Layer {index}', 'progress': (index % 100) / 100}
+            lines.append(json.dumps({'progress_event': event}))
+        elif kind == 2:
+            lines.append(f"Estimated print time: {index % 60}:{index % 60:02d}")
+        else:
+            lines.append(f"Command completed step {index}")
+    return lines
+
+
+class BenchEnvironment:
+    """A live server plus patched class state, torn down after the run."""
+
+    def __init__(self):
+        self.output_root = tempfile.mkdtemp(prefix='plotter-bench-')
+        self.saved = {
+            'OUTPUT_ROOT': PlotterHandler.OUTPUT_ROOT,
+            'ARCHIVE_AFTER_DAYS': PlotterHandler.ARCHIVE_AFTER_DAYS,
+            'sse_connections': PlotterHandler.sse_connections,
+            'log_message': PlotterHandler.__dict__.get('log_message'),
+        }
+        PlotterHandler.OUTPUT_ROOT = self.output_root
+        PlotterHandler.ARCHIVE_AFTER_DAYS = None
+        PlotterHandler.log_message = lambda handler, format, *args: None
+        self._stdout = sys.stdout
+        # Handlers print per request and per line; keep that out of the timings and the report
+        sys.stdout = open(os.devnull, 'w')
+        self.httpd = create_server(host='127.0.0.1', port=0)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def connection(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=600)
+
+    def report(self, text):
+        self._stdout.write(text + '\n')
+        self._stdout.flush()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        sys.stdout.close()
+        sys.stdout = self._stdout
+        PlotterHandler.OUTPUT_ROOT = self.saved['OUTPUT_ROOT']
+        PlotterHandler.ARCHIVE_AFTER_DAYS = self.saved['ARCHIVE_AFTER_DAYS']
+        PlotterHandler.sse_connections = self.saved['sse_connections']
+        if self.saved['log_message'] is None:
+            del PlotterHandler.log_message
+        else:
+            PlotterHandler.log_message = self.saved['log_message']
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        shutil.rmtree(self.output_root, ignore_errors=True)
+
+
+def bench_stream_handlers(env, options):
+    handler = PlotterHandler.__new__(PlotterHandler)
+    handler.send_progress_update = lambda message, payload=None: None
+    results = {}
+    for count in (1000, 10000):
+        lines = progress_lines(count)
+        for stream in ('stdout', 'stderr'):
+            handle = getattr(handler, f'_handle_plot_{stream}_line')
+
+            def run():
+                PlotterHandler.last_progress_bar = None
+                for line in lines:
+                    handle(line)
+
+            result = measure(run, options.min_time, options.rounds)
+            result['per_line_s'] = result['median_s'] / count
+            results[f'stream.{stream}.lines_{count}'] = result
+    return results
+
+
+def bench_progress_fanout(env, options):
+    results = {}
+    for clients in (1, 10, 100):
+        PlotterHandler.sse_connections = {fake_sse_client() for _ in range(clients)}
+        sender = PlotterHandler.__new__(PlotterHandler)
+        payload = {'status': ' 42%|####      | 2743/6530 [01:03<01:27, 43.5 mm/s]',
+                   'metrics': {'done': 2743.0}}
+        results[f'sse.fanout.clients_{clients}'] = measure(
+            lambda: sender.send_progress_update('CLI_PROGRESS_BAR', payload),
+            options.min_time, options.rounds)
+    PlotterHandler.sse_connections = set()
+    return results
+
+
+def bench_save_svg(env, options):
+    results = {}
+    for megabytes in options.svg_megabytes:
+        svg = synthetic_svg(megabytes)
+        body = json.dumps({'name': 'bench', 'svg': svg, 'config': SAMPLE_CONFIG}).encode('utf-8')
+        results[f'save_svg.config_comment.{megabytes}mb'] = measure(
+            lambda: build_config_comment('bench', SAMPLE_CONFIG), options.min_time, options.rounds)
+        # Large documents take seconds per call, so one call per round is plenty
+        rounds = options.rounds if megabytes < 10 else max(1, min(options.rounds, 3))
+        results[f'save_svg.minidom.{megabytes}mb'] = measure(
+            lambda: xml.dom.minidom.parseString(svg).toprettyxml(indent='  '), 0, rounds)
+        connection = env.connection()
+
+        def post():
+            connection.request('POST', '/save-svg', body=body,
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f'/save-svg returned {response.status}')
+
+        results[f'save_svg.http.{megabytes}mb'] = measure(post, 0, rounds)
+        connection.close()
+        shutil.rmtree(os.path.join(env.output_root, 'bench'), ignore_errors=True)
+    return results
+
+
+def bench_manifest(env, options):
+    PlotterHandler.load_drawings_manifest()
+
+    def miss():
+        PlotterHandler.manifest_cache = {'mtime': None, 'data': None}
+        PlotterHandler.load_drawings_manifest()
+
+    return {
+        'manifest.cache_hit': measure(PlotterHandler.load_drawings_manifest, options.min_time,
+                                      options.rounds),
+        'manifest.cache_miss': measure(miss, options.min_time, options.rounds),
+    }
+
+
+def bench_static(env, options):
+    png = b'\x89PNG\r\n\x1a\n' + os.urandom(256 * 1024)
+    asset_id, _ = PlotterHandler.get_asset_store().put(png)
+    results = {}
+    connection = env.connection()
+    for name, path in (('static.main_js', '/client/js/main.js'),
+                       ('static.manifest', '/drawings-manifest.json'),
+                       ('static.asset_256kb', f'/assets/{asset_id}')):
+        def get(path=path):
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f'{path} returned {response.status}')
+
+        results[name] = measure(get, options.min_time, options.rounds)
+    connection.close()
+    return results
+
+
+CASES = {
+    'stream': bench_stream_handlers,
+    'sse': bench_progress_fanout,
+    'save_svg': bench_save_svg,
+    'manifest': bench_manifest,
+    'static': bench_static,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(options, report=print):
+    env = BenchEnvironment()
+    results = {}
+    try:
+        for group, bench in CASES.items():
+            if options.filter and not any(group.startswith(prefix) for prefix in options.filter):
+                continue
+            for name, result in bench(env, options).items():
+                results[name] = result
+                env.report(f"{name:<36} {result['median_s'] * 1e3:>12.4f} ms")
+    finally:
+        env.close()
+    return {
+        'meta': {
+            'createdAt': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'host': socket.gethostname(),
+            'revision': git_revision(),
+            'cpuCount': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Return ``(rows, regressions)``; each row is ``(name, baseline_s, current_s, ratio)``."""
+    rows = []
+    regressions = []
+    base = baseline.get('results', {})
+    now = current.get('results', {})
+    for name in sorted(set(base) | set(now)):
+        before = base.get(name, {}).get('median_s')
+        after = now.get(name, {}).get('median_s')
+        ratio = after / before if before and after is not None else None
+        rows.append((name, before, after, ratio))
+        if ratio is not None and ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_comparison(rows, threshold):
+    lines = [f"{'benchmark':<36} {'baseline ms':>12} {'current ms':>12} {'change':>8}"]
+    for name, before, after, ratio in rows:
+        before_text = f"{before * 1e3:.4f}" if before is not None else '-'
+        after_text = f"{after * 1e3:.4f}" if after is not None else '-'
+        change = f"{(ratio - 1) * 100:+.1f}%" if ratio is not None else 'n/a'
+        flag = '  REGRESSION' if ratio is not None and ratio > 1 + threshold else ''
+        lines.append(f"{name:<36} {before_text:>12} {after_text:>12} {change:>8}{flag}")
+    return '\n'.join(lines)
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the plotter server hot paths.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the benchmarks')
+    run.add_argument('-k', '--filter', action='append',
+                     help=f"Only run groups starting with this ({', '.join(CASES)})")
+    run.add_argument('-o', '--output', help='Write results JSON here')
+    run.add_argument('--save-baseline', nargs='?', const=default_baseline_path(), metavar='PATH',
+                     help='Also store the results as the baseline '
+                          '(default: benchmarks/baselines/<host>.json)')
+    run.add_argument('--quick', action='store_true', help='Short rounds and only the 1 MB SVG')
+    run.add_argument('--min-time', type=float, default=0.2, help='Seconds per timed round')
+    run.add_argument('--rounds', type=int, default=5)
+    run.add_argument('--compare', nargs='?', const=default_baseline_path(), metavar='BASELINE',
+                     help='Compare against a baseline after running')
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    compare = commands.add_parser('compare', help='Compare a results file against a baseline')
+    compare.add_argument('current')
+    compare.add_argument('--baseline', default=default_baseline_path())
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help='Allowed slowdown before a case counts as a regression (0.25 = 25%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    if options.command == 'compare':
+        current = load_json(options.current)
+        baseline = load_json(options.baseline)
+    else:
+        if options.quick:
+            options.min_time = min(options.min_time, 0.05)
+            options.rounds = min(options.rounds, 3)
+        options.svg_megabytes = QUICK_SVG_MEGABYTES if options.quick else FULL_SVG_MEGABYTES
+        current = run_benchmarks(options)
+        if options.output:
+            write_json(options.output, current)
+        if options.save_baseline:
+            write_json(options.save_baseline, current)
+            print(f"Baseline saved to {options.save_baseline}")
+        if not options.compare:
+            return 0
+        baseline = load_json(options.compare)
+    rows, regressions = compare_results(baseline, current, options.threshold)
+    print(format_comparison(rows, options.threshold))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {options.threshold * 100:.0f}%: "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+let configPromise = null;
+
+/**
+ * Fetch the server's combined config snapshot (plotters, papers, mediums, previewProfiles).
+ * The server sends an ETag with `Cache-Control: no-cache`, so repeat loads are cheap 304 revalidations.
+ */
+export function loadServerConfig({ refresh = false } = {}) {
+    if (!configPromise || refresh) {
+        configPromise = fetch('/config')
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load config (${response.status})`);
+                }
+                return response.json();
+            })
+            .catch(error => {
+                configPromise = null;
+                throw error;
+            });
+    }
+    return configPromise;
+}
@@ -14,7 +14,7 @@ function normalizeFeatures(features = {}) {
     };
 }
 
-export function registerDrawing({ id, name, configClass, drawFunction, validator, controls = [], features = {} }) {
+export function registerDrawing({ id, name, configClass, drawFunction, validator, controls = [], features = {}, modulePath = null }) {
     if (!id) {
         throw new Error('Drawing id is required');
     }
@@ -29,7 +29,8 @@ export function registerDrawing({ id, name, configClass, drawFunction, validator
         drawFunction,
         validator,
         controls: resolvedControls,
-        features: resolvedFeatures
+        features: resolvedFeatures,
+        modulePath
     };
     return drawingTypes[id];
 }
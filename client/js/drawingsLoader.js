@@ -4,7 +4,7 @@ const DRAWINGS_MANIFEST_PATH = '/drawings-manifest.json';
 const isBrowserEnvironment = typeof fetch === 'function';
 let loadPromise = null;
 
-function registerDrawingDefinition(definition) {
+function registerDrawingDefinition(definition, modulePath = null) {
     if (!definition || !definition.id) {
         console.warn('Skipping invalid drawing definition', definition);
         return;
@@ -19,7 +19,8 @@ function registerDrawingDefinition(definition) {
         drawFunction: definition.drawFunction,
         validator: definition.validator,
         controls: definition.controls,
-        features: definition.features
+        features: definition.features,
+        modulePath
     });
 
     (definition.presets || []).forEach(preset => {
@@ -48,7 +49,7 @@ async function importDrawing(entry, versionSuffix) {
             console.warn(`No drawing definition exported from ${entry.path}`);
             return;
         }
-        registerDrawingDefinition(definition);
+        registerDrawingDefinition(definition, entry.path);
     } catch (error) {
         console.error(`Failed to load drawing module at ${entry.path}`, error);
     }
@@ -10,6 +10,7 @@ import { normalizePaperColor, getPaperColor, getPaperTextureClass, computePlotte
 import { filterPaletteByDisabledColors, loadDisabledColorPrefs, saveDisabledColorPrefs } from './utils/paletteUtils.js';
 import { collectLayerColorNames, applyColorUsageHighlight } from './utils/layerColorUsage.js';
 import { loadPlotterSettings, persistPlotterSettings as persistPlotterSettingsToStorage } from './utils/plotterSettingsStorage.js';
+import { loadServerConfig } from './configClient.js';
 
 window.logDebug = logDebug;
 initLogTabs();
@@ -24,8 +25,30 @@ function setPreviewControlsDisabled(disabled) {
     }
 }
 
+function updatePenCursor(position) {
+    const svg = container?.querySelector('svg');
+    if (!svg) return;
+    let cursor = svg.querySelector('circle.pen-cursor');
+    if (!position) {
+        cursor?.remove();
+        return;
+    }
+    if (!cursor) {
+        cursor = document.createElementNS('http://www.w3.org/2000/svg', 'circle');
+        cursor.setAttribute('class', 'preview-only pen-cursor');
+        cursor.setAttribute('r', '1.5');
+        cursor.setAttribute('fill', 'none');
+        cursor.setAttribute('stroke-width', '0.5');
+        svg.appendChild(cursor);
+    }
+    cursor.setAttribute('cx', position.x);
+    cursor.setAttribute('cy', position.y);
+    cursor.setAttribute('stroke', position.down ? '#d62828' : '#999999');
+}
+
 function handlePlotReady(result) {
     stopProgressListener();
+    updatePenCursor(null);
     updatePlotterStatus('Ready');
     setPreviewControlsDisabled(false);
     refreshResumeStatus({ silent: true });
@@ -41,6 +64,7 @@ function beginProgressListener() {
         logDebug,
         logProgress,
         onPlotReady: handlePlotReady,
+        onPenPosition: updatePenCursor,
         playCompletionSiren
     });
 }
@@ -454,6 +478,42 @@ function readFileAsDataURL(file) {
     });
 }
 
+// Images are stored content-addressed on the server so drawings only carry a
+// short /assets/<id> URL through saves, persistence and render requests.
+async function uploadImageAsset(blob) {
+    const response = await fetch('/assets', {
+        method: 'POST',
+        headers: { 'Content-Type': blob.type || 'application/octet-stream' },
+        body: blob
+    });
+    const result = await response.json().catch(() => ({}));
+    if (!response.ok || result.status !== 'success') {
+        throw new Error(result.message || `Upload failed (${response.status})`);
+    }
+    return result.url;
+}
+
+async function resolveImageControlValue(file) {
+    try {
+        return await uploadImageAsset(file);
+    } catch (error) {
+        logDebug(`Image upload failed, keeping it inline: ${error.message}`, 'warn');
+        return readFileAsDataURL(file);
+    }
+}
+
+async function migrateInlineImage(dataUrl) {
+    if (typeof dataUrl !== 'string' || !dataUrl.startsWith('data:')) {
+        return dataUrl;
+    }
+    try {
+        const blob = await (await fetch(dataUrl)).blob();
+        return await uploadImageAsset(blob);
+    } catch {
+        return dataUrl;
+    }
+}
+
 async function loadImageMetadataFromDataUrl(dataUrl) {
     if (!dataUrl || typeof Image === 'undefined') {
         return null;
@@ -774,14 +834,8 @@ async function loadPlotterSpecs() {
         return state.plotterSpecs;
     }
     if (!plotterSpecsPromise) {
-        plotterSpecsPromise = fetch(`/config/plotters.json?v=${Date.now()}`)
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error(`Failed to load plotter config (${response.status})`);
-                }
-                return response.json();
-            })
-            .then(config => {
+        plotterSpecsPromise = loadServerConfig()
+            .then(({ plotters: config }) => {
                 const defaultId = config.default;
                 return config.plotters?.[defaultId] || null;
             })
@@ -1019,7 +1073,16 @@ async function applyStoredControlValues(context) {
     }
     for (const control of controls) {
         if (Object.prototype.hasOwnProperty.call(saved, control.id)) {
-            const savedValue = saved[control.id];
+            let savedValue = saved[control.id];
+            if (control.id === 'imageDataUrl') {
+                // Older sessions persisted the whole photo inline; move it to the asset store
+                const migrated = await migrateInlineImage(savedValue);
+                if (migrated !== savedValue) {
+                    saved[control.id] = migrated;
+                    savedValue = migrated;
+                    persistControlValues();
+                }
+            }
             setNestedValue(drawingConfig, control.target, savedValue);
             if (control.id === 'imageDataUrl') {
                 await ensurePhotoAspectMetadata(drawingConfig, savedValue);
@@ -1176,8 +1239,8 @@ function createControlElement(control, value, onChange) {
                 }
                 valueDisplay.textContent = file.name;
                 try {
-                    const dataUrl = await readFileAsDataURL(file);
-                    await onChange(dataUrl);
+                    const imageUrl = await resolveImageControlValue(file);
+                    await onChange(imageUrl);
                 } catch (error) {
                     logDebug(`Failed to load file: ${error.message}`, 'error');
                 }
@@ -1778,7 +1841,8 @@ initPlotterControls({
     updatePlotterStatus,
     setPreviewControlsDisabled,
     refreshResumeStatus,
-    clearResumeStatus: clearResumeStatusLocally
+    clearResumeStatus: clearResumeStatusLocally,
+    getPlotMargin: () => Number(state.currentMargin) || 0
 });
 
 refreshResumeStatus({ silent: true });
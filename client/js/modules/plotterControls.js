@@ -7,7 +7,8 @@ export function initPlotterControls({
     updatePlotterStatus,
     setPreviewControlsDisabled,
     refreshResumeStatus,
-    clearResumeStatus
+    clearResumeStatus,
+    getPlotMargin = () => 0
 }) {
     let lastPlottedLayer = null;
     const resumeButton = document.getElementById('plotterResumePlot');
@@ -49,7 +50,8 @@ export function initPlotterControls({
                 layerLabel,
                 pen_pos_up: penPosUp,
                 pen_pos_down: penPosDown,
-                pen_rate_lower: penRateLower
+                pen_rate_lower: penRateLower,
+                margin: getPlotMargin()
             });
             if (!success) {
                 throw new Error('Plot command failed to start');
@@ -10,6 +10,7 @@ const WORKER_TIMEOUT_MS = 10000;
 const MAX_PREVIEW_LAYERS = 400;
 const TARGET_PREVIEW_LAYERS = 150;
 const USE_WORKER_RENDER = true;
+const RENDER_CACHE_URL = '/render-cache';
 let generatorWorker = null;
 let workerReadyPromise = null;
 let resolveWorkerReady = null;
@@ -54,7 +55,7 @@ export function createPreviewController({
         disablePreviewControls(true);
         try {
             logDebug('Loading drawing modules and presets…');
-            const { drawings, drawingsReady } = await import('../drawings.js?v=' + Date.now());
+            const { drawings, drawingTypes, drawingsReady } = await import('../drawings.js?v=' + Date.now());
             await drawingsReady;
             syncDrawingStyles(drawings, state);
 
@@ -145,8 +146,9 @@ export function createPreviewController({
             let renderMode = attemptWorker ? 'worker' : 'main';
             let passesFromWorker = null;
             if (attemptWorker) {
-                renderResult = await runRenderGeneratorWorker({
+                renderResult = await renderWithServerCache({
                     drawingKey: select.value,
+                    modulePath: drawingTypes?.[selectedDrawing.type]?.modulePath ?? null,
                     controlValues,
                     paper: paperForRender,
                     orientation: state.currentOrientation,
@@ -535,6 +537,62 @@ function hydrateRenderResult({ renderResult, previewColor, maxTravelLimit }) {
     return { svg, travelSummary, renderContext };
 }
 
+async function lookupCachedRender(request) {
+    if (typeof fetch !== 'function') {
+        return null;
+    }
+    try {
+        const response = await fetch(`${RENDER_CACHE_URL}/lookup`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(request)
+        });
+        if (!response.ok) {
+            return null;
+        }
+        const data = await response.json();
+        return data.hit ? data.result : null;
+    } catch (error) {
+        console.debug('[preview] render cache lookup failed', error);
+        return null;
+    }
+}
+
+function storeCachedRender(request, result) {
+    if (typeof fetch !== 'function') {
+        return;
+    }
+    const { svgInfo, passes, travelSummary } = result;
+    fetch(RENDER_CACHE_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ request, result: { svgInfo, passes, travelSummary } })
+    }).catch(error => {
+        console.debug('[preview] render cache store failed', error);
+    });
+}
+
+// Repeated configurations come back from the server's render cache instead of being re-rendered
+async function renderWithServerCache(payload) {
+    const { abortSignal, ...request } = payload;
+    const startedAt = Date.now();
+    const cached = await lookupCachedRender(request);
+    if (cached && !abortSignal?.aborted) {
+        debugLogger?.(`Preview for ${request.drawingKey} served from the server render cache.`);
+        return {
+            ...cached,
+            drawingKey: request.drawingKey,
+            elapsedMs: Date.now() - startedAt,
+            cached: true
+        };
+    }
+    const result = await runRenderGeneratorWorker(payload);
+    if (result && !result.error) {
+        storeCachedRender(request, result);
+    }
+    return result;
+}
+
 async function runRenderGeneratorWorker(payload) {
     if (typeof Worker === 'undefined') {
         console.warn('[preview] worker unavailable: global Worker missing');
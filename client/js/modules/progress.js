@@ -38,7 +38,7 @@ function parsePercentFromStatus(status) {
     return normalizeProgressValue(match[0]);
 }
 
-export function startProgressListener({ logDebug, logProgress, onPlotReady, playCompletionSiren }) {
+export function startProgressListener({ logDebug, logProgress, onPlotReady, onPenPosition, playCompletionSiren }) {
     stopProgressListener();
     lastProgressBar = '';
     jsonProgressActive = false;
@@ -88,7 +88,11 @@ export function startProgressListener({ logDebug, logProgress, onPlotReady, play
                     if (!jsonProgressActive && payload && payload.status && payload.status !== lastProgressBar) {
                         lastProgressBar = payload.status;
                         const sourceLabel = payload.source ? ` (${payload.source})` : '';
-                        const derivedPercent = parsePercentFromStatus(payload.status);
+                        const derivedPercent = typeof payload.overall === 'number'
+                            ? normalizeProgressValue(payload.overall)
+                            : (typeof payload.metrics?.percent === 'number'
+                                ? normalizeProgressValue(payload.metrics.percent / 100)
+                                : parsePercentFromStatus(payload.status));
                         const message = `[AxiDraw] ${payload.status}${sourceLabel}`;
                         if (typeof logProgress === 'function') {
                             logProgress(message, derivedPercent);
@@ -98,6 +102,30 @@ export function startProgressListener({ logDebug, logProgress, onPlotReady, play
                     }
                     break;
                 }
+                case 'PLOT_STALLED': {
+                    const seconds = payload && typeof payload.stalledFor === 'number'
+                        ? Math.round(payload.stalledFor)
+                        : null;
+                    logDebug?.(`Plot progress stalled${seconds !== null ? ` for ${seconds}s` : ''}`, 'error');
+                    break;
+                }
+                case 'PEN_POSITION':
+                    if (payload && typeof payload.x === 'number' && typeof payload.y === 'number') {
+                        onPenPosition?.(payload);
+                    }
+                    break;
+                case 'CHUNK_PROGRESS': {
+                    if (payload && payload.state === 'completed') {
+                        const percent = normalizeProgressValue(payload.progress);
+                        const message = `[AxiDraw] Chunk ${payload.chunk}/${payload.chunks} complete`;
+                        if (typeof logProgress === 'function') {
+                            logProgress(message, percent);
+                        } else {
+                            logDebug?.(message, 'info');
+                        }
+                    }
+                    break;
+                }
                 default:
                     if (typeof data.progress === 'string' && data.progress.toLowerCase().includes('error')) {
                         logDebug?.(data.progress, 'error');
@@ -116,7 +144,7 @@ export function startProgressListener({ logDebug, logProgress, onPlotReady, play
         console.error('SSE error:', error);
         logDebug?.('Progress listener error, reconnecting...', 'error');
         stopProgressListener();
-        setTimeout(() => startProgressListener({ logDebug, logProgress, onPlotReady, playCompletionSiren }), 1000);
+        setTimeout(() => startProgressListener({ logDebug, logProgress, onPlotReady, onPenPosition, playCompletionSiren }), 1000);
     };
 
     progressEventSource.onopen = () => {
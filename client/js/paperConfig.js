@@ -1,7 +1,8 @@
+import { loadServerConfig } from './configClient.js';
+
 export async function loadPaperConfig() {
     try {
-        const response = await fetch(`/config/papers.json?v=${Date.now()}`);
-        const config = await response.json();
+        const config = (await loadServerConfig()).papers;
 return {
             papers: config.papers,
             default: config.default
@@ -3,6 +3,7 @@
  */
 
 import { areRectanglesAdjacent } from '../../../drawings/shared/utils/geometryUtils.js';
+import { loadServerConfig } from '../configClient.js';
 
 let colorPalettes = {};
 let colorPalette = {};
@@ -12,8 +13,7 @@ let maxMediumColorCount = 0;
 
 async function loadColorPalettes() {
     try {
-        const response = await fetch(`/config/mediums.json?v=${Date.now()}`);
-        const config = await response.json();
+        const config = (await loadServerConfig()).mediums;
         Object.entries(config.mediums).forEach(([id, medium]) => {
             const paletteName = `${id}Palette`;
             colorPalettes[paletteName] = convertMediumColors(medium);
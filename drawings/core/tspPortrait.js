@@ -41,6 +41,8 @@ class TspPortraitConfig extends SizedDrawingConfig {
         this.maskFeather = clampInteger(params.maskFeather, TSP_LIMITS.maskFeather.min, TSP_LIMITS.maskFeather.max, TSP_LIMITS.maskFeather.default);
         this.seed = clampInteger(params.seed, TSP_LIMITS.seed.min, TSP_LIMITS.seed.max, TSP_LIMITS.seed.default);
         this.matchPhotoAspectRatio = params.matchPhotoAspectRatio !== false;
+        this.serverRouting = params.serverRouting === true;
+        this.serverPreprocessing = params.serverPreprocessing === true;
         this.imageDataUrl = typeof params.imageDataUrl === 'string' ? params.imageDataUrl : '';
         this.imageAspectRatio = null;
         this.imageNaturalWidth = null;
@@ -482,21 +484,24 @@ function smoothPath(points, passes, windowSize) {
     return smoothed;
 }
 
-export async function drawTspPortrait(drawingConfig, renderContext) {
-    const { svg, builder } = createDrawingRuntime({ drawingConfig, renderContext });
-    const config = drawingConfig.drawingData;
-    if (!config.imageDataUrl) {
-        throw new Error('Upload a reference portrait to generate TSP art.');
-    }
+const PREPROCESS_MEMO_LIMIT = 4;
+const preprocessMemo = new Map();
+
+function preprocessKey(config) {
+    return [
+        config.sampleResolution,
+        config.shadeWeight,
+        config.edgeWeight,
+        config.headTightness,
+        config.maskThreshold,
+        config.maskFeather,
+        config.imageDataUrl
+    ].join('|');
+}
+
+async function computeDensityLocally(config) {
     const image = await loadImageData(config.imageDataUrl);
     const raster = rasterizeImage(image, config.sampleResolution);
-    config.setImageMetadata({
-        aspectRatio: raster.aspect,
-        width: raster.width,
-        height: raster.height,
-        source: config.imageDataUrl
-    });
-
     const edges = computeEdgeMap(raster.gray, raster.width, raster.height);
     const { mask } = buildHeadMask(
         raster.gray,
@@ -507,12 +512,122 @@ export async function drawTspPortrait(drawingConfig, renderContext) {
         config.maskFeather
     );
     const density = buildDensityMap(raster.gray, edges, mask, config.shadeWeight, config.edgeWeight);
+    return { width: raster.width, height: raster.height, aspect: raster.aspect, density };
+}
+
+function decodeUint16Map(encoded) {
+    const binary = atob(encoded);
+    const view = new DataView(new ArrayBuffer(binary.length));
+    for (let i = 0; i < binary.length; i++) {
+        view.setUint8(i, binary.charCodeAt(i));
+    }
+    const values = new Float32Array(binary.length / 2);
+    for (let i = 0; i < values.length; i++) {
+        values[i] = view.getUint16(i * 2, true) / 65535;
+    }
+    return values;
+}
+
+async function requestServerDensity(config) {
+    if (typeof fetch !== 'function') {
+        return null;
+    }
+    try {
+        const response = await fetch('/preprocess-image', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                image: config.imageDataUrl,
+                maps: ['density'],
+                params: {
+                    sampleResolution: config.sampleResolution,
+                    shadeWeight: config.shadeWeight,
+                    edgeWeight: config.edgeWeight,
+                    headTightness: config.headTightness,
+                    maskThreshold: config.maskThreshold,
+                    maskFeather: config.maskFeather
+                }
+            })
+        });
+        if (!response.ok) {
+            return null;
+        }
+        const result = await response.json();
+        if (result.status !== 'success' || !result.maps?.density) {
+            return null;
+        }
+        return {
+            width: result.width,
+            height: result.height,
+            aspect: result.aspect,
+            density: decodeUint16Map(result.maps.density)
+        };
+    } catch (error) {
+        console.warn('Server image preprocessing unavailable, processing locally', error);
+        return null;
+    }
+}
+
+// Density maps only depend on the photo and image parameters, so route and
+// smoothing tweaks reuse the last few results instead of re-rasterizing.
+async function prepareDensity(config) {
+    const key = preprocessKey(config);
+    const memoized = preprocessMemo.get(key);
+    if (memoized) {
+        return memoized;
+    }
+    const prepared = (config.serverPreprocessing ? await requestServerDensity(config) : null)
+        || await computeDensityLocally(config);
+    preprocessMemo.set(key, prepared);
+    if (preprocessMemo.size > PREPROCESS_MEMO_LIMIT) {
+        preprocessMemo.delete(preprocessMemo.keys().next().value);
+    }
+    return prepared;
+}
+
+async function requestServerRoute(points) {
+    if (typeof fetch !== 'function') {
+        return null;
+    }
+    try {
+        const response = await fetch('/tsp-route', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ points: points.flatMap(({ x, y }) => [x, y]) })
+        });
+        if (!response.ok) {
+            return null;
+        }
+        const result = await response.json();
+        if (result.status !== 'success' || !Array.isArray(result.route) || result.route.length !== points.length) {
+            return null;
+        }
+        return result.route;
+    } catch (error) {
+        console.warn('Server TSP routing unavailable, routing locally', error);
+        return null;
+    }
+}
+
+export async function drawTspPortrait(drawingConfig, renderContext) {
+    const { svg, builder } = createDrawingRuntime({ drawingConfig, renderContext });
+    const config = drawingConfig.drawingData;
+    if (!config.imageDataUrl) {
+        throw new Error('Upload a reference portrait to generate TSP art.');
+    }
+    const prepared = await prepareDensity(config);
+    config.setImageMetadata({
+        aspectRatio: prepared.aspect,
+        width: prepared.width,
+        height: prepared.height,
+        source: config.imageDataUrl
+    });
 
     const rng = createSeededRandom(config.seed);
     const sampled = samplePoints({
-        density,
-        width: raster.width,
-        height: raster.height,
+        density: prepared.density,
+        width: prepared.width,
+        height: prepared.height,
         count: config.pointCount,
         rng
     });
@@ -527,8 +642,9 @@ export async function drawTspPortrait(drawingConfig, renderContext) {
         x: u * bounds.width,
         y: v * bounds.height
     }));
-    const route = buildApproxNearestNeighborRoute(routePoints);
-    const refinedRoute = twoOpt(route, routePoints, config.twoOptPasses, rng);
+    const serverRoute = config.serverRouting ? await requestServerRoute(routePoints) : null;
+    const refinedRoute = serverRoute
+        || twoOpt(buildApproxNearestNeighborRoute(routePoints), routePoints, config.twoOptPasses, rng);
     const ordered = refinedRoute.map((idx) => routePoints[idx]);
     const smoothed = smoothPath(ordered, config.smoothingPasses, config.smoothingWindow);
     const projected = builder.projectPoints(smoothed);
@@ -615,6 +731,24 @@ const tspPortraitControls = [
         default: TSP_LIMITS.twoOptPasses.default,
         description: 'How many times to untangle the route crossings'
     },
+    {
+        id: 'serverPreprocessing',
+        label: 'Server Preprocessing',
+        target: 'drawingData.serverPreprocessing',
+        inputType: 'checkbox',
+        valueType: 'boolean',
+        default: false,
+        description: 'Build the density map on the plot server and cache it per photo (falls back to in-browser processing)'
+    },
+    {
+        id: 'serverRouting',
+        label: 'Server Routing',
+        target: 'drawingData.serverRouting',
+        inputType: 'checkbox',
+        valueType: 'boolean',
+        default: false,
+        description: 'Solve the route on the plot server (falls back to in-browser routing)'
+    },
     {
         id: 'smoothingPasses',
         label: 'Smoothing Passes',
@@ -708,6 +842,8 @@ const tspPortraitDefinition = attachControls(defineDrawing({
                 maskThreshold: TSP_LIMITS.maskThreshold.default,
                 maskFeather: TSP_LIMITS.maskFeather.default,
                 matchPhotoAspectRatio: true,
+                serverRouting: false,
+                serverPreprocessing: false,
                 seed: TSP_LIMITS.seed.default,
                 line: {
                     strokeWidth: 0.3
@@ -32,11 +32,11 @@ async function loadPlotterCapabilities() {
         return;
     }
     try {
-        const response = await fetch(`/config/plotters.json?v=${Date.now()}`);
+        const response = await fetch('/config');
         if (!response.ok) {
             throw new Error(`Failed to load plotter config (${response.status})`);
         }
-        const data = await response.json();
+        const data = (await response.json()).plotters;
         const defaultId = data.default;
         const plotter = data.plotters?.[defaultId];
         const specs = plotter?.specs || {};
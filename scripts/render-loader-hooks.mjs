@@ -0,0 +1,11 @@
+// Module resolution hooks for scripts/render-worker.mjs: the browser imports drawing modules by
+// their URL path (`/drawings/core/voronoi.js?v=…`), which Node maps to files in the repository.
+const REPO_ROOT = new URL('../', import.meta.url);
+const SERVED_PREFIXES = ['/drawings/', '/client/'];
+
+export async function resolve(specifier, context, nextResolve) {
+    if (SERVED_PREFIXES.some(prefix => specifier.startsWith(prefix))) {
+        return nextResolve(new URL(`.${specifier}`, REPO_ROOT).href, context);
+    }
+    return nextResolve(specifier, context);
+}
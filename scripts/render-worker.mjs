@@ -0,0 +1,228 @@
+#!/usr/bin/env node
+/**
+ * Headless drawing renderer driven by server/render_pool.py.
+ *
+ * Loads the drawings listed in the server's manifest with the browser's own modules, swapped to
+ * the data adapters the render worker uses, then reads one JSON render job per line on stdin and
+ * answers each with one JSON line on stdout: the SVG as the page would save it, plus the layer
+ * and travel summaries. Relative fetches (`/config`, `/drawings-manifest.json`, `/tsp-route`,
+ * assets) go to the server named by PLOTTER_SERVER_URL. Logging goes to stderr so stdout only
+ * carries results.
+ */
+import { register } from 'node:module';
+import { createInterface } from 'node:readline';
+
+register(new URL('./render-loader-hooks.mjs', import.meta.url));
+
+const SERVER_URL = process.env.PLOTTER_SERVER_URL || 'http://localhost:8000';
+const SVG_NS = 'http://www.w3.org/2000/svg';
+const INKSCAPE_NS = 'http://www.inkscape.org/namespaces/inkscape';
+
+for (const level of ['log', 'info', 'debug', 'warn']) {
+    console[level] = console.error.bind(console);
+}
+
+const nativeFetch = globalThis.fetch;
+globalThis.fetch = (resource, init) => {
+    const target = typeof resource === 'string' && resource.startsWith('/')
+        ? new URL(resource, SERVER_URL)
+        : resource;
+    return nativeFetch(target, init);
+};
+
+const { setClientAdapters } = await import('/drawings/shared/clientAdapters.js');
+const dataAdapters = await import('/drawings/shared/dataAdapters.js');
+setClientAdapters(dataAdapters);
+const { drawings, drawingTypes, drawingsReady } = await import('/client/js/drawings.js');
+await drawingsReady;
+const { generateSVG } = await import('/client/js/app.js');
+const { colorPalettes } = await import('/client/js/utils/colorUtils.js');
+const { splitPassesByTravel } = await import('/client/js/utils/passTravelLimiter.js');
+
+// Controls write into the shared preset objects, so every job starts from a pristine copy
+const pristine = new Map(Object.entries(drawings).map(([key, config]) => [key, snapshot(config)]));
+
+function snapshot(config) {
+    return {
+        line: { ...config.line },
+        colorPalette: config.colorPalette,
+        drawingData: Object.fromEntries(
+            Object.entries(config.drawingData).map(([name, value]) => [name, cloneValue(value)])
+        )
+    };
+}
+
+function cloneValue(value) {
+    try {
+        return structuredClone(value);
+    } catch {
+        return value;
+    }
+}
+
+function resolveDrawing(drawingKey) {
+    if (drawings[drawingKey]) {
+        return drawingKey;
+    }
+    // A drawing type id selects its first preset
+    return Object.keys(drawings).find(key => drawings[key].type === drawingKey) || null;
+}
+
+function setNestedValue(obj, path, value) {
+    const segments = path.split('.');
+    let current = obj;
+    for (let i = 0; i < segments.length - 1; i += 1) {
+        if (current[segments[i]] === undefined || current[segments[i]] === null) {
+            current[segments[i]] = {};
+        }
+        current = current[segments[i]];
+    }
+    current[segments[segments.length - 1]] = value;
+}
+
+function prepareConfig(drawingKey, job) {
+    const config = drawings[drawingKey];
+    const original = pristine.get(drawingKey);
+    config.line = { ...original.line, ...(job.lineOverrides || {}) };
+    config.colorPalette = original.colorPalette;
+    for (const name of Object.keys(config.drawingData)) {
+        if (!(name in original.drawingData)) {
+            delete config.drawingData[name];
+        }
+    }
+    for (const [name, value] of Object.entries(original.drawingData)) {
+        config.drawingData[name] = cloneValue(value);
+    }
+    if (job.mediumId) {
+        const palette = colorPalettes[`${job.mediumId}Palette`];
+        if (!palette) {
+            throw new Error(`Unknown medium: ${job.mediumId}`);
+        }
+        config.colorPalette = palette;
+    }
+    const controls = drawingTypes[config.type]?.controls || [];
+    const values = job.controlValues || {};
+    const unknown = Object.keys(values).filter(id => !controls.some(control => control.id === id));
+    if (unknown.length) {
+        throw new Error(`Unknown controls for ${config.type}: ${unknown.join(', ')}`);
+    }
+    controls.forEach(control => {
+        if (Object.prototype.hasOwnProperty.call(values, control.id)) {
+            setNestedValue(config, control.target, values[control.id]);
+        }
+    });
+    return config;
+}
+
+function escapeAttribute(value) {
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/"/g, '&quot;')
+        .replace(/</g, '&lt;');
+}
+
+function buildPathData(points = []) {
+    return points.map((point, index) => `${index === 0 ? 'M' : 'L'} ${point.x} ${point.y}`).join(' ');
+}
+
+// Mirrors createSVG and rebuildDrawingLayer in the page, without the preview-only guides
+function serializeSvg(svgInfo, passes) {
+    const { paperWidth, paperHeight, orientation } = svgInfo;
+    const layers = passes.filter(entry => entry?.paths?.length).map((entry, idx) => {
+        const label = entry.label || entry.baseLabel || 'Layer';
+        const attributes = [
+            'inkscape:groupmode="layer"',
+            `inkscape:label="${escapeAttribute(`${idx}-${label}`)}"`,
+            `data-layer-order="${entry.baseOrder ?? idx}"`,
+            `data-layer-base="${escapeAttribute(entry.baseLabel || label)}"`
+        ];
+        if (entry.travelMm > 0) {
+            attributes.push(`data-travel-mm="${entry.travelMm.toFixed(2)}"`);
+        }
+        if (entry.stroke) {
+            attributes.push(`stroke="${escapeAttribute(entry.stroke)}"`);
+        }
+        const paths = entry.paths.map(path => {
+            const pathAttributes = [`d="${buildPathData(path.points)}"`, 'fill="none"'];
+            if (path.strokeWidth) {
+                pathAttributes.push(`stroke-width="${escapeAttribute(path.strokeWidth)}"`);
+            }
+            if (path.strokeLinecap) {
+                pathAttributes.push(`stroke-linecap="${escapeAttribute(path.strokeLinecap)}"`);
+            }
+            if (path.strokeLinejoin) {
+                pathAttributes.push(`stroke-linejoin="${escapeAttribute(path.strokeLinejoin)}"`);
+            }
+            if (path.stroke) {
+                pathAttributes.push(`stroke="${escapeAttribute(path.stroke)}"`);
+            }
+            return `<path ${pathAttributes.join(' ')}/>`;
+        });
+        return `<g ${attributes.join(' ')}>${paths.join('')}</g>`;
+    });
+    return `<svg xmlns="${SVG_NS}" xmlns:svg="${SVG_NS}" xmlns:inkscape="${INKSCAPE_NS}" `
+        + `width="${paperWidth}mm" height="${paperHeight}mm" viewBox="0 0 ${paperWidth} ${paperHeight}" `
+        + `data-orientation="${orientation}"><g data-role="drawing-content">${layers.join('')}</g></svg>`;
+}
+
+async function render(job) {
+    const drawingKey = resolveDrawing(job.drawingKey);
+    if (!drawingKey) {
+        throw new Error(`Unknown drawing: ${job.drawingKey}`);
+    }
+    const config = prepareConfig(drawingKey, job);
+    const { svg, renderContext } = await generateSVG(config, {
+        paper: job.paper,
+        orientation: job.orientation,
+        plotterArea: job.plotterArea
+    });
+    const passes = (svg.layers || []).map((layer, index) => ({
+        baseOrder: index,
+        baseLabel: layer.name || layer.color || 'Layer',
+        label: `${index}-${layer.name || 'Layer'}`,
+        stroke: layer.color,
+        paths: layer.paths || []
+    }));
+    const { passes: splitPasses, ...travelSummary } = splitPassesByTravel(passes, job.maxTravelPerLayerMeters);
+    const svgInfo = {
+        paperWidth: renderContext.paperWidth,
+        paperHeight: renderContext.paperHeight,
+        margin: renderContext.margin,
+        orientation: renderContext.orientation
+    };
+    return {
+        drawingKey,
+        drawingType: config.type,
+        name: config.name,
+        svg: serializeSvg(svgInfo, splitPasses),
+        svgInfo,
+        travelSummary,
+        layers: splitPasses.filter(entry => entry?.paths?.length).map(entry => ({
+            label: entry.label,
+            stroke: entry.stroke || null,
+            paths: entry.paths.length,
+            travelMm: Math.round(entry.travelMm * 100) / 100
+        }))
+    };
+}
+
+function reply(message) {
+    process.stdout.write(`${JSON.stringify(message)}\n`);
+}
+
+reply({ type: 'ready', drawings: Object.keys(drawings) });
+
+const lines = createInterface({ input: process.stdin, crlfDelay: Infinity });
+for await (const line of lines) {
+    if (!line.trim()) {
+        continue;
+    }
+    let job = null;
+    const startedAt = Date.now();
+    try {
+        job = JSON.parse(line);
+        reply({ type: 'result', id: job.id, ...(await render(job)), elapsedMs: Date.now() - startedAt });
+    } catch (error) {
+        reply({ type: 'result', id: job?.id ?? null, error: error?.message || String(error) });
+    }
+}
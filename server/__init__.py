@@ -1,3 +1,2 @@
 # This file makes the server directory a Python package
-from . import plotter_config
 from . import server
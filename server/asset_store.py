@@ -0,0 +1,86 @@
+"""Content-addressed store for uploaded reference images.
+
+Photo drawings used to carry their source image as a base64 data URL in every
+config, save and localStorage snapshot. Uploads are instead written once as
+``<sha256>.<ext>`` and referenced by the short URL ``/assets/<id>``; because an
+id names its bytes, responses can be cached by browsers forever.
+"""
+import hashlib
+import os
+import re
+
+ASSET_URL_PREFIX = '/assets/'
+MAX_ASSET_BYTES = 25 * 1024 * 1024
+ASSET_ID_PATTERN = re.compile(r'^[0-9a-f]{64}\.(png|jpg|gif|webp)$')
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+}
+
+
+class AssetError(ValueError):
+    pass
+
+
+def sniff_extension(data):
+    """Identify an image by its magic bytes; declared content types are not trusted."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def asset_id_from_url(url):
+    """Return the asset id for an ``/assets/<id>`` URL, or None for anything else."""
+    if not isinstance(url, str) or not url.startswith(ASSET_URL_PREFIX):
+        return None
+    asset_id = url[len(ASSET_URL_PREFIX):].split('?', 1)[0]
+    return asset_id if ASSET_ID_PATTERN.match(asset_id) else None
+
+
+class AssetStore:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, asset_id):
+        if not ASSET_ID_PATTERN.match(asset_id or ''):
+            return None
+        return os.path.join(self.directory, asset_id)
+
+    def content_type(self, asset_id):
+        return CONTENT_TYPES[asset_id.rsplit('.', 1)[1]]
+
+    def put(self, data):
+        """Store ``data`` and return ``(asset_id, created)``."""
+        if not data:
+            raise AssetError('Empty upload')
+        if len(data) > MAX_ASSET_BYTES:
+            raise AssetError(f"Asset exceeds {MAX_ASSET_BYTES} bytes")
+        extension = sniff_extension(data)
+        if not extension:
+            raise AssetError('Unsupported image type; upload PNG, JPEG, GIF or WebP')
+        asset_id = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self.path_for(asset_id)
+        if os.path.exists(path):
+            return asset_id, False
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+        return asset_id, True
+
+    def read(self, asset_id):
+        path = self.path_for(asset_id)
+        if not path or not os.path.isfile(path):
+            raise AssetError(f"Unknown asset {asset_id}")
+        with open(path, 'rb') as handle:
+            return handle.read()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Stand-in for ``axicli`` so the server can be exercised without a plotter.
+
+Point the server at it with ``AXIDRAW_PATH=server/axicli_sim.py``. It accepts
+the argument surface the server uses (``--mode layers/plot/res_plot/manual/
+toggle/align/cycle``, ``--layer``, ``--progress``, ``--output_file`` and the
+pen/speed options), walks the SVG's strokes with the same ``TravelIndex`` the
+server uses for pen tracking, and prints tqdm-style ``Plot Progress:`` bars
+to stderr. Timing comes from the plotter's ``max_travel_speed_mm_s`` in
+``config/plotters.json`` scaled by ``--speed_pendown``/``--speed_penup``;
+``AXICLI_SIM_SPEED`` multiplies simulated time (e.g. ``50`` runs 50x faster).
+
+SIGINT pauses like the real CLI: the plot stops, and ``--output_file``
+receives the input SVG with a ``<plotdata pause_dist=…>`` element that a
+later ``--mode res_plot`` run continues from.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    from pen_position import TravelIndex
+    from svg_layers import (SVG_NS, element_polylines, iter_stroke_elements, layer_polylines,
+                            local_name, parse_svg)
+except ImportError:
+    from .pen_position import TravelIndex
+    from .svg_layers import (SVG_NS, element_polylines, iter_stroke_elements, layer_polylines,
+                             local_name, parse_svg)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(REPO_ROOT, 'config', 'plotters.json')
+DEFAULT_MAX_SPEED = 381.0  # mm/s, AxiDraw SE/A3
+DEFAULT_SPEED_PENDOWN = 25  # axicli defaults, percent of max speed
+DEFAULT_SPEED_PENUP = 75
+PEN_TRANSITION_SECONDS = 0.15  # Time for one pen lift or lower
+MANUAL_COMMAND_SECONDS = 0.3
+TICK_SECONDS = 0.1  # tqdm's default refresh interval
+BAR_WIDTH = 10
+
+
+class Paused(Exception):
+    pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='axicli', description='Simulated AxiDraw CLI')
+    parser.add_argument('svg', nargs='?')
+    parser.add_argument('--mode', default='plot')
+    parser.add_argument('--layer', type=int)
+    parser.add_argument('--manual_cmd')
+    parser.add_argument('--model', type=int)
+    parser.add_argument('--penlift', type=int)
+    parser.add_argument('--speed_pendown', type=float, default=DEFAULT_SPEED_PENDOWN)
+    parser.add_argument('--speed_penup', type=float, default=DEFAULT_SPEED_PENUP)
+    parser.add_argument('--output_file')
+    parser.add_argument('--progress', action='store_true')
+    # Pen heights, rates and acceleration do not affect the simulation
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def max_travel_speed(model):
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as handle:
+            config = json.load(handle)
+    except (OSError, ValueError):
+        return DEFAULT_MAX_SPEED
+    plotters = config.get('plotters') or {}
+    matching = [p for p in plotters.values() if model is not None and p.get('model') == model]
+    plotter = matching[0] if matching else plotters.get(config.get('default')) or {}
+    return float((plotter.get('specs') or {}).get('max_travel_speed_mm_s') or DEFAULT_MAX_SPEED)
+
+
+def all_polylines(root):
+    polylines = []
+    for element in iter_stroke_elements(root):
+        polylines.extend(element_polylines(element))
+    return polylines
+
+
+class TravelTimeline:
+    """Cumulative simulated time at every vertex of a ``TravelIndex``."""
+
+    def __init__(self, index, pendown_speed, penup_speed):
+        self.index = index
+        self.times = [0.0]
+        for position in range(1, len(index.distances)):
+            span = index.distances[position] - index.distances[position - 1]
+            down = index.pen_down[position]
+            seconds = span / (pendown_speed if down else penup_speed)
+            if down != index.pen_down[position - 1]:
+                seconds += PEN_TRANSITION_SECONDS
+            self.times.append(self.times[-1] + seconds)
+
+    @property
+    def duration(self):
+        return self.times[-1]
+
+    def _interpolate(self, source, target, value):
+        if value <= source[0]:
+            return target[0]
+        if value >= source[-1]:
+            return target[-1]
+        low, high = 0, len(source) - 1
+        while high - low > 1:
+            middle = (low + high) // 2
+            if source[middle] <= value:
+                low = middle
+            else:
+                high = middle
+        span = source[high] - source[low]
+        t = (value - source[low]) / span if span > 0 else 1.0
+        return target[low] + (target[high] - target[low]) * t
+
+    def distance_at(self, seconds):
+        return self._interpolate(self.times, self.index.distances, seconds)
+
+    def time_at(self, distance):
+        return self._interpolate(self.index.distances, self.times, distance)
+
+
+def format_clock(seconds):
+    seconds = int(max(0, seconds))
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def format_bar(done, total, elapsed, remaining, start=0.0):
+    fraction = done / total if total > 0 else 1.0
+    filled = int(fraction * BAR_WIDTH)
+    rate = (done - start) / elapsed if elapsed > 0 else None
+    rate_text = f"{rate:.1f} mm/s" if rate is not None else '? mm/s'
+    return (f"{fraction * 100:3.0f}%|{'#' * filled}{' ' * (BAR_WIDTH - filled)}| "
+            f"{done:.0f}/{total:.0f} "
+            f"[{format_clock(elapsed)}<{format_clock(remaining)}, {rate_text}]")
+
+
+def run_plot(timeline, start_distance, show_progress, speed, paused):
+    """Advance through the timeline at ``speed`` times real time; return the distance reached."""
+    total = timeline.index.total
+    start_time = timeline.time_at(start_distance)
+    started = time.monotonic()
+    distance = start_distance
+    while True:
+        simulated = min(timeline.duration, start_time + (time.monotonic() - started) * speed)
+        distance = timeline.distance_at(simulated)
+        if show_progress:
+            bar = format_bar(distance, total, simulated - start_time,
+                             timeline.duration - simulated, start_distance)
+            sys.stderr.write(f"\rPlot Progress: {bar}")
+            sys.stderr.flush()
+        if paused():
+            raise Paused(distance)
+        if simulated >= timeline.duration:
+            break
+        time.sleep(TICK_SECONDS)
+    if show_progress:
+        sys.stderr.write('\n')
+    return distance
+
+
+def find_plotdata(root):
+    for element in root.iter():
+        if local_name(element) == 'plotdata':
+            return element
+    return None
+
+
+def write_output(root, path, layer, pause_distance, total):
+    plotdata = find_plotdata(root)
+    if plotdata is None:
+        plotdata = ET.SubElement(root, f'{{{SVG_NS}}}plotdata')
+    plotdata.set('application', 'axicli-sim')
+    plotdata.set('layer', '' if layer is None else str(layer))
+    plotdata.set('pause_dist', f"{pause_distance:.3f}")
+    plotdata.set('total_dist', f"{total:.3f}")
+    temp_path = f"{path}.tmp"
+    ET.ElementTree(root).write(temp_path, encoding='unicode', xml_declaration=False)
+    os.replace(temp_path, path)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    speed = max(float(os.environ.get('AXICLI_SIM_SPEED', '1') or 1), 1e-6)
+    interrupted = []
+    signal.signal(signal.SIGINT, lambda signum, frame: interrupted.append(signum))
+
+    if args.mode in ('manual', 'toggle', 'align', 'cycle'):
+        time.sleep(MANUAL_COMMAND_SECONDS / speed)
+        return 0
+    if args.mode not in ('plot', 'layers', 'res_plot'):
+        print(f"Error: unsupported mode {args.mode}", file=sys.stderr)
+        return 1
+    if not args.svg:
+        print('Error: no input SVG file given', file=sys.stderr)
+        return 1
+    try:
+        with open(args.svg, 'rb') as handle:
+            root = parse_svg(handle.read())
+    except (OSError, ET.ParseError) as e:
+        print(f"Error: unable to read {args.svg}: {e}", file=sys.stderr)
+        return 1
+
+    layer = args.layer if args.mode == 'layers' else None
+    start_distance = 0.0
+    if args.mode == 'res_plot':
+        plotdata = find_plotdata(root)
+        if plotdata is None or float(plotdata.get('pause_dist') or 0) <= 0:
+            print('Error: no resume data found in input file', file=sys.stderr)
+            return 1
+        layer = int(plotdata.get('layer')) if plotdata.get('layer') else None
+        start_distance = float(plotdata.get('pause_dist'))
+
+    index = TravelIndex(layer_polylines(root, layer) if layer is not None else all_polylines(root))
+    max_speed = max_travel_speed(args.model)
+    timeline = TravelTimeline(
+        index,
+        max_speed * max(args.speed_pendown, 1) / 100.0,
+        max_speed * max(args.speed_penup, 1) / 100.0
+    )
+    try:
+        run_plot(timeline, start_distance, args.progress, speed, lambda: bool(interrupted))
+    except Paused as paused:
+        sys.stderr.write('\n')
+        print('Plot paused by keyboard interrupt.', file=sys.stderr)
+        if args.output_file:
+            write_output(root, args.output_file, layer, paused.args[0], index.total)
+        return 0
+    if args.output_file:
+        write_output(root, args.output_file, layer, 0.0, index.total)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Validated, hot-reloadable view of ``config/*.json``.
+
+``ConfigRegistry.snapshot()`` returns an immutable ``ConfigSnapshot`` of the
+plotter, paper, medium and preview-profile files. Snapshots are rebuilt
+only when a file's mtime or size changes (checked at most every
+``check_interval`` seconds). A rebuilt snapshot replaces the current one in
+a single assignment, so a request never sees half of an edit. A file that
+fails to parse or validate leaves the previous snapshot in place and is
+reported through ``last_error``.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config')
+CONFIG_FILES = {
+    'plotters': 'plotters.json',
+    'papers': 'papers.json',
+    'mediums': 'mediums.json',
+    'previewProfiles': 'previewProfiles.json',
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _require_mapping(value, where):
+    if not isinstance(value, dict):
+        raise ConfigError(f"{where} must be an object")
+    return value
+
+
+def _require_default(config, collection, where):
+    entries = _require_mapping(config.get(collection), f"{where}.{collection}")
+    if not entries:
+        raise ConfigError(f"{where}.{collection} is empty")
+    default = config.get('default')
+    if default is not None and default not in entries:
+        raise ConfigError(f"{where}.default '{default}' is not one of its {collection}")
+    return entries
+
+
+def validate_plotters(config):
+    plotters = _require_default(config, 'plotters', 'plotters.json')
+    if config.get('default') is None:
+        raise ConfigError('plotters.json.default is required')
+    for plotter_id, plotter in plotters.items():
+        where = f"plotters.json.plotters.{plotter_id}"
+        _require_mapping(plotter, where)
+        for key in ('model', 'penlift'):
+            if not isinstance(plotter.get(key), int) or isinstance(plotter.get(key), bool):
+                raise ConfigError(f"{where}.{key} must be an integer")
+        paper = plotter.get('paper')
+        if paper is not None:
+            paper = _require_mapping(paper, f"{where}.paper")
+        if paper is not None and not all(_is_number(paper.get(key)) for key in ('width', 'height')):
+            raise ConfigError(f"{where}.paper needs numeric width and height")
+
+
+def validate_papers(config):
+    papers = _require_default(config, 'papers', 'papers.json')
+    for paper_id, paper in papers.items():
+        where = f"papers.json.papers.{paper_id}"
+        _require_mapping(paper, where)
+        for key in ('width', 'height'):
+            if not _is_number(paper.get(key)) or paper[key] <= 0:
+                raise ConfigError(f"{where}.{key} must be a positive number")
+        if 'margin' in paper and (not _is_number(paper['margin']) or paper['margin'] < 0):
+            raise ConfigError(f"{where}.margin must be a non-negative number")
+
+
+def validate_mediums(config):
+    mediums = _require_default(config, 'mediums', 'mediums.json')
+    for medium_id, medium in mediums.items():
+        where = f"mediums.json.mediums.{medium_id}"
+        _require_mapping(medium, where)
+        colors = medium.get('colors')
+        if colors is None:
+            continue
+        for color_id, color in _require_mapping(colors, f"{where}.colors").items():
+            color = _require_mapping(color, f"{where}.colors.{color_id}")
+            if not isinstance(color.get('hex'), str):
+                raise ConfigError(f"{where}.colors.{color_id}.hex must be a string")
+
+
+def validate_preview_profiles(config):
+    defaults = _require_mapping(config.get('defaults'), 'previewProfiles.json.defaults')
+    for key, value in defaults.items():
+        if not _is_number(value):
+            raise ConfigError(f"previewProfiles.json.defaults.{key} must be a number")
+
+
+VALIDATORS = {
+    'plotters': validate_plotters,
+    'papers': validate_papers,
+    'mediums': validate_mediums,
+    'previewProfiles': validate_preview_profiles,
+}
+
+
+def freeze(value):
+    """Recursively convert parsed JSON into read-only mappings and tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Plain dicts and lists for a frozen value, e.g. to send it on as JSON."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigSnapshot:
+    """One consistent, read-only generation of every config file."""
+
+    __slots__ = ('version', 'etag', 'body', 'sections', 'plotter_id', 'plotter', 'plotter_flags')
+
+    def __init__(self, version, raw):
+        self.version = version
+        payload = json.dumps(raw, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+        # Pre-serialized for /config so each request only copies bytes
+        self.body = json.dumps({'version': version, **raw}, separators=(',', ':')).encode('utf-8')
+        self.sections = freeze(raw)
+        self.plotter_id = raw['plotters']['default']
+        self.plotter = self.sections['plotters']['plotters'][self.plotter_id]
+        # axicli flags every command repeats, formatted once per generation
+        self.plotter_flags = (str(self.plotter['model']), str(self.plotter['penlift']))
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+
+class ConfigRegistry:
+    def __init__(self, directory=CONFIG_DIR, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.last_error = None
+        self._stamps = None
+        self._checked_at = 0.0
+        self._snapshot = None
+        self.reload(force=True, raise_errors=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, CONFIG_FILES[name])
+
+    def _stat_files(self):
+        stamps = {}
+        for name in CONFIG_FILES:
+            try:
+                stat = os.stat(self._path(name))
+                stamps[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stamps[name] = None
+        return stamps
+
+    def _load(self):
+        raw = {}
+        for name, validate in VALIDATORS.items():
+            path = self._path(name)
+            try:
+                with open(path, 'r', encoding='utf-8') as handle:
+                    data = json.load(handle)
+            except OSError as e:
+                raise ConfigError(f"Cannot read {CONFIG_FILES[name]}: {e}")
+            except ValueError as e:
+                raise ConfigError(f"Invalid JSON in {CONFIG_FILES[name]}: {e}")
+            validate(_require_mapping(data, CONFIG_FILES[name]))
+            raw[name] = data
+        return raw
+
+    def reload(self, force=False, raise_errors=False):
+        """Rebuild the snapshot if any file changed; return True when a new one was installed."""
+        with self.lock:
+            stamps = self._stat_files()
+            self._checked_at = time.monotonic()
+            if not force and stamps == self._stamps:
+                return False
+            try:
+                raw = self._load()
+            except ConfigError as e:
+                self.last_error = str(e)
+                if raise_errors:
+                    raise
+                print(f"⚠️ Keeping previous config: {e}")
+                # Remember the broken stamps so the same bad file is not re-parsed on every request
+                self._stamps = stamps
+                return False
+            self._stamps = stamps
+            self.last_error = None
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            snapshot = ConfigSnapshot(version, raw)
+            if self._snapshot and snapshot.etag == self._snapshot.etag:
+                return False  # Touched but unchanged; keep the version clients already hold
+            self._snapshot = snapshot
+            return True
+
+    def snapshot(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._snapshot
@@ -0,0 +1,324 @@
+"""In-process diagnostics for a running server: stack sampling, heap snapshots and thread dumps.
+
+Everything here attaches to the live process, so a sluggish server can be
+inspected mid-plot without restarting it under a profiler. The HTTP side
+(``/debug/...`` in ``server.py``) only answers loopback clients that present
+the token from ``load_debug_token``. The token file lives in the user's runtime
+or config directory, never in the working directory or ``output/``, so no
+static route can serve it.
+"""
+import hmac
+import ipaddress
+import os
+import secrets
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter, OrderedDict
+
+DEBUG_TOKEN_ENV = 'PLOTTER_DEBUG_TOKEN'
+DEBUG_TOKEN_FILE_NAME = 'debug_token'
+DEBUG_TOKEN_APP_DIR = 'plotter-server'
+DEBUG_TOKEN_HEADER = 'X-Debug-Token'
+MAX_STACK_DEPTH = 64
+MAX_SNAPSHOTS = 8  # Older tracemalloc snapshots are dropped first
+
+
+def default_token_directory():
+    """``$XDG_RUNTIME_DIR/plotter-server``, else ``~/.config/plotter-server``."""
+    base = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, DEBUG_TOKEN_APP_DIR)
+
+
+def load_debug_token(directory=None):
+    """The debug token from ``PLOTTER_DEBUG_TOKEN``, else from ``<directory>/debug_token``.
+
+    ``directory`` defaults to ``default_token_directory()``. The file is created
+    on first use, readable only by the server's user, and reused afterwards so
+    the token survives restarts.
+    """
+    token = os.environ.get(DEBUG_TOKEN_ENV, '').strip()
+    if token:
+        return token
+    directory = directory or default_token_directory()
+    path = os.path.join(directory, DEBUG_TOKEN_FILE_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as handle:
+            token = handle.read().strip()
+        if token:
+            return token
+    except OSError:
+        pass
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    token = secrets.token_urlsafe(24)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+        handle.write(token + '\n')
+    os.replace(temp_path, path)
+    return token
+
+
+def token_matches(expected, supplied):
+    if not expected or not supplied:
+        return False
+    return hmac.compare_digest(expected.encode(), supplied.encode())
+
+
+def is_loopback(host):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    mapped = getattr(address, 'ipv4_mapped', None)
+    return (mapped or address).is_loopback
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _thread_names():
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler covering every thread, including ones already running.
+
+    cProfile only instruments the thread that enables it, which would miss the
+    SSE loops, pipe readers and plot thread that are already up when a session
+    starts; sampling ``sys._current_frames()`` sees all of them, blocked or not.
+    """
+
+    def __init__(self, interval=0.005, max_seconds=300.0):
+        self.interval = max(0.001, float(interval))
+        self.max_seconds = max(self.interval, float(max_seconds))
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.thread_counts = Counter()
+        self.stacks = Counter()
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='debug-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.stopped_at is None:
+            self.stopped_at = time.time()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        names = _thread_names()
+        names_refreshed = time.monotonic()
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now - names_refreshed >= 1.0:
+                names = _thread_names()
+                names_refreshed = now
+            self.sample(sys._current_frames(), names, skip=own_ident)
+        self.stopped_at = time.time()
+
+    def sample(self, frames, names, skip=None):
+        self.samples += 1
+        for ident, frame in frames.items():
+            if ident == skip:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            thread_name = names.get(ident, str(ident))
+            self.thread_counts[thread_name] += 1
+            self.self_counts[stack[0]] += 1
+            for key in set(stack):
+                self.total_counts[key] += 1
+            self.stacks[(thread_name,) + tuple(reversed(stack))] += 1
+
+    def report(self, limit=30):
+        observed = sum(self.thread_counts.values()) or 1
+        functions = []
+        for key, total in self.total_counts.most_common(limit):
+            filename, line, name = key
+            functions.append({
+                'function': name,
+                'file': filename,
+                'line': line,
+                'self': self.self_counts.get(key, 0),
+                'total': total,
+                'totalPct': round(100.0 * total / observed, 2),
+            })
+        end = self.stopped_at or time.time()
+        return {
+            'mode': 'sample',
+            'interval': self.interval,
+            'duration': round(end - (self.started_at or end), 3),
+            'samples': self.samples,
+            'threads': dict(self.thread_counts.most_common()),
+            'functions': functions,
+        }
+
+    def collapsed(self):
+        """Stacks in the ``frame;frame;frame count`` format flame graph tools read."""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            thread_name, frames = stack[0], stack[1:]
+            parts = [thread_name] + [f"{name} ({os.path.basename(filename)}:{line})"
+                                     for filename, line, name in frames]
+            lines.append(f"{';'.join(part.replace(';', ':') for part in parts)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _statistic_entry(stat, key_type):
+    frame = stat.traceback[0]
+    location = frame.filename if key_type == 'filename' else f"{frame.filename}:{frame.lineno}"
+    entry = {
+        'location': location,
+        'size': stat.size,
+        'count': stat.count,
+    }
+    if key_type == 'traceback':
+        entry['traceback'] = stat.traceback.format()
+    return entry
+
+
+def _difference_entry(stat, key_type):
+    entry = _statistic_entry(stat, key_type)
+    entry['sizeDiff'] = stat.size_diff
+    entry['countDiff'] = stat.count_diff
+    return entry
+
+
+class MemoryTracer:
+    """tracemalloc sessions with numbered snapshots that can be diffed against each other."""
+
+    KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+        self.next_id = 1
+        self.started_here = False
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            'tracing': tracemalloc.is_tracing(),
+            'frames': tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+            'tracedBytes': current,
+            'peakBytes': peak,
+            'snapshots': [{'id': snapshot_id, 'takenAt': taken_at}
+                          for snapshot_id, (taken_at, _) in self.snapshots.items()],
+        }
+
+    def start(self, frames=10):
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, int(frames)))
+                self.started_here = True
+        return self.status()
+
+    def stop(self):
+        with self.lock:
+            self.snapshots.clear()
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.started_here = False
+        return self.status()
+
+    def _check_key_type(self, key_type):
+        if key_type not in self.KEY_TYPES:
+            raise ValueError(f"keyType must be one of {', '.join(self.KEY_TYPES)}")
+
+    def take_snapshot(self, key_type='lineno', limit=20):
+        """Record a snapshot and return its id with the largest allocation sites."""
+        self._check_key_type(key_type)
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc is not running; start it first')
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        with self.lock:
+            snapshot_id = self.next_id
+            self.next_id += 1
+            self.snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self.snapshots) > MAX_SNAPSHOTS:
+                self.snapshots.popitem(last=False)
+        stats = snapshot.statistics(key_type)
+        return {
+            'id': snapshot_id,
+            'totalBytes': sum(stat.size for stat in stats),
+            'top': [_statistic_entry(stat, key_type) for stat in stats[:limit]],
+        }
+
+    def diff(self, from_id, to_id=None, key_type='lineno', limit=20):
+        """Allocation growth between two snapshots; without ``to_id`` a fresh snapshot is taken."""
+        self._check_key_type(key_type)
+        if to_id is None:
+            to_id = self.take_snapshot(key_type, limit=0)['id']
+        from_id, to_id = int(from_id), int(to_id)
+        with self.lock:
+            older = self.snapshots.get(from_id)
+            newer = self.snapshots.get(to_id)
+        if older is None or newer is None:
+            raise KeyError(f"Unknown snapshot {from_id if older is None else to_id}")
+        stats = newer[1].compare_to(older[1], key_type)
+        return {
+            'from': from_id,
+            'to': to_id,
+            'sizeDiff': sum(stat.size_diff for stat in stats),
+            'top': [_difference_entry(stat, key_type) for stat in stats[:limit]],
+        }
+
+
+def thread_stacks():
+    """Name, state and current stack of every live thread, innermost frame last."""
+    frames = sys._current_frames()
+    threads = []
+    for thread in threading.enumerate():
+        frame = frames.get(thread.ident)
+        stack = traceback.extract_stack(frame) if frame is not None else []
+        threads.append({
+            'name': thread.name,
+            'ident': thread.ident,
+            'nativeId': getattr(thread, 'native_id', None),
+            'daemon': thread.daemon,
+            'stack': [{'file': entry.filename, 'line': entry.lineno, 'function': entry.name,
+                       'code': entry.line}
+                      for entry in stack],
+        })
+    return threads
+
+
+def format_thread_stacks(threads):
+    blocks = []
+    for thread in threads:
+        lines = [f"Thread {thread['name']} (ident={thread['ident']}, daemon={thread['daemon']}):"]
+        for entry in thread['stack']:
+            lines.append(f"  File \"{entry['file']}\", line {entry['line']}, "
+                         f"in {entry['function']}")
+            if entry['code']:
+                lines.append(f"    {entry['code']}")
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks) + '\n'
@@ -0,0 +1,53 @@
+"""Size and age bounds for the on-disk caches under ``output/cache/``.
+
+Cache entries are plain files named ``<key><suffix>``. Reads touch the file's
+mtime, so pruning oldest-mtime-first evicts the least recently used entries.
+"""
+import os
+import time
+
+
+def touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_directory(directory, suffix, max_entries=None, max_bytes=None, max_age_seconds=None,
+                    now=None):
+    """Delete expired entries, then least recently used ones beyond the count and size limits.
+
+    Returns the number of files removed.
+    """
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(suffix)]
+    except OSError:
+        return 0
+    now = time.time() if now is None else now
+    entries = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort(reverse=True)  # Most recently used first
+    kept_count = 0
+    kept_bytes = 0
+    removed = 0
+    for mtime, size, path in entries:
+        expired = max_age_seconds is not None and now - mtime > max_age_seconds
+        over_count = max_entries is not None and kept_count >= max_entries
+        over_size = max_bytes is not None and kept_bytes + size > max_bytes and kept_count > 0
+        if expired or over_count or over_size:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            continue
+        kept_count += 1
+        kept_bytes += size
+    return removed
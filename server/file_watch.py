@@ -0,0 +1,149 @@
+"""Filtering for server_runner's file watcher.
+
+Watching ``'.'`` recursively puts an inotify watch on every directory under
+``node_modules``, ``.venv``, ``output`` and ``.git``, and editors emit several
+modify events per save. ``WatchRules`` decides which paths matter and which
+directories are worth watching at all, ``ContentHashes`` drops events whose
+file bytes did not actually change, and ``Debouncer`` coalesces a burst of
+events into one callback. Everything here is stdlib-only so it can be tested
+without watchdog installed.
+"""
+import fnmatch
+import hashlib
+import os
+import threading
+
+DEFAULT_INCLUDE = ('*.py', 'config/*.json')
+DEFAULT_EXCLUDE = (
+    '.git', 'node_modules', '.venv', 'venv', 'output', 'bin', 'lib', 'include',
+    '__pycache__', '.pytest_cache', '.mypy_cache', '.ruff_cache', 'client', 'drawings', 'tests',
+)
+
+
+class WatchRules:
+    """Include/exclude globs over paths relative to ``root`` (always with ``/`` separators).
+
+    An exclude pattern without a slash matches a path component at any depth
+    (``node_modules`` excludes every ``node_modules`` directory); patterns
+    with a slash are matched against the whole relative path.
+    """
+
+    def __init__(self, root, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+        self.root = os.path.abspath(root)
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+
+    def relative(self, path):
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        return relative.replace(os.sep, '/')
+
+    def is_excluded(self, relative):
+        parts = relative.split('/')
+        for pattern in self.exclude:
+            if '/' in pattern.strip('/'):
+                exact = pattern.strip('/')
+                subtree = pattern.rstrip('/') + '/*'
+                if fnmatch.fnmatch(relative, exact) or fnmatch.fnmatch(relative, subtree):
+                    return True
+            elif any(fnmatch.fnmatch(part, pattern) for part in parts):
+                return True
+        return False
+
+    def matches(self, path):
+        relative = self.relative(path)
+        if relative.startswith('..') or self.is_excluded(relative):
+            return False
+        name = relative.rsplit('/', 1)[-1]
+        for pattern in self.include:
+            target = relative if '/' in pattern else name
+            if fnmatch.fnmatch(target, pattern):
+                return True
+        return False
+
+    def directories(self, start=None):
+        """Directories to watch non-recursively, pruning excluded trees instead of entering them.
+
+        ``start`` limits the walk to one subtree, e.g. a directory created after startup.
+        """
+        start = self.root if start is None else os.path.abspath(start)
+        relative = self.relative(start)
+        if relative != '.' and (relative.startswith('..') or self.is_excluded(relative)):
+            return
+        for current, dirnames, _ in os.walk(start):
+            relative = self.relative(current)
+            dirnames[:] = sorted(
+                name for name in dirnames
+                if not self.is_excluded(name if relative == '.' else f"{relative}/{name}")
+            )
+            yield current
+
+    def files(self, start=None):
+        for directory in self.directories(start):
+            for entry in os.scandir(directory):
+                if entry.is_file() and self.matches(entry.path):
+                    yield entry.path
+
+
+def hash_file(path):
+    try:
+        with open(path, 'rb') as handle:
+            return hashlib.sha1(handle.read()).hexdigest()
+    except OSError:
+        return None  # Deleted or unreadable; treat as its own state
+
+
+class ContentHashes:
+    """Remembers file digests so saves that leave the bytes unchanged are ignored."""
+
+    def __init__(self, paths=()):
+        self.lock = threading.Lock()
+        self.digests = {os.path.abspath(path): hash_file(path) for path in paths}
+
+    def changed(self, path):
+        path = os.path.abspath(path)
+        digest = hash_file(path)
+        with self.lock:
+            if path in self.digests and self.digests[path] == digest:
+                return False
+            self.digests[path] = digest
+            return True
+
+
+class Debouncer:
+    """Collect paths and call ``callback(paths)`` once no new path arrived for ``delay`` seconds.
+
+    Callbacks never overlap: a burst that settles while the previous callback
+    (e.g. a restart waiting for its worker) is still running waits for it.
+    """
+
+    def __init__(self, callback, delay=0.3):
+        self.callback = callback
+        self.delay = delay
+        self.pending = set()
+        self.timer = None
+        self.lock = threading.Lock()
+        self.callback_lock = threading.Lock()
+
+    def add(self, path):
+        with self.lock:
+            self.pending.add(path)
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.callback_lock:
+            with self.lock:
+                paths, self.pending = self.pending, set()
+                self.timer = None
+            if paths:
+                self.callback(sorted(paths))
+
+    def cancel(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = None
+            self.pending = set()
@@ -0,0 +1,317 @@
+"""NumPy port of the photo preprocessing used by the TSP Portrait drawing.
+
+``preprocess_image`` decodes the photo once and derives the grayscale,
+Sobel edge, head mask and density maps with the same formulas as
+``drawings/core/tspPortrait.js``. Results are stored as ``.npz`` files keyed by a
+hash of the image bytes plus the image-affecting parameters, so slider changes
+that only touch routing or smoothing never redo the work. numpy and Pillow are
+optional and imported on first use; ``is_available()`` reports whether the
+endpoint can run.
+"""
+import base64
+import collections
+import hashlib
+import io
+import json
+import os
+import threading
+
+try:
+    from lazy_import import optional_module
+except ImportError:
+    from .lazy_import import optional_module
+
+np = optional_module('numpy')
+Image = optional_module('PIL.Image')
+
+# Mirrors TSP_LIMITS in drawings/core/tspPortrait.js: (min, max, default, integer)
+PARAM_LIMITS = {
+    'sampleResolution': (256, 3072, 1400, True),
+    'shadeWeight': (0.0, 1.0, 0.7, False),
+    'edgeWeight': (0.0, 1.0, 0.3, False),
+    'headTightness': (0.0, 1.0, 0.35, False),
+    'maskThreshold': (0.0, 1.0, 0.25, False),
+    'maskFeather': (0, 8, 2, True),
+}
+MAP_NAMES = ('gray', 'edges', 'mask', 'density')
+PREPROCESS_VERSION = 1
+
+
+class PreprocessError(ValueError):
+    pass
+
+
+def is_available():
+    return np is not None and Image is not None
+
+
+def normalize_params(params):
+    """Clamp image parameters to the drawing's limits, filling defaults."""
+    params = params or {}
+    normalized = {}
+    for name, (low, high, default, integer) in PARAM_LIMITS.items():
+        value = params.get(name, default)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = float(default)
+        value = min(max(value, low), high)
+        normalized[name] = int(round(value)) if integer else value
+    return normalized
+
+
+def decode_data_url(data_url):
+    if not isinstance(data_url, str) or not data_url.startswith('data:') or ',' not in data_url:
+        raise PreprocessError('image must be a base64 data URL')
+    header, encoded = data_url.split(',', 1)
+    if ';base64' not in header:
+        raise PreprocessError('image must be a base64 data URL')
+    try:
+        return base64.b64decode(encoded, validate=False)
+    except (ValueError, TypeError) as e:
+        raise PreprocessError(f"Invalid base64 image data: {e}")
+
+
+def cache_key(image_bytes, params):
+    digest = hashlib.sha1(image_bytes)
+    digest.update(json.dumps({'v': PREPROCESS_VERSION, **params}, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def rasterize(image_bytes, target_resolution):
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image = image.convert('RGB')
+    except Exception as e:
+        raise PreprocessError(f"Unable to decode image: {e}")
+    natural_width, natural_height = image.size
+    aspect = natural_width / natural_height
+    if aspect >= 1:
+        width, height = target_resolution, max(8, round(target_resolution / aspect))
+    else:
+        width, height = max(8, round(target_resolution * aspect)), target_resolution
+    rgb = np.asarray(image.resize((width, height), Image.BILINEAR), dtype=np.float32)
+    gray = (0.2126 * rgb[..., 0] + 0.7152 * rgb[..., 1] + 0.0722 * rgb[..., 2]) / 255.0
+    return gray.astype(np.float32), aspect
+
+
+def compute_edge_map(gray):
+    edges = np.zeros_like(gray)
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return edges
+    tl, tc, tr = gray[:-2, :-2], gray[:-2, 1:-1], gray[:-2, 2:]
+    ml, mr = gray[1:-1, :-2], gray[1:-1, 2:]
+    bl, bc, br = gray[2:, :-2], gray[2:, 1:-1], gray[2:, 2:]
+    gx = (tr + 2 * mr + br) - (tl + 2 * ml + bl)
+    gy = (bl + 2 * bc + br) - (tl + 2 * tc + tr)
+    edges[1:-1, 1:-1] = np.hypot(gx, gy)
+    peak = edges.max()
+    if peak > 0:
+        edges = np.minimum(edges / peak, 1.0)
+    return edges.astype(np.float32)
+
+
+def _row_runs(row):
+    padded = np.concatenate(([False], row, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(changes[0::2].tolist(), changes[1::2].tolist()))
+
+
+def flood_fill_region(values, seed_x, seed_y, threshold):
+    """4-connected region of ``values >= threshold`` containing the seed pixel.
+
+    Works on horizontal runs with a union-find instead of per-pixel stacks, so
+    the Python-level work scales with the number of runs, not pixels.
+    """
+    height, width = values.shape
+    seed_x = min(max(int(round(seed_x)), 0), width - 1)
+    seed_y = min(max(int(round(seed_y)), 0), height - 1)
+    region = np.zeros_like(values, dtype=np.float32)
+    if values[seed_y, seed_x] < threshold:
+        return region
+    inside = values >= threshold
+    runs = []
+    parent = []
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    previous = []
+    for y in range(height):
+        current = []
+        pointer = 0
+        for start, end in _row_runs(inside[y]):
+            run_id = len(runs)
+            runs.append((y, start, end))
+            parent.append(run_id)
+            current.append((start, end, run_id))
+            while pointer < len(previous) and previous[pointer][1] <= start:
+                pointer += 1
+            probe = pointer
+            while probe < len(previous) and previous[probe][0] < end:
+                root_a, root_b = find(run_id), find(previous[probe][2])
+                if root_a != root_b:
+                    parent[root_a] = root_b
+                probe += 1
+        previous = current
+    seed_root = None
+    for run_id, (y, start, end) in enumerate(runs):
+        if y == seed_y and start <= seed_x < end:
+            seed_root = find(run_id)
+            break
+    for run_id, (y, start, end) in enumerate(runs):
+        if find(run_id) == seed_root:
+            region[y, start:end] = 1.0
+    return region
+
+
+def blur_mask(mask, passes):
+    """3x3 box blur repeated ``passes`` times, averaging only in-bounds neighbours."""
+    if passes <= 0:
+        return mask
+    ones = np.pad(np.ones_like(mask), 1)
+    counts = sum(
+        ones[1 + dy:ones.shape[0] - 1 + dy, 1 + dx:ones.shape[1] - 1 + dx]
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+    )
+    for _ in range(passes):
+        padded = np.pad(mask, 1)
+        total = sum(
+            padded[1 + dy:padded.shape[0] - 1 + dy, 1 + dx:padded.shape[1] - 1 + dx]
+            for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+        )
+        mask = (total / counts).astype(np.float32)
+    return mask
+
+
+def build_head_mask(gray, tightness, threshold, feather):
+    height, width = gray.shape
+    shade = 1.0 - gray
+    cutoff = max(0.0, min(1.0, threshold or 0.0))
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float64)
+    weights = np.where(shade >= cutoff, shade, 0.0)
+    total_weight = float(weights.sum())
+    if total_weight > 0:
+        cx = float((xs * weights).sum() / total_weight)
+        cy = float((ys * weights).sum() / total_weight)
+        # The JS version measures spread over every pixel but divides by the thresholded weight
+        dist_accum = float((((xs - cx) ** 2 + (ys - cy) ** 2) * shade).sum())
+        spread = (dist_accum / total_weight) ** 0.5
+    else:
+        cx, cy = width / 2, height / 2
+        spread = min(width, height) * 0.3
+    radius_scale = 1.15 - tightness * 0.4
+    rx = max(width * 0.22, spread * radius_scale)
+    ry = max(height * 0.22, spread * radius_scale * 0.95)
+    d2 = ((xs - cx) / rx) ** 2 + ((ys - cy) / ry) ** 2
+    mask = np.where(d2 <= 1, 1.0, np.exp(-np.maximum(0.0, d2 - 1) * 1.5)).astype(np.float32)
+    if cutoff > 0:
+        mask *= flood_fill_region(shade, cx, cy, cutoff)
+    return blur_mask(mask, feather)
+
+
+def build_density_map(gray, edges, mask, shade_weight, edge_weight):
+    weight_sum = max(shade_weight + edge_weight, 0.0001)
+    density = ((1.0 - gray) * shade_weight + edges * edge_weight) / weight_sum * mask
+    peak = density.max()
+    if peak > 0:
+        density = np.minimum(density / peak, 1.0)
+    return density.astype(np.float32)
+
+
+def compute_maps(image_bytes, params):
+    gray, aspect = rasterize(image_bytes, params['sampleResolution'])
+    edges = compute_edge_map(gray)
+    mask = build_head_mask(gray, params['headTightness'], params['maskThreshold'],
+                           params['maskFeather'])
+    density = build_density_map(gray, edges, mask, params['shadeWeight'], params['edgeWeight'])
+    return {'gray': gray, 'edges': edges, 'mask': mask, 'density': density}, aspect
+
+
+def encode_map(values):
+    """Quantize a 0..1 map to little-endian uint16 and base64 it for JSON transport."""
+    quantized = np.round(np.clip(values, 0.0, 1.0) * 65535).astype('<u2')
+    return base64.b64encode(quantized.tobytes()).decode('ascii')
+
+
+class PreprocessCache:
+    """Disk cache of computed maps (``<key>.npz``) with a small in-memory LRU in front."""
+
+    def __init__(self, directory, max_entries=4):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as archive:
+                entry = ({name: archive[name] for name in MAP_NAMES}, float(archive['aspect']))
+        except Exception as e:
+            print(f"Warning: discarding unreadable preprocess cache {path}: {e}")
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, maps, aspect):
+        self._remember(key, (maps, aspect))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self._path(key)}.tmp"
+            with open(temp_path, 'wb') as handle:
+                np.savez(handle, aspect=np.float64(aspect), **maps)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            print(f"Warning: failed to cache preprocessed image {key}: {e}")
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def preprocess_image(image_bytes, params, cache=None, maps=('density',)):
+    """Return ``(payload, cached)`` for encoded ``image_bytes``.
+
+    Maps in the payload are base64-encoded uint16 arrays.
+    """
+    if not is_available():
+        raise RuntimeError('Image preprocessing requires numpy and Pillow')
+    requested = [name for name in maps if name in MAP_NAMES]
+    if not requested:
+        raise PreprocessError(f"maps must name at least one of {', '.join(MAP_NAMES)}")
+    params = normalize_params(params)
+    key = cache_key(image_bytes, params)
+    entry = cache.get(key) if cache else None
+    cached = entry is not None
+    if entry is None:
+        computed, aspect = compute_maps(image_bytes, params)
+        if cache:
+            cache.put(key, computed, aspect)
+        entry = (computed, aspect)
+    computed, aspect = entry
+    height, width = computed['gray'].shape
+    payload = {
+        'key': key,
+        'width': int(width),
+        'height': int(height),
+        'aspect': aspect,
+        'encoding': 'uint16',
+        'maps': {name: encode_map(computed[name]) for name in requested}
+    }
+    return payload, cached
@@ -0,0 +1,221 @@
+"""Sheet imposition: pack several saved drawings onto one paper and merge their colours.
+
+Each saved drawing is cropped to the bounding box of its strokes, packed into
+the printable area with a MaxRects best-short-side-fit packer, and its geometry
+is rewritten with the placement baked in, so axicli never has to interpret
+transforms. Layers that share a stroke colour are merged across drawings;
+one ``--layer`` run per colour then covers the whole sheet.
+"""
+import xml.etree.ElementTree as ET
+
+try:
+    from svg_layers import (GEOMETRY_ATTRS, GROUPMODE_ATTR, LABEL_ATTR, SVG_NS,
+                            element_polylines, format_path, iter_layers, iter_stroke_elements,
+                            layer_number)
+except ImportError:
+    from .svg_layers import (GEOMETRY_ATTRS, GROUPMODE_ATTR, LABEL_ATTR, SVG_NS,
+                             element_polylines, format_path, iter_layers, iter_stroke_elements,
+                             layer_number)
+
+DEFAULT_GAP_MM = 5.0
+_EPSILON = 1e-9
+
+
+class ImpositionError(ValueError):
+    pass
+
+
+def sheet_size(paper, orientation='landscape'):
+    """``(width, height)`` of a papers.json entry in the given orientation."""
+    short, long = sorted((float(paper['width']), float(paper['height'])))
+    return (long, short) if orientation == 'landscape' else (short, long)
+
+
+def printable_area(width, height, margin, travel=None):
+    """``(x, y, width, height)`` inside the margins and within reach of the carriage.
+
+    ``travel`` is the plotter's ``usable_travel_mm``; the paper's top-left corner
+    sits at the home position, so travel limits the far edges only.
+    """
+    right = width - margin
+    bottom = height - margin
+    if travel:
+        right = min(right, float(travel[0]))
+        bottom = min(bottom, float(travel[1]))
+    if right - margin <= 0 or bottom - margin <= 0:
+        raise ImpositionError('Margins and plotter travel leave no printable area')
+    return margin, margin, right - margin, bottom - margin
+
+
+def layer_key(group):
+    """Layers merge on stroke colour, falling back to the label without its number."""
+    stroke = (group.get('stroke') or '').strip().lower()
+    if stroke and stroke != 'none':
+        return stroke
+    return layer_name(group).strip().lower()
+
+
+def layer_name(group):
+    label = group.get(LABEL_ATTR) or ''
+    return label.split('-', 1)[-1] if layer_number(label) is not None else label
+
+
+def collect_strokes(root):
+    """``(layer_group, element, polylines)`` for every stroke in every layer."""
+    strokes = []
+    for _, group in iter_layers(root):
+        for element in iter_stroke_elements(group):
+            polylines = [points for points in element_polylines(element) if len(points) > 1]
+            if polylines:
+                strokes.append((group, element, polylines))
+    return strokes
+
+
+def stroke_bounds(strokes):
+    xs = [x for _, _, polylines in strokes for points in polylines for x, _ in points]
+    ys = [y for _, _, polylines in strokes for points in polylines for _, y in points]
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _fits(size, free):
+    return size[0] <= free[2] + _EPSILON and size[1] <= free[3] + _EPSILON
+
+
+def _split(free, used):
+    """Free rectangles left of ``free`` once ``used`` is carved out of it."""
+    fx, fy, fw, fh = free
+    ux, uy, uw, uh = used
+    if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+        return [free]
+    pieces = []
+    if ux > fx:
+        pieces.append((fx, fy, ux - fx, fh))
+    if ux + uw < fx + fw:
+        pieces.append((ux + uw, fy, fx + fw - ux - uw, fh))
+    if uy > fy:
+        pieces.append((fx, fy, fw, uy - fy))
+    if uy + uh < fy + fh:
+        pieces.append((fx, uy + uh, fw, fy + fh - uy - uh))
+    return [piece for piece in pieces if piece[2] > _EPSILON and piece[3] > _EPSILON]
+
+
+def _contains(outer, inner):
+    return (inner[0] >= outer[0] - _EPSILON and inner[1] >= outer[1] - _EPSILON
+            and inner[0] + inner[2] <= outer[0] + outer[2] + _EPSILON
+            and inner[1] + inner[3] <= outer[1] + outer[3] + _EPSILON)
+
+
+def pack(sizes, width, height, gap=DEFAULT_GAP_MM, allow_rotate=True, names=None):
+    """Place ``(w, h)`` boxes in a ``width`` × ``height`` area, at least ``gap`` apart.
+
+    Returns one ``(x, y, rotated)`` per size, in input order. Boxes are placed
+    largest first with MaxRects best-short-side-fit, turned a quarter only when
+    no free rectangle takes them upright; each is padded by ``gap``
+    on its far sides and the area is padded by the same amount, so the gap only
+    appears between boxes. Raises ``ImpositionError`` naming the first box that
+    does not fit, by ``names[i]`` when given.
+    """
+    free = [(0.0, 0.0, width + gap, height + gap)]
+    placements = [None] * len(sizes)
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][0] * sizes[i][1], i))
+    for index in order:
+        w, h = sizes[index]
+        options = [((w + gap, h + gap), False)]
+        if allow_rotate and abs(w - h) > _EPSILON:
+            options.append(((h + gap, w + gap), True))
+        best = None
+        for size, rotated in options:
+            for rect in free:
+                if not _fits(size, rect):
+                    continue
+                leftovers = (rect[2] - size[0], rect[3] - size[1])
+                score = (min(leftovers), max(leftovers))
+                if best is None or score < best[0]:
+                    best = (score, rect[0], rect[1], size, rotated)
+            if best is not None:
+                break  # Artwork keeps its orientation whenever it fits upright
+        if best is None:
+            name = names[index] if names else f"Drawing {index + 1}"
+            raise ImpositionError(f"{name} ({w:.1f}×{h:.1f}mm) does not fit on the sheet")
+        _, x, y, size, rotated = best
+        used = (x, y, size[0], size[1])
+        placements[index] = (x, y, rotated)
+        free = [piece for rect in free for piece in _split(rect, used)]
+        free = [rect for i, rect in enumerate(free)
+                if not any(j != i and _contains(other, rect) and (other != rect or j < i)
+                           for j, other in enumerate(free))]
+    return placements
+
+
+def _placer(bounds, x, y, rotated):
+    min_x, min_y, max_x, max_y = bounds
+    height = max_y - min_y
+
+    def place(point):
+        u, v = point[0] - min_x, point[1] - min_y
+        if rotated:  # A quarter turn clockwise keeps the box's top-left at the origin
+            u, v = height - v, u
+        return x + u, y + v
+    return place
+
+
+def impose(drawings, width, height, area, gap=DEFAULT_GAP_MM, allow_rotate=True):
+    """Pack parsed drawings onto one sheet and return ``(svg_root, summary)``.
+
+    ``drawings`` is a list of ``(name, svg_root)`` pairs; ``area`` comes from
+    ``printable_area``. The summary lists each drawing's placement and the
+    merged layers in plotting order.
+    """
+    sources = []
+    for name, root in drawings:
+        strokes = collect_strokes(root)
+        bounds = stroke_bounds(strokes)
+        if bounds is None:
+            raise ImpositionError(f"{name} has no plottable strokes")
+        sources.append((name, strokes, bounds))
+    sizes = [(bounds[2] - bounds[0], bounds[3] - bounds[1]) for _, _, bounds in sources]
+    area_x, area_y, area_width, area_height = area
+    placements = pack(sizes, area_width, area_height, gap, allow_rotate,
+                      names=[name for name, _, _ in sources])
+
+    root = ET.Element(f'{{{SVG_NS}}}svg', {
+        'width': f'{width:g}mm',
+        'height': f'{height:g}mm',
+        'viewBox': f'0 0 {width:g} {height:g}',
+    })
+    content = ET.SubElement(root, f'{{{SVG_NS}}}g', {'data-role': 'drawing-content'})
+    layers = {}
+    summary = {'drawings': [], 'layers': []}
+    for (name, strokes, bounds), size, (x, y, rotated) in zip(sources, sizes, placements):
+        place = _placer(bounds, area_x + x, area_y + y, rotated)
+        for group, element, polylines in strokes:
+            key = layer_key(group)
+            if key not in layers:
+                attributes = {GROUPMODE_ATTR: 'layer',
+                              LABEL_ATTR: f"{len(layers)}-{layer_name(group)}"}
+                if group.get('stroke'):
+                    attributes['stroke'] = group.get('stroke')
+                entry = {'label': attributes[LABEL_ATTR], 'key': key, 'sources': []}
+                summary['layers'].append(entry)
+                layers[key] = (ET.SubElement(content, f'{{{SVG_NS}}}g', attributes), entry)
+            layer, entry = layers[key]
+            if name not in entry['sources']:
+                entry['sources'].append(name)
+            attributes = {attr: value for attr, value in element.attrib.items()
+                          if attr not in GEOMETRY_ATTRS}
+            attributes.setdefault('fill', 'none')
+            attributes['d'] = format_path([[place(point) for point in points]
+                                           for points in polylines])
+            ET.SubElement(layer, f'{{{SVG_NS}}}path', attributes)
+        placed_width, placed_height = (size[1], size[0]) if rotated else size
+        summary['drawings'].append({
+            'source': name,
+            'x': round(area_x + x, 3),
+            'y': round(area_y + y, 3),
+            'width': round(placed_width, 3),
+            'height': round(placed_height, 3),
+            'rotated': rotated,
+        })
+    return root, summary
@@ -0,0 +1,70 @@
+"""Modules imported on first use instead of when the server starts.
+
+``server_runner.py`` restarts the server on every Python change, so every
+module-level import holds up the dev loop. ``LazyModule`` stands in for a
+module until one of its attributes is read. ``optional_module`` does the same
+for an optional dependency such as numpy or Pillow: it returns None up front
+when the package is not installed, so ``is None`` checks keep working without
+importing anything.
+"""
+import importlib
+import importlib.util
+import threading
+import time
+
+# Seconds each module took to import on first use, reported by --profile-startup
+LOAD_TIMES = {}
+
+
+class LazyModule:
+    """Forwards attribute reads to the module, importing it on the first one.
+
+    The stand-in has no public attributes of its own, so none can shadow the
+    module's; use ``load`` and ``is_loaded`` to manage it.
+    """
+
+    def __init__(self, name, package=None):
+        self._name = name
+        self._package = package
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name.lstrip('.')} ({state})>"
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name, self._package)
+                    LOAD_TIMES.setdefault(self._name.lstrip('.'), time.perf_counter() - started)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+def load(module):
+    """Import a LazyModule now; returns the real module. Plain modules pass through."""
+    return module._load() if isinstance(module, LazyModule) else module
+
+
+def is_loaded(module):
+    return not isinstance(module, LazyModule) or module._module is not None
+
+
+def sibling_module(name, package):
+    """A LazyModule for a module next to the caller, whether it runs as a script or a package."""
+    return LazyModule(f'.{name}', package) if package else LazyModule(name)
+
+
+def optional_module(name):
+    """A LazyModule for ``name``, or None when it is not installed."""
+    try:
+        found = importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        found = False
+    return LazyModule(name) if found else None
@@ -0,0 +1,218 @@
+"""Retention for ``output/``: gzip old saves to ``.svgz`` and deduplicate copies.
+
+``OutputArchive.archive`` compresses every saved SVG older than ``max_age_days``.
+Each file is replaced by ``<name>.svgz`` with the same mtime, so catalog dates
+and thumbnails still apply. With ``dedupe`` enabled, the compressed bytes are
+first written to ``output/archive/blobs/<sha256>.svgz`` and the archived file is
+a hard link to that blob, so byte-identical saves share one copy on disk. Blobs
+whose last link is gone are pruned on the next run. ``output/archive/index.json``
+records the original hash and sizes of every archived file.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    from output_catalog import iter_output_files
+except ImportError:
+    from .output_catalog import iter_output_files
+
+ARCHIVE_DIR_NAME = 'archive'
+INDEX_FILE_NAME = 'index.json'
+BLOB_DIR_NAME = 'blobs'
+SECONDS_PER_DAY = 86400
+
+
+def compress_svg(data):
+    # A fixed gzip mtime keeps identical inputs byte-identical for deduplication
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(temp_path, path)
+
+
+def lower_thread_priority():
+    """Best-effort: renice the calling thread so archiving yields to plotting (Linux only)."""
+    if not sys.platform.startswith('linux') or not hasattr(os, 'setpriority'):
+        return False
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        return True
+    except OSError:
+        return False
+
+
+class OutputArchive:
+    def __init__(self, output_root):
+        self.output_root = output_root
+        self.archive_dir = os.path.join(output_root, ARCHIVE_DIR_NAME)
+        self.blob_dir = os.path.join(self.archive_dir, BLOB_DIR_NAME)
+        self.index_path = os.path.join(self.archive_dir, INDEX_FILE_NAME)
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as handle:
+                index = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def save_index(self, index):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        _write_atomic(self.index_path, json.dumps(index, indent=2, sort_keys=True).encode('utf-8'))
+
+    def _store(self, target, compressed, digest, dedupe):
+        """Write ``compressed`` to ``target``; return True when it links to an existing blob."""
+        if dedupe:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            blob = os.path.join(self.blob_dir, f"{digest}.svgz")
+            existed = os.path.exists(blob)
+            if not existed:
+                _write_atomic(blob, compressed)
+            try:
+                if os.path.exists(target):
+                    os.remove(target)
+                os.link(blob, target)
+                return existed
+            except OSError:
+                pass  # Filesystems without hard links get a private copy
+        _write_atomic(target, compressed)
+        return False
+
+    def archive(self, max_age_days, dedupe=True, now=None, pause=0.0, skip_paths=(), cancel=None):
+        """Compress saves older than ``max_age_days``; return a summary of the run.
+
+        Files in ``skip_paths`` (e.g. the SVG or resume log of a plot) are left
+        alone, and the run stops early once ``cancel()`` returns true.
+        """
+        with self.lock:
+            now = time.time() if now is None else now
+            cutoff = now - max_age_days * SECONDS_PER_DAY
+            index = self.load_index()
+            skipped = {os.path.realpath(path) for path in skip_paths if path}
+            summary = {'archived': 0, 'deduplicated': 0, 'bytesBefore': 0, 'bytesAfter': 0,
+                       'prunedBlobs': 0, 'skipped': 0, 'cancelled': False}
+            for entry in list(iter_output_files(self.output_root)):
+                if cancel is not None and cancel():
+                    summary['cancelled'] = True
+                    break
+                if not entry.name.endswith('.svg'):
+                    continue
+                if os.path.realpath(entry.path) in skipped:
+                    summary['skipped'] += 1
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime >= cutoff:
+                    continue
+                with open(entry.path, 'rb') as handle:
+                    data = handle.read()
+                digest = hashlib.sha256(data).hexdigest()
+                compressed = compress_svg(data)
+                target = f"{entry.path}z"
+                shared = self._store(target, compressed, digest, dedupe)
+                os.utime(target, (stat.st_atime, stat.st_mtime))
+                os.remove(entry.path)
+                relative = os.path.relpath(target, self.output_root).replace(os.sep, '/')
+                index[relative] = {
+                    'sha256': digest,
+                    'originalSize': len(data),
+                    'compressedSize': len(compressed),
+                    'deduplicated': shared,
+                    'archivedAt': datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+                }
+                summary['archived'] += 1
+                summary['deduplicated'] += int(shared)
+                summary['bytesBefore'] += len(data)
+                summary['bytesAfter'] += 0 if shared else len(compressed)
+                if pause:
+                    time.sleep(pause)
+            missing = [path for path in index
+                       if not os.path.exists(os.path.join(self.output_root, path))]
+            for relative in missing:
+                del index[relative]
+            summary['prunedBlobs'] = self.prune_blobs()
+            self.save_index(index)
+            return summary
+
+    def prune_blobs(self):
+        """Delete blobs no archived file links to any more."""
+        if not os.path.isdir(self.blob_dir):
+            return 0
+        pruned = 0
+        for entry in os.scandir(self.blob_dir):
+            if entry.is_file() and entry.name.endswith('.svgz') and entry.stat().st_nlink <= 1:
+                os.remove(entry.path)
+                pruned += 1
+        return pruned
+
+    def stats(self):
+        index = self.load_index()
+        return {
+            'files': len(index),
+            'originalBytes': sum(item.get('originalSize', 0) for item in index.values()),
+            'compressedBytes': sum(item.get('compressedSize', 0) for item in index.values()
+                                   if not item.get('deduplicated')),
+            'deduplicated': sum(1 for item in index.values() if item.get('deduplicated')),
+        }
+
+
+class ArchiveScheduler:
+    """Daemon thread that periodically archives old outputs at low priority."""
+
+    def __init__(self, output_root, max_age_days, dedupe=True, interval=6 * 3600,
+                 initial_delay=60.0, on_complete=None, is_busy=None, protected_paths=None,
+                 busy_retry=300.0):
+        self.archive = OutputArchive(output_root)
+        self.max_age_days = max_age_days
+        self.dedupe = dedupe
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.on_complete = on_complete
+        self.is_busy = is_busy  # Runs are skipped (and cut short) while this returns true
+        self.protected_paths = protected_paths  # Callable returning paths that must not move
+        self.busy_retry = busy_retry
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='output-archive', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        lower_thread_priority()
+        if self.stop_event.wait(self.initial_delay):
+            return
+        while not self.stop_event.is_set():
+            if self.is_busy is not None and self.is_busy():
+                # A plot is running; try again soon rather than waiting a full interval
+                if self.stop_event.wait(min(self.interval, self.busy_retry)):
+                    return
+                continue
+            try:
+                skip_paths = self.protected_paths() if self.protected_paths else ()
+                summary = self.archive.archive(self.max_age_days, self.dedupe, pause=0.01,
+                                               skip_paths=skip_paths, cancel=self.is_busy)
+                if summary['archived']:
+                    print(f"Archived {summary['archived']} outputs "
+                          f"({summary['bytesBefore']} -> {summary['bytesAfter']} bytes, "
+                          f"{summary['deduplicated']} deduplicated)")
+                    if self.on_complete:
+                        self.on_complete(summary)
+            except Exception as e:
+                print(f"Output archive run failed: {e}")
+            if self.stop_event.wait(self.interval):
+                return
@@ -0,0 +1,437 @@
+"""SQLite catalog of saved drawings under ``output/``.
+
+Every ``/save-svg`` writes ``output/<drawing>/<timestamp>.svg`` with a header
+comment from ``build_config_comment``. The catalog indexes those files (paper,
+medium, size, layer count) so the gallery can page and filter without opening
+hundreds of SVGs. ``sync()`` backfills incrementally by comparing each file's
+mtime and size with its row, and thumbnails are rendered on a small background
+pool when Pillow is installed.
+"""
+import ast
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from lazy_import import optional_module
+    from svg_layers import (GROUPMODE_ATTR, element_polylines, iter_stroke_elements, local_name,
+                            parse_svg)
+except ImportError:
+    from .lazy_import import optional_module
+    from .svg_layers import (GROUPMODE_ATTR, element_polylines, iter_stroke_elements, local_name,
+                             parse_svg)
+
+# Pillow is only needed for thumbnails, so it is imported when the first one is drawn
+Image = optional_module('PIL.Image')
+ImageColor = optional_module('PIL.ImageColor')
+ImageDraw = optional_module('PIL.ImageDraw')
+
+CATALOG_FILE_NAME = 'catalog.sqlite3'
+THUMBNAIL_DIR_NAME = 'thumbnails'
+THUMBNAIL_SIZE = 256
+# Directories under output/ that hold server state rather than saved drawings
+RESERVED_DIRS = {'archive', 'assets', 'cache', 'plot_chunks', THUMBNAIL_DIR_NAME}
+OUTPUT_EXTENSIONS = ('.svg', '.svgz')
+_THUMBNAIL_NAME_REGEX = re.compile(r'^[0-9a-f]{40}\.png$')
+MAX_PAGE_SIZE = 200
+MAX_THUMBNAIL_ATTEMPTS = 3  # Per file version; a changed file starts over
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    drawing TEXT NOT NULL,
+    created TEXT,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    paper_id TEXT,
+    paper_name TEXT,
+    paper_width REAL,
+    paper_height REAL,
+    orientation TEXT,
+    medium_id TEXT,
+    medium_name TEXT,
+    layers INTEGER,
+    thumbnail TEXT,
+    hatch TEXT,
+    controls TEXT,
+    thumbnail_error TEXT,
+    thumbnail_attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outputs_created ON outputs (created DESC);
+CREATE INDEX IF NOT EXISTS outputs_drawing ON outputs (drawing, created DESC);
+CREATE INDEX IF NOT EXISTS outputs_paper ON outputs (paper_id);
+CREATE INDEX IF NOT EXISTS outputs_medium ON outputs (medium_id);
+"""
+
+_HEADER_REGEX = re.compile(r'^\s*<!--(.*?)-->', re.S)
+_DATE_REGEX = re.compile(r'^Date:\s*(\S+)', re.M)
+_DRAWING_REGEX = re.compile(r'^Drawing:\s*(.+)$', re.M)
+_PAPER_REGEX = re.compile(
+    r'^Paper:\s*id=(?P<id>\S+)\s+name=(?P<name>.*?)'
+    r'\s+size=(?P<width>[\d.]+|unknown)\D(?P<height>[\d.]+|unknown)mm'
+    r'\s+orientation=(?P<orientation>\S+)', re.M)
+_MEDIUM_REGEX = re.compile(r'^Medium:\s*id=(?P<id>\S+)\s+name=(?P<name>.*)$', re.M)
+_LAYER_REGEX = re.compile(r'inkscape:groupmode=["\']layer["\']')
+_TIMESTAMP_NAME_REGEX = re.compile(r'^(\d{4})(\d{2})(\d{2})-(\d{2})(\d{2})(\d{2})')
+
+COLUMNS = ('path', 'drawing', 'created', 'mtime', 'size', 'paper_id', 'paper_name', 'paper_width',
+           'paper_height', 'orientation', 'medium_id', 'medium_name', 'layers', 'thumbnail',
+           'hatch', 'controls', 'thumbnail_error', 'thumbnail_attempts')
+# Columns added after the first release, with the declaration used to migrate older catalogs
+ADDED_COLUMNS = (
+    ('hatch', 'TEXT'),
+    ('controls', 'TEXT'),
+    ('thumbnail_error', 'TEXT'),
+    ('thumbnail_attempts', 'INTEGER NOT NULL DEFAULT 0'),
+)
+JSON_COLUMNS = ('hatch', 'controls')
+HEADER_BLOCKS = {'hatch': 'Hatch Settings:', 'controls': 'Drawing Controls:'}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _header_block(header, title):
+    """JSON text for a ``format_block`` section of the header, or None when it is empty."""
+    match = re.search(rf'^{re.escape(title)}\n((?:  .*(?:\n|$))+)', header, re.M)
+    if not match:
+        return None
+    body = '\n'.join(line[2:] for line in match.group(1).splitlines()).strip()
+    if not body or body == '(none)':
+        return None
+    try:
+        return json.dumps(ast.literal_eval(body), sort_keys=True, default=str)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        # Not a plain literal (e.g. a truncated value); keep the text so it stays searchable
+        return json.dumps(body)
+
+
+def parse_header(text):
+    """Extract catalog fields from the ``build_config_comment`` header of a saved SVG."""
+    match = _HEADER_REGEX.match(text or '')
+    if not match:
+        return {}
+    header = match.group(1)
+    fields = {}
+    date = _DATE_REGEX.search(header)
+    if date:
+        fields['created'] = date.group(1)
+    drawing = _DRAWING_REGEX.search(header)
+    if drawing:
+        fields['drawing'] = drawing.group(1).strip()
+    paper = _PAPER_REGEX.search(header)
+    if paper:
+        fields.update({
+            'paper_id': paper.group('id'),
+            'paper_name': paper.group('name'),
+            'paper_width': _number(paper.group('width')),
+            'paper_height': _number(paper.group('height')),
+            'orientation': paper.group('orientation'),
+        })
+    medium = _MEDIUM_REGEX.search(header)
+    if medium:
+        fields['medium_id'] = medium.group('id')
+        fields['medium_name'] = medium.group('name').strip()
+    for column, title in HEADER_BLOCKS.items():
+        block = _header_block(header, title)
+        if block is not None:
+            fields[column] = block
+    return fields
+
+
+def _created_from_name(filename):
+    match = _TIMESTAMP_NAME_REGEX.match(filename)
+    if not match:
+        return None
+    year, month, day, hour, minute, second = match.groups()
+    return f"{year}-{month}-{day}T{hour}:{minute}:{second}"
+
+
+def is_output_file_path(relative):
+    """True for ``<drawing>/<name>.svg|.svgz``, the only shape of path a saved drawing has."""
+    parts = relative.split('/')
+    return (len(parts) == 2 and all(parts) and parts[0] not in RESERVED_DIRS
+            and not parts[0].startswith('.') and parts[1].endswith(OUTPUT_EXTENSIONS))
+
+
+def is_thumbnail_name(name):
+    return bool(_THUMBNAIL_NAME_REGEX.match(name))
+
+
+def iter_output_files(output_root):
+    """Yield ``os.DirEntry`` objects for saved drawings, archived ``.svgz`` included."""
+    if not os.path.isdir(output_root):
+        return
+    for entry in os.scandir(output_root):
+        if not entry.is_dir() or entry.name in RESERVED_DIRS:
+            continue
+        for file_entry in os.scandir(entry.path):
+            if file_entry.is_file() and file_entry.name.endswith(OUTPUT_EXTENSIONS):
+                yield file_entry
+
+
+def read_output_text(path):
+    opener = gzip.open if path.endswith('.svgz') else open
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as handle:
+        return handle.read()
+
+
+def render_thumbnail(svg_text, destination, size=THUMBNAIL_SIZE):
+    """Rasterize the SVG's strokes to a PNG fitted into ``size`` pixels; needs Pillow."""
+    root = parse_svg(svg_text)
+    strokes = []
+    for layer in root.iter():
+        if local_name(layer) != 'g' or layer.get(GROUPMODE_ATTR) != 'layer':
+            continue
+        layer_stroke = layer.get('stroke') or 'black'
+        for element in iter_stroke_elements(layer):
+            color = element.get('stroke') or layer_stroke
+            for points in element_polylines(element):
+                if len(points) >= 2:
+                    strokes.append((color, points))
+    xs = [x for _, points in strokes for x, _ in points]
+    ys = [y for _, points in strokes for _, y in points]
+    image = Image.new('RGB', (size, size), 'white')
+    if xs:
+        min_x, min_y = min(xs), min(ys)
+        span = max(max(xs) - min_x, max(ys) - min_y, 1e-6)
+        margin = size * 0.05
+        scale = (size - 2 * margin) / span
+        offset_x = (size - (max(xs) - min_x) * scale) / 2
+        offset_y = (size - (max(ys) - min_y) * scale) / 2
+        draw = ImageDraw.Draw(image)
+        for color, points in strokes:
+            try:
+                fill = ImageColor.getrgb(color)
+            except ValueError:
+                fill = (0, 0, 0)
+            draw.line([((x - min_x) * scale + offset_x, (y - min_y) * scale + offset_y)
+                       for x, y in points], fill=fill)
+    temp_path = f"{destination}.tmp"
+    image.save(temp_path, 'PNG')
+    os.replace(temp_path, destination)
+
+
+def _row_item(row):
+    item = dict(row)
+    for column in JSON_COLUMNS:
+        if item.get(column) is not None:
+            try:
+                item[column] = json.loads(item[column])
+            except ValueError:
+                pass
+    return item
+
+
+class OutputCatalog:
+    def __init__(self, output_root, thumbnail_workers=2):
+        self.output_root = output_root
+        self.db_path = os.path.join(output_root, CATALOG_FILE_NAME)
+        self.thumbnail_dir = os.path.join(output_root, THUMBNAIL_DIR_NAME)
+        self.lock = threading.Lock()
+        self.pending_thumbnails = set()
+        self.thumbnail_workers = thumbnail_workers
+        self._executor = None
+        os.makedirs(output_root, exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        existing = {row[1] for row in self.connection.execute('PRAGMA table_info(outputs)')}
+        added = [(column, declaration) for column, declaration in ADDED_COLUMNS
+                 if column not in existing]
+        for column, declaration in added:
+            self.connection.execute(f"ALTER TABLE outputs ADD COLUMN {column} {declaration}")
+        if added:
+            # Rows indexed before these columns existed are re-read on the next sync
+            self.connection.execute('UPDATE outputs SET mtime = 0')
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self.lock:
+            self.connection.close()
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.output_root).replace(os.sep, '/')
+
+    def record(self, path, svg_text=None):
+        """Index one saved SVG, reading it from disk unless ``svg_text`` is supplied."""
+        stat = os.stat(path)
+        if svg_text is None:
+            svg_text = read_output_text(path)
+        relative = self._relative(path)
+        fields = {
+            'path': relative,
+            'drawing': relative.split('/', 1)[0],
+            'created': _created_from_name(os.path.basename(path)),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'layers': len(_LAYER_REGEX.findall(svg_text)),
+            'thumbnail': None,
+            'thumbnail_attempts': 0,
+        }
+        fields.update(parse_header(svg_text))
+        row = tuple(fields.get(column) for column in COLUMNS)
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO outputs ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                row)
+        self.schedule_thumbnail(relative, stat.st_mtime)
+        return fields
+
+    def sync(self):
+        """Bring the catalog in line with the files on disk; return counts of changes."""
+        with self.lock:
+            known = {row['path']: row for row in self.connection.execute(
+                'SELECT path, mtime, size, thumbnail, thumbnail_attempts FROM outputs')}
+        seen = set()
+        updated = 0
+        for entry in iter_output_files(self.output_root):
+            relative = self._relative(entry.path)
+            seen.add(relative)
+            stat = entry.stat()
+            row = known.get(relative)
+            if row is not None and (row['mtime'], row['size']) == (stat.st_mtime, stat.st_size):
+                if row['thumbnail'] is None and row['thumbnail_attempts'] < MAX_THUMBNAIL_ATTEMPTS:
+                    self.schedule_thumbnail(relative, stat.st_mtime)
+                continue
+            try:
+                self.record(entry.path)
+                updated += 1
+            except (OSError, ValueError, EOFError) as e:
+                print(f"Warning: could not catalog {entry.path}: {e}")
+        removed = [path for path in known if path not in seen]
+        if removed:
+            with self.lock, self.connection:
+                self.connection.executemany('DELETE FROM outputs WHERE path = ?',
+                                            [(path,) for path in removed])
+        self.prune_thumbnails()
+        return {'updated': updated, 'removed': len(removed), 'total': len(seen)}
+
+    def prune_thumbnails(self):
+        """Delete thumbnails no catalog row refers to; return how many were removed."""
+        try:
+            names = [name for name in os.listdir(self.thumbnail_dir) if is_thumbnail_name(name)]
+        except OSError:
+            return 0
+        # Snapshot pending renders before the rows, so a render finishing in between is still kept
+        with self.lock:
+            keep = set(self.pending_thumbnails)
+            for row in self.connection.execute('SELECT path, mtime, thumbnail FROM outputs'):
+                keep.add(row['thumbnail'])
+                keep.add(self.thumbnail_name(row['path'], row['mtime']))
+        removed = 0
+        for name in names:
+            if name in keep:
+                continue
+            try:
+                os.remove(os.path.join(self.thumbnail_dir, name))
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def query(self, drawing=None, paper=None, medium=None, search=None, since=None, until=None,
+              page=1, page_size=50):
+        clauses = []
+        args = []
+        for column, value in (('drawing', drawing), ('paper_id', paper), ('medium_id', medium)):
+            if value:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if since:
+            clauses.append('created >= ?')
+            args.append(since)
+        if until:
+            clauses.append('created < ?')
+            args.append(until)
+        if search:
+            searchable = ('path', 'paper_name', 'medium_name', 'hatch', 'controls')
+            clauses.append(f"({' OR '.join(f'{column} LIKE ?' for column in searchable)})")
+            args.extend([f"%{search}%"] * len(searchable))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        page = max(1, int(page))
+        page_size = max(1, min(MAX_PAGE_SIZE, int(page_size)))
+        with self.lock:
+            total = self.connection.execute(f"SELECT COUNT(*) FROM outputs {where}",
+                                            args).fetchone()[0]
+            rows = self.connection.execute(
+                f"SELECT * FROM outputs {where} ORDER BY created DESC, path DESC LIMIT ? OFFSET ?",
+                args + [page_size, (page - 1) * page_size]).fetchall()
+        return {
+            'items': [_row_item(row) for row in rows],
+            'total': total,
+            'page': page,
+            'pageSize': page_size,
+            'pages': max(1, math.ceil(total / page_size)),
+        }
+
+    def facets(self):
+        """Distinct drawings, papers and mediums for building filter menus."""
+        with self.lock:
+            return {
+                name: [row[0] for row in self.connection.execute(
+                    f"SELECT DISTINCT {column} FROM outputs "
+                    f"WHERE {column} IS NOT NULL ORDER BY {column}")]
+                for name, column in (('drawings', 'drawing'), ('papers', 'paper_id'),
+                                     ('mediums', 'medium_id'))
+            }
+
+    def thumbnail_name(self, relative, mtime):
+        # Archiving keeps the mtime, so an .svgz reuses the thumbnail of its .svg
+        if relative.endswith('.svgz'):
+            relative = relative[:-1]
+        return f"{hashlib.sha1(f'{relative}:{mtime}'.encode('utf-8')).hexdigest()}.png"
+
+    def schedule_thumbnail(self, relative, mtime):
+        if Image is None:
+            return None
+        name = self.thumbnail_name(relative, mtime)
+        with self.lock:
+            if name in self.pending_thumbnails:
+                return None
+            self.pending_thumbnails.add(name)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.thumbnail_workers,
+                                                    thread_name_prefix='thumbnail')
+            executor = self._executor
+        return executor.submit(self._build_thumbnail, relative, name)
+
+    def _build_thumbnail(self, relative, name):
+        try:
+            destination = os.path.join(self.thumbnail_dir, name)
+            if not os.path.exists(destination):
+                os.makedirs(self.thumbnail_dir, exist_ok=True)
+                source = os.path.join(self.output_root, *relative.split('/'))
+                render_thumbnail(read_output_text(source), destination)
+            with self.lock, self.connection:
+                self.connection.execute(
+                    'UPDATE outputs SET thumbnail = ?, thumbnail_error = NULL WHERE path = ?',
+                    (name, relative))
+        except Exception as e:
+            print(f"Warning: thumbnail failed for {relative}: {e}")
+            # Recorded so a later sync retries it, up to MAX_THUMBNAIL_ATTEMPTS per file version
+            with self.lock, self.connection:
+                self.connection.execute(
+                    'UPDATE outputs SET thumbnail_error = ?, '
+                    'thumbnail_attempts = thumbnail_attempts + 1 WHERE path = ?',
+                    (str(e)[:500], relative))
+        finally:
+            with self.lock:
+                self.pending_thumbnails.discard(name)
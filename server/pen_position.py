@@ -0,0 +1,95 @@
+"""Map plot progress onto an estimated pen position.
+
+A ``TravelIndex`` walks a layer's polylines in plot order, starting and ending
+at home (0, 0), and records the cumulative distance at every vertex, including
+pen-up moves between strokes. Progress reported by axicli (``done/total`` in the
+tqdm bar) is converted to a fraction of that distance and resolved to an
+``(x, y)`` point with a binary search, so the client can draw a cursor without
+touching the SVG.
+"""
+import bisect
+import math
+import time
+
+try:
+    from svg_layers import layer_polylines
+except ImportError:
+    from .svg_layers import layer_polylines
+
+HOME = (0.0, 0.0)
+
+
+class TravelIndex:
+    def __init__(self, polylines):
+        self.distances = [0.0]
+        self.points = [HOME]
+        self.pen_down = [False]
+        cursor = HOME
+        total = 0.0
+        for points in polylines:
+            if len(points) < 2:
+                continue
+            for index, point in enumerate(points):
+                total += math.hypot(point[0] - cursor[0], point[1] - cursor[1])
+                self.distances.append(total)
+                self.points.append((float(point[0]), float(point[1])))
+                # The move into the first vertex is a pen-up travel
+                self.pen_down.append(index > 0)
+                cursor = point
+        total += math.hypot(cursor[0] - HOME[0], cursor[1] - HOME[1])
+        self.distances.append(total)
+        self.points.append(HOME)
+        self.pen_down.append(False)
+
+    @classmethod
+    def from_svg_root(cls, root, layer):
+        return cls(layer_polylines(root, layer))
+
+    @property
+    def total(self):
+        return self.distances[-1]
+
+    def position_at(self, fraction):
+        """Return ``(x, y, pen_down)`` once ``fraction`` of the travel is complete."""
+        fraction = max(0.0, min(1.0, fraction))
+        target = fraction * self.total
+        index = bisect.bisect_left(self.distances, target)
+        if index <= 0:
+            x, y = self.points[0]
+            return x, y, False
+        if index >= len(self.distances):
+            x, y = self.points[-1]
+            return x, y, False
+        start, end = self.distances[index - 1], self.distances[index]
+        span = end - start
+        t = (target - start) / span if span > 0 else 1.0
+        (x1, y1), (x2, y2) = self.points[index - 1], self.points[index]
+        return x1 + (x2 - x1) * t, y1 + (y2 - y1) * t, self.pen_down[index]
+
+
+class PenPositionStream:
+    """Rate-limited producer of compact ``PEN_POSITION`` payloads."""
+
+    def __init__(self, index, min_interval=0.25, clock=time.monotonic):
+        self.index = index
+        self.min_interval = min_interval
+        self.clock = clock
+        self._last_emit = None
+
+    def update(self, done, total):
+        """Return a payload for ``done``/``total`` progress, or None when throttled or unusable."""
+        if not total or total <= 0 or done is None:
+            return None
+        fraction = max(0.0, min(1.0, done / total))
+        now = self.clock()
+        if (self._last_emit is not None and fraction < 1.0
+                and now - self._last_emit < self.min_interval):
+            return None
+        self._last_emit = now
+        x, y, pen_down = self.index.position_at(fraction)
+        return {
+            'x': round(x, 2),
+            'y': round(y, 2),
+            'down': pen_down,
+            'fraction': round(fraction, 4)
+        }
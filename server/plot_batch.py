@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""Headless batch plotting: drive a running server from the command line.
+
+Lists saved drawings from ``output/`` and their layers, then plots a file's
+layers in order over the ``/ws`` control channel, with the same pen settings
+the browser would pick for the drawing's paper and medium. Progress is read
+from the channel's typed ``progress`` messages. Ctrl+C stops the plot and
+leaves it resumable with ``plot_batch.py resume``.
+
+    python server/plot_batch.py list --drawing voronoi
+    python server/plot_batch.py layers voronoi/voronoi_20250101_120000.svg
+    python server/plot_batch.py plot voronoi/voronoi_20250101_120000.svg --layers 0 2
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import socket
+import sys
+import time
+from collections import deque
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode, urlsplit
+from urllib.request import urlopen
+
+try:
+    from output_catalog import parse_header
+    from svg_layers import (LABEL_ATTR, element_length, iter_layers, iter_stroke_elements,
+                            layer_number, parse_svg)
+    from ws_channel import (OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key, encode_frame,
+                            read_frame)
+except ImportError:
+    from .output_catalog import parse_header
+    from .svg_layers import (LABEL_ATTR, element_length, iter_layers, iter_stroke_elements,
+                             layer_number, parse_svg)
+    from .ws_channel import (OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key, encode_frame,
+                             read_frame)
+
+DEFAULT_SERVER = 'http://localhost:8000'
+DEFAULT_PEN_POS_UP = 95  # The plotter page's slider defaults
+DEFAULT_PEN_POS_DOWN = 50
+DEFAULT_PEN_RATE_LOWER = 10
+# Mirrors PAPER_MEDIUM_PLOTTER_OVERRIDES in client/js/utils/paperProfile.js
+PEN_RATE_OVERRIDES = {
+    'molotow': {'dalersmootha3': 5, 'daleraquafinehpa3': -5, 'vangoghblacka3': 8,
+                'strathmorebristolvellum': 4, 'hahnemuhleskizze190': -12},
+    'yono': {'dalersmootha3': 8, 'daleraquafinehpa3': -6, 'vangoghblacka3': 10,
+             'strathmorebristolvellum': 6, 'hahnemuhleskizze190': -15},
+}
+EXIT_INTERRUPTED = 130
+
+
+class BatchError(Exception):
+    pass
+
+
+def pen_rate_modifier(paper):
+    """Port of ``derivePenRateModifier``: absorbent or delicate stock lowers the pen slower."""
+    modifier = 0
+    absorbency = str(paper.get('absorbency') or '').lower()
+    if 'medium-high' in absorbency:
+        modifier -= 3
+    elif 'high' in absorbency:
+        modifier -= 6
+    elif 'low-medium' in absorbency:
+        modifier += 3
+    elif 'low' in absorbency:
+        modifier += 5
+    strength = str(paper.get('surfaceStrength') or '').lower()
+    if 'excellent' in strength or 'very-strong' in strength:
+        modifier += 4
+    elif 'good' in strength:
+        modifier += 2
+    elif 'moderate' in strength or 'delicate' in strength:
+        modifier -= 6
+    return modifier
+
+
+def resolve_pen_rate_lower(paper, paper_id, medium, medium_id):
+    """The ``pen_rate_lower`` the browser's ``resolvePlotterDefaults`` picks for a pairing."""
+    base = (medium.get('plotterDefaults') or {}).get('penRateLower')
+    if not isinstance(base, (int, float)):
+        base = DEFAULT_PEN_RATE_LOWER
+    override = PEN_RATE_OVERRIDES.get(medium_id, {}).get(paper_id, 0)
+    # Math.round, not Python's round-half-to-even
+    return min(max(math.floor(base + pen_rate_modifier(paper) + override + 0.5), 1), 100)
+
+
+def list_layers(svg_text):
+    """Per axicli layer number: its labels, stroke colour, element count and drawn length."""
+    layers = {}
+    for _, group in iter_layers(parse_svg(svg_text)):
+        number = layer_number(group.get(LABEL_ATTR))
+        if number is None:
+            continue
+        entry = layers.setdefault(number, {'layer': number, 'label': group.get(LABEL_ATTR),
+                                           'stroke': group.get('stroke'), 'elements': 0,
+                                           'lengthMm': 0.0})
+        for element in iter_stroke_elements(group):
+            entry['elements'] += 1
+            entry['lengthMm'] += element_length(element)
+    for entry in layers.values():
+        entry['lengthMm'] = round(entry['lengthMm'], 1)
+    return [layers[number] for number in sorted(layers)]
+
+
+def plan_layers(layers, selected=None, start_at=None):
+    """The layers to plot, in order: ``selected`` keeps its own order, empty layers are skipped."""
+    by_number = {entry['layer']: entry for entry in layers}
+    if selected:
+        missing = [number for number in selected if number not in by_number]
+        if missing:
+            raise BatchError(f"No layer {', '.join(str(number) for number in missing)} "
+                             f"(layers: {', '.join(str(number) for number in by_number)})")
+        plan = [by_number[number] for number in selected]
+    else:
+        plan = [entry for entry in layers if entry['elements']]
+    if start_at is not None:
+        numbers = [entry['layer'] for entry in plan]
+        if start_at not in numbers:
+            raise BatchError(f"Layer {start_at} is not part of this run")
+        plan = plan[numbers.index(start_at):]
+    return plan
+
+
+def format_duration(seconds):
+    if not isinstance(seconds, (int, float)):
+        return '?'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def format_progress(payload):
+    """One status line for a ``CLI_PROGRESS_BAR`` payload."""
+    metrics = (payload or {}).get('metrics')
+    if not metrics:
+        return str((payload or {}).get('status', ''))
+    percent = payload.get('overall', metrics['percent'] / 100) * 100
+    line = (f"{percent:5.1f}%  {metrics['done']:g}/{metrics['total']:g}  "
+            f"elapsed {format_duration(metrics.get('elapsed'))}  "
+            f"eta {format_duration(metrics.get('eta'))}")
+    if payload.get('source'):
+        line += f"  [{payload['source']}]"
+    return line
+
+
+class ServerClient:
+    """The HTTP endpoints a batch run reads: /outputs, saved files and /config."""
+
+    def __init__(self, base_url=DEFAULT_SERVER, timeout=15.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _get(self, path):
+        try:
+            with urlopen(f"{self.base_url}{path}", timeout=self.timeout) as response:
+                return response.read().decode('utf-8')
+        except HTTPError as e:
+            if e.code == 404:
+                raise BatchError(f"Not found: {path}")
+            raise BatchError(f"GET {path} failed with HTTP {e.code}")
+        except URLError as e:
+            raise BatchError(f"Cannot reach the server at {self.base_url}: {e.reason}")
+
+    def get_json(self, path):
+        return json.loads(self._get(path))
+
+    def outputs(self, **filters):
+        query = urlencode({key: value for key, value in filters.items() if value})
+        return self.get_json(f"/outputs?{query}")
+
+    def saved_svg(self, rel_path):
+        return self._get(f"/outputs/files/{quote(rel_path)}")
+
+    def config(self):
+        return self.get_json('/config')
+
+    def control_channel(self):
+        parts = urlsplit(self.base_url)
+        return ControlClient(parts.hostname or 'localhost', parts.port or 80,
+                             timeout=self.timeout)
+
+
+class ControlClient:
+    """A blocking client for the ``/ws`` control channel."""
+
+    def __init__(self, host, port, timeout=15.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(None)  # Plots run for hours; the server pings an idle client
+        self.rfile = self.sock.makefile('rb')
+        self.pending = deque()  # Messages read while waiting for an ack
+        self._next_id = 0
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        self.sock.sendall((f'GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                           f'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                           f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n')
+                          .encode('ascii'))
+        status = self.rfile.readline().decode('latin-1')
+        headers = {}
+        for line in iter(self.rfile.readline, b'\r\n'):
+            if not line:
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != accept_key(key):
+            self.sock.close()
+            raise BatchError(f"Control channel refused: {status.strip() or 'no response'}")
+
+    def _send_frame(self, opcode, payload):
+        self.sock.sendall(encode_frame(opcode, payload, mask=os.urandom(4)))
+
+    def send(self, message):
+        self._send_frame(OP_TEXT, json.dumps(message).encode('utf-8'))
+
+    def receive(self):
+        """The next JSON message from the server, messages set aside by ``request`` first."""
+        if self.pending:
+            return self.pending.popleft()
+        return self._read_message()
+
+    def _read_message(self):
+        while True:  # Pings are answered along the way
+            try:
+                _, opcode, payload = read_frame(self.rfile, require_mask=False)
+            except (EOFError, OSError) as e:
+                raise BatchError(f"Control channel closed: {e}")
+            if opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+            elif opcode == OP_CLOSE:
+                raise BatchError('The server closed the control channel')
+            elif opcode == OP_TEXT:
+                return json.loads(payload.decode('utf-8'))
+
+    def request(self, message):
+        """Send ``message`` with a fresh id and return the reply carrying that id."""
+        self._next_id += 1
+        request_id = self._next_id
+        self.send({**message, 'id': request_id})
+        while True:
+            reply = self._read_message()
+            if reply.get('id') == request_id and reply.get('type') != 'progress':
+                return reply
+            # Progress from a fast plot can overtake its own ack
+            self.pending.append(reply)
+
+    def command(self, name, **params):
+        return self.request({'type': 'command', 'command': name, **params})
+
+    def close(self):
+        try:
+            self._send_frame(OP_CLOSE, b'\x03\xe8')
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class ProgressPrinter:
+    """Writes progress to ``stream``: one updating line on a terminal, whole percents otherwise."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self._last_percent = None
+        self._line_open = False
+
+    def bar(self, payload):
+        metrics = (payload or {}).get('metrics') or {}
+        if self.interactive:
+            self.stream.write(f"\r{format_progress(payload)}\x1b[K")
+            self._line_open = True
+        else:
+            percent = int(metrics.get('percent', -1))
+            if percent == self._last_percent:
+                return
+            self._last_percent = percent
+            self.stream.write(f"{format_progress(payload)}\n")
+        self.stream.flush()
+
+    def line(self, text):
+        if self._line_open:
+            self.stream.write('\n')
+            self._line_open = False
+        self._last_percent = None
+        self.stream.write(f"{text}\n")
+        self.stream.flush()
+
+
+def wait_for_plot(channel, printer):
+    """Follow progress until the current plot finishes; True when it completed."""
+    while True:
+        message = channel.receive()
+        if message.get('type') != 'progress':
+            continue
+        progress, payload = message.get('progress'), message.get('payload')
+        if progress == 'CLI_PROGRESS_BAR':
+            printer.bar(payload)
+        elif progress == 'PLOT_COMPLETE':
+            return True
+        elif progress == 'PLOT_ERROR':
+            return False
+        elif progress == 'PLOT_STALLED':
+            printer.line(f"Warning: no progress for {payload.get('stalledFor')}s "
+                         f"({payload.get('done')}/{payload.get('total')})")
+        elif progress == 'CHUNK_PROGRESS':
+            printer.line(f"Chunk {payload.get('chunk')}/{payload.get('chunks')}: "
+                         f"{payload.get('state', '')}".rstrip(': '))
+        elif progress not in ('PEN_POSITION', 'CLI_PROGRESS'):
+            printer.line(progress)
+
+
+def resolve_pen_settings(sections, svg_text, args):
+    """Pen positions from the flags, and ``pen_rate_lower`` from the paper and medium.
+
+    The paper and medium default to the ones recorded in the saved file's header.
+    """
+    papers, mediums = sections['papers'], sections['mediums']
+    info = parse_header(svg_text)
+    paper_id = args.paper or info.get('paper_id') or papers['default']
+    medium_id = args.medium or info.get('medium_id') or mediums['default']
+    if paper_id not in papers['papers']:
+        raise BatchError(f"Unknown paper {paper_id}")
+    if medium_id not in mediums['mediums']:
+        raise BatchError(f"Unknown medium {medium_id}")
+    rate = args.pen_rate_lower
+    if rate is None:
+        rate = resolve_pen_rate_lower(papers['papers'][paper_id], paper_id,
+                                      mediums['mediums'][medium_id], medium_id)
+    return {'paper': paper_id, 'medium': medium_id, 'pen_pos_up': args.pen_up,
+            'pen_pos_down': args.pen_down, 'pen_rate_lower': rate}
+
+
+def run_layers(channel, svg_text, plan, settings, args, printer, prompt=input):
+    """Plot ``plan`` layer by layer; returns the process exit status."""
+    for position, entry in enumerate(plan):
+        if position and not args.no_wait:
+            prompt(f"Load the pen for layer {entry['label']} and press Enter ")
+        printer.line(f"Plotting layer {entry['label']} ({position + 1}/{len(plan)})")
+        params = {'svg': svg_text, 'layer': entry['layer'], 'layerLabel': entry['label'],
+                  'pen_pos_up': settings['pen_pos_up'],
+                  'pen_pos_down': settings['pen_pos_down'],
+                  'pen_rate_lower': settings['pen_rate_lower']}
+        if args.speed_classes:
+            params['speed_classes'] = True
+        elif args.chunks and args.chunks > 1:
+            params['chunks'] = args.chunks
+        try:
+            ack = channel.command('plot', **params)
+            if ack.get('status') != 'success':
+                printer.line(f"Error: {ack.get('message')}")
+                return 1
+            completed = wait_for_plot(channel, printer)
+        except KeyboardInterrupt:
+            return interrupt(channel, printer, plan[position + 1:])
+        if not completed:
+            printer.line(f"Layer {entry['label']} failed; run 'resume' to continue it")
+            _remaining_hint(plan[position + 1:], printer)
+            return 1
+    printer.line('All layers plotted')
+    return 0
+
+
+def _remaining_hint(remaining, printer):
+    if remaining:
+        printer.line(f"Then plot the remaining layers with --start-at {remaining[0]['layer']}")
+
+
+def interrupt(channel, printer, remaining=()):
+    """Stop the plot after Ctrl+C so axicli writes its resume log."""
+    printer.line('Stopping plot...')
+    try:
+        printer.line(channel.command('stop_plot').get('message', ''))
+    except BatchError as e:
+        printer.line(f"Error: {e}")
+    printer.line("Run 'plot_batch.py resume' to continue")
+    _remaining_hint(remaining, printer)
+    return EXIT_INTERRUPTED
+
+
+def cmd_list(client, args, printer):
+    result = client.outputs(drawing=args.drawing, paper=args.paper, medium=args.medium,
+                            q=args.search, pageSize=args.limit)
+    for item in result.get('items', []):
+        printer.line(f"{item['path']}  {item.get('paper_id') or '-'}  "
+                     f"{item.get('medium_id') or '-'}  layers={item.get('layers') or '?'}")
+    printer.line(f"{result.get('total', 0)} saved drawing(s)")
+    return 0
+
+
+def cmd_layers(client, args, printer):
+    for entry in list_layers(client.saved_svg(args.path)):
+        printer.line(f"{entry['layer']:>3}  {entry['label']}  {entry['stroke'] or '-'}  "
+                     f"{entry['elements']} element(s)  {entry['lengthMm'] / 1000:.2f} m")
+    return 0
+
+
+def cmd_plot(client, args, printer):
+    svg_text = client.saved_svg(args.path)
+    plan = plan_layers(list_layers(svg_text), args.layers, args.start_at)
+    if not plan:
+        raise BatchError(f"{args.path} has no layers with strokes")
+    settings = resolve_pen_settings(client.config(), svg_text, args)
+    printer.line(f"{args.path}: {len(plan)} layer(s) on {settings['paper']} with "
+                 f"{settings['medium']}, pen {settings['pen_pos_up']}/{settings['pen_pos_down']}"
+                 f", rate {settings['pen_rate_lower']}")
+    channel = client.control_channel()
+    try:
+        return run_layers(channel, svg_text, plan, settings, args, printer)
+    except KeyboardInterrupt:  # At a pen-change prompt: nothing is plotting
+        return EXIT_INTERRUPTED
+    finally:
+        channel.close()
+
+
+def cmd_resume(client, args, printer):
+    channel = client.control_channel()
+    try:
+        ack = channel.command('resume_plot')
+        printer.line(ack.get('message', ''))
+        if ack.get('status') != 'success':
+            return 1
+        return 0 if wait_for_plot(channel, printer) else 1
+    except KeyboardInterrupt:
+        return interrupt(channel, printer)
+    finally:
+        channel.close()
+
+
+def cmd_stop(client, args, printer):
+    channel = client.control_channel()
+    try:
+        ack = channel.command('stop_plot')
+    finally:
+        channel.close()
+    printer.line(ack.get('message', ''))
+    return 0 if ack.get('status') == 'success' else 1
+
+
+def cmd_status(client, args, printer):
+    channel = client.control_channel()
+    try:
+        status = channel.request({'type': 'resume'})
+    finally:
+        channel.close()
+    if status.get('foreignPlotPid'):
+        printer.line(f"Plot running in a previous server (PID {status['foreignPlotPid']}); "
+                     f"its progress is not streamed until it finishes")
+        return 0
+    if not status.get('available'):
+        printer.line('No plot to resume')
+        return 0
+    line = f"Resume available for layer {status.get('layerLabel') or status.get('layer')}"
+    chunks = status.get('chunks')
+    if chunks:
+        line += f" (chunk {chunks['completed'] + 1}/{chunks['total']})"
+    printer.line(line)
+    return 0
+
+
+def cmd_tail(client, args, printer):
+    channel = client.control_channel()
+    try:
+        while True:
+            completed = wait_for_plot(channel, printer)
+            printer.line('PLOT_COMPLETE' if completed else 'PLOT_ERROR')
+            if args.once:
+                return 0 if completed else 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        channel.close()
+
+
+COMMANDS = {
+    'list': cmd_list,
+    'layers': cmd_layers,
+    'plot': cmd_plot,
+    'resume': cmd_resume,
+    'stop': cmd_stop,
+    'status': cmd_status,
+    'tail': cmd_tail,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Plot saved drawings without a browser.')
+    parser.add_argument('--server', default=os.environ.get('PLOTTER_SERVER', DEFAULT_SERVER),
+                        help=f'Server URL (default: $PLOTTER_SERVER or {DEFAULT_SERVER})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    listing = commands.add_parser('list', help='List saved drawings in output/')
+    listing.add_argument('--drawing')
+    listing.add_argument('--paper')
+    listing.add_argument('--medium')
+    listing.add_argument('-q', '--search')
+    listing.add_argument('--limit', type=int, default=50)
+
+    layers = commands.add_parser('layers', help="List a saved drawing's layers")
+    layers.add_argument('path', help='<drawing>/<file>.svg, as listed')
+
+    plot = commands.add_parser('plot', help="Plot a saved drawing's layers in order")
+    plot.add_argument('path', help='<drawing>/<file>.svg, as listed')
+    plot.add_argument('--layers', type=int, nargs='+', metavar='N',
+                      help='Layer numbers in plot order (default: every layer with strokes)')
+    plot.add_argument('--start-at', type=int, metavar='N',
+                      help='Skip the layers before N, e.g. after a pen ran dry')
+    plot.add_argument('--pen-up', type=int, default=DEFAULT_PEN_POS_UP)
+    plot.add_argument('--pen-down', type=int, default=DEFAULT_PEN_POS_DOWN)
+    plot.add_argument('--pen-rate-lower', type=int,
+                      help='Default: derived from the paper and medium, as in the browser')
+    plot.add_argument('--paper', help="Paper id (default: the drawing's own)")
+    plot.add_argument('--medium', help="Medium id (default: the drawing's own)")
+    plot.add_argument('--speed-classes', action='store_true')
+    plot.add_argument('--chunks', type=int)
+    plot.add_argument('--no-wait', action='store_true',
+                      help='Do not pause for a pen change between layers')
+
+    commands.add_parser('resume', help='Resume the last interrupted plot')
+    commands.add_parser('stop', help='Stop the running plot, keeping it resumable')
+    commands.add_parser('status', help='Show whether a plot can be resumed')
+    tail = commands.add_parser('tail', help='Follow plot progress')
+    tail.add_argument('--once', action='store_true', help='Exit when the current plot ends')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, stream=sys.stdout):
+    args = parse_args(argv)
+    client = ServerClient(args.server)
+    printer = ProgressPrinter(stream)
+    started = time.monotonic()
+    try:
+        status = COMMANDS[args.command](client, args, printer)
+    except BatchError as e:
+        printer.line(f"Error: {e}")
+        return 1
+    if args.command in ('plot', 'resume'):
+        printer.line(f"Finished in {format_duration(time.monotonic() - started)}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Chunked layer plotting.
+
+A layer can be cut into several smaller plot files so each finished chunk becomes a
+recovery point. Chunks keep the client's stroke order (which is already travel
+optimised) and are balanced by drawn length. Progress is recorded in a JSON
+checkpoint next to the chunk files, so a stop or crash resumes from the last
+finished chunk even when axicli's own resume log is missing or unreadable.
+"""
+import json
+import os
+import queue
+import shutil
+import threading
+import xml.etree.ElementTree as ET
+
+try:
+    from svg_layers import (element_length, extract_layer_svg, layer_stroke_elements, parse_svg,
+                            serialize_svg)
+except ImportError:
+    from .svg_layers import (element_length, extract_layer_svg, layer_stroke_elements, parse_svg,
+                             serialize_svg)
+
+CHECKPOINT_NAME = 'checkpoint.json'
+SOURCE_NAME = 'source.svg'
+
+
+def plan_chunks(root, layer, chunk_count):
+    """Split a layer's strokes into at most ``chunk_count`` contiguous runs of similar length."""
+    elements = [element for _, element in layer_stroke_elements(root, layer)]
+    if not elements:
+        return []
+    count = max(1, min(int(chunk_count), len(elements)))
+    lengths = [element_length(element) for element in elements]
+    total = sum(lengths)
+    chunks = []
+    current = []
+    current_indices = []
+    current_length = 0.0
+    consumed = 0.0
+    for index, (element, length) in enumerate(zip(elements, lengths)):
+        current.append(element)
+        current_indices.append(index)
+        current_length += length
+        consumed += length
+        chunks_left = count - len(chunks) - 1
+        elements_left = len(elements) - index - 1
+        target = total * (len(chunks) + 1) / count
+        if chunks_left > 0 and (consumed >= target or elements_left == chunks_left):
+            chunks.append({'elements': current, 'indices': current_indices,
+                           'length': current_length})
+            current = []
+            current_indices = []
+            current_length = 0.0
+    if current:
+        chunks.append({'elements': current, 'indices': current_indices, 'length': current_length})
+    return chunks
+
+
+def resume_log_is_usable(path):
+    """Return True when ``path`` looks like a complete axicli resume log."""
+    if not path or not os.path.isfile(path):
+        return False
+    try:
+        if os.path.getsize(path) == 0:
+            return False
+        ET.parse(path)
+    except (OSError, ET.ParseError):
+        return False
+    return True
+
+
+def _write_atomic(path, text):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+    os.replace(temp_path, path)
+
+
+class ChunkCheckpoint:
+    """On-disk record of a chunked layer plot."""
+
+    def __init__(self, directory, data):
+        self.directory = directory
+        self.data = data
+
+    @classmethod
+    def path_for(cls, directory):
+        return os.path.join(directory, CHECKPOINT_NAME)
+
+    @classmethod
+    def exists(cls, directory):
+        return os.path.exists(cls.path_for(directory))
+
+    @classmethod
+    def create(cls, directory, svg_text, plan, layer, layer_label=None, settings=None):
+        """Persist ``plan`` (a list of ``{'indices', 'length'[, 'settings', 'label']}`` dicts).
+
+        ``indices`` are positions in the layer's stroke order; per-chunk ``settings``
+        override the shared pen settings for that chunk's axicli run.
+        """
+        cls.discard(directory)
+        os.makedirs(directory, exist_ok=True)
+        _write_atomic(os.path.join(directory, SOURCE_NAME), svg_text)
+        checkpoint = cls(directory, {
+            'layer': layer,
+            'layerLabel': layer_label,
+            'settings': dict(settings or {}),
+            'chunkCount': len(plan),
+            'weights': [chunk['length'] for chunk in plan],
+            'strokes': [list(chunk['indices']) for chunk in plan],
+            'chunkSettings': [dict(chunk.get('settings') or {}) for chunk in plan],
+            'chunkLabels': [chunk.get('label') for chunk in plan],
+            'completed': 0,
+            'resumeChunk': None
+        })
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, directory):
+        try:
+            with open(cls.path_for(directory), 'r', encoding='utf-8') as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get('chunkCount'), int):
+            return None
+        if not os.path.exists(os.path.join(directory, SOURCE_NAME)):
+            return None
+        return cls(directory, data)
+
+    @classmethod
+    def discard(cls, directory):
+        if directory and os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def save(self):
+        _write_atomic(self.path_for(self.directory), json.dumps(self.data, indent=2))
+
+    @property
+    def layer(self):
+        return self.data.get('layer')
+
+    @property
+    def layer_label(self):
+        return self.data.get('layerLabel')
+
+    @property
+    def settings(self):
+        return self.data.get('settings') or {}
+
+    @property
+    def chunk_count(self):
+        return self.data['chunkCount']
+
+    @property
+    def completed(self):
+        return int(self.data.get('completed') or 0)
+
+    @property
+    def remaining(self):
+        return max(0, self.chunk_count - self.completed)
+
+    @property
+    def resume_chunk(self):
+        return self.data.get('resumeChunk')
+
+    def chunk_settings(self, index):
+        """Shared pen settings merged with any per-chunk overrides."""
+        merged = dict(self.settings)
+        overrides = self.data.get('chunkSettings') or []
+        if index < len(overrides):
+            merged.update(overrides[index] or {})
+        return merged
+
+    def chunk_label(self, index):
+        labels = self.data.get('chunkLabels') or []
+        label = labels[index] if index < len(labels) else None
+        return label or f"chunk {index + 1}/{self.chunk_count}"
+
+    def source_svg(self):
+        with open(os.path.join(self.directory, SOURCE_NAME), 'r', encoding='utf-8') as handle:
+            return handle.read()
+
+    def chunk_path(self, index):
+        return os.path.join(self.directory, f"chunk_{index + 1:03d}.svg")
+
+    def mark_started(self, index):
+        self.data['resumeChunk'] = index
+        self.save()
+
+    def mark_complete(self, index):
+        self.data['completed'] = max(self.completed, index + 1)
+        self.data['resumeChunk'] = None
+        self.save()
+        try:
+            os.remove(self.chunk_path(index))
+        except OSError:
+            pass
+
+    def overall_progress(self, index, fraction=0.0):
+        """Fraction of the whole layer done while chunk ``index`` is ``fraction`` complete."""
+        weights = self.data.get('weights') or []
+        total = sum(weights)
+        if len(weights) != self.chunk_count or total <= 0:
+            return min(1.0, (index + max(0.0, min(1.0, fraction))) / max(1, self.chunk_count))
+        done = sum(weights[:index]) + weights[index] * max(0.0, min(1.0, fraction))
+        return min(1.0, done / total)
+
+
+class ChunkPreparer:
+    """Writes chunk SVGs on a background thread, one chunk ahead of the plotter."""
+
+    _DONE = object()
+
+    def __init__(self, checkpoint, root=None, start_index=0, lookahead=1):
+        self.checkpoint = checkpoint
+        self.root = root
+        self.start_index = start_index
+        self._queue = queue.Queue(maxsize=max(1, lookahead))
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            root = self.root if self.root is not None else parse_svg(self.checkpoint.source_svg())
+            layer = self.checkpoint.layer
+            elements = [element for _, element in layer_stroke_elements(root, layer)]
+            strokes = self.checkpoint.data.get('strokes') or []
+            for index in range(self.start_index, len(strokes)):
+                if self._stopped.is_set():
+                    return
+                keep = set(id(elements[i]) for i in strokes[index] if i < len(elements))
+                chunk_path = self.checkpoint.chunk_path(index)
+                _write_atomic(chunk_path, serialize_svg(extract_layer_svg(root, layer, keep=keep)))
+                if not self._put((index, chunk_path)):
+                    return
+            self._put(self._DONE)
+        except Exception as error:
+            self._put(error)
+
+    def next(self):
+        """Return the next ``(index, path)`` pair, or None once every chunk has been handed out."""
+        item = self._queue.get()
+        if item is self._DONE:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def cancel(self):
+        self._stopped.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
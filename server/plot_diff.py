@@ -0,0 +1,178 @@
+"""Differential plotting: keep only the strokes a new SVG adds to an already plotted one.
+
+Strokes are compared per axicli layer, one polyline (subpath) at a time. An
+exact geometry hash of the rounded coordinates, with direction normalised,
+matches untouched strokes in one dictionary lookup. Strokes that moved by no
+more than the tolerance are then matched through a grid keyed on their end
+points. Each base polyline can account for only one new polyline, so a stroke
+drawn twice in the new version is plotted once more.
+
+``PlottedStore`` keeps the SVGs recently sent to ``plot`` by their SHA-256, so
+a diff can name what is already on the sheet without re-uploading it.
+"""
+import hashlib
+import math
+import os
+import re
+from collections import defaultdict
+
+try:
+    from disk_cache import prune_directory, touch
+    from svg_layers import (LABEL_ATTR, STROKE_TAGS, element_polylines, iter_layers,
+                            iter_stroke_elements, layer_number, local_name, rewrite_stroke)
+except ImportError:
+    from .disk_cache import prune_directory, touch
+    from .svg_layers import (LABEL_ATTR, STROKE_TAGS, element_polylines, iter_layers,
+                             iter_stroke_elements, layer_number, local_name, rewrite_stroke)
+
+DEFAULT_TOLERANCE_MM = 0.05
+HASH_DECIMALS = 3  # format_path writes 3 decimals, so re-saved files still hash the same
+SVG_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def svg_hash(svg_text):
+    return hashlib.sha256(svg_text.encode('utf-8')).hexdigest()
+
+
+class PlottedStore:
+    """``<sha256>.svg`` copies of plotted documents, pruned least recently used first."""
+
+    def __init__(self, directory, max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        if not SVG_HASH_PATTERN.match(key or ''):
+            return None
+        return os.path.join(self.directory, f"{key}.svg")
+
+    def put(self, svg_text):
+        key = svg_hash(svg_text)
+        path = self.path_for(key)
+        if os.path.exists(path):
+            touch(path)
+            return key
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            handle.write(svg_text)
+        os.replace(temp_path, path)
+        prune_directory(self.directory, '.svg', self.max_entries, self.max_bytes)
+        return key
+
+    def get(self, key):
+        path = self.path_for(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        touch(path)
+        with open(path, 'r', encoding='utf-8') as handle:
+            return handle.read()
+
+
+def geometry_hash(points):
+    """Identical for the same polyline drawn in either direction."""
+    forward = tuple((round(x, HASH_DECIMALS), round(y, HASH_DECIMALS)) for x, y in points)
+    return min(forward, forward[::-1])
+
+
+def _within(points, other, tolerance):
+    return all(math.hypot(x1 - x2, y1 - y2) <= tolerance
+               for (x1, y1), (x2, y2) in zip(points, other))
+
+
+class StrokeIndex:
+    """The polylines of one base layer, each of which can be claimed by one new polyline."""
+
+    def __init__(self, polylines, tolerance):
+        self.tolerance = max(float(tolerance), 10 ** -HASH_DECIMALS)
+        self.polylines = polylines
+        self.claimed = [False] * len(polylines)
+        self.by_hash = defaultdict(list)
+        self.by_cell = defaultdict(list)
+        for index, points in enumerate(polylines):
+            self.by_hash[geometry_hash(points)].append(index)
+            for endpoint in {points[0], points[-1]}:
+                self.by_cell[self._cell(endpoint)].append(index)
+
+    def _cell(self, point):
+        return (math.floor(point[0] / self.tolerance), math.floor(point[1] / self.tolerance))
+
+    def _near(self, point):
+        cx, cy = self._cell(point)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                yield from self.by_cell.get((cx + dx, cy + dy), ())
+
+    def claim(self, points):
+        """Mark and return the base polyline matching ``points``, or None."""
+        for index in self.by_hash.get(geometry_hash(points), ()):
+            if not self.claimed[index]:
+                self.claimed[index] = True
+                return index
+        reversed_points = points[::-1]
+        for index in self._near(points[0]):
+            candidate = self.polylines[index]
+            if self.claimed[index] or len(candidate) != len(points):
+                continue
+            if (_within(points, candidate, self.tolerance)
+                    or _within(reversed_points, candidate, self.tolerance)):
+                self.claimed[index] = True
+                return index
+        return None
+
+    @property
+    def unclaimed(self):
+        return self.claimed.count(False)
+
+
+def _layer_polylines(root):
+    polylines = defaultdict(list)
+    for _, group in iter_layers(root):
+        number = layer_number(group.get(LABEL_ATTR))
+        for element in iter_stroke_elements(group):
+            polylines[number].extend(points for points in element_polylines(element)
+                                     if len(points) > 1)
+    return polylines
+
+
+def diff_svg(base_root, new_root, tolerance=DEFAULT_TOLERANCE_MM, layer=None):
+    """Strip ``new_root`` in place down to the strokes missing from ``base_root``.
+
+    With ``layer`` only that axicli layer is compared; the others are left
+    untouched. Returns a summary with per-layer ``added``, ``unchanged`` and
+    ``removed`` polyline counts; ``removed`` strokes stay on the paper, since a
+    plotter cannot erase them.
+    """
+    base = _layer_polylines(base_root)
+    target = layer_number(layer) if layer is not None else None
+    indexes = {}
+    layers = {}
+    for _, group in iter_layers(new_root):
+        number = layer_number(group.get(LABEL_ATTR))
+        if target is not None and number != target:
+            continue
+        if number not in indexes:
+            indexes[number] = StrokeIndex(base.get(number, []), tolerance)
+            layers[number] = {'layer': number, 'label': group.get(LABEL_ATTR),
+                              'added': 0, 'unchanged': 0}
+        index = indexes[number]
+        counts = layers[number]
+        for parent in list(group.iter()):
+            for child in list(parent):
+                if local_name(child) not in STROKE_TAGS:
+                    continue
+                polylines = [points for points in element_polylines(child) if len(points) > 1]
+                fresh = [points for points in polylines if index.claim(points) is None]
+                counts['added'] += len(fresh)
+                counts['unchanged'] += len(polylines) - len(fresh)
+                if not fresh:
+                    parent.remove(child)
+                elif len(fresh) < len(polylines):
+                    rewrite_stroke(child, fresh)
+    for number, counts in layers.items():
+        counts['removed'] = indexes[number].unclaimed
+    summary = {'layers': list(layers.values())}
+    for key in ('added', 'unchanged', 'removed'):
+        summary[key] = sum(counts[key] for counts in layers.values())
+    return summary
@@ -0,0 +1,248 @@
+"""Pre-flight bounds check for plot SVGs, run before the carriage is homed.
+
+The layer about to be plotted is measured against the plot envelope: the sheet
+inside its margin, cut down to what the carriage can reach. The sheet is the
+SVG document itself (the preview writes ``width="Wmm"`` with a matching
+``viewBox``); the reach is the plotter's ``usable_travel_mm``, turned to match
+the sheet's orientation and measured from the home corner, as in
+``imposition.printable_area``. Stroke extents are computed in one vectorized
+pass when numpy is installed; it is imported with the first large layer.
+
+Out-of-bounds geometry is either rejected, with the offending extents in the
+error, or clipped to the envelope with Liang–Barsky segment clipping. Closed
+shapes are clipped as outlines, since the pen only draws their edges.
+"""
+import math
+import re
+
+try:
+    from imposition import ImpositionError, printable_area
+    from lazy_import import optional_module
+    from svg_layers import (element_polylines, layer_stroke_elements, parse_svg,
+                            rewrite_stroke, serialize_svg)
+except ImportError:
+    from .imposition import ImpositionError, printable_area
+    from .lazy_import import optional_module
+    from .svg_layers import (element_polylines, layer_stroke_elements, parse_svg,
+                             rewrite_stroke, serialize_svg)
+
+np = optional_module('numpy')
+
+MODES = ('reject', 'clip', 'off')
+DEFAULT_MODE = 'reject'
+DEFAULT_TOLERANCE_MM = 0.01
+MAX_REPORTED_STROKES = 20
+VECTORIZE_MIN_POINTS = 256  # Below this, building the array costs more than it saves
+PX_MM = 25.4 / 96  # Unitless SVG lengths are CSS pixels
+UNIT_MM = {'': PX_MM, 'px': PX_MM, 'mm': 1.0, 'cm': 10.0, 'in': 25.4, 'pt': 25.4 / 72,
+           'pc': 25.4 / 6}
+
+_LENGTH_REGEX = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-z]*)\s*$')
+
+
+class PreflightError(ValueError):
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+def parse_length(value):
+    """An SVG length attribute in mm, or None when it is missing or relative."""
+    match = _LENGTH_REGEX.match(value or '')
+    if not match or match.group(2) not in UNIT_MM:
+        return None
+    return float(match.group(1)) * UNIT_MM[match.group(2)]
+
+
+def document_frame(root):
+    """``(origin_x, origin_y, mm_per_unit, width_mm, height_mm)`` of an SVG root.
+
+    The sheet size is None when the document does not give one.
+    """
+    width = parse_length(root.get('width'))
+    height = parse_length(root.get('height'))
+    view_box = [float(value) for value in re.split(r'[\s,]+', (root.get('viewBox') or '').strip())
+                if value]
+    if len(view_box) != 4 or view_box[2] <= 0 or view_box[3] <= 0:
+        return 0.0, 0.0, PX_MM, width, height
+    origin_x, origin_y, box_width, box_height = view_box
+    if width is None:
+        width = box_width * PX_MM
+    if height is None:
+        height = box_height * PX_MM
+    return origin_x, origin_y, width / box_width, width, height
+
+
+def plot_envelope(width, height, margin=0.0, travel=None):
+    """``(left, top, right, bottom)`` in mm that the pen may draw inside.
+
+    ``width`` and ``height`` may be None for a document of unknown size, which
+    leaves only the margin at the home corner and the plotter travel.
+    """
+    if travel and width is not None and height is not None:
+        short, long = sorted(float(value) for value in travel)
+        travel = (short, long) if height > width else (long, short)
+    try:
+        x, y, area_width, area_height = printable_area(
+            math.inf if width is None else width, math.inf if height is None else height,
+            margin, travel)
+    except ImpositionError as e:
+        raise PreflightError(str(e))
+    return x, y, x + area_width, y + area_height
+
+
+def stroke_extents(strokes):
+    """``(min_x, min_y, max_x, max_y)`` of each stroke, given as a list of polylines."""
+    counts = [sum(len(points) for points in polylines) for polylines in strokes]
+    if np is not None and sum(counts) >= VECTORIZE_MIN_POINTS:
+        coords = np.array([point for polylines in strokes for points in polylines
+                           for point in points], dtype=float)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        lows = np.minimum.reduceat(coords, starts, axis=0).tolist()
+        highs = np.maximum.reduceat(coords, starts, axis=0).tolist()
+        return [(low[0], low[1], high[0], high[1]) for low, high in zip(lows, highs)]
+    extents = []
+    for polylines in strokes:
+        xs = [x for points in polylines for x, _ in points]
+        ys = [y for points in polylines for _, y in points]
+        extents.append((min(xs), min(ys), max(xs), max(ys)))
+    return extents
+
+
+def clip_segment(start, end, box):
+    """Liang–Barsky: the part of ``start``→``end`` inside ``box``, or None."""
+    (x0, y0), (x1, y1) = start, end
+    dx, dy = x1 - x0, y1 - y0
+    left, top, right, bottom = box
+    low, high = 0.0, 1.0
+    for p, q in ((-dx, x0 - left), (dx, right - x0), (-dy, y0 - top), (dy, bottom - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > high:
+                return None
+            low = max(low, t)
+        else:
+            if t < low:
+                return None
+            high = min(high, t)
+    # Keep untouched end points exact so neighbouring segments still join up
+    head = start if low == 0.0 else (x0 + low * dx, y0 + low * dy)
+    tail = end if high == 1.0 else (x0 + high * dx, y0 + high * dy)
+    return head, tail
+
+
+def clip_polyline(points, box):
+    """The runs of ``points`` inside ``box``, as a list of polylines."""
+    runs = []
+    current = None
+    for start, end in zip(points, points[1:]):
+        segment = clip_segment(start, end, box)
+        if segment is None:
+            current = None
+            continue
+        head, tail = segment
+        if current is not None and current[-1] == head:
+            current.append(tail)
+        else:
+            current = [head, tail]
+            runs.append(current)
+    closed = len(points) > 2 and points[0] == points[-1]
+    if closed and len(runs) > 1 and runs[0][0] == points[0] and runs[-1][-1] == points[-1]:
+        runs[0] = runs.pop() + runs[0][1:]  # The outline was cut open inside the box
+    return runs
+
+
+def _rounded(values):
+    return [round(value, 2) for value in values]
+
+
+def _extents_dict(extents):
+    min_x, min_y, max_x, max_y = _rounded(extents)
+    return {'minX': min_x, 'minY': min_y, 'maxX': max_x, 'maxY': max_y}
+
+
+def _finite(value):
+    return round(value, 2) if math.isfinite(value) else None
+
+
+def check_plot_svg(svg_text, layer, margin=0.0, travel=None, mode=DEFAULT_MODE,
+                   tolerance=DEFAULT_TOLERANCE_MM):
+    """Check ``layer`` of ``svg_text`` against the plot envelope.
+
+    Returns ``(svg_text, report)``. The text is unchanged unless ``mode`` is
+    ``'clip'`` and strokes had to be cut back. In ``'reject'`` mode, geometry
+    outside the envelope raises ``PreflightError`` carrying the report, which
+    gives every extent in mm from the sheet's top-left corner.
+    """
+    if mode not in MODES:
+        raise PreflightError(f"bounds must be one of {', '.join(MODES)}")
+    root = parse_svg(svg_text)
+    origin_x, origin_y, scale, width, height = document_frame(root)
+    envelope = plot_envelope(width, height, margin, travel)
+    left, top, right, bottom = envelope
+    report = {
+        'layer': layer,
+        'mode': mode,
+        'area': {'x': _finite(left), 'y': _finite(top), 'width': _finite(right - left),
+                 'height': _finite(bottom - top)},
+        'strokes': 0, 'outside': 0, 'clipped': 0, 'removed': 0,
+    }
+    pairs = []
+    for group, element in layer_stroke_elements(root, layer):
+        polylines = [points for points in element_polylines(element) if len(points) > 1]
+        if polylines:
+            pairs.append((group, element, polylines))
+    report['strokes'] = len(pairs)
+    if not pairs:
+        return svg_text, report
+
+    # Extents in mm; the clip box in document units
+    extents = [(
+        (min_x - origin_x) * scale, (min_y - origin_y) * scale,
+        (max_x - origin_x) * scale, (max_y - origin_y) * scale,
+    ) for min_x, min_y, max_x, max_y in stroke_extents([polylines for _, _, polylines in pairs])]
+    layer_extents = (min(entry[0] for entry in extents), min(entry[1] for entry in extents),
+                     max(entry[2] for entry in extents), max(entry[3] for entry in extents))
+    report['extents'] = _extents_dict(layer_extents)
+    report['overflow'] = {
+        'left': round(max(0.0, left - layer_extents[0]), 2),
+        'top': round(max(0.0, top - layer_extents[1]), 2),
+        'right': round(max(0.0, layer_extents[2] - right), 2),
+        'bottom': round(max(0.0, layer_extents[3] - bottom), 2),
+    }
+    offending = [index for index, (min_x, min_y, max_x, max_y) in enumerate(extents)
+                 if min_x < left - tolerance or min_y < top - tolerance
+                 or max_x > right + tolerance or max_y > bottom + tolerance]
+    report['outside'] = len(offending)
+    if not offending:
+        return svg_text, report
+    report['offending'] = [{'stroke': index, **_extents_dict(extents[index])}
+                           for index in offending[:MAX_REPORTED_STROKES]]
+    if mode == 'off':
+        return svg_text, report
+    if mode == 'reject':
+        sides = ', '.join(f"{side} {amount:g}mm" for side, amount in report['overflow'].items()
+                          if amount > 0)
+        raise PreflightError(
+            f"Layer {layer} has {len(offending)} of {len(pairs)} strokes outside the "
+            f"plot area ({sides} over)", report)
+
+    box = (left / scale + origin_x, top / scale + origin_y,
+           right / scale + origin_x, bottom / scale + origin_y)
+    for index in offending:
+        group, element, polylines = pairs[index]
+        kept = [run for points in polylines for run in clip_polyline(points, box)]
+        if kept:
+            rewrite_stroke(element, kept)
+            report['clipped'] += 1
+        else:
+            for parent in group.iter():
+                if element in list(parent):
+                    parent.remove(element)
+                    break
+            report['removed'] += 1
+    return serialize_svg(root), report
@@ -0,0 +1,241 @@
+"""Registry of long-running axicli children, persisted under ``output/``.
+
+Every plot child is started as the leader of its own session/process group
+and recorded in ``output/processes.json`` along with the server that owns it
+and its start time (kernel ticks from ``/proc`` on Linux, ``ps -o lstart=``
+elsewhere). The start time guards against PID reuse: a record only counts as
+live while a process with that PID *and* that start time exists. Stopping a
+plot signals its recorded group directly, so no system-wide process scan is
+needed, and a group whose identity cannot be verified is never signalled.
+"""
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+REGISTRY_FILE_NAME = 'processes.json'
+
+
+def _proc_stat_fields(pid):
+    try:
+        with open(f'/proc/{pid}/stat', 'r', encoding='utf-8') as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, so split after its closing parenthesis
+    return stat.rsplit(')', 1)[-1].split()
+
+
+def _ps_fields(pid):
+    """``(state, start time)`` from ``ps`` for systems without /proc (macOS, BSDs), or None."""
+    if os.name != 'posix':
+        return None
+    try:
+        result = subprocess.run(['ps', '-o', 'stat=,lstart=', '-p', str(int(pid))],
+                                capture_output=True, text=True, timeout=2)
+    except (OSError, ValueError, TypeError, subprocess.SubprocessError):
+        return None
+    parts = result.stdout.split()
+    if result.returncode != 0 or len(parts) < 2:
+        return None
+    return parts[0], ' '.join(parts[1:])
+
+
+def _ps_start_time(pid):
+    fields = _ps_fields(pid)
+    return fields[1] if fields else None
+
+
+def _process_state(pid):
+    fields = _proc_stat_fields(pid)
+    if fields is not None:
+        return fields[0]
+    fields = _ps_fields(pid)
+    return fields[0] if fields else None
+
+
+def process_start_time(pid):
+    """Start time of ``pid``: /proc clock ticks, else the ``ps -o lstart=`` string, else None."""
+    fields = _proc_stat_fields(pid)
+    if fields is None:
+        return _ps_start_time(pid)
+    try:
+        return int(fields[19])
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
+
+
+def record_alive(record):
+    """Whether the recorded process may still be running.
+
+    When the start time cannot be compared, the pid existing counts as alive,
+    so other commands stay refused; ``identity_verified`` decides signalling.
+    """
+    pid = record.get('pid')
+    if not pid_alive(pid):
+        return False
+    if (_process_state(pid) or '').startswith('Z'):
+        return False  # Exited, waiting for its parent to reap it
+    started = record.get('startTime')
+    if started is None:
+        return True
+    current = process_start_time(pid)
+    return current is None or current == started
+
+
+def identity_verified(record):
+    """True only when the live process provably is the one recorded (same pid and start time)."""
+    started = record.get('startTime')
+    if started is None or not pid_alive(record.get('pid')):
+        return False
+    return process_start_time(record['pid']) == started
+
+
+class ProcessRegistry:
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, REGISTRY_FILE_NAME)
+        self.lock = threading.Lock()
+
+    def _locked(self):
+        return _FileLock(f"{self.path}.lock") if fcntl else _NullLock()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as handle:
+                records = json.load(handle)
+        except (OSError, ValueError):
+            return []
+        if not isinstance(records, list):
+            return []
+        return [record for record in records if isinstance(record, dict)]
+
+    def _write(self, records):
+        if not records:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(records, handle, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _update(self, change):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._locked():
+                records = change(self._read())
+                self._write(records)
+                return records
+
+    def register(self, process, kind='plot', command=None):
+        record = {
+            'pid': process.pid,
+            # Children are started with start_new_session, so they lead their own group
+            'pgid': process.pid if os.name == 'posix' else None,
+            'startTime': process_start_time(process.pid),
+            'server': os.getpid(),
+            'kind': kind,
+            'command': [os.path.basename(str(part)) for part in (command or [])[:4]],
+            'startedAt': time.time(),
+        }
+        self._update(lambda records: [r for r in records if r.get('pid') != process.pid] + [record])
+        return record
+
+    def unregister(self, pid):
+        self._update(lambda records: [r for r in records if r.get('pid') != pid])
+
+    def live(self):
+        return [record for record in self._read() if record_alive(record)]
+
+    def foreign(self):
+        """Live children owned by any other server process (draining or gone)."""
+        return [record for record in self.live() if record.get('server') != os.getpid()]
+
+    def reap(self):
+        """Drop dead records and return the live children whose server has exited (orphans)."""
+        records = self._update(lambda records: [r for r in records if record_alive(r)])
+        return [record for record in records
+                if record.get('server') != os.getpid() and not pid_alive(record.get('server'))]
+
+    def stop(self, record, timeout=5.0):
+        """Interrupt a recorded child group, escalating to SIGTERM then SIGKILL.
+
+        Returns True once the process is gone.
+
+        Nothing is signalled unless the process still matches its recorded start
+        time: with the pid possibly reused, ``killpg`` could hit an unrelated group.
+        """
+        if not record_alive(record):
+            self.unregister(record['pid'])
+            return True
+        if not identity_verified(record):
+            print(f"Refusing to signal process {record['pid']}: "
+                  "cannot verify it is the recorded plot")
+            return False
+        for sig in (signal.SIGINT, signal.SIGTERM, getattr(signal, 'SIGKILL', signal.SIGTERM)):
+            try:
+                if record.get('pgid') and hasattr(os, 'killpg'):
+                    os.killpg(record['pgid'], sig)
+                else:
+                    os.kill(record['pid'], sig)
+            except ProcessLookupError:
+                break
+            except OSError as e:
+                print(f"Failed to signal process {record['pid']}: {e}")
+                return False
+            deadline = time.time() + timeout
+            while time.time() < deadline and record_alive(record):
+                time.sleep(0.05)
+            if not record_alive(record):
+                break
+        stopped = not record_alive(record)
+        if stopped:
+            self.unregister(record['pid'])
+        return stopped
+
+
+class _FileLock:
+    """Cross-process advisory lock so a draining and a new server never interleave writes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, 'a')
+        fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
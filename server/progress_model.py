@@ -0,0 +1,116 @@
+"""Typed parsing of axicli's tqdm progress bars plus rolling telemetry.
+
+``parse_progress_bar`` turns text such as
+``3%|###       | 200/6530 [00:03<02:00, 50.0 mm/s]`` into numeric fields.
+``ProgressTracker`` keeps a short history of samples to derive a rolling rate
+and to flag a stall when no distance has been covered for ``stall_seconds``.
+"""
+import collections
+import re
+import time
+
+_BAR_REGEX = re.compile(
+    r'^\s*(?P<percent>\d+(?:\.\d+)?)%'
+    r'(?:\s*\|[^|]*\|)?'
+    r'\s*(?P<done>\d+(?:\.\d+)?)(?P<done_suffix>[kMG]?)'
+    r'\s*/\s*(?P<total>\d+(?:\.\d+)?)(?P<total_suffix>[kMG]?)'
+    r'(?:\s*\[(?P<elapsed>[\d:]+)\s*(?:<\s*(?P<eta>[\d:?]+))?'
+    r'(?:\s*,\s*(?P<rate>[\d.]+|\?)\s*(?P<rate_unit>[^\]\s,]+))?\s*\])?'
+)
+_SUFFIX_SCALE = {'': 1.0, 'k': 1e3, 'M': 1e6, 'G': 1e9}
+
+
+def parse_duration(text):
+    """Convert ``[[h:]m:]s`` to seconds; return None for ``?`` or malformed input."""
+    if not text or '?' in text:
+        return None
+    try:
+        parts = [float(part) for part in text.split(':')]
+    except ValueError:
+        return None
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def parse_progress_bar(text):
+    """Return a dict of numeric progress fields, or None when ``text`` is not a tqdm bar.
+
+    Rates reported in inverted form (``s/mm``) are normalised to units per second.
+    """
+    match = _BAR_REGEX.match(text or '')
+    if not match:
+        return None
+    done = float(match.group('done')) * _SUFFIX_SCALE[match.group('done_suffix')]
+    total = float(match.group('total')) * _SUFFIX_SCALE[match.group('total_suffix')]
+    rate = None
+    unit = match.group('rate_unit')
+    raw_rate = match.group('rate')
+    if raw_rate and raw_rate != '?':
+        rate = float(raw_rate)
+        if unit and unit.startswith('s/'):
+            rate = 1.0 / rate if rate > 0 else 0.0
+            unit = f"{unit[2:]}/s"
+    return {
+        'percent': float(match.group('percent')),
+        'done': done,
+        'total': total,
+        'elapsed': parse_duration(match.group('elapsed')),
+        'eta': parse_duration(match.group('eta')),
+        'rate': rate,
+        'unit': unit
+    }
+
+
+class ProgressTracker:
+    """Rolling rate average and stall detection over recent progress samples."""
+
+    def __init__(self, window_seconds=10.0, stall_seconds=20.0, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.stall_seconds = stall_seconds
+        self.clock = clock
+        self.samples = collections.deque()
+        self.last_advance = None
+        self.stalled = False
+        self.latest = None
+
+    def update(self, sample):
+        """Record a parsed sample and return it enriched with rolling metrics."""
+        now = self.clock()
+        if self.last_advance is None or not self.samples or sample['done'] > self.samples[-1][1]:
+            self.last_advance = now
+            self.stalled = False
+        self.samples.append((now, sample['done']))
+        while len(self.samples) > 2 and now - self.samples[0][0] > self.window_seconds:
+            self.samples.popleft()
+        metrics = dict(sample)
+        metrics['avgRate'] = self.rolling_rate()
+        metrics['stalled'] = self.stalled
+        self.latest = metrics
+        return metrics
+
+    def rolling_rate(self):
+        if len(self.samples) < 2:
+            return None
+        (start_time, start_done), (end_time, end_done) = self.samples[0], self.samples[-1]
+        span = end_time - start_time
+        if span <= 0:
+            return None
+        return max(0.0, (end_done - start_done) / span)
+
+    def check_stall(self):
+        """Return True exactly once when progress has not advanced for ``stall_seconds``."""
+        if self.stalled or self.last_advance is None or self.latest is None:
+            return False
+        if self.latest['done'] >= self.latest['total'] > 0:
+            return False
+        if self.clock() - self.last_advance >= self.stall_seconds:
+            self.stalled = True
+            return True
+        return False
+
+    def stalled_for(self):
+        if self.last_advance is None:
+            return 0.0
+        return self.clock() - self.last_advance
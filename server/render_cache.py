@@ -0,0 +1,84 @@
+"""Disk cache of drawing render results for the browser preview.
+
+A result is what the render worker hands back for one configuration: the
+SVG frame, the layer passes with their paths, and the travel summary. The key
+hashes everything the render depends on: the drawing module and the manifest
+``version`` (a hash of every drawing module's source), the preset, control
+values, paper, orientation, plotter area, palette, line and hatch overrides and
+the travel limit. Entries are compact ``<key>.json`` files under
+``output/cache/render``, sent back on a hit without being decoded, and pruned
+least recently used first to a count and size bound.
+"""
+import hashlib
+import json
+import os
+import re
+
+try:
+    from disk_cache import prune_directory, touch
+except ImportError:
+    from .disk_cache import prune_directory, touch
+
+KEY_FIELDS = ('drawingKey', 'modulePath', 'controlValues', 'paper', 'orientation',
+              'plotterArea', 'maxTravelPerLayerMeters', 'paletteOverride', 'lineOverrides')
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def render_key(request, manifest_version):
+    """Stable hash of the render inputs in ``request``; key order does not matter."""
+    inputs = {field: request.get(field) for field in KEY_FIELDS}
+    inputs['manifestVersion'] = manifest_version
+    payload = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    def __init__(self, directory, max_entries=200, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        if not KEY_PATTERN.match(key or ''):
+            return None
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """The stored result as JSON bytes, or None."""
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except OSError:
+            return None
+        touch(path)
+        return data
+
+    def put(self, key, result):
+        """Store ``result`` (a JSON-serializable dict); returns its size in bytes."""
+        data = json.dumps(result, separators=(',', ':')).encode('utf-8')
+        path = self.path_for(key)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+        prune_directory(self.directory, '.json', self.max_entries, self.max_bytes)
+        return len(data)
+
+    def clear(self):
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if name.endswith('.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -0,0 +1,361 @@
+"""Headless drawing renders on a pool of local Node processes, for parameter sweeps.
+
+Each worker runs ``scripts/render-worker.mjs``, which loads the drawings in
+``drawings/manifest.json`` through the server with the browser's own modules and
+answers one JSON job per line on stdin with one JSON result line on stdout.
+Workers start on first use and stay warm between jobs; one that crashes or
+overruns its timeout is killed and replaced on the next job. A sweep is the
+cartesian product of the listed control values, queued as one render job whose
+variants finish, and are saved, independently.
+"""
+import collections
+import itertools
+import json
+import math
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_SCRIPT = os.path.join(REPO_ROOT, 'scripts', 'render-worker.mjs')
+NODE_ENV = 'PLOTTER_NODE'  # Path to the node binary when it is not on PATH
+DEFAULT_TIMEOUT = 120.0
+STARTUP_TIMEOUT = 30.0
+MAX_VARIANTS = 500
+MAX_RANGE_VALUES = 1000
+STDERR_TAIL_LINES = 20
+MAX_JOBS = 50  # Finished jobs kept for GET /render-jobs
+
+
+class RenderError(Exception):
+    pass
+
+
+def worker_count():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def node_command(script=WORKER_SCRIPT):
+    return [os.environ.get(NODE_ENV) or shutil.which('node') or 'node', script]
+
+
+def _range_values(spec):
+    try:
+        start, stop = float(spec['from']), float(spec['to'])
+        step = float(spec.get('step', 1))
+    except (KeyError, TypeError, ValueError):
+        raise RenderError("Ranges need numeric 'from' and 'to' and an optional 'step'")
+    if step <= 0 or not all(math.isfinite(value) for value in (start, stop, step)):
+        raise RenderError('Range steps must be positive')
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    if count < 1:
+        raise RenderError(f"Empty range from {start:g} to {stop:g}")
+    if count > MAX_RANGE_VALUES:
+        raise RenderError(f"Ranges are limited to {MAX_RANGE_VALUES} values")
+    values = [round(start + index * step, 10) for index in range(count)]
+    if all(value.is_integer() for value in (start, step)):
+        values = [int(value) for value in values]
+    return values
+
+
+def expand_sweep(sweep, limit=MAX_VARIANTS):
+    """Every combination of the swept control values, as a list of ``{control: value}``.
+
+    ``sweep`` maps a control id to a list of values or to an inclusive
+    ``{'from', 'to', 'step'}`` range. Later controls vary fastest.
+    """
+    if not sweep:
+        return [{}]
+    if not isinstance(sweep, dict):
+        raise RenderError('sweep must map control ids to value lists or ranges')
+    axes = []
+    for control, spec in sweep.items():
+        values = _range_values(spec) if isinstance(spec, dict) else spec
+        if not isinstance(values, list) or not values:
+            raise RenderError(f"Sweep values for {control} must be a non-empty list or range")
+        axes.append((control, values))
+    total = math.prod(len(values) for _, values in axes)
+    if total > limit:
+        raise RenderError(f"Sweep has {total} variants; the limit is {limit}")
+    names = [control for control, _ in axes]
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*(values for _, values in axes))]
+
+
+class RenderWorker:
+    """One Node renderer process, used by a single pool thread at a time."""
+
+    def __init__(self, command, env=None, cwd=REPO_ROOT, startup_timeout=STARTUP_TIMEOUT):
+        self.stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+        self._lines = queue.Queue()
+        try:
+            self.process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                cwd=cwd, env=env, text=True, encoding='utf-8', bufsize=1)
+        except OSError as e:
+            raise RenderError(f"Cannot start render worker: {e}")
+        threading.Thread(target=self._read_stdout, name='render-stdout', daemon=True).start()
+        threading.Thread(target=self._read_stderr, name='render-stderr', daemon=True).start()
+        ready = self._next_message(startup_timeout, 'start')
+        if ready.get('type') != 'ready':
+            self.kill()
+            raise RenderError(f"Render worker did not start: {ready}")
+        self.drawings = ready.get('drawings') or []
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self.stderr_tail.append(line.rstrip())
+
+    def _next_message(self, timeout, doing):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.kill()
+                raise RenderError(f"Render worker timed out after {timeout:g}s during {doing}")
+            if line is None:
+                self.process.wait()
+                detail = ' | '.join(self.stderr_tail) or 'no output'
+                raise RenderError(f"Render worker exited with {self.process.returncode} during "
+                                  f"{doing}: {detail}")
+            try:
+                return json.loads(line)
+            except ValueError:
+                self.stderr_tail.append(line.rstrip())  # Stray output; the result is still due
+
+    def render(self, job, timeout=DEFAULT_TIMEOUT):
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self.kill()
+            raise RenderError(f"Render worker is gone: {e}")
+        while True:
+            message = self._next_message(timeout, f"job {job.get('id')}")
+            if message.get('id') == job.get('id'):
+                break
+        if 'error' in message:
+            raise RenderError(message['error'])
+        return message
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+    def close(self, timeout=2.0):
+        try:
+            self.process.stdin.close()  # The worker exits once its input ends
+            self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class RenderPool:
+    """``size`` threads, each feeding queued jobs to its own Node worker."""
+
+    def __init__(self, server_url, size=None, command=None, timeout=DEFAULT_TIMEOUT,
+                 startup_timeout=STARTUP_TIMEOUT):
+        self.size = size or worker_count()
+        self.command = command or node_command()
+        self.env = dict(os.environ, PLOTTER_SERVER_URL=server_url)
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self._queue = queue.Queue()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run, name=f'render-{index}', daemon=True)
+                         for index in range(self.size)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job):
+        """Queue ``job`` and return a Future for the worker's result message."""
+        if self._closed:
+            raise RenderError('Render pool is shut down')
+        future = Future()
+        self._queue.put((future, dict(job, id=job.get('id') or uuid.uuid4().hex)))
+        return future
+
+    def _run(self):
+        worker = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                future, job = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if worker is None or not worker.alive:
+                        worker = RenderWorker(self.command, env=self.env,
+                                              startup_timeout=self.startup_timeout)
+                    future.set_result(worker.render(job, self.timeout))
+                except RenderError as e:
+                    future.set_exception(e)
+                except Exception as e:
+                    print(f"Render worker failed on job {job['id']}: {e}")
+                    future.set_exception(RenderError(str(e)))
+        finally:
+            if worker is not None:
+                worker.close()
+
+    def shutdown(self, wait=True):
+        """Cancel queued jobs and stop the workers once their current job is done."""
+        self._closed = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class RenderJob:
+    def __init__(self, drawing, variants, options=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.drawing = drawing
+        self.variants = variants
+        self.options = options or {}  # Caller data for ``save``, never sent to the workers
+        self.state = 'queued'
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.files = []
+        self.errors = []
+        self.created = time.time()
+        self.finished = None
+        self.futures = []
+
+    @property
+    def done(self):
+        return self.completed + self.failed + self.cancelled == len(self.variants)
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'drawing': self.drawing,
+            'state': self.state,
+            'total': len(self.variants),
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'files': list(self.files),
+            'errors': list(self.errors),
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class RenderJobManager:
+    """Render jobs in submission order; each variant is saved by ``save`` as it finishes.
+
+    ``save(job, index, controls, result)`` returns the written path, and
+    ``notify(summary)`` hears about every change to a job.
+    """
+
+    def __init__(self, pool, save, notify=None, max_jobs=MAX_JOBS):
+        self.pool = pool
+        self.save = save
+        self.notify = notify
+        self.max_jobs = max_jobs
+        self.jobs = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def start(self, drawing, base, variants, options=None):
+        """Queue one render per ``variants`` entry, merged over ``base['controlValues']``."""
+        job = RenderJob(drawing, variants, options)
+        with self.lock:
+            self.jobs[job.id] = job
+            finished = [key for key, entry in self.jobs.items() if entry.state in
+                        ('done', 'failed', 'cancelled')]
+            for key in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+                del self.jobs[key]
+        for index, controls in enumerate(variants):
+            payload = dict(base, id=f"{job.id}-{index}",
+                           controlValues={**base.get('controlValues', {}), **controls})
+            future = self.pool.submit(payload)
+            job.futures.append(future)
+            future.add_done_callback(
+                lambda done, index=index, controls=controls: self._finish(job, index, controls,
+                                                                          done))
+        self._publish(job)
+        return job
+
+    def _finish(self, job, index, controls, future):
+        try:
+            result = future.result()
+            path = self.save(job, index, controls, result)
+            outcome = ('completed', path)
+        except CancelledError:
+            outcome = ('cancelled', None)
+        except Exception as e:
+            outcome = ('failed', f"Variant {index} {json.dumps(controls)}: {e}")
+        with self.lock:
+            if outcome[0] == 'completed':
+                job.completed += 1
+                job.files.append(outcome[1])
+            elif outcome[0] == 'cancelled':
+                job.cancelled += 1
+            else:
+                job.failed += 1
+                job.errors.append(outcome[1])
+            if job.done:
+                job.finished = time.time()
+                if job.state != 'cancelled':
+                    job.state = 'done' if job.completed or not job.failed else 'failed'
+            elif job.state == 'queued':
+                job.state = 'running'
+        self._publish(job)
+
+    def cancel(self, job_id):
+        """Drop a job's queued variants; ones already rendering still finish and are saved."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self.lock:
+            if not job.done:
+                job.state = 'cancelled'
+        for future in job.futures:
+            future.cancel()
+        self._publish(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def summaries(self):
+        with self.lock:
+            return [job.summary() for job in reversed(self.jobs.values())]
+
+    def _publish(self, job):
+        if self.notify is None:
+            return
+        with self.lock:
+            summary = job.summary()
+        try:
+            self.notify(summary)
+        except Exception as e:
+            print(f"Could not publish render job {job.id}: {e}")
@@ -1,27 +1,80 @@
+try:
+    # Imported first: it notes the time, so --profile-startup can time the imports below
+    from startup_profile import IMPORT_STARTED, StartupProfile
+except ImportError:
+    from .startup_profile import IMPORT_STARTED, StartupProfile
 from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 import glob
+import gzip
 import json
 import os
 import shutil
 import sys
 from datetime import datetime
-import xml.dom.minidom
-import pprint
+from xml.parsers.expat import ExpatError
 import subprocess
 import shlex
 import threading
 import time
 import signal
+import socket
 import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote
 try:
-    from plotter_config import PLOTTER_CONFIGS, CURRENT_PLOTTER
+    from config_registry import ConfigRegistry, thaw
+    from lazy_import import LOAD_TIMES, LazyModule, is_loaded, load, sibling_module
+    from plot_chunks import ChunkCheckpoint, ChunkPreparer, plan_chunks, resume_log_is_usable
+    from pen_position import PenPositionStream, TravelIndex
+    from progress_model import ProgressTracker, parse_progress_bar
+    from speed_classes import plan_speed_classes, select_medium
+    from svg_layers import parse_svg, serialize_svg
+    import image_preprocess
+    from asset_store import (ASSET_URL_PREFIX, AssetError, AssetStore, MAX_ASSET_BYTES,
+                             asset_id_from_url)
+    from output_catalog import (OutputCatalog, is_output_file_path, is_thumbnail_name,
+                                parse_header, read_output_text)
+    from output_archive import ArchiveScheduler, OutputArchive
+    from process_registry import ProcessRegistry
+    import imposition
+    import plot_diff
+    import preflight
+    import render_cache
+    import render_pool
+    import ws_channel
+    from debug_tools import (DEBUG_TOKEN_FILE_NAME, DEBUG_TOKEN_HEADER, MemoryTracer,
+                             SamplingProfiler, format_thread_stacks, is_loopback, load_debug_token,
+                             thread_stacks, token_matches)
 except ImportError:
-    from .plotter_config import PLOTTER_CONFIGS, CURRENT_PLOTTER
+    from .config_registry import ConfigRegistry, thaw
+    from .lazy_import import LOAD_TIMES, LazyModule, is_loaded, load, sibling_module
+    from .plot_chunks import ChunkCheckpoint, ChunkPreparer, plan_chunks, resume_log_is_usable
+    from .pen_position import PenPositionStream, TravelIndex
+    from .progress_model import ProgressTracker, parse_progress_bar
+    from .speed_classes import plan_speed_classes, select_medium
+    from .svg_layers import parse_svg, serialize_svg
+    from . import image_preprocess
+    from .asset_store import (ASSET_URL_PREFIX, AssetError, AssetStore, MAX_ASSET_BYTES,
+                              asset_id_from_url)
+    from .output_catalog import (OutputCatalog, is_output_file_path, is_thumbnail_name,
+                                 parse_header, read_output_text)
+    from .output_archive import ArchiveScheduler, OutputArchive
+    from .process_registry import ProcessRegistry
+    from . import imposition
+    from . import plot_diff
+    from . import preflight
+    from . import render_cache
+    from . import render_pool
+    from . import ws_channel
+    from .debug_tools import (DEBUG_TOKEN_FILE_NAME, DEBUG_TOKEN_HEADER, MemoryTracer,
+                              SamplingProfiler, format_thread_stacks, is_loopback, load_debug_token,
+                              thread_stacks, token_matches)
+_MODULES_IMPORTED = time.perf_counter()
 
-try:
-    import psutil
-except ImportError:
-    psutil = None
+# Only a few requests need these, so they are imported on first use
+pprint = LazyModule('pprint')
+minidom = LazyModule('xml.dom.minidom')
+tsp_solver = sibling_module('tsp_solver', __package__)
 
 
 def wrap_command_with_sleep_blocker(cmd):
@@ -126,7 +179,12 @@ def build_config_comment(drawing_name, config):
     return "<!--\n" + "\n".join(sections) + "\n-->\n"
 
 class PlotterHandler(SimpleHTTPRequestHandler):
-    AXIDRAW_PATH = "./bin/axicli"  # Path to the AxiDraw executable
+    protocol_version = 'HTTP/1.1'  # Keep-alive; every response is length- or chunk-framed
+    timeout = 15  # Seconds an idle keep-alive connection may wait for its next request
+    # Headers and body are separate writes; Nagle would hold the body for the peer's delayed ACK
+    disable_nagle_algorithm = True
+    # Path to the AxiDraw executable (server/axicli_sim.py simulates one)
+    AXIDRAW_PATH = os.environ.get('AXIDRAW_PATH', "./bin/axicli")
     current_plot_process = None  # Track the current plotting process
     sse_connections = set()  # Track active SSE connections
     keep_sse_alive = True  # Control SSE connection lifecycle
@@ -136,6 +194,7 @@ class PlotterHandler(SimpleHTTPRequestHandler):
     }
     OUTPUT_ROOT = 'output'
     RESUME_LOG_NAME = 'plot_resume.log'
+    CHUNK_DIR_NAME = 'plot_chunks'
     resume_state_lock = threading.Lock()
     resume_state = {
         'path': None,
@@ -144,13 +203,74 @@ class PlotterHandler(SimpleHTTPRequestHandler):
         'available': False
     }
     _RESUME_SENTINEL = object()
+    diff_base_path = None  # Saved output the latest plot was diffed against
     plot_interrupted = False
     last_progress_bar = None
+    active_chunk = None  # (checkpoint, index) while a chunked layer plot is running
+    pen_position_stream = None  # PenPositionStream for the layer being plotted
+    PEN_POSITION_INTERVAL = 0.25  # Minimum seconds between PEN_POSITION events
+    progress_tracker = None  # ProgressTracker for the running axicli process
+    STALL_SECONDS = 20.0  # Seconds without progress before PLOT_STALLED is raised
+    STALL_CHECK_INTERVAL = 1.0
+    TSP_MAX_POINTS = 200000  # Mirrors TSP_LIMITS.pointCount in drawings/core/tspPortrait.js
+    TSP_MAX_TIME_BUDGET = 60.0
+    tsp_cache = None
+    config_registry = None
+    preprocess_cache = None
+    ASSET_DIR_NAME = 'assets'
+    ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+    output_catalog = None
+    output_catalog_lock = threading.Lock()
+    CATALOG_SYNC_INTERVAL = 30.0  # Seconds between directory rescans triggered by /outputs
+    last_catalog_sync = 0.0
+    ARCHIVE_AFTER_DAYS = 30  # Gzip saves older than this to .svgz; None disables archiving
+    ARCHIVE_DEDUPE = True  # Hard-link byte-identical archived saves to one blob
+    ARCHIVE_INTERVAL = 6 * 3600
+    archive_scheduler = None
+    process_registry = None
+    process_registry_lock = threading.Lock()
+    plot_threads = set()  # Threads driving a plot; a draining server waits for these
+    draining = False
+    DRAIN_GRACE_SECONDS = 2.0
+    QUIET_POST_PATHS = ('/tsp-route', '/preprocess-image', '/plot-diff', '/render-cache',
+                        '/render-cache/lookup')  # Large payloads
+    debug_profiler = None  # SamplingProfiler of the current or last /debug/profile session
+    memory_tracer = MemoryTracer()
+    debug_lock = threading.Lock()
+    DEBUG_TOKEN_DIR = None  # None: $XDG_RUNTIME_DIR/plotter-server or ~/.config/plotter-server
+    IMPOSED_DIR_NAME = 'imposed'
+    IMPOSE_MAX_FILES = 50
+    plotted_store = None
+    control_channel = ws_channel.ControlChannel()
+    WS_PING_INTERVAL = 10.0
+    WS_MAX_QUEUE = 256  # Unsent messages before a slow control client is dropped
+    COALESCED_PROGRESS = ('CLI_PROGRESS_BAR', 'PEN_POSITION')  # Only the latest one matters
+    render_jobs = None  # RenderJobManager, with its Node worker pool, started by the first job
+    render_lock = threading.Lock()
+    RENDER_WORKERS = None  # None: one per core, less one for the server
+    RENDER_TIMEOUT = render_pool.DEFAULT_TIMEOUT  # Seconds one variant may take to render
+    RENDER_MAX_VARIANTS = render_pool.MAX_VARIANTS
+    render_cache = None
+    RENDER_CACHE_MAX_ENTRIES = 200
+    RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    RENDER_CACHE_MAX_ENTRY_BYTES = 32 * 1024 * 1024  # Bigger results are rendered each time
+    startup_ready = threading.Event()  # Cleared while create_server's background start-up runs
+    startup_ready.set()
+    startup_thread = None
+    STARTUP_WAIT_SECONDS = 30.0
 
     @classmethod
     def _default_resume_path(cls):
         return os.path.join(cls.OUTPUT_ROOT, cls.RESUME_LOG_NAME)
 
+    @classmethod
+    def _chunk_dir(cls):
+        return os.path.join(cls.OUTPUT_ROOT, cls.CHUNK_DIR_NAME)
+
+    @classmethod
+    def load_chunk_checkpoint(cls):
+        return ChunkCheckpoint.load(cls._chunk_dir())
+
     @classmethod
     def _resolve_resume_path(cls, requested_path=None):
         if requested_path:
@@ -207,7 +327,7 @@ class PlotterHandler(SimpleHTTPRequestHandler):
     @classmethod
     def mark_resume_available(cls, resume_path=None, layer=None, layer_label=None):
         path = resume_path or cls.resume_state.get('path')
-        exists = bool(path) and os.path.exists(path)
+        exists = (bool(path) and os.path.exists(path)) or ChunkCheckpoint.exists(cls._chunk_dir())
         updates = {
             'available': exists
         }
@@ -228,20 +348,31 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                 os.remove(path)
             except OSError as e:
                 print(f"Warning: failed to remove resume log {path}: {e}")
+        if remove_file:
+            ChunkCheckpoint.discard(cls._chunk_dir())
         cls.update_resume_state(path=None, layer=None, layer_label=None, available=False)
 
     @classmethod
     def get_resume_status(cls, include_path=False):
+        cls.wait_for_startup()
         with cls.resume_state_lock:
             state = dict(cls.resume_state)
         path = state.get('path')
         exists = bool(path) and os.path.exists(path)
-        available = bool(state.get('available')) and exists
+        checkpoint = cls.load_chunk_checkpoint()
+        available = bool(state.get('available')) and (exists or checkpoint is not None)
         payload = {
             'available': available,
             'layer': state.get('layer'),
-            'layerLabel': state.get('layer_label')
+            'layerLabel': state.get('layer_label'),
+            # A draining server's plot: it runs on, but its progress stays with that process
+            'foreignPlotPid': cls.foreign_plot_pid()
         }
+        if checkpoint is not None:
+            payload['chunks'] = {
+                'completed': checkpoint.completed,
+                'total': checkpoint.chunk_count
+            }
         if include_path:
             payload['path'] = path if exists else None
         return payload
@@ -252,38 +383,167 @@ class PlotterHandler(SimpleHTTPRequestHandler):
         return cls._prepare_resume_file(resume_path)
 
     @classmethod
-    def execute_home_sequence(cls, pen_pos_up):
+    def execute_home_sequence(cls, pen_pos_up, clear_resume=True):
         if pen_pos_up is None:
             raise ValueError("pen_pos_up is required to home the plotter")
         pen_up_value = str(pen_pos_up)
+        model, penlift = cls.plotter_flags()
         raise_pen_cmd = [
             cls.AXIDRAW_PATH,
             '--mode', 'manual',
             '--manual_cmd', 'raise_pen',
-            '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
+            '--model', model,
             '--pen_pos_up', pen_up_value,
-            '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+            '--penlift', penlift
         ]
         walk_home_cmd = [
             cls.AXIDRAW_PATH,
             '--mode', 'manual',
             '--manual_cmd', 'walk_home',
-            '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
+            '--model', model,
             '--pen_pos_up', pen_up_value,
-            '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+            '--penlift', penlift
         ]
         subprocess.run(raise_pen_cmd, capture_output=True, text=True, check=True)
         subprocess.run(walk_home_cmd, capture_output=True, text=True, check=True)
-        cls.clear_resume_state()
+        if clear_resume:
+            cls.clear_resume_state()
+
+    @classmethod
+    def wait_for_startup(cls):
+        """Block until the orphan check, temp cleanup and resume bootstrap have run."""
+        if not cls.startup_ready.wait(cls.STARTUP_WAIT_SECONDS):
+            print("⚠️ Start-up tasks are still running; continuing without them")
+
+    @classmethod
+    def finish_startup(cls, profile):
+        """Start-up work that can wait until the server is accepting connections.
+
+        Plot commands and resume status wait for ``startup_ready``, so no plot
+        starts before its temp files are cleaned up and the resume state is known.
+        """
+        try:
+            with profile.step('reap plot processes', 'background'):
+                orphans = cls.get_process_registry().reap()
+            for record in orphans:
+                # Its stdout went with the old server, but stop_plot can still reach it
+                print(f"⚠️ Plot from an exited server is still running (PID {record['pid']}); "
+                      "commands are refused until it stops")
+            if cls.foreign_plot_pid() is None:
+                with profile.step('clean up temp files', 'background'):
+                    cleanup_temp_files()
+            with profile.step('bootstrap resume state', 'background'):
+                cls.bootstrap_resume_state()
+        except Exception as e:
+            print(f"❌ Error during startup: {e}")
+        finally:
+            cls.startup_ready.set()
+        with profile.step('create debug token', 'background'):
+            cls.get_debug_token()  # Before anyone needs it
+        with profile.step('sync output catalog', 'background'):
+            cls.sync_output_catalog(force=True)
 
     @classmethod
     def bootstrap_resume_state(cls):
         resume_path = cls._resolve_resume_path()
-        if resume_path and os.path.exists(resume_path):
+        checkpoint = cls.load_chunk_checkpoint()
+        if checkpoint is not None and checkpoint.remaining:
+            cls.update_resume_state(
+                path=resume_path,
+                layer=checkpoint.layer,
+                layer_label=checkpoint.layer_label,
+                available=True
+            )
+        elif resume_path and os.path.exists(resume_path):
             cls.update_resume_state(path=resume_path, available=True)
         else:
             cls.update_resume_state(path=None, layer=None, layer_label=None, available=False)
 
+    def _send_bytes(self, status, body, content_type, cache_control=None, etag=None):
+        """Send a complete response with an explicit Content-Length so keep-alive framing holds."""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if cache_control:
+            self.send_header('Cache-Control', cache_control)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, status, data, cache_control=None):
+        body = json.dumps(data).encode('utf-8')
+        self._send_bytes(status, body, 'application/json', cache_control)
+
+    def _send_file(self, path, content_type, cache_control=None, etag=None):
+        try:
+            source_file = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "Not Found")
+            return
+        with source_file:
+            size = os.fstat(source_file.fileno()).st_size
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            if cache_control:
+                self.send_header('Cache-Control', cache_control)
+            if etag:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+            if self.command != 'HEAD':
+                shutil.copyfileobj(source_file, self.wfile)
+
+    def _send_svgz(self, path):
+        """Serve an archived SVG, letting gzip-capable clients decompress it themselves."""
+        with open(path, 'rb') as source_file:
+            compressed = source_file.read()
+        accepts_gzip = 'gzip' in (self.headers.get('Accept-Encoding') or '').lower()
+        body = compressed if accepts_gzip else gzip.decompress(compressed)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/svg+xml')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if accepts_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def write_sse_chunk(self, data):
+        """Write one chunked-encoding frame to an SSE stream; frames never interleave."""
+        with self.sse_write_lock:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+    @classmethod
+    def _output_file_path(cls, kind, rel_path):
+        """Resolve an /outputs/<kind>/ path to a saved drawing or thumbnail, or None."""
+        if kind == 'thumbnails':
+            if not is_thumbnail_name(rel_path):
+                return None
+            return cls._safe_join(os.path.join(cls.OUTPUT_ROOT, 'thumbnails'), rel_path)
+        if kind != 'files' or not is_output_file_path(rel_path):
+            return None
+        return cls._safe_join(cls.OUTPUT_ROOT, *rel_path.split('/'))
+
+    def send_head(self):
+        # The static fallback serves the working directory, which contains output/ by default
+        output_root = os.path.realpath(self.OUTPUT_ROOT)
+        requested = os.path.realpath(self.translate_path(self.path))
+        if requested == output_root or requested.startswith(output_root + os.sep):
+            self.send_error(404, "Not Found")
+            return None
+        return SimpleHTTPRequestHandler.send_head(self)
+
+    def end_sse_stream(self):
+        """Write the terminating zero-length chunk under the same lock as progress frames."""
+        with self.sse_write_lock:
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+
     def do_GET(self):
         # Redirect root to plotter.html
         if self.path == '/':
@@ -291,21 +551,18 @@ class PlotterHandler(SimpleHTTPRequestHandler):
         request_path = self.path.split('?', 1)[0]
         if request_path == '/drawings-manifest.json':
             manifest = self.load_drawings_manifest()
-            body = json.dumps(manifest).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Cache-Control', 'no-cache')
-            self.send_header('Content-Length', str(len(body)))
-            self.end_headers()
-            self.wfile.write(body)
+            self._send_json(200, manifest, cache_control='no-cache')
             return
         if self.path == '/plot-progress':
             self.send_response(200)
             self.send_header('Content-Type', 'text/event-stream')
             self.send_header('Cache-Control', 'no-cache')
-            self.send_header('Connection', 'keep-alive')
+            self.send_header('Transfer-Encoding', 'chunked')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
+            # The stream only ends when the client goes away, so never reuse this socket
+            self.close_connection = True
+            self.sse_write_lock = threading.Lock()
             
             # Add this connection to the set
             PlotterHandler.sse_connections.add(self)
@@ -315,26 +572,68 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                 while PlotterHandler.keep_sse_alive:
                     # Send a heartbeat to keep connection alive
                     try:
-                        self.wfile.write(b':\n\n')  # SSE comment as heartbeat
-                        self.wfile.flush()
+                        self.write_sse_chunk(b':\n\n')  # SSE comment as heartbeat
                     except (BrokenPipeError, ConnectionResetError):
                         break
                     time.sleep(0.1)  # Shorter sleep to be more responsive
+                else:
+                    try:
+                        self.end_sse_stream()
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
             except (BrokenPipeError, ConnectionResetError):
                 print("Client disconnected from SSE")
             finally:
                 # Remove connection when client disconnects
                 PlotterHandler.sse_connections.discard(self)
             return
+        if request_path == '/config':
+            self.serve_config()
+            return
+        if request_path == '/ws':
+            self.serve_control_channel()
+            return
+        if request_path.startswith('/debug/'):
+            self.serve_debug('GET', {})
+            return
+        if request_path == '/render-jobs' or request_path.startswith('/render-jobs/'):
+            status, response = self.serve_render_jobs('GET', request_path[len('/render-jobs'):])
+            self._send_json(status, response, cache_control='no-cache')
+            return
         if self.path == '/resume-status':
             status = self.get_resume_status()
-            body = json.dumps(status).encode('utf-8')
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Cache-Control', 'no-cache')
-            self.send_header('Content-Length', str(len(body)))
-            self.end_headers()
-            self.wfile.write(body)
+            self._send_json(200, status, cache_control='no-cache')
+            return
+
+        if request_path == '/outputs':
+            query = self.path.split('?', 1)[1] if '?' in self.path else ''
+            status, response = self.list_outputs(query)
+            self._send_json(status, response, cache_control='no-cache')
+            return
+        if request_path.startswith(('/outputs/thumbnails/', '/outputs/files/')):
+            kind, rel_path = request_path[len('/outputs/'):].split('/', 1)
+            safe_path = self._output_file_path(kind, unquote(rel_path))
+            if not safe_path:
+                # Only saved drawings and thumbnails; catalog, registry and caches stay private
+                self.send_error(404, "Not Found")
+                return
+            if kind == 'files' and safe_path.endswith('.svg') and not os.path.isfile(safe_path):
+                # Links to saves that have since been archived keep working
+                safe_path = f"{safe_path}z"
+            if not os.path.isfile(safe_path):
+                self.send_error(404, "Not Found")
+                return
+            if kind == 'thumbnails':
+                # Thumbnail names hash the source path and mtime, so they never change
+                self._send_file(safe_path, 'image/png', cache_control=self.ASSET_CACHE_CONTROL)
+            elif safe_path.endswith('.svgz'):
+                self._send_svgz(safe_path)
+            else:
+                self._send_file(safe_path, 'image/svg+xml', cache_control='no-cache')
+            return
+
+        if request_path.startswith(ASSET_URL_PREFIX):
+            self.serve_asset(request_path[len(ASSET_URL_PREFIX):])
             return
 
         if request_path.startswith('/drawings/'):
@@ -345,17 +644,13 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                 self.send_error(403, "Forbidden")
                 return
             if os.path.isfile(safe_path):
-                self.send_response(200)
                 if safe_path.endswith('.js'):
-                    self.send_header('Content-Type', 'application/javascript')
+                    content_type = 'application/javascript'
                 elif safe_path.endswith('.json'):
-                    self.send_header('Content-Type', 'application/json')
+                    content_type = 'application/json'
                 else:
-                    self.send_header('Content-Type', 'application/octet-stream')
-                self.send_header('Cache-Control', 'no-cache')
-                self.end_headers()
-                with open(safe_path, 'rb') as source_file:
-                    shutil.copyfileobj(source_file, self.wfile)
+                    content_type = 'application/octet-stream'
+                self._send_file(safe_path, content_type, cache_control='no-cache')
                 return
             self.send_error(404, "Not Found")
             return
@@ -364,11 +659,7 @@ class PlotterHandler(SimpleHTTPRequestHandler):
         if self.path.startswith('/css/'):
             css_path = os.path.join('client/static', self.path.lstrip('/'))
             if os.path.exists(css_path):
-                self.send_response(200)
-                self.send_header('Content-Type', 'text/css')
-                self.end_headers()
-                with open(css_path, 'rb') as f:
-                    self.wfile.write(f.read())
+                self._send_file(css_path, 'text/css')
                 return
         
         # Handle JS file requests
@@ -377,24 +668,16 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             js_path = self.path.split('?')[0]
             js_path = os.path.join('client/', js_path.lstrip('/'))
             if os.path.exists(js_path):
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/javascript')
-                self.end_headers()
-                with open(js_path, 'rb') as f:
-                    self.wfile.write(f.read())
+                self._send_file(js_path, 'application/javascript')
                 return
         
         # Handle favicon.ico requests
         if self.path == '/favicon.ico':
-            self.send_response(200)
-            self.send_header('Content-Type', 'image/x-icon')
-            self.end_headers()
-            try:
-                with open('client/static/favicon.ico', 'rb') as f:
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
+            if os.path.exists('client/static/favicon.ico'):
+                self._send_file('client/static/favicon.ico', 'image/x-icon')
+            else:
                 # If favicon.ico doesn't exist, return empty response
-                self.wfile.write(b'')
+                self._send_bytes(200, b'', 'image/x-icon')
             return
         
         # Handle all other GET requests as normal
@@ -402,13 +685,59 @@ class PlotterHandler(SimpleHTTPRequestHandler):
 
     PROGRESS_BAR_REGEX = re.compile(r'Plot Progress:\s*(?P<bar>.+)$')
 
+    @classmethod
+    def start_pen_tracking(cls, svg_text, layer):
+        """Index the layer's travel so progress updates can be turned into pen positions."""
+        try:
+            index = TravelIndex.from_svg_root(parse_svg(svg_text), layer)
+        except Exception as e:
+            print(f"Pen position tracking unavailable: {e}")
+            cls.pen_position_stream = None
+            return None
+        cls.pen_position_stream = PenPositionStream(index, min_interval=cls.PEN_POSITION_INTERVAL)
+        return cls.pen_position_stream
+
+    @classmethod
+    def stop_pen_tracking(cls):
+        cls.pen_position_stream = None
+
     @classmethod
     def emit_progress_bar(cls, handler, bar_text):
         if bar_text == cls.last_progress_bar:
             return
         cls.last_progress_bar = bar_text
         payload = {'status': bar_text}
+        sample = parse_progress_bar(bar_text)
+        if sample is not None:
+            if cls.progress_tracker is None:
+                cls.progress_tracker = ProgressTracker(stall_seconds=cls.STALL_SECONDS)
+            payload['metrics'] = cls.progress_tracker.update(sample)
+        active_chunk = cls.active_chunk
+        if active_chunk is not None:
+            checkpoint, index = active_chunk
+            payload['source'] = checkpoint.chunk_label(index)
+            if sample is not None:
+                payload['overall'] = checkpoint.overall_progress(index, sample['percent'] / 100)
         handler.send_progress_update('CLI_PROGRESS_BAR', payload)
+        stream = cls.pen_position_stream
+        if stream is not None and sample is not None:
+            position = stream.update(sample['done'], sample['total'])
+            if position is not None:
+                handler.send_progress_update('PEN_POSITION', position)
+
+    def _monitor_progress_stall(self, process):
+        """Raise PLOT_STALLED when the running process stops reporting forward progress."""
+        while process.poll() is None:
+            time.sleep(self.STALL_CHECK_INTERVAL)
+            tracker = PlotterHandler.progress_tracker
+            if tracker is not None and tracker.check_stall():
+                stalled_for = tracker.stalled_for()
+                print(f"Plot progress stalled for {stalled_for:.0f}s")
+                self.send_progress_update('PLOT_STALLED', {
+                    'stalledFor': round(stalled_for, 1),
+                    'done': tracker.latest['done'],
+                    'total': tracker.latest['total']
+                })
 
     def _handle_plot_stdout_line(self, line):
         stripped = line.strip()
@@ -472,6 +801,37 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             except Exception:
                 pass
 
+    @classmethod
+    def start_plot_thread(cls, target, *args, **kwargs):
+        """Run a plot job on a daemon thread that graceful shutdown knows to wait for."""
+        def run():
+            try:
+                target(*args, **kwargs)
+            finally:
+                cls.plot_threads.discard(threading.current_thread())
+        thread = threading.Thread(target=run, daemon=True)
+        cls.plot_threads.add(thread)
+        thread.start()
+        return thread
+
+    @classmethod
+    def plot_in_progress(cls):
+        return any(thread.is_alive() for thread in list(cls.plot_threads))
+
+    @classmethod
+    def get_process_registry(cls):
+        # One shared instance, so its lock serializes every thread's read-modify-write
+        with cls.process_registry_lock:
+            if cls.process_registry is None or cls.process_registry.directory != cls.OUTPUT_ROOT:
+                cls.process_registry = ProcessRegistry(cls.OUTPUT_ROOT)
+            return cls.process_registry
+
+    @classmethod
+    def foreign_plot_pid(cls):
+        """Pid of a plot started by another server process (draining or exited), if any."""
+        records = cls.get_process_registry().foreign()
+        return records[0]['pid'] if records else None
+
     def _run_axidraw_process(self, cmd):
         process = subprocess.Popen(
             cmd,
@@ -479,9 +839,14 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             stderr=subprocess.PIPE,
             text=True,
             bufsize=1,
-            universal_newlines=True
+            universal_newlines=True,
+            # Own session: restarting or signalling the server's process group leaves the plot alone
+            start_new_session=(os.name == 'posix')
         )
         PlotterHandler.current_plot_process = process
+        registry = PlotterHandler.get_process_registry()
+        registry.register(process, kind='plot', command=cmd)
+        PlotterHandler.progress_tracker = ProgressTracker(stall_seconds=self.STALL_SECONDS)
 
         stdout_thread = threading.Thread(
             target=self._stream_pipe,
@@ -493,8 +858,14 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             args=(process.stderr, self._handle_plot_stderr_line),
             daemon=True
         )
+        stall_thread = threading.Thread(
+            target=self._monitor_progress_stall,
+            args=(process,),
+            daemon=True
+        )
         stdout_thread.start()
         stderr_thread.start()
+        stall_thread.start()
 
         try:
             returncode = process.wait()
@@ -502,8 +873,178 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             stderr_thread.join(timeout=1)
             return returncode
         finally:
+            registry.unregister(process.pid)
             PlotterHandler.current_plot_process = None
 
+    def _layer_plot_command(self, svg_path, layer, settings, resume_path=None):
+        # Build command array with filename as first parameter after axicli
+        model, penlift = self.plotter_flags()
+        cmd = [self.AXIDRAW_PATH]
+        if svg_path:
+            cmd.append(svg_path)
+        cmd.extend([
+            '--mode', 'layers',
+            '--layer', str(layer),
+            '--model', model,
+            '--pen_pos_up', str(settings['pen_pos_up']),
+            '--pen_pos_down', str(settings['pen_pos_down']),
+            '--pen_rate_lower', str(settings.get('pen_rate_lower', 25)),
+            '--penlift', penlift,
+            '--progress'
+        ])
+        for key in ('speed_pendown', 'speed_penup', 'accel'):
+            if settings.get(key) is not None:
+                cmd.extend([f'--{key}', str(settings[key])])
+        if resume_path:
+            cmd.extend(['--output_file', resume_path])
+        return wrap_command_with_sleep_blocker(cmd)
+
+    def _resume_plot_command(self, resume_path):
+        model, penlift = self.plotter_flags()
+        cmd = [
+            self.AXIDRAW_PATH,
+            resume_path,
+            '--mode', 'res_plot',
+            '--model', model,
+            '--penlift', penlift,
+            '--progress'
+        ]
+        cmd.extend(['--output_file', resume_path])
+        return wrap_command_with_sleep_blocker(cmd)
+
+    def _start_chunked_plot(self, params, chunk_count=1, speed_classes=False):
+        try:
+            root = parse_svg(params['svg'])
+        except Exception as e:
+            print(f"Error parsing SVG for chunked plot: {e}")
+            return {
+                'status': 'error',
+                'message': f'Invalid SVG data: {str(e)}'
+            }
+        if speed_classes:
+            try:
+                mediums = self.get_config_registry().snapshot()['mediums']
+                medium = select_medium(mediums, params.get('medium'))
+            except (OSError, ValueError) as e:
+                print(f"Error loading medium config: {e}")
+                medium = {}
+            plan = plan_speed_classes(root, params['layer'], medium)
+        else:
+            plan = plan_chunks(root, params['layer'], chunk_count)
+        if not plan:
+            return {
+                'status': 'error',
+                'message': f"Layer {params['layer']} has no plottable geometry"
+            }
+        settings = {
+            'pen_pos_up': params['pen_pos_up'],
+            'pen_pos_down': params['pen_pos_down'],
+            'pen_rate_lower': params.get('pen_rate_lower', 25)
+        }
+        try:
+            checkpoint = ChunkCheckpoint.create(
+                PlotterHandler._chunk_dir(),
+                params['svg'],
+                plan,
+                params['layer'],
+                layer_label=params.get('layerLabel'),
+                settings=settings
+            )
+        except OSError as e:
+            print(f"Error writing chunk checkpoint: {e}")
+            return {
+                'status': 'error',
+                'message': f'Failed to create chunk checkpoint: {str(e)}'
+            }
+        unit = 'speed classes' if speed_classes else 'chunks'
+        PlotterHandler.last_progress_bar = None
+        PlotterHandler.register_resume_tracking(
+            PlotterHandler._resolve_resume_path(),
+            layer=checkpoint.layer,
+            layer_label=checkpoint.layer_label
+        )
+        PlotterHandler.start_plot_thread(self._run_chunked_plot, checkpoint, root)
+        return {
+            'status': 'success',
+            'message': f'Chunked plot started ({checkpoint.chunk_count} {unit})'
+        }
+
+    def _plot_chunk(self, checkpoint, index, cmd):
+        PlotterHandler.active_chunk = (checkpoint, index)
+        PlotterHandler.last_progress_bar = None
+        checkpoint.mark_started(index)
+        self.send_progress_update('CHUNK_PROGRESS', {
+            'chunk': index + 1,
+            'chunks': checkpoint.chunk_count,
+            'state': 'started',
+            'progress': checkpoint.overall_progress(index)
+        })
+        print(f"Plotting chunk {index + 1}/{checkpoint.chunk_count} of layer {checkpoint.layer}")
+        print(f"Executing: {' '.join(cmd)}")
+        returncode = self._run_axidraw_process(cmd)
+        if PlotterHandler.plot_interrupted:
+            interrupt_code = returncode if returncode not in (None, 0) else 1
+            raise subprocess.CalledProcessError(interrupt_code, cmd)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        checkpoint.mark_complete(index)
+        resume_path = PlotterHandler._resolve_resume_path()
+        if os.path.exists(resume_path):
+            os.remove(resume_path)
+        self.send_progress_update('CHUNK_PROGRESS', {
+            'chunk': index + 1,
+            'chunks': checkpoint.chunk_count,
+            'state': 'completed',
+            'progress': checkpoint.overall_progress(index, 1.0)
+        })
+
+    def _run_chunked_plot(self, checkpoint, root=None, resume_log=None, home_first=False):
+        """Plot the remaining chunks of ``checkpoint`` while the next chunk file is prepared."""
+        start_index = checkpoint.completed + (1 if resume_log else 0)
+        preparer = ChunkPreparer(checkpoint, root=root, start_index=start_index).start()
+        try:
+            if home_first:
+                PlotterHandler.execute_home_sequence(checkpoint.settings.get('pen_pos_up'),
+                                                     clear_resume=False)
+            if resume_log:
+                print(f"Resuming chunk {checkpoint.completed + 1} from resume log")
+                self._plot_chunk(checkpoint, checkpoint.completed,
+                                 self._resume_plot_command(resume_log))
+            while True:
+                item = preparer.next()
+                if item is None:
+                    break
+                index, chunk_path = item
+                resume_path = PlotterHandler.prepare_resume_file()
+                PlotterHandler.register_resume_tracking(
+                    resume_path,
+                    layer=checkpoint.layer,
+                    layer_label=checkpoint.layer_label
+                )
+                cmd = self._layer_plot_command(
+                    chunk_path, checkpoint.layer, checkpoint.chunk_settings(index), resume_path
+                )
+                with open(chunk_path, 'r', encoding='utf-8') as chunk_file:
+                    PlotterHandler.start_pen_tracking(chunk_file.read(), checkpoint.layer)
+                self._plot_chunk(checkpoint, index, cmd)
+            try:
+                PlotterHandler.remember_plotted_svg(checkpoint.source_svg())
+            except OSError as e:
+                print(f"Warning: failed to keep plotted SVG for diffs: {e}")
+            PlotterHandler.clear_resume_state()
+            self.send_progress_update("Plot completed successfully")
+            self.send_progress_update("PLOT_COMPLETE")
+        except Exception as e:
+            preparer.cancel()
+            PlotterHandler.plot_interrupted = False
+            PlotterHandler.mark_resume_available(None, checkpoint.layer, checkpoint.layer_label)
+            print(f"Error in chunked plot thread: {e}")
+            self.send_progress_update(f"Error: {str(e)}")
+            self.send_progress_update("PLOT_ERROR")
+        finally:
+            PlotterHandler.active_chunk = None
+            PlotterHandler.stop_pen_tracking()
+
     @classmethod
     def load_drawings_manifest(cls):
         manifest_path = os.path.join(os.getcwd(), 'drawings', 'manifest.json')
@@ -527,11 +1068,667 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             }
             return data
 
+    @classmethod
+    def get_config_registry(cls):
+        if cls.config_registry is None:
+            cls.config_registry = ConfigRegistry()
+        return cls.config_registry
+
+    @classmethod
+    def plotter_flags(cls):
+        """``(model, penlift)`` axicli values for the default plotter in the current config."""
+        return cls.get_config_registry().snapshot().plotter_flags
+
+    def serve_config(self):
+        snapshot = self.get_config_registry().snapshot()
+        if_none_match = self.headers.get('If-None-Match') or ''
+        if snapshot.etag in [tag.strip() for tag in if_none_match.split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', snapshot.etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+        self._send_bytes(200, snapshot.body, 'application/json', cache_control='no-cache',
+                         etag=snapshot.etag)
+
+    @classmethod
+    def get_tsp_cache(cls):
+        if cls.tsp_cache is None:
+            cls.tsp_cache = tsp_solver.RouteCache(os.path.join(cls.OUTPUT_ROOT, 'cache', 'tsp'))
+        return cls.tsp_cache
+
+    def solve_tsp_route(self, data):
+        """Return an optimized visiting order for the posted point cloud."""
+        try:
+            points = tsp_solver.normalize_points(data.get('points'))
+        except (KeyError, TypeError, ValueError) as e:
+            return {'status': 'error', 'message': f"Invalid points: {e}"}
+        if len(points) > self.TSP_MAX_POINTS:
+            return {'status': 'error',
+                    'message': f"Too many points ({len(points)} > {self.TSP_MAX_POINTS})"}
+        options = data.get('options') or {}
+        try:
+            time_budget = float(options.get('timeBudget', tsp_solver.DEFAULT_TIME_BUDGET))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'timeBudget must be a number'}
+        time_budget = max(0.0, min(self.TSP_MAX_TIME_BUDGET, time_budget))
+
+        cache = self.get_tsp_cache()
+        key = tsp_solver.point_set_hash(points)
+        cached = cache.get(key)
+        if cached is not None and len(cached.get('route', [])) == len(points):
+            return {'status': 'success', 'route': cached['route'], 'length': cached['length'],
+                    'cached': True}
+
+        started = time.monotonic()
+        route = tsp_solver.solve_route(points, time_budget=time_budget)
+        length = tsp_solver.route_length(points, route)
+        print(f"Solved TSP route for {len(points)} points in {time.monotonic() - started:.2f}s "
+              f"(length {length:.1f})")
+        cache.put(key, {'route': route, 'length': length})
+        return {'status': 'success', 'route': route, 'length': length, 'cached': False}
+
+    @classmethod
+    def get_output_catalog(cls):
+        with cls.output_catalog_lock:
+            if cls.output_catalog is None or cls.output_catalog.output_root != cls.OUTPUT_ROOT:
+                if cls.output_catalog is not None:
+                    cls.output_catalog.close()
+                cls.output_catalog = OutputCatalog(cls.OUTPUT_ROOT)
+                cls.last_catalog_sync = 0.0
+            return cls.output_catalog
+
+    @classmethod
+    def sync_output_catalog(cls, force=False):
+        """Rescan ``output/`` for files saved or removed outside ``/save-svg``."""
+        catalog = cls.get_output_catalog()
+        now = time.monotonic()
+        recently = cls.last_catalog_sync and now - cls.last_catalog_sync < cls.CATALOG_SYNC_INTERVAL
+        if not force and recently:
+            return None
+        cls.last_catalog_sync = now
+        result = catalog.sync()
+        if result['updated'] or result['removed']:
+            print(f"Output catalog synced: {result['updated']} updated, "
+                  f"{result['removed']} removed, {result['total']} total")
+        return result
+
+    def list_outputs(self, query_string):
+        params = {key: values[-1] for key, values in parse_qs(query_string).items()}
+        self.sync_output_catalog(force=params.get('refresh') == '1')
+        try:
+            page = int(params.get('page', 1))
+            page_size = int(params.get('pageSize', 50))
+        except ValueError:
+            return 400, {'status': 'error', 'message': 'page and pageSize must be integers'}
+        catalog = self.get_output_catalog()
+        result = catalog.query(
+            drawing=params.get('drawing'),
+            paper=params.get('paper'),
+            medium=params.get('medium'),
+            search=params.get('q'),
+            since=params.get('since'),
+            until=params.get('until'),
+            page=page,
+            page_size=page_size
+        )
+        for item in result['items']:
+            item['url'] = f"/outputs/files/{item['path']}"
+            thumbnail = item['thumbnail']
+            item['thumbnailUrl'] = f"/outputs/thumbnails/{thumbnail}" if thumbnail else None
+        result['facets'] = catalog.facets()
+        result['archive'] = OutputArchive(self.OUTPUT_ROOT).stats()
+        result['status'] = 'success'
+        return 200, result
+
+    @classmethod
+    def read_saved_output(cls, rel_path):
+        """Text of a saved drawing addressed as ``<drawing>/<file>``, as /outputs lists it."""
+        path = cls._output_file_path('files', str(rel_path or ''))
+        if path is not None and path.endswith('.svg') and not os.path.isfile(path):
+            path = f"{path}z"  # Archived since it was listed, as /outputs/files/ allows for
+        if path is None or not os.path.isfile(path):
+            raise FileNotFoundError(f"No saved output {rel_path}")
+        return read_output_text(path)
+
+    def impose_outputs(self, data):
+        """Pack saved drawings onto one sheet, merge their colours and save the result."""
+        files = data.get('files')
+        if not isinstance(files, list) or not files:
+            return 400, {'status': 'error', 'message': 'files must be a non-empty list'}
+        if len(files) > self.IMPOSE_MAX_FILES:
+            return 400, {'status': 'error',
+                         'message': f"At most {self.IMPOSE_MAX_FILES} files per sheet"}
+        snapshot = self.get_config_registry().snapshot()
+        papers = snapshot['papers']
+        paper_id = data.get('paperId') or papers['default']
+        paper = papers['papers'].get(paper_id)
+        if paper is None:
+            return 400, {'status': 'error', 'message': f"Unknown paper {paper_id}"}
+        orientation = 'portrait' if data.get('orientation') == 'portrait' else 'landscape'
+        try:
+            gap = max(0.0, float(data.get('gap', imposition.DEFAULT_GAP_MM)))
+            margin = float(data['margin']) if 'margin' in data else float(paper.get('margin', 0))
+        except (TypeError, ValueError):
+            return 400, {'status': 'error', 'message': 'gap and margin must be numbers'}
+
+        drawings = []
+        mediums = set()
+        for rel_path in files:
+            try:
+                svg_text = self.read_saved_output(rel_path)
+                drawings.append((rel_path, parse_svg(svg_text)))
+            except FileNotFoundError as e:
+                return 404, {'status': 'error', 'message': str(e)}
+            except Exception as e:
+                return 400, {'status': 'error', 'message': f"Cannot read {rel_path}: {e}"}
+            mediums.add(parse_header(svg_text).get('medium_id') or 'unknown')
+
+        width, height = imposition.sheet_size(paper, orientation)
+        travel = snapshot.plotter.get('specs', {}).get('usable_travel_mm')
+        try:
+            area = imposition.printable_area(width, height, margin, travel)
+            root, summary = imposition.impose(drawings, width, height, area, gap=gap,
+                                              allow_rotate=data.get('rotate', True) is not False)
+        except imposition.ImpositionError as e:
+            return 422, {'status': 'error', 'message': str(e)}
+
+        output_dir = os.path.join(self.OUTPUT_ROOT, self.IMPOSED_DIR_NAME)
+        os.makedirs(output_dir, exist_ok=True)
+        filename = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.svg")
+        config = {
+            'paperId': paper_id,
+            'paperMargin': margin,
+            'paper': dict(paper, id=paper_id, width=width, height=height,
+                          orientation=orientation),
+            'medium': mediums.pop() if len(mediums) == 1 else 'mixed',
+            'drawingControls': {'files': files, 'gap': gap, 'rotate': data.get('rotate', True)},
+            'drawingData': summary,
+        }
+        pretty_svg = minidom.parseString(serialize_svg(root)).toprettyxml(indent='  ')
+        pretty_svg = pretty_svg.split('\n', 1)[1].strip() + '\n'  # Drop the XML declaration
+        final_svg = build_config_comment(self.IMPOSED_DIR_NAME, config) + pretty_svg
+        with open(filename, 'w', encoding='utf-8') as handle:
+            handle.write(final_svg)
+        try:
+            self.get_output_catalog().record(filename, final_svg)
+        except Exception as e:
+            print(f"Warning: failed to catalog {filename}: {e}")
+        print(f"Imposed {len(files)} drawings onto {filename} "
+              f"({len(summary['layers'])} merged layers)")
+        return 200, {'status': 'success', 'filename': filename, **summary}
+
+    @classmethod
+    def write_output_svg(cls, name, svg_text, config, suffix=''):
+        """Save ``svg_text`` pretty-printed under its config header to ``output/<name>/``."""
+        output_dir = os.path.join(cls.OUTPUT_ROOT, name)
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Error creating output directory: {e}")
+            raise Exception(f"Failed to create output directory: {str(e)}")
+
+        # Generate filename with timestamp
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        filename = os.path.join(output_dir, f"{timestamp}{suffix}.svg")
+
+        try:
+            # Pretty print the SVG
+            dom = minidom.parseString(svg_text)
+            pretty_svg = dom.toprettyxml(indent='  ')
+        except ExpatError as e:
+            print(f"Error parsing SVG data: {e}")
+            raise Exception(f"Invalid SVG data: {str(e)}")
+        svg_lines = pretty_svg.splitlines()
+        if svg_lines and svg_lines[0].lstrip().startswith('<?xml'):
+            svg_lines = svg_lines[1:]
+        pretty_svg = '\n'.join(svg_lines).strip() + '\n'
+
+        # Add configuration as comment at the top
+        final_svg = build_config_comment(name, config) + pretty_svg
+
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(final_svg)
+        except IOError as e:
+            print(f"Error writing SVG file: {e}")
+            raise Exception(f"Failed to write SVG file: {str(e)}")
+
+        try:
+            cls.get_output_catalog().record(filename, final_svg)
+        except Exception as e:
+            print(f"Warning: failed to catalog {filename}: {e}")
+        return filename
+
+    @classmethod
+    def get_render_jobs(cls, server_url):
+        with cls.render_lock:
+            if cls.render_jobs is None:
+                pool = render_pool.RenderPool(server_url, size=cls.RENDER_WORKERS,
+                                              timeout=cls.RENDER_TIMEOUT)
+                cls.render_jobs = render_pool.RenderJobManager(
+                    pool, cls.save_render_result, notify=cls.publish_render_job)
+            return cls.render_jobs
+
+    @classmethod
+    def stop_render_pool(cls):
+        with cls.render_lock:
+            if cls.render_jobs is not None:
+                cls.render_jobs.pool.shutdown(wait=False)
+                cls.render_jobs = None
+
+    @classmethod
+    def save_render_result(cls, job, index, controls, result):
+        """Write one finished sweep variant to ``output/`` with the header a browser save has."""
+        options = job.options
+        config = {
+            'name': result.get('name'),
+            'type': result.get('drawingType'),
+            'line': options['line'],
+            'drawingControls': {**options['controls'], **controls},
+            'drawingData': {'renderJob': job.id, 'variant': index,
+                            'travelSummary': result.get('travelSummary')},
+            'paperId': options['paperId'],
+            'paperMargin': options['paper'].get('margin'),
+            'paper': dict(options['paper'], orientation=options['orientation']),
+            'medium': options['medium'],
+            'maxTravelPerLayerMeters': options['maxTravelPerLayerMeters'],
+        }
+        return cls.write_output_svg(result['drawingKey'], result['svg'], config,
+                                    suffix=f"-{job.id[:6]}-{index:03d}")
+
+    @classmethod
+    def publish_render_job(cls, summary):
+        if len(cls.control_channel):
+            cls.control_channel.broadcast({'type': 'render_job', **summary},
+                                          coalesce=('render_job', summary['id']))
+
+    def start_render_job(self, data):
+        """Queue a headless render of ``drawing`` for every combination in ``sweep``."""
+        drawing = data.get('drawing')
+        if not isinstance(drawing, str) or not drawing:
+            return 400, {'status': 'error', 'message': 'drawing must name a preset or type'}
+        controls = data.get('controls') or {}
+        line = data.get('line') or {}
+        if not isinstance(controls, dict) or not isinstance(line, dict):
+            return 400, {'status': 'error', 'message': 'controls and line must be objects'}
+        try:
+            variants = render_pool.expand_sweep(data.get('sweep'), self.RENDER_MAX_VARIANTS)
+        except render_pool.RenderError as e:
+            return 400, {'status': 'error', 'message': str(e)}
+        snapshot = self.get_config_registry().snapshot()
+        papers, mediums = snapshot['papers'], snapshot['mediums']
+        paper_id = data.get('paperId') or papers['default']
+        medium_id = data.get('mediumId') or mediums['default']
+        paper = thaw(papers['papers'].get(paper_id))
+        medium = thaw(mediums['mediums'].get(medium_id))
+        if paper is None or medium is None:
+            unknown = f"paper {paper_id}" if paper is None else f"medium {medium_id}"
+            return 400, {'status': 'error', 'message': f"Unknown {unknown}"}
+        orientation = 'portrait' if data.get('orientation') == 'portrait' else 'landscape'
+        try:
+            margin = float(data['margin']) if 'margin' in data else float(paper.get('margin', 0))
+        except (TypeError, ValueError):
+            return 400, {'status': 'error', 'message': 'margin must be a number'}
+        paper = dict(paper, id=paper_id, margin=margin)
+        # The page draws with the medium's stroke unless the line controls override it
+        medium_line = {'strokeWidth': medium.get('strokeWidth'),
+                       'lineCap': medium.get('strokeLinecap'),
+                       'lineJoin': medium.get('strokeLinejoin')}
+        line = {**{key: value for key, value in medium_line.items() if value is not None}, **line}
+        # As in the page, the medium's travel limit applies unless the request sets one
+        defaults = medium.get('plotterDefaults') or {}
+        max_travel = data.get('maxTravelPerLayerMeters', defaults.get('maxTravelPerLayerMeters'))
+        base = {
+            'drawingKey': drawing,
+            'controlValues': controls,
+            'paper': paper,
+            'orientation': orientation,
+            'plotterArea': thaw(snapshot.plotter.get('paper')),
+            'maxTravelPerLayerMeters': max_travel,
+            'mediumId': medium_id,
+            'lineOverrides': line,
+        }
+        options = {
+            'controls': controls,
+            'line': line,
+            'paperId': paper_id,
+            'paper': paper,
+            'orientation': orientation,
+            'medium': {'id': medium_id, 'metadata': {key: value for key, value in medium.items()
+                                                     if key not in ('colors', 'preview')}},
+            'maxTravelPerLayerMeters': max_travel,
+        }
+        server_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        try:
+            job = self.get_render_jobs(server_url).start(drawing, base, variants, options)
+        except render_pool.RenderError as e:
+            return 503, {'status': 'error', 'message': str(e)}
+        print(f"Render job {job.id}: {len(variants)} variant(s) of {drawing} on {paper_id} "
+              f"with {medium_id}")
+        return 202, {'status': 'success', **job.summary()}
+
+    def serve_render_jobs(self, method, route):
+        """``GET /render-jobs[/<id>]`` and ``POST /render-jobs/<id>/cancel``."""
+        manager = PlotterHandler.render_jobs
+        job_id, _, action = route.strip('/').partition('/')
+        if not job_id and method == 'GET':
+            jobs = manager.summaries() if manager is not None else []
+            return 200, {'status': 'success', 'jobs': jobs}
+        if (method == 'POST' and action != 'cancel') or (method == 'GET' and action):
+            return 404, {'status': 'error', 'message': 'Not found'}
+        job = None
+        if manager is not None:
+            job = manager.cancel(job_id) if action == 'cancel' else manager.get(job_id)
+        if job is None:
+            return 404, {'status': 'error', 'message': f"No render job {job_id}"}
+        return 200, {'status': 'success', **job.summary()}
+
+    @classmethod
+    def get_plotted_store(cls):
+        if cls.plotted_store is None:
+            cls.plotted_store = plot_diff.PlottedStore(
+                os.path.join(cls.OUTPUT_ROOT, 'cache', 'plotted'))
+        return cls.plotted_store
+
+    @classmethod
+    def remember_plotted_svg(cls, svg_text):
+        try:
+            return cls.get_plotted_store().put(svg_text)
+        except OSError as e:
+            print(f"Warning: failed to keep plotted SVG for diffs: {e}")
+            return None
+
+    def read_diff_base(self, base=None, base_hash=None):
+        """The SVG a diff subtracts: a saved output by path, or a plotted SVG by hash."""
+        if base:
+            return self.read_saved_output(base)
+        if base_hash:
+            svg_text = self.get_plotted_store().get(str(base_hash))
+            if svg_text is None:
+                raise FileNotFoundError(f"No plotted SVG with hash {base_hash}")
+            return svg_text
+        raise ValueError('Give base (a saved output path) or baseHash')
+
+    def diff_plot_svg(self, svg_text, base_text, tolerance=None, layer=None):
+        """Return ``(diff_svg_text, summary)`` holding only strokes new since ``base_text``."""
+        if tolerance is None:
+            tolerance = plot_diff.DEFAULT_TOLERANCE_MM
+        root = parse_svg(svg_text)
+        summary = plot_diff.diff_svg(parse_svg(base_text), root, float(tolerance), layer=layer)
+        return serialize_svg(root), summary
+
+    def preflight_plot_svg(self, params):
+        """Check the plot layer against the paper margin and plotter travel.
+
+        Returns ``(svg_text, report)``; the report is None when ``bounds`` is off.
+        """
+        mode = params.get('bounds') or preflight.DEFAULT_MODE
+        if mode == 'off':
+            return params['svg'], None
+        snapshot = self.get_config_registry().snapshot()
+        margin = params.get('margin')
+        if margin is None and params.get('paperId'):
+            paper = snapshot['papers']['papers'].get(params['paperId'])
+            if paper is None:
+                raise preflight.PreflightError(f"Unknown paper {params['paperId']}")
+            margin = paper.get('margin', 0)
+        try:
+            margin = max(0.0, float(margin or 0))
+        except (TypeError, ValueError):
+            raise preflight.PreflightError('margin must be a number')
+        travel = snapshot.plotter.get('specs', {}).get('usable_travel_mm')
+        return preflight.check_plot_svg(params['svg'], params['layer'], margin, travel, mode)
+
+    def plot_diff(self, data):
+        if not isinstance(data.get('svg'), str):
+            return 400, {'status': 'error', 'message': 'svg is required'}
+        try:
+            base_text = self.read_diff_base(data.get('base'), data.get('baseHash'))
+            svg_text, summary = self.diff_plot_svg(data['svg'], base_text, data.get('tolerance'),
+                                                   data.get('layer'))
+        except FileNotFoundError as e:
+            return 404, {'status': 'error', 'message': str(e)}
+        except (ValueError, SyntaxError) as e:  # ParseError is a SyntaxError
+            return 400, {'status': 'error', 'message': str(e)}
+        return 200, {'status': 'success', 'svg': svg_text, **summary}
+
+    @classmethod
+    def start_output_archiving(cls):
+        if cls.ARCHIVE_AFTER_DAYS is None or cls.archive_scheduler is not None:
+            return cls.archive_scheduler
+        cls.archive_scheduler = ArchiveScheduler(
+            cls.OUTPUT_ROOT,
+            cls.ARCHIVE_AFTER_DAYS,
+            dedupe=cls.ARCHIVE_DEDUPE,
+            interval=cls.ARCHIVE_INTERVAL,
+            on_complete=lambda summary: cls.sync_output_catalog(force=True),
+            is_busy=cls.plot_in_progress,
+            protected_paths=cls.archive_protected_paths
+        ).start()
+        return cls.archive_scheduler
+
+    @classmethod
+    def archive_protected_paths(cls):
+        """Files a running or resumable plot still needs, which archiving must not move."""
+        with cls.resume_state_lock:
+            paths = [cls.resume_state.get('path')]
+        paths.extend([cls._default_resume_path(), cls.diff_base_path])
+        return [path for path in paths if path]
+
+    @classmethod
+    def get_debug_token(cls):
+        return load_debug_token(cls.DEBUG_TOKEN_DIR)
+
+    @classmethod
+    def remove_legacy_debug_token(cls):
+        """Delete the token file older versions kept in ``output/``, next to served files."""
+        try:
+            os.remove(os.path.join(cls.OUTPUT_ROOT, DEBUG_TOKEN_FILE_NAME))
+        except OSError:
+            pass
+
+    def authorize_debug_request(self):
+        """Return ``(http_status, response)`` when the caller may not use /debug, else None."""
+        if not is_loopback(self.client_address[0]):
+            return 403, {'status': 'error', 'message': 'Debug endpoints only answer local clients'}
+        if not token_matches(self.get_debug_token(), self.headers.get(DEBUG_TOKEN_HEADER)):
+            return 401, {'status': 'error',
+                         'message': f"Missing or wrong {DEBUG_TOKEN_HEADER} header"}
+        return None
+
+    def serve_debug(self, method, data):
+        request_path, _, query_string = self.path.partition('?')
+        params = {key: values[-1] for key, values in parse_qs(query_string).items()}
+        params.update(data if isinstance(data, dict) else {})
+        denied = self.authorize_debug_request()
+        if denied:
+            status, response = denied
+        else:
+            try:
+                route = request_path[len('/debug'):]
+                status, response = self.handle_debug_request(method, route, params)
+            except (KeyError, TypeError, ValueError) as e:
+                message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+                status, response = 400, {'status': 'error', 'message': message}
+            except RuntimeError as e:
+                status, response = 409, {'status': 'error', 'message': str(e)}
+        if isinstance(response, str):
+            self._send_bytes(status, response.encode('utf-8'), 'text/plain; charset=utf-8',
+                             cache_control='no-store')
+        else:
+            self._send_json(status, response, cache_control='no-store')
+
+    def handle_debug_request(self, method, route, params):
+        """Dispatch /debug routes; returns ``(http_status, response)`` with a dict or plain text."""
+        limit = int(params.get('limit', 30))
+        if method == 'GET' and route == '/threads':
+            threads = thread_stacks()
+            if params.get('format') == 'text':
+                return 200, format_thread_stacks(threads)
+            return 200, {
+                'status': 'success',
+                'threads': threads,
+                'sseConnections': len(PlotterHandler.sse_connections),
+                'plotThreads': [thread.name for thread in list(PlotterHandler.plot_threads)],
+            }
+        if route.startswith('/profile'):
+            with PlotterHandler.debug_lock:
+                profiler = PlotterHandler.debug_profiler
+                if method == 'GET' and route == '/profile':
+                    if profiler is None:
+                        return 200, {'status': 'success', 'running': False}
+                    return 200, dict(profiler.report(limit), status='success',
+                                     running=profiler.running)
+                if method == 'POST' and route == '/profile/start':
+                    if profiler is not None and profiler.running:
+                        raise RuntimeError('A profiling session is already running')
+                    profiler = SamplingProfiler(float(params.get('interval', 0.005)),
+                                                float(params.get('maxSeconds', 300)))
+                    profiler.start()
+                    PlotterHandler.debug_profiler = profiler
+                    print(f"Debug profiling started "
+                          f"(sampling every {profiler.interval * 1000:.1f} ms)")
+                    return 200, {'status': 'success', 'running': True,
+                                 'interval': profiler.interval,
+                                 'maxSeconds': profiler.max_seconds}
+                if method == 'POST' and route == '/profile/stop':
+                    if profiler is None:
+                        raise RuntimeError('No profiling session has been started')
+                    profiler.stop()
+                    print(f"Debug profiling stopped after {profiler.samples} samples")
+                    if params.get('format') == 'collapsed':
+                        return 200, profiler.collapsed()
+                    return 200, dict(profiler.report(limit), status='success', running=False)
+        tracer = PlotterHandler.memory_tracer
+        key_type = params.get('keyType', 'lineno')
+        if method == 'GET' and route == '/memory':
+            return 200, dict(tracer.status(), status='success')
+        if method == 'POST' and route == '/memory/start':
+            return 200, dict(tracer.start(int(params.get('frames', 10))), status='success')
+        if method == 'POST' and route == '/memory/snapshot':
+            return 200, dict(tracer.take_snapshot(key_type, limit), status='success')
+        if method == 'POST' and route == '/memory/diff':
+            diff = tracer.diff(params['from'], params.get('to'), key_type, limit)
+            return 200, dict(diff, status='success')
+        if method == 'POST' and route == '/memory/stop':
+            return 200, dict(tracer.stop(), status='success')
+        return 404, {'status': 'error', 'message': f"Unknown debug route {method} /debug{route}"}
+
+    @classmethod
+    def get_asset_store(cls):
+        return AssetStore(os.path.join(cls.OUTPUT_ROOT, cls.ASSET_DIR_NAME))
+
+    def store_asset(self, body):
+        """Persist an uploaded image and return ``(http_status, response)`` with its URL."""
+        try:
+            asset_id, created = self.get_asset_store().put(body)
+        except AssetError as e:
+            return 400, {'status': 'error', 'message': str(e)}
+        if created:
+            print(f"Stored asset {asset_id} ({len(body)} bytes)")
+        return (201 if created else 200), {
+            'status': 'success',
+            'id': asset_id,
+            'url': f"{ASSET_URL_PREFIX}{asset_id}",
+            'bytes': len(body)
+        }
+
+    def serve_asset(self, asset_id):
+        store = self.get_asset_store()
+        path = store.path_for(asset_id)
+        if not path or not os.path.isfile(path):
+            self.send_error(404, "Not Found")
+            return
+        etag = f'"{asset_id}"'
+        if etag in [tag.strip() for tag in (self.headers.get('If-None-Match') or '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', self.ASSET_CACHE_CONTROL)
+            self.end_headers()
+            return
+        self._send_file(path, store.content_type(asset_id), cache_control=self.ASSET_CACHE_CONTROL,
+                        etag=etag)
+
+    @classmethod
+    def get_render_cache(cls):
+        if cls.render_cache is None:
+            cls.render_cache = render_cache.RenderCache(
+                os.path.join(cls.OUTPUT_ROOT, 'cache', 'render'),
+                max_entries=cls.RENDER_CACHE_MAX_ENTRIES, max_bytes=cls.RENDER_CACHE_MAX_BYTES)
+        return cls.render_cache
+
+    def serve_render_cache(self, route, data):
+        """Look up, store or clear preview render results keyed by their inputs."""
+        cache = self.get_render_cache()
+        if route == '/clear':
+            self._send_json(200, {'status': 'success', 'removed': cache.clear()})
+            return
+        request = data.get('request') if route == '' else data
+        if not isinstance(request, dict) or not request.get('drawingKey'):
+            self._send_json(400, {'status': 'error',
+                                  'message': 'A render request with a drawingKey is required'})
+            return
+        key = render_cache.render_key(request, self.load_drawings_manifest().get('version'))
+        if route == '/lookup':
+            cached = cache.get(key)
+            if cached is None:
+                self._send_json(200, {'status': 'success', 'key': key, 'hit': False})
+                return
+            # The stored JSON goes out as is; decoding a large result would cost more than the hit
+            body = (f'{{"status":"success","key":"{key}","hit":true,"result":'.encode('utf-8')
+                    + cached + b'}')
+            self._send_bytes(200, body, 'application/json', cache_control='no-store')
+            return
+        result = data.get('result')
+        if not isinstance(result, dict) or not isinstance(result.get('passes'), list):
+            self._send_json(400, {'status': 'error', 'message': 'result must include passes'})
+            return
+        result = {name: result.get(name) for name in ('svgInfo', 'passes', 'travelSummary')}
+        try:
+            size = cache.put(key, result)
+        except OSError as e:
+            print(f"Warning: failed to cache render {key}: {e}")
+            self._send_json(500, {'status': 'error', 'message': str(e)})
+            return
+        self._send_json(200, {'status': 'success', 'key': key, 'bytes': size})
+
+    @classmethod
+    def get_preprocess_cache(cls):
+        if cls.preprocess_cache is None:
+            cls.preprocess_cache = image_preprocess.PreprocessCache(
+                os.path.join(cls.OUTPUT_ROOT, 'cache', 'preprocess'))
+        return cls.preprocess_cache
+
+    def preprocess_image(self, data):
+        """Return ``(http_status, response)`` with the photo maps for ``data['image']``."""
+        if not image_preprocess.is_available():
+            return 503, {'status': 'error',
+                         'message': 'Image preprocessing requires numpy and Pillow'}
+        try:
+            image = data.get('image')
+            asset_id = asset_id_from_url(image)
+            if asset_id:
+                image_bytes = self.get_asset_store().read(asset_id)
+            else:
+                image_bytes = image_preprocess.decode_data_url(image)
+            payload, cached = image_preprocess.preprocess_image(
+                image_bytes,
+                data.get('params'),
+                cache=self.get_preprocess_cache(),
+                maps=data.get('maps') or ('density',)
+            )
+        except (image_preprocess.PreprocessError, AssetError) as e:
+            return 400, {'status': 'error', 'message': str(e)}
+        return 200, {'status': 'success', 'cached': cached, **payload}
+
     def handle_command(self, command_data):
         """Handle plotter commands by executing AxiDraw CLI commands"""
+        PlotterHandler.wait_for_startup()
         command = command_data.get('command')
         # Use all data except 'command' as params
         params = {k: v for k, v in command_data.items() if k != 'command'}
+        model, penlift = PlotterHandler.plotter_flags()
         
         # Dictionary mapping commands to their CLI parameters
         def plot_command(params):
@@ -540,6 +1737,47 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             if 'layer' not in params:
                 print("Error: No layer specified in plot command")
                 raise ValueError("No layer specified in plot command")
+            # Left unarchived while it is the latest plot's base, so replotting the layer finds it
+            PlotterHandler.diff_base_path = (
+                PlotterHandler._output_file_path('files', str(params['diff_base']))
+                if params.get('diff_base') else None)
+            if 'svg' in params and (params.get('diff_base') or params.get('diff_base_hash')):
+                try:
+                    base_text = self.read_diff_base(params.get('diff_base'),
+                                                    params.get('diff_base_hash'))
+                    diff_svg, summary = self.diff_plot_svg(params['svg'], base_text,
+                                                           params.get('diff_tolerance'),
+                                                           params['layer'])
+                except (OSError, ValueError, SyntaxError) as e:
+                    print(f"Error building plot diff: {e}")
+                    return {'status': 'error', 'message': f'Failed to diff against base: {e}'}
+                print(f"Plot diff for layer {params['layer']}: {summary['added']} new, "
+                      f"{summary['unchanged']} already plotted")
+                if not summary['added']:
+                    message = f"Layer {params['layer']} has no new strokes to plot"
+                    self.send_progress_update(message)
+                    self.send_progress_update("PLOT_COMPLETE")  # Nothing to wait for
+                    return {'status': 'success', 'message': message, 'diff': summary}
+                params = dict(params, svg=diff_svg)
+            if 'svg' in params:
+                try:
+                    checked_svg, report = self.preflight_plot_svg(params)
+                except preflight.PreflightError as e:
+                    print(f"Plot pre-flight failed: {e}")
+                    return {'status': 'error', 'message': str(e), 'preflight': e.report}
+                except (ValueError, SyntaxError) as e:
+                    print(f"Error checking plot bounds: {e}")
+                    return {'status': 'error', 'message': f'Failed to check plot bounds: {e}'}
+                if report and (report['clipped'] or report['removed']):
+                    if report['removed'] == report['strokes']:
+                        return {'status': 'error', 'preflight': report,
+                                'message': f"Layer {params['layer']} has nothing inside "
+                                           f"the plot area"}
+                    message = (f"Clipped {report['clipped']} and dropped {report['removed']} "
+                               f"strokes outside the plot area")
+                    print(message)
+                    self.send_progress_update(message)
+                params = dict(params, svg=checked_svg)
             try:
                 PlotterHandler.execute_home_sequence(params.get('pen_pos_up'))
             except Exception as home_error:
@@ -549,6 +1787,17 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                     'message': f'Failed to home plotter before plotting: {home_error}'
                 }
 
+            try:
+                chunk_count = int(params.get('chunks') or 1)
+            except (TypeError, ValueError):
+                chunk_count = 1
+            if 'svg' in params and (params.get('speed_classes') or chunk_count > 1):
+                response = self._start_chunked_plot(params, chunk_count,
+                                                    speed_classes=bool(params.get('speed_classes')))
+                if response['status'] == 'success':
+                    response['plottedHash'] = plot_diff.svg_hash(params['svg'])
+                return response
+
             # Create temp file for SVG if present
             temp_svg_path = None
             resume_path = None
@@ -573,23 +1822,10 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             
             def run_plot():
                 try:
-                    # Build command array with filename as first parameter after axicli
-                    cmd = [self.AXIDRAW_PATH]
-                    if temp_svg_path:
-                        cmd.append(temp_svg_path)
-                    cmd.extend([
-                        '--mode', 'layers',
-                        '--layer', str(params['layer']),
-                        '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
-                        '--pen_pos_up', str(params['pen_pos_up']),
-                        '--pen_pos_down', str(params['pen_pos_down']),
-                        '--pen_rate_lower', str(params.get('pen_rate_lower', 25)),
-                        '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift']),
-                        '--progress'
-                    ])
-                    if resume_path:
-                        cmd.extend(['--output_file', resume_path])
-                    cmd = wrap_command_with_sleep_blocker(cmd)
+                    cmd = self._layer_plot_command(temp_svg_path, params['layer'], params,
+                                                   resume_path)
+                    if 'svg' in params:
+                        PlotterHandler.start_pen_tracking(params['svg'], params['layer'])
 
                     print(f"Executing command for layer number: {params.get('layer', '1')}")
                     print(f"Executing command for layer label: {params.get('layerLabel', 'unknown')}")
@@ -601,6 +1837,9 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                         raise subprocess.CalledProcessError(interrupt_code, cmd)
                     if returncode != 0:
                         raise subprocess.CalledProcessError(returncode, cmd)
+                    if 'svg' in params:
+                        # Kept only once it is on paper, as the diffed and clipped SVG axicli drew
+                        PlotterHandler.remember_plotted_svg(params['svg'])
                     PlotterHandler.clear_resume_state()
                     self.send_progress_update("Plot completed successfully")
                     self.send_progress_update("PLOT_COMPLETE")  # Special message for client
@@ -611,6 +1850,7 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                     self.send_progress_update(f"Error: {str(e)}")
                     self.send_progress_update("PLOT_ERROR")  # New special message for client
                 finally:
+                    PlotterHandler.stop_pen_tracking()
                     # Clean up temp file if it was created
                     if temp_svg_path:
                         try:
@@ -620,19 +1860,39 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                             print(f"Error removing temporary file {temp_svg_path}: {e}")
 
             # Start the plot in a separate thread
-            plot_thread = threading.Thread(target=run_plot)
-            plot_thread.daemon = True  # Make thread daemon so it doesn't block program exit
-            plot_thread.start()
+            PlotterHandler.start_plot_thread(run_plot)
             
-            return {
+            response = {
                 'status': 'success',
                 'message': 'Plot command started'
             }
+            if 'svg' in params:
+                response['plottedHash'] = plot_diff.svg_hash(params['svg'])
+            return response
         def resume_plot_command(_):
             PlotterHandler.keep_sse_alive = True
             PlotterHandler.plot_interrupted = False
             status = self.get_resume_status(include_path=True)
             resume_path = status.get('path')
+            checkpoint = PlotterHandler.load_chunk_checkpoint()
+            if checkpoint is not None and checkpoint.remaining:
+                # Only trust axicli's log when it belongs to the chunk that was interrupted
+                resume_log = resume_path
+                if (checkpoint.resume_chunk != checkpoint.completed
+                        or not resume_log_is_usable(resume_log)):
+                    resume_log = None
+                PlotterHandler.update_resume_state(available=False)
+                PlotterHandler.start_plot_thread(
+                    self._run_chunked_plot,
+                    checkpoint,
+                    resume_log=resume_log,
+                    home_first=resume_log is None
+                )
+                return {
+                    'status': 'success',
+                    'message': (f'Resuming chunked plot at chunk '
+                                f'{checkpoint.completed + 1}/{checkpoint.chunk_count}')
+                }
             if not resume_path or not os.path.exists(resume_path):
                 return {
                     'status': 'error',
@@ -642,16 +1902,7 @@ class PlotterHandler(SimpleHTTPRequestHandler):
 
             def run_resume():
                 try:
-                    cmd = [
-                        self.AXIDRAW_PATH,
-                        resume_path,
-                        '--mode', 'res_plot',
-                        '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
-                        '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift']),
-                        '--progress'
-                    ]
-                    cmd.extend(['--output_file', resume_path])
-                    cmd = wrap_command_with_sleep_blocker(cmd)
+                    cmd = self._resume_plot_command(resume_path)
 
                     print("Resuming plot from resume log")
                     print(f"Executing: {' '.join(cmd)}")
@@ -668,9 +1919,7 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                     self.send_progress_update(f"Error: {str(e)}")
                     self.send_progress_update("PLOT_ERROR")
 
-            resume_thread = threading.Thread(target=run_resume)
-            resume_thread.daemon = True
-            resume_thread.start()
+            PlotterHandler.start_plot_thread(run_resume)
             return {
                 'status': 'success',
                 'message': 'Resume command started'
@@ -682,50 +1931,58 @@ class PlotterHandler(SimpleHTTPRequestHandler):
             'toggle': lambda params: [
                 self.AXIDRAW_PATH,
                 '--mode', 'toggle',
-                '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
+                '--model', model,
                 '--pen_pos_up', str(params['pen_pos_up']),
                 '--pen_pos_down', str(params['pen_pos_down']),
                 '--pen_rate_lower', str(params.get('pen_rate_lower', 25)),
-                '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+                '--penlift', penlift
             ],
             'align': lambda params: [
                 self.AXIDRAW_PATH,
                 '--mode', 'align',
-                '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
+                '--model', model,
                 '--pen_pos_up', str(params['pen_pos_up']),
                 '--pen_pos_down', str(params['pen_pos_down']),
-                '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+                '--penlift', penlift
             ],
             'cycle': lambda params: [
                 self.AXIDRAW_PATH,
                 '--mode', 'cycle',
-                '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
+                '--model', model,
                 '--pen_pos_up', str(params['pen_pos_up']),
                 '--pen_pos_down', str(params['pen_pos_down']),
                 '--pen_rate_lower', str(params.get('pen_rate_lower', 25)),
-                '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+                '--penlift', penlift
             ],
             'home': lambda _: None,  # Special case handled below
             'disable_motors': lambda _: [
                 self.AXIDRAW_PATH,
                 '--mode', 'manual',
                 '--manual_cmd', 'disable_xy',
-                '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
-                '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+                '--model', model,
+                '--penlift', penlift
             ],
             'raise_pen': lambda params: [
                 self.AXIDRAW_PATH,
                 '--mode', 'manual',
                 '--manual_cmd', 'raise_pen',
-                '--model', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']),
+                '--model', model,
                 '--pen_pos_up', str(params['pen_pos_up']),
-                '--penlift', str(PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift'])
+                '--penlift', penlift
             ],
             'stop_plot': lambda _: None  # Special case handled below
         }
         
         if command not in commands:
             return {'status': 'error', 'message': f'Unknown command: {command}'}
+
+        foreign_pid = PlotterHandler.foreign_plot_pid()
+        if foreign_pid and command != 'stop_plot':
+            return {
+                'status': 'error',
+                'message': (f'A plot started before the last server restart is still running '
+                            f'(PID {foreign_pid})')
+            }
             
         try:
             if command == 'stop_plot':
@@ -753,30 +2010,24 @@ class PlotterHandler(SimpleHTTPRequestHandler):
                     PlotterHandler.mark_resume_available()
                     return {'status': 'success', 'message': 'Plot stopped'}
                 else:
-                    print("No current plot process found, searching for stray processes...")
-                    found_stray = False
-                    if psutil:
-                        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                            if 'axicli' in str(proc.info.get('name', '')) or \
-                               (proc.info.get('cmdline') and any('axicli' in str(cmd) for cmd in proc.info['cmdline'])):
-                                print(f"Found stray axicli process (PID: {proc.pid})")
-                                proc.terminate()
-                                try:
-                                    print(f"Waiting for stray process {proc.pid} to terminate...")
-                                    proc.wait(timeout=5)
-                                    print(f"Stray process {proc.pid} terminated successfully")
-                                except (psutil.TimeoutExpired, AttributeError):
-                                    print(f"Stray process {proc.pid} did not terminate, attempting to kill...")
-                                    proc.kill()
-                                    print(f"Stray process {proc.pid} killed")
-                                found_stray = True
-                    else:
-                        print("psutil not available; cannot inspect stray processes")
-                    if found_stray:
-                        PlotterHandler.mark_resume_available()
-                    if found_stray:
-                        return {'status': 'success', 'message': 'Stray plot process stopped'}
-                    print("No axicli processes found")
+                    # Plots left by a previous server are recorded with their process group,
+                    # so no host-wide scan is needed
+                    registry = PlotterHandler.get_process_registry()
+                    stopped = []
+                    for record in registry.foreign():
+                        print(f"Interrupting plot owned by a previous server "
+                              f"(PID: {record['pid']})")
+                        if registry.stop(record):
+                            stopped.append(str(record['pid']))
+                    if stopped:
+                        # This server never tracked that plot, so point resume at the shared log
+                        PlotterHandler.mark_resume_available(PlotterHandler._resolve_resume_path())
+                        return {'status': 'success',
+                                'message': f"Stopped plot from a previous server "
+                                           f"(PID {', '.join(stopped)})"}
+                    if foreign_pid:
+                        return {'status': 'error', 'message': f'Failed to stop plot {foreign_pid}'}
+                    print("No registered plot processes found")
                     return {'status': 'success', 'message': 'No active plot to stop'}
             elif command in ('plot', 'resume_plot'):
                 return commands[command](params)
@@ -817,105 +2068,196 @@ class PlotterHandler(SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
     def do_POST(self):
         try:
-            content_length = int(self.headers['Content-Length'])
+            content_length = int(self.headers.get('Content-Length') or 0)
+            if self.path == '/assets':
+                if content_length > MAX_ASSET_BYTES:
+                    # The oversized body is left unread, so the socket cannot be reused
+                    self.close_connection = True
+                    self._send_json(413, {'status': 'error',
+                                          'message': f"Asset exceeds {MAX_ASSET_BYTES} bytes"})
+                    return
+                status, response = self.store_asset(self.rfile.read(content_length))
+                self._send_json(status, response)
+                return
+            if self.path == '/render-cache' and content_length > self.RENDER_CACHE_MAX_ENTRY_BYTES:
+                self.close_connection = True
+                self._send_json(413, {'status': 'error',
+                                      'message': 'Render result is too large to cache'})
+                return
             post_data = self.rfile.read(content_length)
+            if self.path == '/render-cache/clear':
+                self.serve_render_cache('/clear', {})
+                return
+            if self.path.startswith('/render-jobs/'):
+                # Job actions carry no body
+                status, response = self.serve_render_jobs('POST',
+                                                          self.path[len('/render-jobs'):])
+                self._send_json(status, response)
+                return
+            if self.path.startswith('/debug/'):
+                # Debug bodies are optional and never echoed
+                body = json.loads(post_data.decode('utf-8')) if post_data.strip() else {}
+                self.serve_debug('POST', body)
+                return
             data = json.loads(post_data.decode('utf-8'))
             
             # Add this debug print
-            print(f"\nReceived command data:")
-            print(json.dumps(data, indent=2))
+            if self.path not in self.QUIET_POST_PATHS:
+                print(f"\nReceived command data:")
+                print(json.dumps(data, indent=2))
 
             if self.path == '/save-svg':
                 try:
-                    # Create output directory and drawing-specific subdirectory
-                    base_output = getattr(self, 'OUTPUT_ROOT', PlotterHandler.OUTPUT_ROOT)
-                    output_dir = os.path.join(base_output, data['name'])
-                    try:
-                        os.makedirs(output_dir, exist_ok=True)
-                    except OSError as e:
-                        print(f"Error creating output directory: {e}")
-                        raise Exception(f"Failed to create output directory: {str(e)}")
-
-                    # Generate filename with timestamp
-                    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-                    filename = os.path.join(output_dir, f"{timestamp}.svg")
-                    
-                    try:
-                        # Pretty print the SVG
-                        dom = xml.dom.minidom.parseString(data['svg'])
-                        pretty_svg = dom.toprettyxml(indent='  ')
-                    except xml.parsers.expat.ExpatError as e:
-                        print(f"Error parsing SVG data: {e}")
-                        raise Exception(f"Invalid SVG data: {str(e)}")
-                    svg_lines = pretty_svg.splitlines()
-                    if svg_lines and svg_lines[0].lstrip().startswith('<?xml'):
-                        svg_lines = svg_lines[1:]
-                    pretty_svg = '\n'.join(svg_lines).strip() + '\n'
-                    
-                    # Add configuration as comment at the top
-                    config = data.get('config', {})
-                    config_comment = build_config_comment(data['name'], config)
-                    final_svg = config_comment + pretty_svg
-                    
-                    # Write the SVG file
-                    try:
-                        with open(filename, 'w', encoding='utf-8') as f:
-                            f.write(final_svg)
-                    except IOError as e:
-                        print(f"Error writing SVG file: {e}")
-                        raise Exception(f"Failed to write SVG file: {str(e)}")
-                    
+                    filename = self.write_output_svg(data['name'], data['svg'],
+                                                     data.get('config', {}))
+
                     # Send response
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self._send_json(200, {
                         'status': 'success',
                         'filename': filename
-                    }).encode())
+                    })
                 except Exception as e:
                     print(f"Error handling save-svg: {e}")
-                    self.send_response(500)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self._send_json(500, {
                         'status': 'error',
                         'message': str(e)
-                    }).encode())
+                    })
             elif self.path == '/plotter':
                 # Handle plotter commands
                 response = self.handle_command(data)
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
+                self._send_json(200, response)
+            elif self.path == '/tsp-route':
+                response = self.solve_tsp_route(data)
+                self._send_json(200 if response['status'] == 'success' else 400, response)
+            elif self.path == '/preprocess-image':
+                status, response = self.preprocess_image(data)
+                self._send_json(status, response)
+            elif self.path == '/plot-diff':
+                status, response = self.plot_diff(data)
+                self._send_json(status, response)
+            elif self.path == '/impose':
+                status, response = self.impose_outputs(data)
+                self._send_json(status, response)
+            elif self.path in ('/render-cache', '/render-cache/lookup'):
+                self.serve_render_cache(self.path[len('/render-cache'):], data)
+            elif self.path == '/render-jobs':
+                status, response = self.start_render_job(data)
+                self._send_json(status, response)
             else:
                 # Handle non-matching paths with 404
-                self.send_response(404)
-                self.end_headers()
-                self.wfile.write(b'Not Found')
+                self._send_bytes(404, b'Not Found', 'text/plain')
         except Exception as e:
             print(f"Error handling POST: {e}")
-            self.send_response(500)
-            self.end_headers()
-            self.wfile.write(str(e).encode())
+            # The request body may be unread, so the socket cannot carry another request
+            self.close_connection = True
+            self._send_bytes(500, str(e).encode(), 'text/plain')
     
+    @classmethod
+    def start_control_channel_watches(cls):
+        channel = cls.control_channel
+        if channel.watches:
+            return
+        channel.watch('resume', cls.get_resume_status)
+
+        def config_state():
+            registry = cls.get_config_registry()
+            return {'version': registry.snapshot().version, 'error': registry.last_error}
+        channel.watch('config', config_state)
+
+    def serve_control_channel(self):
+        """Upgrade to a WebSocket carrying commands, acks, progress, resume and config state."""
+        problem = ws_channel.handshake_error(self.headers)
+        if problem is not None:
+            self.close_connection = True
+            status = 426 if 'version' in problem else 400
+            self._send_json(status, {'status': 'error', 'message': problem})
+            return
+        if PlotterHandler.draining:
+            self._send_json(503, {'status': 'error', 'message': 'Server is restarting'})
+            return
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept',
+                         ws_channel.accept_key(self.headers['Sec-WebSocket-Key']))
+        SimpleHTTPRequestHandler.end_headers(self)
+        self.close_connection = True
+        self.connection.settimeout(None)  # Liveness comes from ping/pong instead
+
+        def shutdown_socket():
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        connection = ws_channel.WebSocketConnection(
+            self.rfile, self.wfile, max_queue=self.WS_MAX_QUEUE,
+            ping_interval=self.WS_PING_INTERVAL, on_close=shutdown_socket)
+        self.start_control_channel_watches()
+        channel = PlotterHandler.control_channel
+        connection.send({'type': 'hello', 'protocol': 1})
+        channel.add(connection)
+        # Commands can block for seconds (homing, manual moves), so they run in order on a
+        # worker and this loop keeps answering pings. stop_plot skips the queue.
+        commands = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ws-command')
+        try:
+            for message in connection.messages():
+                if isinstance(message, dict) and message.get('type') == 'command':
+                    if message.get('command') == 'stop_plot':
+                        threading.Thread(target=self.reply_to_control_message,
+                                         args=(connection, message), daemon=True).start()
+                    else:
+                        commands.submit(self.reply_to_control_message, connection, message)
+                    continue
+                self.reply_to_control_message(connection, message)
+        finally:
+            commands.shutdown(wait=False, cancel_futures=True)
+            channel.discard(connection)
+            connection.close()
+            connection.join(timeout=2)
+
+    def reply_to_control_message(self, connection, message):
+        reply = self.handle_control_message(message)
+        if reply is not None:
+            connection.send(reply)
+
+    def handle_control_message(self, message):
+        if not isinstance(message, dict):
+            return {'type': 'error', 'message': 'Messages must be JSON objects'}
+        kind = message.get('type')
+        request_id = message.get('id')
+        if kind == 'command':
+            params = {key: value for key, value in message.items() if key not in ('type', 'id')}
+            try:
+                response = self.handle_command(params)
+            except Exception as e:
+                print(f"Error handling control command: {e}")
+                response = {'status': 'error', 'message': str(e)}
+            return {'type': 'ack', 'id': request_id, **response}
+        if kind == 'resume':
+            return {'type': 'resume', 'id': request_id, **self.get_resume_status()}
+        if kind == 'ping':
+            return {'type': 'pong', 'id': request_id}
+        return {'type': 'error', 'id': request_id, 'message': f"Unknown message type: {kind}"}
+
     def send_progress_update(self, message, payload=None):
         envelope = {'progress': message}
         if payload is not None:
             envelope['payload'] = payload
+        if len(PlotterHandler.control_channel):
+            coalesce = message if message in self.COALESCED_PROGRESS else None
+            PlotterHandler.control_channel.broadcast({'type': 'progress', **envelope},
+                                                     coalesce=coalesce)
         data = f"data: {json.dumps(envelope)}\n\n".encode('utf-8')
         # Send to all active connections
         disconnected = set()
-        for connection in PlotterHandler.sse_connections:
+        for connection in list(PlotterHandler.sse_connections):
             try:
-                connection.wfile.write(data)
-                connection.wfile.flush()
+                connection.write_sse_chunk(data)
             except Exception as e:
                 print(f"Error sending progress update to client: {e}")
                 disconnected.add(connection)
@@ -924,6 +2266,10 @@ class PlotterHandler(SimpleHTTPRequestHandler):
         PlotterHandler.sse_connections.difference_update(disconnected)
 
     def end_headers(self):
+        if PlotterHandler.draining:
+            # Push keep-alive clients over to the replacement server
+            self.send_header('Connection', 'close')
+            self.close_connection = True
         self.send_header('Access-Control-Allow-Origin', '*')
         SimpleHTTPRequestHandler.end_headers(self)
 
@@ -944,24 +2290,160 @@ def cleanup_temp_files():
     except Exception as e:
         print(f"❌ Error during cleanup: {e}")
 
-def create_server(host='', port=8000):
+LISTEN_FD_ENV = 'PLOTTER_LISTEN_FD'  # Listening socket inherited from server_runner's supervisor
+READY_FD_ENV = 'PLOTTER_READY_FD'  # Pipe used to tell the supervisor this worker is accepting
+
+
+def create_server(host='', port=8000, listen_fd=None, profile=None):
+    """Bind (or adopt ``listen_fd``) and return the server.
+
+    Start-up work that scans the disk runs on a background thread once the
+    socket is listening; see ``PlotterHandler.finish_startup``.
+    """
+    profile = profile or StartupProfile()
     try:
-        cleanup_temp_files()  # Add cleanup call
-        PlotterHandler.bootstrap_resume_state()
+        with profile.step('remove legacy debug token'):
+            PlotterHandler.remove_legacy_debug_token()  # Never serve it, not even briefly
         server_address = (host, port)
-        httpd = ThreadingHTTPServer(server_address, PlotterHandler)
+        with profile.step('bind'):
+            if listen_fd is not None:
+                # Adopt the supervisor's socket instead of binding, so restarts never refuse
+                # connections
+                httpd = ThreadingHTTPServer(server_address, PlotterHandler,
+                                            bind_and_activate=False)
+                httpd.socket.close()
+                httpd.socket = socket.socket(fileno=listen_fd)
+                httpd.server_address = httpd.socket.getsockname()[:2]
+                httpd.server_name, httpd.server_port = httpd.server_address
+            else:
+                httpd = ThreadingHTTPServer(server_address, PlotterHandler)
+        profile.mark_listening()
+        with profile.step('start output archiving'):
+            PlotterHandler.start_output_archiving()
+        PlotterHandler.startup_ready.clear()
+        PlotterHandler.startup_thread = threading.Thread(
+            target=PlotterHandler.finish_startup, args=(profile,), name='startup', daemon=True)
+        PlotterHandler.startup_thread.start()
         print(f'🚀 Server running on http://{host or "localhost"}:{httpd.server_address[1]}')
         return httpd
     except Exception as e:
         print(f"❌ Error creating server: {e}")
         raise
 
-if __name__ == '__main__':
+
+def drain_server(httpd):
+    """Finish a running plot and flush its SSE clients before closing; new requests go elsewhere."""
+    PlotterHandler.draining = True
+    if PlotterHandler.plot_in_progress():
+        print("⏳ Waiting for the running plot to finish before exiting...")
+        while PlotterHandler.plot_in_progress():
+            time.sleep(0.5)
+    time.sleep(PlotterHandler.DRAIN_GRACE_SECONDS)
+    PlotterHandler.keep_sse_alive = False
+    PlotterHandler.control_channel.close_all(ws_channel.CLOSE_GOING_AWAY, 'Server restarting')
+    httpd.server_close()
+    if is_loaded(tsp_solver):
+        tsp_solver.shutdown_executor()
+    PlotterHandler.stop_render_pool()
+
+
+def interrupt_running_plot():
+    process = PlotterHandler.current_plot_process
+    if process is not None and process.poll() is None:
+        # The plot has its own session, so it no longer receives the terminal's Ctrl+C
+        PlotterHandler.plot_interrupted = True
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def notify_supervisor_ready():
+    ready_fd = os.environ.pop(READY_FD_ENV, None)
+    if not ready_fd:
+        return
+    try:
+        os.write(int(ready_fd), b'ready\n')
+        os.close(int(ready_fd))
+    except (OSError, ValueError) as e:
+        print(f"Could not notify supervisor: {e}")
+
+
+def reload_configs():
+    """Re-read config/*.json now instead of on the next mtime check.
+
+    Invalid files keep the current snapshot.
+    """
+    registry = PlotterHandler.get_config_registry()
+    if registry.reload(force=True):
+        snapshot = registry.snapshot()
+        print(f"⚙️ Config reloaded (version {snapshot.version}, plotter: {snapshot.plotter_id})")
+        return True
+    return registry.last_error is None
+
+
+def serve(httpd):
+    """Serve until SIGTERM (graceful drain) or Ctrl+C (interrupt the plot and exit)."""
+    def request_drain(signum, frame):
+        print('\n🔁 Draining: no longer accepting new connections')
+        # shutdown() blocks until serve_forever returns, so it cannot run on the serving thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_drain)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_configs())
+    notify_supervisor_ready()
     try:
-        httpd = create_server()
         httpd.serve_forever()
     except KeyboardInterrupt:
         print('\n👋 Server shutting down...')
+        interrupt_running_plot()
         httpd.server_close()
+        if is_loaded(tsp_solver):
+            tsp_solver.shutdown_executor()
+        return
+    drain_server(httpd)
+
+
+def report_startup_profile(profile):
+    """Wait for the background start-up, import each deferred module once and print the timings."""
+    PlotterHandler.startup_thread.join()
+    for module in (pprint, minidom, tsp_solver, image_preprocess.np, image_preprocess.Image,
+                   preflight.np):
+        if module is not None:
+            load(module)
+    for name, seconds in sorted(LOAD_TIMES.items(), key=lambda item: -item[1]):
+        profile.record('deferred', name, seconds)
+    print(profile.format())
+
+
+def parse_args(argv=None):
+    import argparse  # Only the script needs it
+
+    parser = argparse.ArgumentParser(description='Serve the plotter UI and control the AxiDraw.')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Start, print how long imports and start-up steps took, and exit')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    startup_profile = StartupProfile(started=IMPORT_STARTED)
+    startup_profile.record('import', 'modules', _MODULES_IMPORTED - IMPORT_STARTED)
+    startup_profile.record('import', 'server.py', time.perf_counter() - _MODULES_IMPORTED)
+    try:
+        args = parse_args()
+        inherited_fd = os.environ.pop(LISTEN_FD_ENV, None)
+        httpd = create_server(args.host, args.port,
+                              listen_fd=int(inherited_fd) if inherited_fd else None,
+                              profile=startup_profile)
+        if args.profile_startup:
+            report_startup_profile(startup_profile)
+            httpd.server_close()
+        else:
+            serve(httpd)
     except Exception as e:
         print(f"❌ Server error: {e}")
@@ -2,16 +2,77 @@ import sys
 import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+import argparse
+import select
+import socket
 import subprocess
 import os
 import signal
+import threading
+try:
+    from file_watch import ContentHashes, DEFAULT_EXCLUDE, DEFAULT_INCLUDE, Debouncer, WatchRules
+except ImportError:
+    from .file_watch import ContentHashes, DEFAULT_EXCLUDE, DEFAULT_INCLUDE, Debouncer, WatchRules
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(__file__), 'server.py')
+LISTEN_FD_ENV = 'PLOTTER_LISTEN_FD'
+READY_FD_ENV = 'PLOTTER_READY_FD'
+READY_TIMEOUT = 15.0  # Seconds a new worker gets to start accepting before it is abandoned
+
+
+def open_listen_socket(host, port):
+    """Bind the shared listening socket once; every worker inherits this same fd."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(128)
+    listener.set_inheritable(True)
+    return listener
+
 
 class ServerRestartHandler(FileSystemEventHandler):
-    def __init__(self):
+    """Restart server.py on Python changes and have it reload ``config/*.json`` in place.
+
+    In supervisor mode (the default) the runner owns the listening socket.
+    A replacement worker is started on the inherited fd and only once it
+    reports ready is the old worker sent SIGTERM, which makes it stop
+    accepting, finish any running plot and exit. A worker that fails to
+    start (e.g. a syntax error mid-edit) is discarded and the old one keeps
+    serving. With ``supervise=False`` the previous kill-and-respawn
+    behaviour is used.
+    """
+
+    def __init__(self, host='', port=8000, supervise=True, rules=None, debounce=0.3):
         self.server_process = None
+        self.draining_processes = []
+        # Held while workers are replaced, reaped or shut down (a restart may take READY_TIMEOUT)
+        self.process_lock = threading.RLock()
+        self.observer = None
+        self.watched = set()
+        self.rules = rules or WatchRules('.')
+        self.hashes = ContentHashes(self.rules.files())
+        self.debouncer = Debouncer(self.on_files_changed, debounce)
+        self.listen_socket = open_listen_socket(host, port) if supervise else None
         self.start_server()
 
     def start_server(self):
+        with self.process_lock:
+            if self.listen_socket is None:
+                self.restart_in_place()
+            else:
+                self.replace_worker()
+
+    def watch(self, start=None):
+        """Schedule a non-recursive watch on every relevant directory under ``start``."""
+        added = []
+        for directory in self.rules.directories(start):
+            if directory not in self.watched:
+                self.observer.schedule(self, path=directory, recursive=False)
+                self.watched.add(directory)
+                added.append(directory)
+        return added
+
+    def restart_in_place(self):
         if self.server_process:
             print("\n🛑 Stopping previous server instance...")
             # Send SIGTERM to process group
@@ -21,36 +82,166 @@ class ServerRestartHandler(FileSystemEventHandler):
             except subprocess.TimeoutExpired:
                 # Force kill if it doesn't shut down gracefully
                 os.killpg(os.getpgid(self.server_process.pid), signal.SIGKILL)
-            
+
         print("\n🔄 Starting server...")
         # Start new process in its own process group
         self.server_process = subprocess.Popen(
-            [sys.executable, os.path.join(os.path.dirname(__file__), 'server.py')],
+            [sys.executable, SERVER_SCRIPT],
             preexec_fn=os.setsid
         )
 
-    def on_modified(self, event):
-        if event.src_path.endswith('.py'):
-            print(f"\n📝 Detected change in {os.path.basename(event.src_path)}")
+    def replace_worker(self):
+        print("\n🔄 Starting server...")
+        ready_read, ready_write = os.pipe()
+        env = dict(os.environ)
+        env[LISTEN_FD_ENV] = str(self.listen_socket.fileno())
+        env[READY_FD_ENV] = str(ready_write)
+        try:
+            process = subprocess.Popen(
+                [sys.executable, SERVER_SCRIPT],
+                env=env,
+                pass_fds=(self.listen_socket.fileno(), ready_write),
+                start_new_session=True
+            )
+        finally:
+            os.close(ready_write)
+        try:
+            ready = self.wait_for_ready(process, ready_read)
+        finally:
+            os.close(ready_read)
+
+        if not ready:
+            print("❌ New server failed to start; previous instance keeps serving")
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            return
+
+        previous, self.server_process = self.server_process, process
+        if previous and previous.poll() is None:
+            print(f"🔁 Draining previous server (pid {previous.pid})")
+            # Signal only the worker, not its group: a running plot must not see this
+            previous.send_signal(signal.SIGTERM)
+            self.draining_processes.append(previous)
+
+    def wait_for_ready(self, process, ready_read):
+        deadline = time.time() + READY_TIMEOUT
+        while time.time() < deadline:
+            readable, _, _ = select.select([ready_read], [], [], 0.2)
+            if readable:
+                # EOF without data means the worker exited before accepting
+                return bool(os.read(ready_read, 64))
+            if process.poll() is not None:
+                return False
+        return False
+
+    def reap(self):
+        # Skip this round rather than block the main loop behind a restart
+        if not self.process_lock.acquire(blocking=False):
+            return
+        try:
+            for process in list(self.draining_processes):
+                if process.poll() is not None:
+                    print(f"✅ Previous server (pid {process.pid}) exited")
+                    self.draining_processes.remove(process)
+        finally:
+            self.process_lock.release()
+
+    def shutdown(self):
+        with self.process_lock:
+            processes = [p for p in [self.server_process, *self.draining_processes]
+                         if p and p.poll() is None]
+        for process in processes:
+            # Workers run in their own session, so forward the Ctrl+C explicitly
+            process.send_signal(signal.SIGINT)
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+        if self.listen_socket:
+            self.listen_socket.close()
+
+    def reload_config(self):
+        if self.server_process and self.server_process.poll() is None:
+            # The server re-reads config/*.json on SIGHUP; no restart needed
+            self.server_process.send_signal(signal.SIGHUP)
+
+    def on_any_event(self, event):
+        if event.event_type not in ('created', 'modified', 'moved'):
+            return
+        # Editors that save via rename report the real file as the move destination
+        path = getattr(event, 'dest_path', None) or event.src_path
+        if event.is_directory:
+            if event.event_type != 'modified' and self.observer is not None:
+                self.on_directory_added(path)
+            return
+        if self.rules.matches(path) and self.hashes.changed(path):
+            self.debouncer.add(path)
+
+    def on_directory_added(self, path):
+        """Watch a directory created (or moved in) after startup and pick up files already in it."""
+        if not self.watch(path):
+            return
+        for file_path in self.rules.files(path):
+            if self.hashes.changed(file_path):
+                self.debouncer.add(file_path)
+
+    def on_files_changed(self, paths):
+        # Runs on the debouncer's timer thread; Debouncer never overlaps calls
+        names = ', '.join(os.path.basename(path) for path in paths)
+        if any(path.endswith('.py') for path in paths):
+            print(f"\n📝 Detected change in {names}")
             self.start_server()
+        else:
+            print(f"\n⚙️ Reloading config after change in {names}")
+            self.reload_config()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run server.py and restart it when Python files change.')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--no-supervise', action='store_true',
+                        help='Kill and respawn the server on change instead of handing over '
+                             'the socket')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help=f"Watch paths matching GLOB (default: {' '.join(DEFAULT_INCLUDE)})")
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='Skip paths or directories matching GLOB, in addition to the defaults')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='Seconds of quiet before a burst of changes triggers a restart')
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    event_handler = ServerRestartHandler()
+    args = parse_args()
+    rules = WatchRules('.', include=args.include or DEFAULT_INCLUDE,
+                       exclude=(*DEFAULT_EXCLUDE, *args.exclude))
+    event_handler = ServerRestartHandler(args.host, args.port, supervise=not args.no_supervise,
+                                         rules=rules, debounce=args.debounce)
     observer = Observer()
-    observer.schedule(event_handler, path='.', recursive=True)
+    event_handler.observer = observer
+    # One non-recursive watch per relevant directory, not one recursive watch over node_modules
+    watched = event_handler.watch()
     observer.start()
-    print("\n👀 Watching for changes in Python files...")
+    print(f"\n👀 Watching {len(watched)} directories for {', '.join(rules.include)} changes...")
 
     try:
         while True:
             time.sleep(1)
+            event_handler.reap()
     except KeyboardInterrupt:
         print("\n👋 Shutting down server and watcher...")
-        if event_handler.server_process:
+        if event_handler.listen_socket is None and event_handler.server_process:
             os.killpg(os.getpgid(event_handler.server_process.pid), signal.SIGTERM)
             try:
                 event_handler.server_process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 os.killpg(os.getpgid(event_handler.server_process.pid), signal.SIGKILL)
+        else:
+            event_handler.shutdown()
+        event_handler.debouncer.cancel()
         observer.stop()
     observer.join()
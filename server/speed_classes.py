@@ -0,0 +1,129 @@
+"""Speed classes: plot dense detail gently and long straight runs quickly.
+
+Each stroke in a layer is classified by its mean segment length and turning
+density (radians of heading change per millimetre drawn). Strokes of the same
+class become one sub-layer run, plotted with the speed/acceleration/pen-rate
+settings the medium allows for that class in ``config/mediums.json``
+(``plotterDefaults.speedClasses``), clamped to ``plotterDefaults.speedLimits``.
+"""
+import math
+
+try:
+    from svg_layers import element_polylines, layer_stroke_elements, polyline_length
+except ImportError:
+    from .svg_layers import element_polylines, layer_stroke_elements, polyline_length
+
+SPEED_CLASS_ORDER = ('long', 'standard', 'detail')
+
+# Thresholds used to bucket strokes; tuned for mm-based plot SVGs.
+DETAIL_MAX_MEAN_SEGMENT_MM = 1.5
+DETAIL_MIN_TURN_DENSITY = 0.35
+DETAIL_MAX_LENGTH_MM = 3.0
+LONG_MIN_MEAN_SEGMENT_MM = 10.0
+LONG_MAX_TURN_DENSITY = 0.05
+
+# axicli's own defaults, which plots used before speed classes existed
+AXICLI_DEFAULT_SETTINGS = {'speedPendown': 25, 'speedPenup': 75, 'accel': 75, 'penRateLower': 50}
+
+# Fallbacks when a medium does not describe its own classes. None is faster than
+# axicli's defaults: only mediums that list ``speedClasses`` opt in to faster runs.
+DEFAULT_SPEED_CLASSES = {
+    'detail': {'speedPendown': 15, 'accel': 50},
+    'standard': {'speedPendown': 25, 'accel': 75},
+    'long': {'speedPendown': 25, 'accel': 75}
+}
+DEFAULT_SPEED_LIMITS = {
+    'speedPendownMax': 60,
+    'accelMax': 100,
+    'penRateLowerMax': 100
+}
+
+_SETTING_KEYS = {
+    'speedPendown': ('speed_pendown', 'speedPendownMax'),
+    'speedPenup': ('speed_penup', 'speedPenupMax'),
+    'accel': ('accel', 'accelMax'),
+    'penRateLower': ('pen_rate_lower', 'penRateLowerMax')
+}
+
+
+def select_medium(config, medium_id=None):
+    """Pick ``medium_id`` (or the default) from a parsed mediums.json mapping."""
+    mediums = config.get('mediums') or {}
+    default = config.get('default')
+    return mediums.get(medium_id or default) or mediums.get(default) or {}
+
+
+def stroke_metrics(element):
+    """Return ``(length_mm, mean_segment_mm, turn_density)`` for one stroke element."""
+    total_length = 0.0
+    segments = 0
+    turning = 0.0
+    for points in element_polylines(element):
+        total_length += polyline_length(points)
+        headings = []
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            if x1 == x2 and y1 == y2:
+                continue
+            segments += 1
+            headings.append(math.atan2(y2 - y1, x2 - x1))
+        for before, after in zip(headings, headings[1:]):
+            delta = abs(after - before) % (2 * math.pi)
+            turning += min(delta, 2 * math.pi - delta)
+    if segments == 0 or total_length <= 0:
+        return 0.0, 0.0, 0.0
+    return total_length, total_length / segments, turning / total_length
+
+
+def classify_stroke(element):
+    length, mean_segment, turn_density = stroke_metrics(element)
+    if (length < DETAIL_MAX_LENGTH_MM or mean_segment < DETAIL_MAX_MEAN_SEGMENT_MM
+            or turn_density > DETAIL_MIN_TURN_DENSITY):
+        return 'detail', length
+    if mean_segment >= LONG_MIN_MEAN_SEGMENT_MM and turn_density <= LONG_MAX_TURN_DENSITY:
+        return 'long', length
+    return 'standard', length
+
+
+def resolve_class_settings(medium, speed_class):
+    """Map a medium's class settings onto axicli option names, clamped to its limits."""
+    defaults = (medium or {}).get('plotterDefaults') or {}
+    classes = defaults.get('speedClasses') or DEFAULT_SPEED_CLASSES
+    limits = dict(DEFAULT_SPEED_LIMITS)
+    limits.update(defaults.get('speedLimits') or {})
+    raw = classes.get(speed_class) or DEFAULT_SPEED_CLASSES.get(speed_class) or {}
+    settings = {}
+    for key, (option, limit_key) in _SETTING_KEYS.items():
+        value = raw.get(key)
+        if not isinstance(value, (int, float)):
+            continue
+        limit = limits.get(limit_key)
+        if isinstance(limit, (int, float)):
+            value = min(value, limit)
+        settings[option] = max(1, int(round(value)))
+    return settings
+
+
+def plan_speed_classes(root, layer, medium=None):
+    """Group a layer's strokes by speed class, keeping document order inside each class.
+
+    Returns the plan shape ``ChunkCheckpoint.create`` expects, one entry per
+    non-empty class in ``SPEED_CLASS_ORDER``.
+    """
+    buckets = {name: {'indices': [], 'length': 0.0} for name in SPEED_CLASS_ORDER}
+    for index, (_, element) in enumerate(layer_stroke_elements(root, layer)):
+        speed_class, length = classify_stroke(element)
+        buckets[speed_class]['indices'].append(index)
+        buckets[speed_class]['length'] += length
+    plan = []
+    for name in SPEED_CLASS_ORDER:
+        bucket = buckets[name]
+        if not bucket['indices']:
+            continue
+        plan.append({
+            'indices': bucket['indices'],
+            'length': bucket['length'],
+            'label': f"{name} strokes",
+            'speedClass': name,
+            'settings': resolve_class_settings(medium, name)
+        })
+    return plan
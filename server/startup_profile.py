@@ -0,0 +1,52 @@
+"""Timings of the server's imports and start-up steps, for ``server.py --profile-startup``.
+
+Steps fall into phases: ``import`` (module loading), ``startup`` (before the
+server accepts connections), ``background`` (start-up work that runs once it
+does) and ``deferred`` (modules that are only imported on first use).
+"""
+import contextlib
+import threading
+import time
+
+# server.py imports this module before any other, so this is when its imports began
+IMPORT_STARTED = time.perf_counter()
+
+PHASES = ('import', 'startup', 'background', 'deferred')
+
+
+class StartupProfile:
+    def __init__(self, started=None, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock() if started is None else started
+        self.listening = None  # Seconds from ``started`` until the socket accepted connections
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def record(self, phase, name, seconds):
+        with self.lock:
+            self.entries.append((phase, name, seconds))
+
+    @contextlib.contextmanager
+    def step(self, name, phase='startup'):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.record(phase, name, self.clock() - started)
+
+    def mark_listening(self):
+        self.listening = self.clock() - self.started
+
+    def format(self):
+        with self.lock:
+            entries = list(self.entries)
+        width = max([len(name) for _, name, _ in entries] + [10])
+        lines = ['Startup profile (ms)']
+        for phase in PHASES:
+            for entry_phase, name, seconds in entries:
+                if entry_phase == phase:
+                    lines.append(f"  {phase:<10}  {name:<{width}}  {seconds * 1000:8.1f}")
+            if phase == 'startup' and self.listening is not None:
+                lines.append(f"  {'listening':<10}  {'since the first import':<{width}}  "
+                             f"{self.listening * 1000:8.1f}")
+        return '\n'.join(lines)
@@ -0,0 +1,245 @@
+"""Inkscape layer and stroke geometry helpers for plot SVGs.
+
+The client emits layers as ``<g inkscape:groupmode="layer" inkscape:label="N-Name">``
+groups filled with ``M … L …`` paths, so this module only needs a small subset of
+SVG: straight path commands (curves are flattened to their end points) plus
+``polyline``/``polygon``/``line``/``rect`` elements. Transforms are ignored.
+"""
+import copy
+import math
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+INKSCAPE_NS = 'http://www.inkscape.org/namespaces/inkscape'
+GROUPMODE_ATTR = f'{{{INKSCAPE_NS}}}groupmode'
+LABEL_ATTR = f'{{{INKSCAPE_NS}}}label'
+STROKE_TAGS = ('path', 'polyline', 'polygon', 'line', 'rect')
+# Attributes that position a stroke; rewriting it as a ``path`` replaces all of them
+GEOMETRY_ATTRS = {'d', 'points', 'x', 'y', 'width', 'height', 'rx', 'ry',
+                  'x1', 'y1', 'x2', 'y2', 'transform'}
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('inkscape', INKSCAPE_NS)
+
+_PATH_TOKEN_REGEX = re.compile(r'[MmLlHhVvZzCcSsQqTtAa]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_LAYER_NUMBER_REGEX = re.compile(r'^\s*(\d+)')
+_COMMAND_ARITY = {
+    'M': 2, 'L': 2, 'H': 1, 'V': 1, 'Z': 0,
+    'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7
+}
+
+
+def parse_svg(svg_text):
+    """Parse SVG markup into an ElementTree root element."""
+    if isinstance(svg_text, bytes):
+        return ET.fromstring(svg_text)
+    return ET.fromstring(svg_text.encode('utf-8'))
+
+
+def serialize_svg(root):
+    return ET.tostring(root, encoding='unicode')
+
+
+def local_name(element):
+    tag = element.tag
+    if not isinstance(tag, str):
+        return ''
+    return tag.rsplit('}', 1)[-1]
+
+
+def layer_number(label):
+    """Return the leading layer number of an Inkscape label, as axicli reads it."""
+    if label is None:
+        return None
+    match = _LAYER_NUMBER_REGEX.match(str(label))
+    return int(match.group(1)) if match else None
+
+
+def iter_layers(root):
+    """Yield ``(parent, layer_element)`` pairs for every Inkscape layer group."""
+    for parent in root.iter():
+        for child in list(parent):
+            if local_name(child) == 'g' and child.get(GROUPMODE_ATTR) == 'layer':
+                yield parent, child
+
+
+def find_layers(root, layer):
+    """Return the layer groups axicli would plot for ``--layer <layer>``."""
+    target = layer_number(layer)
+    if target is None:
+        return []
+    return [group for _, group in iter_layers(root)
+            if layer_number(group.get(LABEL_ATTR)) == target]
+
+
+def iter_stroke_elements(element):
+    for child in element.iter():
+        if local_name(child) in STROKE_TAGS:
+            yield child
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_points_attr(raw):
+    tokens = re.findall(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?', raw or '')
+    numbers = [float(token) for token in tokens]
+    return [(numbers[i], numbers[i + 1]) for i in range(0, len(numbers) - 1, 2)]
+
+
+def path_polylines(d):
+    """Flatten path data into a list of polylines (lists of ``(x, y)`` tuples)."""
+    tokens = _PATH_TOKEN_REGEX.findall(d or '')
+    polylines = []
+    current = []
+    x = y = 0.0
+    start = (0.0, 0.0)
+    command = None
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.isalpha():
+            command = token
+            index += 1
+            if command in 'Zz':
+                if current:
+                    current.append(start)
+                    polylines.append(current)
+                    current = []
+                x, y = start
+                continue
+        elif command is None:
+            index += 1
+            continue
+        arity = _COMMAND_ARITY[command.upper()]
+        args = tokens[index:index + arity]
+        if len(args) < arity or any(arg.isalpha() for arg in args):
+            break
+        index += arity
+        values = [float(arg) for arg in args]
+        relative = command.islower()
+        upper = command.upper()
+        if upper == 'H':
+            x = x + values[0] if relative else values[0]
+        elif upper == 'V':
+            y = y + values[0] if relative else values[0]
+        else:
+            dx, dy = values[-2], values[-1]
+            x, y = (x + dx, y + dy) if relative else (dx, dy)
+        if upper == 'M':
+            if len(current) > 1:
+                polylines.append(current)
+            current = [(x, y)]
+            start = (x, y)
+            # Subsequent coordinate pairs after a moveto are implicit linetos.
+            command = 'l' if relative else 'L'
+            continue
+        if not current:
+            current = [start]
+        current.append((x, y))
+    if len(current) > 1:
+        polylines.append(current)
+    return polylines
+
+
+def element_polylines(element):
+    name = local_name(element)
+    if name == 'path':
+        return path_polylines(element.get('d'))
+    if name in ('polyline', 'polygon'):
+        points = _parse_points_attr(element.get('points'))
+        if name == 'polygon' and points:
+            points.append(points[0])
+        return [points] if len(points) > 1 else []
+    if name == 'line':
+        return [[
+            (_float(element.get('x1')), _float(element.get('y1'))),
+            (_float(element.get('x2')), _float(element.get('y2')))
+        ]]
+    if name == 'rect':
+        x = _float(element.get('x'))
+        y = _float(element.get('y'))
+        w = _float(element.get('width'))
+        h = _float(element.get('height'))
+        return [[(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]]
+    return []
+
+
+def format_path(polylines):
+    """Path data drawing ``polylines`` with absolute ``M``/``L`` commands."""
+    commands = []
+    for points in polylines:
+        head, rest = points[0], points[1:]
+        commands.append(f"M {head[0]:.3f} {head[1]:.3f} "
+                        + ' '.join(f"L {x:.3f} {y:.3f}" for x, y in rest))
+    return ' '.join(commands)
+
+
+def rewrite_stroke(element, polylines):
+    """Turn ``element`` into a ``path`` drawing only ``polylines``, keeping its styling."""
+    namespace = element.tag[:element.tag.index('}') + 1] if element.tag.startswith('{') else ''
+    for attr in GEOMETRY_ATTRS:
+        element.attrib.pop(attr, None)
+    element.tag = f'{namespace}path'
+    element.set('d', format_path(polylines))
+
+
+def polyline_length(points):
+    return sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(points, points[1:]))
+
+
+def element_length(element):
+    return sum(polyline_length(points) for points in element_polylines(element))
+
+
+def layer_stroke_elements(root, layer):
+    """Return ``(layer_group, stroke_element)`` pairs for the requested layer, in document order."""
+    pairs = []
+    for group in find_layers(root, layer):
+        for element in iter_stroke_elements(group):
+            pairs.append((group, element))
+    return pairs
+
+
+def layer_polylines(root, layer):
+    polylines = []
+    for _, element in layer_stroke_elements(root, layer):
+        polylines.extend(element_polylines(element))
+    return polylines
+
+
+def extract_layer_svg(root, layer, keep=None):
+    """Return a copy of ``root`` holding only ``layer``'s strokes.
+
+    Other Inkscape layers are dropped. When ``keep`` is given it must be a set of
+    ``id()`` values of stroke elements in the original tree; strokes outside it are
+    removed so callers can carve a layer into smaller plot files.
+    """
+    clone = copy.deepcopy(root)
+    clone_layers = set(id(group) for group in find_layers(clone, layer))
+    for parent, group in list(iter_layers(clone)):
+        if id(group) not in clone_layers:
+            parent.remove(group)
+    if keep is None:
+        return clone
+    source_strokes = [
+        element for group in find_layers(root, layer) for element in iter_stroke_elements(group)
+    ]
+    clone_strokes = [
+        element for group in find_layers(clone, layer) for element in iter_stroke_elements(group)
+    ]
+    doomed = {
+        id(cloned) for original, cloned in zip(source_strokes, clone_strokes)
+        if id(original) not in keep
+    }
+    for group in find_layers(clone, layer):
+        for parent in list(group.iter()):
+            for child in list(parent):
+                if id(child) in doomed:
+                    parent.remove(child)
+    return clone
@@ -0,0 +1,464 @@
+"""Open-path TSP route solver for point-cloud drawings such as the TSP Portrait.
+
+Routes start from a grid-indexed nearest-neighbour tour and are then improved
+with 2-opt and Or-opt moves restricted to each point's k nearest neighbours.
+Large point sets are cut into tiles that are solved in parallel on a
+``ProcessPoolExecutor``; tile tours are stitched in serpentine order and the
+joined route gets a final neighbour-list pass. Results are cached by a hash of
+the point set so re-renders with unchanged sampling come back immediately.
+"""
+import collections
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from disk_cache import prune_directory, touch
+except ImportError:
+    from .disk_cache import prune_directory, touch
+
+DEFAULT_NEIGHBOURS = 8
+DEFAULT_TILE_SIZE = 5000
+DEFAULT_TIME_BUDGET = 20.0
+PARALLEL_THRESHOLD = 8000
+MAX_OR_OPT_SEGMENT = 3
+EPSILON = 1e-9
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def worker_count():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def get_executor():
+    """Return the shared process pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # The server is multithreaded and holds client sockets; forked workers would inherit
+            # both, so start them fresh instead
+            _executor = ProcessPoolExecutor(max_workers=worker_count(),
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def normalize_points(raw_points):
+    """Accept ``[[x, y], …]``, ``[{'x', 'y'}, …]`` or a flat ``[x0, y0, x1, …]`` list."""
+    if not isinstance(raw_points, list):
+        raise ValueError('points must be a list')
+    if raw_points and isinstance(raw_points[0], (int, float)):
+        if len(raw_points) % 2:
+            raise ValueError('flat point lists need an even number of values')
+        return [(float(raw_points[i]), float(raw_points[i + 1]))
+                for i in range(0, len(raw_points), 2)]
+    points = []
+    for entry in raw_points:
+        if isinstance(entry, dict):
+            points.append((float(entry['x']), float(entry['y'])))
+        else:
+            points.append((float(entry[0]), float(entry[1])))
+    return points
+
+
+def point_set_hash(points):
+    digest = hashlib.sha1()
+    for x, y in points:
+        digest.update(struct.pack('<dd', x, y))
+    return digest.hexdigest()
+
+
+def route_length(points, route):
+    return sum(
+        math.hypot(points[b][0] - points[a][0], points[b][1] - points[a][1])
+        for a, b in zip(route, route[1:])
+    )
+
+
+class GridIndex:
+    """Uniform grid bucketing points for nearest-neighbour queries."""
+
+    def __init__(self, points, per_cell=2.0):
+        self.points = points
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        self.min_x, self.min_y = min(xs), min(ys)
+        span_x = max(xs) - self.min_x
+        span_y = max(ys) - self.min_y
+        longest = max(span_x, span_y, 1e-6)
+        # Near-collinear clouds would otherwise get microscopic cells
+        area = max(span_x * span_y, longest * longest / max(1, len(points)))
+        self.cell = max(math.sqrt(area * per_cell / max(1, len(points))), longest / 4096)
+        self.cols = int(span_x / self.cell) + 1
+        self.rows = int(span_y / self.cell) + 1
+        self.cells = collections.defaultdict(list)
+        for index, (x, y) in enumerate(points):
+            self.cells[self.cell_of(x, y)].append(index)
+
+    def cell_of(self, x, y):
+        return int((x - self.min_x) / self.cell), int((y - self.min_y) / self.cell)
+
+    def ring(self, cx, cy, radius):
+        """Yield the in-bounds cells at Chebyshev distance ``radius`` from ``(cx, cy)``."""
+        if radius == 0:
+            yield cx, cy
+            return
+        x_low, x_high = max(0, cx - radius), min(self.cols - 1, cx + radius)
+        y_low, y_high = max(0, cy - radius + 1), min(self.rows - 1, cy + radius - 1)
+        for gy in (cy - radius, cy + radius):
+            if 0 <= gy < self.rows:
+                for gx in range(x_low, x_high + 1):
+                    yield gx, gy
+        for gx in (cx - radius, cx + radius):
+            if 0 <= gx < self.cols:
+                for gy in range(y_low, y_high + 1):
+                    yield gx, gy
+
+    def neighbours(self, index, k):
+        """Return up to ``k`` nearest other points of ``index``, closest first."""
+        x, y = self.points[index]
+        cx, cy = self.cell_of(x, y)
+        found = []
+        max_radius = max(self.cols, self.rows)
+        radius = 0
+        while radius <= max_radius:
+            for key in self.ring(cx, cy, radius):
+                for other in self.cells.get(key, ()):
+                    if other != index:
+                        ox, oy = self.points[other]
+                        found.append(((ox - x) ** 2 + (oy - y) ** 2, other))
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= (radius * self.cell) ** 2:
+                    break
+            radius += 1
+        found.sort()
+        return [other for _, other in found[:k]]
+
+
+def nearest_neighbour_route(points, start=0):
+    n = len(points)
+    if n == 0:
+        return []
+    grid = GridIndex(points)
+    buckets = {key: set(members) for key, members in grid.cells.items()}
+    route = [start]
+    buckets[grid.cell_of(*points[start])].discard(start)
+    current = start
+    ring_limit = 6
+    for _ in range(n - 1):
+        x, y = points[current]
+        cx, cy = grid.cell_of(x, y)
+        best = -1
+        best_dist = math.inf
+        radius = 0
+        while radius <= ring_limit:
+            for key in grid.ring(cx, cy, radius):
+                bucket = buckets.get(key)
+                if not bucket:
+                    continue
+                for candidate in bucket:
+                    px, py = points[candidate]
+                    dist = (px - x) ** 2 + (py - y) ** 2
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = candidate
+            if best >= 0 and best_dist <= (radius * grid.cell) ** 2:
+                break
+            radius += 1
+        if best < 0 or best_dist > (ring_limit * grid.cell) ** 2:
+            # Sparse region: fall back to scanning the remaining non-empty cells
+            for key in [key for key, bucket in buckets.items() if not bucket]:
+                del buckets[key]
+            for bucket in buckets.values():
+                for candidate in bucket:
+                    px, py = points[candidate]
+                    dist = (px - x) ** 2 + (py - y) ** 2
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = candidate
+        buckets[grid.cell_of(*points[best])].discard(best)
+        route.append(best)
+        current = best
+    return route
+
+
+def _dist(points, a, b):
+    ax, ay = points[a]
+    bx, by = points[b]
+    return math.hypot(bx - ax, by - ay)
+
+
+def two_opt(points, route, neighbours, deadline):
+    """Neighbour-list 2-opt on an open path; returns the number of improving moves."""
+    n = len(route)
+    pos = [0] * n
+    for index, city in enumerate(route):
+        pos[city] = index
+    moves = 0
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(n - 1):
+            if (i & 1023) == 0 and time.monotonic() >= deadline:
+                return moves
+            a = route[i]
+            b = route[i + 1]
+            d_ab = _dist(points, a, b)
+            for c in neighbours[a]:
+                d_ac = _dist(points, a, c)
+                if d_ac >= d_ab:
+                    break
+                j = pos[c]
+                if j == i + 1:
+                    continue
+                if j + 1 < n:
+                    cn = route[j + 1]
+                    if cn == a:
+                        continue
+                    gain = d_ab + _dist(points, c, cn) - d_ac - _dist(points, b, cn)
+                else:
+                    gain = d_ab - d_ac
+                if gain <= EPSILON:
+                    continue
+                low, high = (i + 1, j) if j > i else (j + 1, i)
+                route[low:high + 1] = route[low:high + 1][::-1]
+                for index in range(low, high + 1):
+                    pos[route[index]] = index
+                moves += 1
+                improved = True
+                break
+    return moves
+
+
+def or_opt(points, route, neighbours, deadline):
+    """Relocate segments of up to ``MAX_OR_OPT_SEGMENT`` points next to a near neighbour."""
+    n = len(route)
+    pos = [0] * n
+    for index, city in enumerate(route):
+        pos[city] = index
+    moves = 0
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        i = 0
+        while i < n:
+            if (i & 1023) == 0 and time.monotonic() >= deadline:
+                return moves
+            moved = False
+            for length in range(1, MAX_OR_OPT_SEGMENT + 1):
+                if i + length > n:
+                    break
+                first = route[i]
+                last = route[i + length - 1]
+                prev = route[i - 1] if i > 0 else None
+                nxt = route[i + length] if i + length < n else None
+                if prev is None and nxt is None:
+                    break
+                if prev is None:
+                    removal_gain = _dist(points, last, nxt)
+                elif nxt is None:
+                    removal_gain = _dist(points, prev, first)
+                else:
+                    removal_gain = (_dist(points, prev, first) + _dist(points, last, nxt)
+                                    - _dist(points, prev, nxt))
+                if removal_gain <= EPSILON:
+                    continue
+                segment = set(route[i:i + length])
+                best = None
+                for c in neighbours[first]:
+                    j = pos[c]
+                    if c in segment:
+                        continue
+                    for u_index in (j - 1, j):
+                        if u_index < 0 or u_index + 1 >= n:
+                            continue
+                        u = route[u_index]
+                        v = route[u_index + 1]
+                        if u in segment or v in segment:
+                            continue
+                        base = _dist(points, u, v)
+                        forward = _dist(points, u, first) + _dist(points, last, v) - base
+                        backward = _dist(points, u, last) + _dist(points, first, v) - base
+                        if forward <= backward:
+                            cost, reverse = forward, False
+                        else:
+                            cost, reverse = backward, True
+                        if cost + EPSILON < removal_gain and (best is None or cost < best[0]):
+                            best = (cost, u, reverse)
+                if best is None:
+                    continue
+                _, u, reverse = best
+                moved_segment = route[i:i + length]
+                if reverse:
+                    moved_segment.reverse()
+                del route[i:i + length]
+                u_index = pos[u] if pos[u] < i else pos[u] - length
+                insert_at = u_index + 1
+                route[insert_at:insert_at] = moved_segment
+                low = min(i, insert_at)
+                high = max(i + length, insert_at + length)
+                for index in range(low, min(high, n)):
+                    pos[route[index]] = index
+                moves += 1
+                improved = True
+                moved = True
+                break
+            if not moved:
+                i += 1
+    return moves
+
+
+def improve_route(points, route, time_budget, k=DEFAULT_NEIGHBOURS):
+    if len(route) < 4:
+        return route
+    deadline = time.monotonic() + max(0.0, time_budget)
+    grid = GridIndex(points)
+    neighbours = [grid.neighbours(index, k) for index in range(len(points))]
+    while time.monotonic() < deadline:
+        moves = two_opt(points, route, neighbours, deadline)
+        moves += or_opt(points, route, neighbours, deadline)
+        if moves == 0:
+            break
+    return route
+
+
+def solve_tile(points, time_budget, k=DEFAULT_NEIGHBOURS):
+    """Solve one open tour; module-level so it can run inside the process pool."""
+    if not points:
+        return []
+    start = min(range(len(points)), key=lambda index: (points[index][0], points[index][1]))
+    route = nearest_neighbour_route(points, start=start)
+    return improve_route(points, route, time_budget, k)
+
+
+def _tile_points(points, tile_size):
+    tiles_per_axis = max(1, int(math.ceil(math.sqrt(len(points) / float(tile_size)))))
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    min_x, min_y = min(xs), min(ys)
+    width = max(max(xs) - min_x, 1e-9)
+    height = max(max(ys) - min_y, 1e-9)
+    tiles = collections.defaultdict(list)
+    for index, (x, y) in enumerate(points):
+        tx = min(tiles_per_axis - 1, int((x - min_x) / width * tiles_per_axis))
+        ty = min(tiles_per_axis - 1, int((y - min_y) / height * tiles_per_axis))
+        tiles[(tx, ty)].append(index)
+    ordered = []
+    for ty in range(tiles_per_axis):
+        columns = range(tiles_per_axis) if ty % 2 == 0 else range(tiles_per_axis - 1, -1, -1)
+        for tx in columns:
+            if tiles.get((tx, ty)):
+                ordered.append(tiles[(tx, ty)])
+    return ordered
+
+
+def solve_route(points, time_budget=DEFAULT_TIME_BUDGET, tile_size=DEFAULT_TILE_SIZE,
+                parallel=None, k=DEFAULT_NEIGHBOURS):
+    """Return an open route (list of point indices) visiting every point once."""
+    n = len(points)
+    if n == 0:
+        return []
+    if parallel is None:
+        parallel = n >= PARALLEL_THRESHOLD
+    if not parallel or n <= tile_size:
+        return solve_tile(points, time_budget, k)
+    tiles = _tile_points(points, tile_size)
+    # Spend most of the budget inside tiles, keep the rest for the stitched route.
+    # Tiles queue behind each other when there are more tiles than workers.
+    rounds = math.ceil(len(tiles) / float(worker_count()))
+    tile_budget = time_budget * 0.6 / rounds
+    futures = [
+        get_executor().submit(solve_tile, [points[index] for index in tile], tile_budget, k)
+        for tile in tiles
+    ]
+    route = []
+    for tile, future in zip(tiles, futures):
+        local = [tile[index] for index in future.result()]
+        if route and local:
+            tail = points[route[-1]]
+            start = points[local[0]]
+            end = points[local[-1]]
+            to_end = math.hypot(end[0] - tail[0], end[1] - tail[1])
+            if to_end < math.hypot(start[0] - tail[0], start[1] - tail[1]):
+                local.reverse()
+        route.extend(local)
+    return improve_route(points, route, time_budget * 0.4, k)
+
+
+class RouteCache:
+    """Small in-memory LRU backed by JSON files keyed by point-set hash.
+
+    The directory is pruned after every write to ``max_disk_entries`` files and
+    ``max_disk_bytes``, least recently used first, and entries older than
+    ``max_age_days`` are dropped.
+    """
+
+    def __init__(self, directory=None, max_entries=32, max_disk_entries=256,
+                 max_disk_bytes=64 * 1024 * 1024, max_age_days=30):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age_days = max_age_days
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json") if self.directory else None
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                value = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        touch(path)
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump(value, handle)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: failed to cache TSP route {key}: {e}")
+            return
+        prune_directory(self.directory, '.json', self.max_disk_entries, self.max_disk_bytes,
+                        self.max_age_days * 86400 if self.max_age_days is not None else None)
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,342 @@
+"""WebSocket control channel: commands, acknowledgements and live state on one connection.
+
+A minimal RFC 6455 server built on the standard library, so the server keeps
+running from a plain checkout. Every message is a JSON text frame with a
+``type``. Each connection has a bounded send queue drained by its own writer
+thread, so one slow client never blocks a plot or the other clients. Queued
+messages with the same coalescing key (progress bars, pen positions, resume
+and config state) are replaced by the newest one. A client that still falls
+``max_queue`` messages behind is disconnected. The writer pings an idle peer
+and drops it when nothing has been heard for two ping intervals.
+"""
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+WS_VERSION = '13'
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_UNSUPPORTED = 1003
+CLOSE_TOO_BIG = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024  # Plot commands carry whole SVGs
+
+
+class WebSocketError(Exception):
+    def __init__(self, message, code=CLOSE_PROTOCOL_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+def accept_key(key):
+    digest = hashlib.sha1((key.strip() + WS_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def handshake_error(headers):
+    """Why ``headers`` are not a usable WebSocket upgrade, or None when they are."""
+    if (headers.get('Upgrade') or '').lower() != 'websocket':
+        return 'Expected Upgrade: websocket'
+    if 'upgrade' not in [token.strip().lower() for token in (headers.get('Connection') or '')
+                         .split(',')]:
+        return 'Expected Connection: Upgrade'
+    if headers.get('Sec-WebSocket-Version') != WS_VERSION:
+        return f'Only WebSocket version {WS_VERSION} is supported'
+    try:
+        if len(base64.b64decode(headers.get('Sec-WebSocket-Key') or '', validate=True)) != 16:
+            return 'Invalid Sec-WebSocket-Key'
+    except ValueError:
+        return 'Invalid Sec-WebSocket-Key'
+    return None
+
+
+def _apply_mask(mask, data):
+    # XOR the whole payload at once; a per-byte loop is slow for SVG-sized commands
+    length = len(data)
+    key = int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+    return (int.from_bytes(data, 'big') ^ key).to_bytes(length, 'big')
+
+
+def encode_frame(opcode, payload=b'', mask=None):
+    """One unfragmented frame; servers send it unmasked, clients pass a 4-byte ``mask``."""
+    length = len(payload)
+    mask_bit = 0x80 if mask is not None else 0
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, mask_bit | length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, mask_bit | 127, length)
+    if mask is None:
+        return header + payload
+    return header + mask + _apply_mask(mask, payload)
+
+
+def _read_exact(rfile, count):
+    data = rfile.read(count)
+    if data is None or len(data) < count:
+        raise EOFError('Connection closed mid-frame')
+    return data
+
+
+def read_frame(rfile, max_bytes=MAX_MESSAGE_BYTES, require_mask=True):
+    """Return ``(fin, opcode, payload)`` for the next frame.
+
+    Servers read client frames, which must be masked; clients reading server
+    frames pass ``require_mask=False``.
+    """
+    first, second = _read_exact(rfile, 2)
+    if first & 0x70:
+        raise WebSocketError('Reserved bits set without a negotiated extension')
+    masked = bool(second & 0x80)
+    if require_mask and not masked:
+        raise WebSocketError('Client frames must be masked')
+    fin, opcode, length = bool(first & 0x80), first & 0x0F, second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', _read_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _read_exact(rfile, 8))[0]
+    if opcode >= OP_CLOSE and (length > 125 or not fin):
+        raise WebSocketError('Control frames must be short and unfragmented')
+    if length > max_bytes:
+        raise WebSocketError(f'Frame exceeds {max_bytes} bytes', CLOSE_TOO_BIG)
+    mask = _read_exact(rfile, 4) if masked else None
+    payload = _read_exact(rfile, length)
+    return fin, opcode, _apply_mask(mask, payload) if masked else payload
+
+
+class WebSocketConnection:
+    def __init__(self, rfile, wfile, max_queue=256, ping_interval=10.0,
+                 max_bytes=MAX_MESSAGE_BYTES, clock=time.monotonic, on_close=None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.on_close = on_close  # Unblocks the reader once the close frame is out
+        self.max_queue = max_queue
+        self.ping_interval = ping_interval
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.last_heard = clock()
+        self.closed = False
+        self.close_code = None
+        self.dropped = 0  # Messages replaced by a newer one with the same key
+        self._queue = OrderedDict()
+        self._sequence = 0
+        self._last_ping = self.last_heard
+        self._condition = threading.Condition()
+        self._writer = threading.Thread(target=self._write_loop, name='ws-writer', daemon=True)
+        self._writer.start()
+
+    def send(self, message, coalesce=None):
+        """Queue a JSON message; returns False once the connection is closing."""
+        with self._condition:
+            if self.closed:
+                return False
+            if coalesce is not None and coalesce in self._queue:
+                self._queue[coalesce] = message  # Keeps its place, carries the newest value
+                self.dropped += 1
+                return True
+            if len(self._queue) >= self.max_queue:
+                self._begin_close(CLOSE_TRY_AGAIN_LATER, 'Client is not keeping up', discard=True)
+                return False
+            self._sequence += 1
+            self._queue[coalesce if coalesce is not None else ('message', self._sequence)] = message
+            self._condition.notify()
+            return True
+
+    def close(self, code=CLOSE_NORMAL, reason='', discard=False):
+        """Send what is queued, unless ``discard``, then the close frame."""
+        with self._condition:
+            self._begin_close(code, reason, discard)
+
+    def _begin_close(self, code, reason, discard=False):
+        if self.closed:
+            return
+        self.closed = True
+        self.close_code = code
+        if discard:
+            self._queue.clear()
+        self._close_frame = struct.pack('!H', code) + reason.encode('utf-8')[:123]
+        self._condition.notify()
+
+    def join(self, timeout=None):
+        self._writer.join(timeout)
+
+    def _write(self, frame):
+        self.wfile.write(frame)
+        self.wfile.flush()
+
+    def _write_loop(self):
+        try:
+            while True:
+                with self._condition:
+                    if not self._queue and not self.closed:
+                        self._condition.wait(self.ping_interval)
+                    if self.closed and not self._queue:
+                        break
+                    message = self._queue.popitem(last=False)[1] if self._queue else None
+                    now = self.clock()
+                    silent_for = now - self.last_heard
+                if isinstance(message, bytes):
+                    self._write(message)
+                elif message is not None:
+                    self._write(encode_frame(OP_TEXT, json.dumps(message).encode('utf-8')))
+                if silent_for > 2 * self.ping_interval:
+                    self.close(CLOSE_GOING_AWAY, 'Ping timeout', discard=True)
+                elif (silent_for >= self.ping_interval
+                        and now - self._last_ping >= self.ping_interval):
+                    self._last_ping = now
+                    self._write(encode_frame(OP_PING, b'keepalive'))
+            self._write(encode_frame(OP_CLOSE, self._close_frame))
+        except (OSError, ValueError):
+            with self._condition:
+                self.closed = True
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+    def _pong(self, payload):
+        with self._condition:
+            if self.closed:
+                return
+            # Only the latest ping needs an answer, and it jumps the queue
+            self._queue['pong'] = encode_frame(OP_PONG, payload)
+            self._queue.move_to_end('pong', last=False)
+            self._condition.notify()
+
+    def messages(self):
+        """Yield decoded JSON messages until the peer closes or breaks the protocol."""
+        fragments = []
+        fragment_opcode = None
+        while not self.closed:
+            try:
+                fin, opcode, payload = read_frame(self.rfile, self.max_bytes)
+            except WebSocketError as e:
+                self.close(e.code, str(e))
+                return
+            except (EOFError, OSError, ValueError):
+                self.close(CLOSE_GOING_AWAY)
+                return
+            self.last_heard = self.clock()
+            if opcode == OP_PING:
+                self._pong(payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                code = struct.unpack('!H', payload[:2])[0] if len(payload) >= 2 else CLOSE_NORMAL
+                self.close(code)  # Echo the peer's code, as RFC 6455 asks
+                return
+            if opcode == OP_CONTINUATION:
+                if fragment_opcode is None:
+                    self.close(CLOSE_PROTOCOL_ERROR, 'Unexpected continuation frame')
+                    return
+            else:
+                if fragment_opcode is not None:
+                    self.close(CLOSE_PROTOCOL_ERROR, 'Expected a continuation frame')
+                    return
+                fragment_opcode = opcode
+            fragments.append(payload)
+            if sum(len(part) for part in fragments) > self.max_bytes:
+                self.close(CLOSE_TOO_BIG, 'Message too large')
+                return
+            if not fin:
+                continue
+            data, opcode = b''.join(fragments), fragment_opcode
+            fragments, fragment_opcode = [], None
+            if opcode != OP_TEXT:
+                self.close(CLOSE_UNSUPPORTED, 'Only JSON text messages are accepted')
+                return
+            try:
+                message = json.loads(data.decode('utf-8'))
+            except (UnicodeDecodeError, ValueError):
+                self.close(CLOSE_UNSUPPORTED, 'Messages must be JSON')
+                return
+            yield message
+
+
+class ControlChannel:
+    """The open control connections, plus watched state pushed to them when it changes."""
+
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.watches = OrderedDict()
+        self._last = {}
+        self._thread = None
+
+    def watch(self, name, getter):
+        """Push ``{'type': name, **getter()}`` whenever the getter's value changes."""
+        self.watches[name] = getter
+
+    def state_messages(self):
+        messages = []
+        for name, getter in self.watches.items():
+            try:
+                messages.append({'type': name, **getter()})
+            except Exception as e:
+                print(f"Control channel could not read {name}: {e}")
+        return messages
+
+    def _publish(self, message):
+        name = message['type']
+        if self._last.get(name) != message:
+            self._last[name] = message
+            self.broadcast(message, coalesce=name)
+
+    def add(self, connection):
+        """Send the current watched state to ``connection``, then include it in broadcasts."""
+        for message in self.state_messages():
+            self._publish(message)  # Others hear about changes before the newcomer is counted
+            connection.send(message, coalesce=message['type'])
+        with self.lock:
+            self.connections.add(connection)
+            if self._thread is None and self.watches:
+                self._thread = threading.Thread(target=self._poll_loop, name='ws-state',
+                                                daemon=True)
+                self._thread.start()
+
+    def discard(self, connection):
+        with self.lock:
+            self.connections.discard(connection)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def broadcast(self, message, coalesce=None):
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.send(message, coalesce=coalesce)
+
+    def close_all(self, code=CLOSE_GOING_AWAY, reason=''):
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.close(code, reason)
+
+    def poll(self):
+        """Broadcast every watched value that changed since the last poll."""
+        for message in self.state_messages():
+            self._publish(message)
+
+    def _poll_loop(self):
+        while True:
+            with self.lock:
+                if not self.connections:
+                    self._thread = None
+                    return
+            self.poll()
+            time.sleep(self.poll_interval)
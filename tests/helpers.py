@@ -0,0 +1,35 @@
+"""Fixtures shared by the server tests: SVG builders, a fake clock and a recording handler."""
+from server.server import PlotterHandler
+
+SVG_OPEN = (
+    '<svg xmlns="http://www.w3.org/2000/svg" '
+    'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"'
+)
+
+
+def layer(label, body, stroke=None):
+    """One Inkscape layer group, as the client exports it."""
+    stroke_attr = f' stroke="{stroke}"' if stroke else ''
+    return f'<g inkscape:groupmode="layer" inkscape:label="{label}"{stroke_attr}>{body}</g>'
+
+
+def layered_svg(*layers, attributes=''):
+    """An SVG document wrapping ``layers``; ``attributes`` is appended to the root tag."""
+    return f"{SVG_OPEN}{' ' + attributes if attributes else ''}>{''.join(layers)}</svg>"
+
+
+class FakeClock:
+    """Stand-in for ``time.monotonic``; tests move ``now`` by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def recording_handler(events):
+    """A PlotterHandler without a connection whose progress updates land in ``events``."""
+    handler = PlotterHandler.__new__(PlotterHandler)
+    handler.send_progress_update = lambda message, payload=None: events.append((message, payload))
+    return handler
@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+import unittest
+
+from server.asset_store import AssetError, AssetStore, asset_id_from_url, sniff_extension
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16
+
+
+class AssetStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='assets-')
+        self.store = AssetStore(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_put_is_content_addressed_and_deduplicated(self):
+        asset_id, created = self.store.put(PNG_BYTES)
+        self.assertTrue(created)
+        self.assertTrue(asset_id.endswith('.png'))
+        self.assertEqual(self.store.put(PNG_BYTES), (asset_id, False))
+        self.assertEqual(self.store.read(asset_id), PNG_BYTES)
+        self.assertEqual(self.store.content_type(asset_id), 'image/png')
+
+    def test_rejects_unknown_types_and_ids(self):
+        with self.assertRaises(AssetError):
+            self.store.put(b'<svg></svg>')
+        with self.assertRaises(AssetError):
+            self.store.read('../secrets.png')
+        self.assertIsNone(self.store.path_for('abc.png'))
+
+    def test_sniffs_common_formats(self):
+        self.assertEqual(sniff_extension(b'\xff\xd8\xff\xe0rest'), 'jpg')
+        self.assertEqual(sniff_extension(b'GIF89a...'), 'gif')
+        self.assertEqual(sniff_extension(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'webp')
+
+    def test_asset_id_from_url(self):
+        asset_id = 'a' * 64 + '.jpg'
+        self.assertEqual(asset_id_from_url(f'/assets/{asset_id}'), asset_id)
+        self.assertIsNone(asset_id_from_url('data:image/png;base64,AAAA'))
+        self.assertIsNone(asset_id_from_url('/assets/../../etc/passwd'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from helpers import layer, layered_svg, recording_handler
+from server.plot_chunks import ChunkCheckpoint, plan_chunks, resume_log_is_usable
+from server.progress_model import parse_progress_bar
+from server.server import PlotterHandler
+from server.svg_layers import parse_svg
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMULATOR = os.path.join(REPO_ROOT, 'server', 'axicli_sim.py')
+SVG = layered_svg(layer(
+    '1-Black', '<path d="M 10 10 L 190 10 L 190 190 L 10 190 Z"/><path d="M 50 50 L 150 150"/>'))
+
+
+def progress_bars(stderr):
+    bars = []
+    for line in stderr.replace('\r', '\n').splitlines():
+        if line.startswith('Plot Progress:'):
+            bars.append(parse_progress_bar(line[len('Plot Progress:'):]))
+    return bars
+
+
+class AxicliSimulatorTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='axicli-sim-')
+        self.svg_path = os.path.join(self.temp_dir, 'plot.svg')
+        self.resume_path = os.path.join(self.temp_dir, 'resume.svg')
+        with open(self.svg_path, 'w', encoding='utf-8') as handle:
+            handle.write(SVG)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, args, speed):
+        env = dict(os.environ, AXICLI_SIM_SPEED=str(speed))
+        return subprocess.Popen([sys.executable, SIMULATOR, *args], env=env, text=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def test_layer_plot_reports_parseable_progress_to_completion(self):
+        process = self._run([self.svg_path, '--mode', 'layers', '--layer', '1', '--progress'],
+                            speed=1000)
+        _, stderr = process.communicate(timeout=10)
+        self.assertEqual(process.returncode, 0)
+        bars = progress_bars(stderr)
+        self.assertTrue(bars and all(bars))
+        self.assertEqual(bars[-1]['percent'], 100.0)
+        self.assertGreater(bars[-1]['total'], 1000)
+
+    def test_sigint_pauses_and_res_plot_finishes(self):
+        process = self._run([self.svg_path, '--mode', 'layers', '--layer', '1', '--progress',
+                             '--output_file', self.resume_path], speed=1)
+        time.sleep(0.5)
+        process.send_signal(signal.SIGINT)
+        _, stderr = process.communicate(timeout=10)
+        self.assertEqual(process.returncode, 0)
+        self.assertIn('paused', stderr)
+        self.assertTrue(resume_log_is_usable(self.resume_path))
+        paused_at = progress_bars(stderr)[-1]['done']
+        self.assertLess(paused_at, progress_bars(stderr)[-1]['total'])
+
+        process = self._run([self.resume_path, '--mode', 'res_plot', '--progress',
+                             '--output_file', self.resume_path], speed=1000)
+        _, stderr = process.communicate(timeout=10)
+        self.assertEqual(process.returncode, 0)
+        bars = progress_bars(stderr)
+        self.assertGreaterEqual(bars[0]['done'], paused_at - 1)
+        self.assertEqual(bars[-1]['percent'], 100.0)
+
+    def test_res_plot_without_resume_data_fails(self):
+        process = self._run([self.svg_path, '--mode', 'res_plot'], speed=1000)
+        _, stderr = process.communicate(timeout=10)
+        self.assertEqual(process.returncode, 1)
+        self.assertIn('no resume data', stderr)
+
+
+class SimulatedPlotRunTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='simulated-plot-')
+        self.original_output_root = PlotterHandler.OUTPUT_ROOT
+        PlotterHandler.OUTPUT_ROOT = self.temp_dir
+        self.events = []
+        self.handler = recording_handler(self.events)
+
+    def tearDown(self):
+        PlotterHandler.OUTPUT_ROOT = self.original_output_root
+        PlotterHandler.clear_resume_state(remove_file=False)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chunked_plot_runs_end_to_end_against_the_simulator(self):
+        root = parse_svg(SVG)
+        checkpoint = ChunkCheckpoint.create(
+            PlotterHandler._chunk_dir(), SVG, plan_chunks(root, 1, 2), 1,
+            layer_label='1-Black', settings={'pen_pos_up': 90, 'pen_pos_down': 40}
+        )
+        # Containers often lack the D-Bus session systemd-inhibit needs; run the simulator unwrapped
+        with patch.object(PlotterHandler, 'AXIDRAW_PATH', SIMULATOR), \
+                patch.dict(os.environ, {'AXICLI_SIM_SPEED': '1000'}), \
+                patch('server.server.wrap_command_with_sleep_blocker', side_effect=lambda cmd: cmd):
+            self.handler._run_chunked_plot(checkpoint)
+        messages = [message for message, _ in self.events]
+        self.assertEqual(messages[-1], 'PLOT_COMPLETE')
+        self.assertIn('CLI_PROGRESS_BAR', messages)
+
+
+if __name__ == '__main__':
+    unittest.main()
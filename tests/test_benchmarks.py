@@ -0,0 +1,38 @@
+import unittest
+
+from benchmarks.server_bench import compare_results, measure, progress_lines, synthetic_svg
+from server.svg_layers import parse_svg
+
+
+def results(**timings):
+    return {'results': {name: {'median_s': seconds} for name, seconds in timings.items()}}
+
+
+class BenchmarkHarnessTests(unittest.TestCase):
+    def test_compare_flags_only_slowdowns_beyond_threshold(self):
+        rows, regressions = compare_results(
+            results(fast=1.0, steady=1.0, slow=1.0, dropped=1.0),
+            results(fast=0.5, steady=1.2, slow=1.5, added=1.0),
+            threshold=0.25,
+        )
+        self.assertEqual(regressions, ['slow'])
+        by_name = {name: ratio for name, _, _, ratio in rows}
+        self.assertIsNone(by_name['dropped'])
+        self.assertIsNone(by_name['added'])
+        self.assertAlmostEqual(by_name['fast'], 0.5)
+
+    def test_measure_reports_per_call_time(self):
+        calls = []
+        result = measure(lambda: calls.append(1), min_time=0.01, rounds=2)
+        self.assertEqual(result['calls'] + 1, len(calls))
+        self.assertGreater(result['ops_per_s'], 0)
+        self.assertLessEqual(result['min_s'], result['median_s'])
+
+    def test_synthetic_inputs_are_well_formed(self):
+        root = parse_svg(synthetic_svg(0.05, layers=3))
+        self.assertEqual(len([g for g in root.iter() if g.tag.endswith('}g')]), 3)
+        self.assertEqual(len(progress_lines(8)), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
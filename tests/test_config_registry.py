@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from server.config_registry import CONFIG_DIR, CONFIG_FILES, ConfigError, ConfigRegistry
+
+
+class ConfigRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp(prefix='config-')
+        for name in CONFIG_FILES.values():
+            shutil.copy(os.path.join(CONFIG_DIR, name), self.config_dir)
+        self.registry = ConfigRegistry(self.config_dir, check_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def _rewrite(self, name, update):
+        path = os.path.join(self.config_dir, CONFIG_FILES[name])
+        with open(path, 'r', encoding='utf-8') as handle:
+            data = json.load(handle)
+        update(data)
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle)
+        # Guarantee a new mtime even on coarse-grained filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_snapshot_is_read_only(self):
+        snapshot = self.registry.snapshot()
+        with self.assertRaises(TypeError):
+            snapshot['papers']['default'] = 'other'
+        self.assertEqual(json.loads(snapshot.body)['version'], 1)
+
+    def test_edits_are_picked_up_as_a_new_version(self):
+        first = self.registry.snapshot()
+        self._rewrite('papers', lambda data: data['papers'][data['default']].update(margin=5))
+        second = self.registry.snapshot()
+        self.assertEqual(second.version, first.version + 1)
+        self.assertNotEqual(second.etag, first.etag)
+        self.assertEqual(second['papers']['papers'][second['papers']['default']]['margin'], 5)
+
+    def test_touch_without_change_keeps_version(self):
+        first = self.registry.snapshot()
+        self._rewrite('mediums', lambda data: None)
+        self.assertIs(self.registry.snapshot(), first)
+
+    def test_invalid_edit_keeps_previous_snapshot(self):
+        first = self.registry.snapshot()
+        self._rewrite('plotters',
+                      lambda data: data['plotters'][data['default']].update(model='two'))
+        self.assertIs(self.registry.snapshot(), first)
+        self.assertIn('model must be an integer', self.registry.last_error)
+
+    def test_invalid_config_at_startup_raises(self):
+        self._rewrite('papers', lambda data: data.update(default='missing'))
+        with self.assertRaises(ConfigError):
+            ConfigRegistry(self.config_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from server.debug_tools import (DEBUG_TOKEN_ENV, MemoryTracer, SamplingProfiler,
+                                default_token_directory, is_loopback, load_debug_token,
+                                thread_stacks, token_matches)
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(200))
+
+
+class DebugTokenTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='debug-token-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_token_file_is_private_and_reused(self):
+        with patch.dict(os.environ, {DEBUG_TOKEN_ENV: ''}):
+            token = load_debug_token(self.directory)
+            self.assertEqual(load_debug_token(self.directory), token)
+        mode = stat.S_IMODE(os.stat(os.path.join(self.directory, 'debug_token')).st_mode)
+        self.assertEqual(mode, 0o600)
+        self.assertTrue(token_matches(token, token))
+        self.assertFalse(token_matches(token, None))
+
+    def test_default_directory_is_outside_the_working_tree(self):
+        with patch.dict(os.environ, {DEBUG_TOKEN_ENV: '', 'XDG_RUNTIME_DIR': self.directory}):
+            token = load_debug_token()
+        path = os.path.join(self.directory, 'plotter-server', 'debug_token')
+        with open(path, 'r', encoding='utf-8') as handle:
+            self.assertEqual(handle.read().strip(), token)
+        with patch.dict(os.environ, {'XDG_RUNTIME_DIR': '', 'HOME': self.directory}):
+            self.assertEqual(default_token_directory(),
+                             os.path.join(self.directory, '.config', 'plotter-server'))
+
+    def test_environment_token_wins(self):
+        with patch.dict(os.environ, {DEBUG_TOKEN_ENV: 'from-env'}):
+            self.assertEqual(load_debug_token(self.directory), 'from-env')
+
+    def test_loopback_detection(self):
+        self.assertTrue(is_loopback('127.0.0.1'))
+        self.assertTrue(is_loopback('::1'))
+        self.assertTrue(is_loopback('::ffff:127.0.0.1'))
+        self.assertFalse(is_loopback('192.168.1.20'))
+        self.assertFalse(is_loopback('localhost'))
+
+
+class SamplingProfilerTests(unittest.TestCase):
+    def test_samples_threads_that_were_already_running(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,), name='busy-worker')
+        worker.start()
+        try:
+            profiler = SamplingProfiler(interval=0.002)
+            profiler.start()
+            time.sleep(0.2)
+            profiler.stop()
+        finally:
+            stop.set()
+            worker.join()
+        report = profiler.report(limit=50)
+        self.assertIn('busy-worker', report['threads'])
+        self.assertIn('busy_loop', [entry['function'] for entry in report['functions']])
+        self.assertNotIn('debug-sampler', report['threads'])
+        self.assertIn('busy-worker;', profiler.collapsed())
+
+
+class MemoryTracerTests(unittest.TestCase):
+    def setUp(self):
+        self.was_tracing = tracemalloc.is_tracing()
+        self.tracer = MemoryTracer()
+
+    def tearDown(self):
+        if not self.was_tracing:
+            self.tracer.stop()
+
+    def test_diff_shows_allocation_growth(self):
+        self.tracer.start(frames=3)
+        first = self.tracer.take_snapshot()['id']
+        retained = [bytearray(1024) for _ in range(2000)]
+        diff = self.tracer.diff(first, key_type='filename', limit=5)
+        self.assertGreater(diff['sizeDiff'], 1024 * 1000)
+        self.assertEqual(diff['top'][0]['location'], __file__)
+        self.assertTrue(retained)
+
+    def test_snapshot_requires_tracing(self):
+        if self.was_tracing:
+            self.skipTest('tracemalloc is already running')
+        with self.assertRaises(RuntimeError):
+            self.tracer.take_snapshot()
+
+
+class ThreadStackTests(unittest.TestCase):
+    def test_current_thread_stack_includes_this_test(self):
+        threads = {thread['name']: thread for thread in thread_stacks()}
+        stack = threads[threading.current_thread().name]['stack']
+        functions = [entry['function'] for entry in stack]
+        self.assertEqual(functions[-2:],
+                         ['test_current_thread_stack_includes_this_test', 'thread_stacks'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from server import server
+from server.config_registry import CONFIG_DIR, CONFIG_FILES, ConfigRegistry
+from server.file_watch import ContentHashes, Debouncer, WatchRules
+
+
+class WatchRulesTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='watch-')
+        for relative in ('server/server.py', 'server/notes.txt', 'config/plotters.json',
+                         'node_modules/pkg/index.py', 'output/hilbert/a.svg', '.git/hooks/hook.py',
+                         'server/__pycache__/server.cpython.pyc', 'scripts/tool.py'):
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write(relative)
+        self.rules = WatchRules(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_matches_includes_and_honours_excludes(self):
+        self.assertTrue(self.rules.matches(os.path.join(self.root, 'server/server.py')))
+        self.assertTrue(self.rules.matches(os.path.join(self.root, 'config/plotters.json')))
+        self.assertFalse(self.rules.matches(os.path.join(self.root, 'server/notes.txt')))
+        self.assertFalse(self.rules.matches(os.path.join(self.root, 'node_modules/pkg/index.py')))
+        self.assertFalse(self.rules.matches(os.path.join(self.root, '.git/hooks/hook.py')))
+
+    def test_directories_prune_excluded_trees(self):
+        watched = {self.rules.relative(path) for path in self.rules.directories()}
+        self.assertEqual(watched, {'.', 'server', 'config', 'scripts'})
+
+    def test_directories_can_start_at_a_new_subtree(self):
+        os.makedirs(os.path.join(self.root, 'server/plugins/__pycache__'))
+        added = {self.rules.relative(path)
+                 for path in self.rules.directories(os.path.join(self.root, 'server/plugins'))}
+        self.assertEqual(added, {'server/plugins'})
+        excluded = os.path.join(self.root, 'node_modules/pkg')
+        self.assertEqual(list(self.rules.directories(excluded)), [])
+
+    def test_path_patterns_exclude_subtrees(self):
+        rules = WatchRules(self.root, exclude=('scripts/*',))
+        self.assertFalse(rules.matches(os.path.join(self.root, 'scripts/tool.py')))
+        self.assertTrue(rules.matches(os.path.join(self.root, 'server/server.py')))
+
+
+class ContentHashTests(unittest.TestCase):
+    def test_unchanged_bytes_are_not_reported(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as handle:
+            handle.write('x = 1\n')
+        try:
+            hashes = ContentHashes([handle.name])
+            os.utime(handle.name)
+            self.assertFalse(hashes.changed(handle.name))
+            with open(handle.name, 'w', encoding='utf-8') as rewrite:
+                rewrite.write('x = 2\n')
+            self.assertTrue(hashes.changed(handle.name))
+            self.assertFalse(hashes.changed(handle.name))
+        finally:
+            os.remove(handle.name)
+
+
+class DebouncerTests(unittest.TestCase):
+    def test_burst_is_coalesced_into_one_call(self):
+        calls = []
+        done = threading.Event()
+        debouncer = Debouncer(lambda paths: (calls.append(paths), done.set()), delay=0.05)
+        for path in ('a.py', 'b.py', 'a.py'):
+            debouncer.add(path)
+        self.assertTrue(done.wait(2))
+        self.assertEqual(calls, [['a.py', 'b.py']])
+
+    def test_callbacks_never_overlap(self):
+        active = []
+        overlaps = []
+        calls = []
+        done = threading.Event()
+
+        def callback(paths):
+            active.append(paths)
+            if len(active) > 1:
+                overlaps.append(paths)
+            threading.Event().wait(0.1)  # A slow restart
+            active.remove(paths)
+            calls.append(paths)
+            if len(calls) == 2:
+                done.set()
+
+        debouncer = Debouncer(callback, delay=0.01)
+        debouncer.add('a.py')
+        threading.Event().wait(0.05)
+        debouncer.add('b.py')
+        self.assertTrue(done.wait(2))
+        self.assertEqual(calls, [['a.py'], ['b.py']])
+        self.assertEqual(overlaps, [])
+
+
+class ConfigReloadTests(unittest.TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp(prefix='config-')
+        for name in CONFIG_FILES.values():
+            shutil.copy(os.path.join(CONFIG_DIR, name), self.config_dir)
+        self.original_registry = server.PlotterHandler.config_registry
+        server.PlotterHandler.config_registry = ConfigRegistry(self.config_dir, check_interval=3600)
+
+    def tearDown(self):
+        server.PlotterHandler.config_registry = self.original_registry
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def _write_plotters(self, text):
+        with open(os.path.join(self.config_dir, 'plotters.json'), 'w', encoding='utf-8') as handle:
+            handle.write(text)
+
+    def test_reload_swaps_plotter_config(self):
+        self._write_plotters(json.dumps({'default': 'mini',
+                                         'plotters': {'mini': {'model': 4, 'penlift': 3}}}))
+        self.assertTrue(server.reload_configs())
+        self.assertEqual(server.PlotterHandler.plotter_flags(), ('4', '3'))
+
+    def test_invalid_config_keeps_previous_settings(self):
+        before = server.PlotterHandler.plotter_flags()
+        self._write_plotters('{"default": ')
+        self.assertFalse(server.reload_configs())
+        self.assertEqual(server.PlotterHandler.plotter_flags(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
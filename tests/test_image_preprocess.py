@@ -0,0 +1,90 @@
+import base64
+import io
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from server import image_preprocess
+from server.image_preprocess import (PreprocessCache, PreprocessError, decode_data_url,
+                                     normalize_params)
+from server.server import PlotterHandler
+
+np = image_preprocess.np
+
+
+def png_bytes(pixels):
+    buffer = io.BytesIO()
+    image_preprocess.Image.fromarray(pixels).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ParamTests(unittest.TestCase):
+    def test_params_are_clamped_and_defaulted(self):
+        params = normalize_params({'sampleResolution': 99999, 'maskFeather': '3.4',
+                                   'edgeWeight': 'x'})
+        self.assertEqual(params['sampleResolution'], 3072)
+        self.assertEqual(params['maskFeather'], 3)
+        self.assertEqual(params['edgeWeight'], 0.3)
+        self.assertEqual(params['headTightness'], 0.35)
+
+    def test_rejects_non_data_urls(self):
+        with self.assertRaises(PreprocessError):
+            decode_data_url('https://example.com/photo.png')
+        self.assertEqual(decode_data_url('data:image/png;base64,aGk='), b'hi')
+
+    def test_endpoint_reports_missing_dependencies(self):
+        handler = PlotterHandler.__new__(PlotterHandler)
+        with patch.object(image_preprocess, 'np', None):
+            status, response = handler.preprocess_image({'image': 'data:image/png;base64,'})
+        self.assertEqual(status, 503)
+        self.assertEqual(response['status'], 'error')
+
+
+@unittest.skipUnless(image_preprocess.is_available(), 'numpy and Pillow are required')
+class PreprocessTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='preprocess-cache-')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_flood_fill_keeps_only_the_seed_component(self):
+        values = np.zeros((5, 7), dtype=np.float32)
+        values[1:4, 1:3] = 1
+        values[1:4, 5] = 1
+        region = image_preprocess.flood_fill_region(values, 1, 2, 0.5)
+        self.assertEqual(region.sum(), 6)
+        self.assertEqual(region[2, 5], 0)
+
+    def test_blur_averages_in_bounds_neighbours(self):
+        mask = np.zeros((3, 3), dtype=np.float32)
+        mask[0, 0] = 1
+        blurred = image_preprocess.blur_mask(mask, 1)
+        self.assertAlmostEqual(float(blurred[0, 0]), 0.25)
+        self.assertAlmostEqual(float(blurred[1, 1]), 1 / 9)
+
+    def test_maps_are_computed_once_then_served_from_disk(self):
+        pixels = np.full((40, 60, 3), 255, dtype=np.uint8)
+        pixels[10:30, 20:40] = 30
+        image_bytes = png_bytes(pixels)
+        params = {'sampleResolution': 256, 'maskFeather': 1}
+        cache = PreprocessCache(self.temp_dir)
+        first, cached = image_preprocess.preprocess_image(image_bytes, params, cache)
+        self.assertFalse(cached)
+        self.assertEqual((first['width'], first['height']), (256, 171))
+        density = np.frombuffer(base64.b64decode(first['maps']['density']), dtype='<u2')
+        self.assertEqual(density.size, 256 * 171)
+        self.assertEqual(int(density.max()), 65535)
+
+        with patch.object(image_preprocess, 'compute_maps',
+                          side_effect=AssertionError('recomputed')):
+            second, cached = image_preprocess.preprocess_image(
+                image_bytes, params, PreprocessCache(self.temp_dir), maps=('gray', 'mask'))
+        self.assertTrue(cached)
+        self.assertEqual(second['key'], first['key'])
+        self.assertEqual(sorted(second['maps']), ['gray', 'mask'])
+
+
+if __name__ == '__main__':
+    unittest.main()
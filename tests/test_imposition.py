@@ -0,0 +1,100 @@
+import itertools
+import unittest
+
+from helpers import layer, layered_svg
+from server.imposition import (ImpositionError, collect_strokes, impose, layer_key, pack,
+                               printable_area, sheet_size, stroke_bounds)
+from server.svg_layers import LABEL_ATTR, find_layers, iter_layers, parse_svg
+
+
+def square(x, y, size):
+    return f'<path d="M {x} {y} L {x + size} {y} L {x + size} {y + size} L {x} {y + size} Z"/>'
+
+
+class PackTests(unittest.TestCase):
+    def _boxes(self, sizes, placements, gap=0.0):
+        boxes = []
+        for (w, h), (x, y, rotated) in zip(sizes, placements):
+            if rotated:
+                w, h = h, w
+            boxes.append((x, y, w + gap, h + gap))
+        return boxes
+
+    def test_boxes_stay_inside_the_area_without_overlapping(self):
+        sizes = [(60, 40), (50, 50), (30, 80), (20, 20), (70, 10), (40, 40)]
+        placements = pack(sizes, 150, 120, gap=5)
+        for x, y, w, h in self._boxes(sizes, placements):
+            self.assertGreaterEqual(x, 0)
+            self.assertGreaterEqual(y, 0)
+            self.assertLessEqual(x + w, 150 + 1e-9)
+            self.assertLessEqual(y + h, 120 + 1e-9)
+        # Padding every box by the gap must still leave them disjoint
+        for a, b in itertools.combinations(self._boxes(sizes, placements, gap=5), 2):
+            overlaps = (a[0] < b[0] + b[2] and b[0] < a[0] + a[2]
+                        and a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+            self.assertFalse(overlaps, f"{a} overlaps {b}")
+
+    def test_rotates_a_box_that_only_fits_sideways(self):
+        placements = pack([(30, 90)], 100, 40, gap=0)
+        self.assertEqual(placements, [(0.0, 0.0, True)])
+        with self.assertRaises(ImpositionError):
+            pack([(30, 90)], 100, 40, gap=0, allow_rotate=False)
+
+    def test_names_the_box_that_does_not_fit(self):
+        with self.assertRaisesRegex(ImpositionError, 'big.svg'):
+            pack([(10, 10), (200, 200)], 100, 100, names=['small.svg', 'big.svg'])
+
+
+class SheetTests(unittest.TestCase):
+    def test_orientation_and_travel_bound_the_printable_area(self):
+        paper = {'width': 297, 'height': 420, 'margin': 20}
+        self.assertEqual(sheet_size(paper, 'landscape'), (420.0, 297.0))
+        self.assertEqual(sheet_size(paper, 'portrait'), (297.0, 420.0))
+        # The A3 carriage reaches 430 × 297 mm, so portrait A3 loses its bottom strip
+        self.assertEqual(printable_area(297, 420, 20, (430, 297)), (20, 20, 257, 277))
+        with self.assertRaises(ImpositionError):
+            printable_area(30, 30, 20)
+
+
+class ImposeTests(unittest.TestCase):
+    def setUp(self):
+        self.first = parse_svg(layered_svg(
+            layer('0-Black', square(100, 100, 40), stroke='#000000'),
+            layer('1-Red', square(150, 100, 10), stroke='#FF0000'),
+        ))
+        self.second = parse_svg(layered_svg(
+            layer('0-Crimson', square(0, 0, 30), stroke='#ff0000'),
+            layer('1-Blue', '<line x1="5" y1="5" x2="25" y2="5"/>', stroke='#0000ff'),
+        ))
+
+    def test_layers_merge_by_stroke_colour(self):
+        root, summary = impose([('a/1.svg', self.first), ('b/2.svg', self.second)],
+                               420, 297, (20, 20, 380, 257), gap=5)
+        labels = [group.get(LABEL_ATTR) for _, group in iter_layers(root)]
+        self.assertEqual(labels, ['0-Black', '1-Red', '2-Blue'])
+        self.assertEqual([entry['sources'] for entry in summary['layers']],
+                         [['a/1.svg'], ['a/1.svg', 'b/2.svg'], ['b/2.svg']])
+        self.assertEqual(len(list(find_layers(root, 1)[0])), 2)
+        self.assertEqual(layer_key(find_layers(root, 1)[0]), '#ff0000')
+
+    def test_geometry_lands_inside_the_area_with_its_placement_baked_in(self):
+        root, summary = impose([('a/1.svg', self.first), ('b/2.svg', self.second)],
+                               420, 297, (20, 20, 380, 257), gap=5)
+        min_x, min_y, max_x, max_y = stroke_bounds(collect_strokes(root))
+        self.assertGreaterEqual(min_x, 20)
+        self.assertGreaterEqual(min_y, 20)
+        self.assertLessEqual(max_x, 400)
+        self.assertLessEqual(max_y, 277)
+        placed = summary['drawings'][0]
+        self.assertEqual((placed['x'], placed['y']), (20, 20))
+        self.assertEqual((placed['width'], placed['height']), (60, 40))
+        self.assertNotIn('transform', root.find('.//{*}path').attrib)
+
+    def test_rejects_a_drawing_without_strokes(self):
+        with self.assertRaisesRegex(ImpositionError, 'empty.svg'):
+            impose([('empty.svg', parse_svg(layered_svg(layer('0-Black', ''))))],
+                   420, 297, (20, 20, 380, 257))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from server.output_archive import ArchiveScheduler, OutputArchive
+from server.output_catalog import OutputCatalog
+
+SVG = b'<!--\nDrawing: hilbert\n-->\n<svg xmlns="http://www.w3.org/2000/svg">\n  <g/>\n</svg>\n'
+DAY = 86400
+
+
+class OutputArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.output_root = tempfile.mkdtemp(prefix='archive-')
+        self.archive = OutputArchive(self.output_root)
+        self.now = time.time()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_root, ignore_errors=True)
+
+    def write_output(self, name, data=SVG, age_days=0):
+        directory = os.path.join(self.output_root, 'hilbert')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        mtime = self.now - age_days * DAY
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_only_old_saves_are_compressed_and_mtime_is_kept(self):
+        old = self.write_output('20240101-120000.svg', age_days=40)
+        recent = self.write_output('20240301-120000.svg', data=SVG + b' ', age_days=1)
+        summary = self.archive.archive(30, now=self.now)
+        self.assertEqual(summary['archived'], 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        with gzip.open(f"{old}z", 'rb') as handle:
+            self.assertEqual(handle.read(), SVG)
+        self.assertAlmostEqual(os.stat(f"{old}z").st_mtime, self.now - 40 * DAY, places=3)
+        index = self.archive.load_index()
+        self.assertEqual(index['hilbert/20240101-120000.svgz']['originalSize'], len(SVG))
+
+    def test_protected_paths_are_left_alone_and_cancel_stops_the_run(self):
+        resumable = self.write_output('20240101-120000.svg', age_days=40)
+        other = self.write_output('20240102-120000.svg', data=SVG + b' ', age_days=40)
+        summary = self.archive.archive(30, now=self.now, skip_paths=[resumable, None])
+        self.assertEqual((summary['archived'], summary['skipped']), (1, 1))
+        self.assertTrue(os.path.exists(resumable))
+        self.assertFalse(os.path.exists(other))
+        summary = self.archive.archive(30, now=self.now, cancel=lambda: True)
+        self.assertTrue(summary['cancelled'])
+        self.assertTrue(os.path.exists(resumable))
+
+    def test_scheduler_skips_runs_while_busy(self):
+        path = self.write_output('20240101-120000.svg', age_days=40)
+        busy = threading.Event()
+        busy.set()
+        checked = threading.Event()
+
+        def is_busy():
+            checked.set()
+            return busy.is_set()
+
+        scheduler = ArchiveScheduler(self.output_root, 30, initial_delay=0, interval=0.01,
+                                     busy_retry=0.01, is_busy=is_busy)
+        scheduler.start()
+        try:
+            self.assertTrue(checked.wait(2))
+            time.sleep(0.05)
+            self.assertTrue(os.path.exists(path))
+            done = threading.Event()
+            scheduler.on_complete = lambda summary: done.set()
+            busy.clear()
+            self.assertTrue(done.wait(2))
+            self.assertFalse(os.path.exists(path))
+        finally:
+            scheduler.stop()
+            scheduler.thread.join(2)
+
+    def test_identical_saves_share_one_blob(self):
+        first = self.write_output('20240101-120000.svg', age_days=40)
+        second = self.write_output('20240102-120000.svg', age_days=40)
+        summary = self.archive.archive(30, now=self.now)
+        self.assertEqual(summary['deduplicated'], 1)
+        self.assertEqual(os.stat(f"{first}z").st_ino, os.stat(f"{second}z").st_ino)
+
+        os.remove(f"{first}z")
+        os.remove(f"{second}z")
+        self.assertEqual(self.archive.archive(30, now=self.now)['prunedBlobs'], 1)
+        self.assertEqual(self.archive.stats()['files'], 0)
+
+    def test_catalog_reads_archived_files(self):
+        self.write_output('20240101-120000.svg', age_days=40)
+        self.archive.archive(30, now=self.now)
+        catalog = OutputCatalog(self.output_root)
+        try:
+            self.assertEqual(catalog.sync()['total'], 1)
+            item = catalog.query()['items'][0]
+        finally:
+            catalog.close()
+        self.assertEqual(item['path'], 'hilbert/20240101-120000.svgz')
+
+
+if __name__ == '__main__':
+    unittest.main()
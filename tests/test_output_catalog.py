@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from helpers import layer, layered_svg
+from server import output_catalog
+from server.output_catalog import OutputCatalog, parse_header
+from server.server import build_config_comment
+
+SVG_BODY = layered_svg(
+    layer('0-Red', '<path d="M 0 0 L 10 10"/>', stroke='#ff0000'),
+    layer('1-Blue', '<path d="M 10 0 L 0 10"/>', stroke='#0000ff'),
+) + '\n'
+CONFIG = {
+    'paper': {'id': 'a4', 'name': 'A4 Sketch', 'width': 297, 'height': 210,
+              'orientation': 'landscape'},
+    'medium': {'id': 'sakura', 'metadata': {'name': 'Sakura Gelly Roll'}},
+    'hatch': {'spacing': 1.5, 'inset': 0.25},
+    'drawingControls': {'seed': 42, 'pattern': 'crosshatch'},
+}
+
+
+class OutputCatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.output_root = tempfile.mkdtemp(prefix='catalog-')
+        self.catalog = OutputCatalog(self.output_root)
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.output_root, ignore_errors=True)
+
+    def reopen(self):
+        """Wait for background thumbnails by closing the catalog, then open it again."""
+        self.catalog.close()
+        self.catalog = OutputCatalog(self.output_root)
+
+    def write_output(self, drawing, name, config=CONFIG):
+        directory = os.path.join(self.output_root, drawing)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(build_config_comment(drawing, config) + SVG_BODY)
+        return path
+
+    def test_parse_header_reads_config_comment(self):
+        fields = parse_header(build_config_comment('hilbert', CONFIG) + SVG_BODY)
+        self.assertEqual(fields['drawing'], 'hilbert')
+        self.assertEqual(fields['paper_id'], 'a4')
+        self.assertEqual(fields['paper_name'], 'A4 Sketch')
+        self.assertEqual((fields['paper_width'], fields['paper_height']), (297.0, 210.0))
+        self.assertEqual(fields['medium_id'], 'sakura')
+        self.assertEqual(fields['medium_name'], 'Sakura Gelly Roll')
+        self.assertEqual(json.loads(fields['hatch']), {'spacing': 1.5, 'inset': 0.25})
+        self.assertEqual(json.loads(fields['controls']), {'seed': 42, 'pattern': 'crosshatch'})
+        self.assertEqual(parse_header(SVG_BODY), {})
+        bare = parse_header(build_config_comment('hilbert', {}) + SVG_BODY)
+        self.assertNotIn('hatch', bare)
+        self.assertNotIn('controls', bare)
+
+    def test_query_searches_hatch_settings_and_drawing_controls(self):
+        self.write_output('hilbert', '20240101-120000.svg')
+        self.write_output('voronoi', '20240102-120000.svg', config={'drawingControls': {'seed': 7}})
+        self.catalog.sync()
+        items = self.catalog.query(search='crosshatch')['items']
+        self.assertEqual([item['drawing'] for item in items], ['hilbert'])
+        self.assertEqual(items[0]['controls'], {'seed': 42, 'pattern': 'crosshatch'})
+        self.assertEqual(items[0]['hatch'], {'spacing': 1.5, 'inset': 0.25})
+        self.assertEqual(self.catalog.query(search='spacing')['total'], 1)
+
+    def test_catalogs_without_the_new_columns_are_migrated_and_reindexed(self):
+        self.catalog.close()
+        database = os.path.join(self.output_root, 'catalog.sqlite3')
+        os.remove(database)
+        legacy = sqlite3.connect(database)
+        legacy.execute('CREATE TABLE outputs (path TEXT PRIMARY KEY, drawing TEXT, '
+                       'created TEXT, mtime REAL, size INTEGER, paper_id TEXT, paper_name TEXT, '
+                       'paper_width REAL, paper_height REAL, orientation TEXT, medium_id TEXT, '
+                       'medium_name TEXT, layers INTEGER, thumbnail TEXT)')
+        path = self.write_output('hilbert', '20240101-120000.svg')
+        stat = os.stat(path)
+        legacy.execute("INSERT INTO outputs (path, drawing, mtime, size) "
+                       "VALUES (?, 'hilbert', ?, ?)",
+                       ('hilbert/20240101-120000.svg', stat.st_mtime, stat.st_size))
+        legacy.commit()
+        legacy.close()
+        self.catalog = OutputCatalog(self.output_root)
+        self.assertEqual(self.catalog.sync()['updated'], 1)
+        self.assertEqual(self.catalog.query(search='crosshatch')['total'], 1)
+
+    def test_sync_is_incremental_and_drops_deleted_files(self):
+        first = self.write_output('hilbert', '20240101-120000.svg')
+        self.write_output('voronoi', '20240102-120000.svg')
+        os.makedirs(os.path.join(self.output_root, 'cache'))
+        self.assertEqual(self.catalog.sync(), {'updated': 2, 'removed': 0, 'total': 2})
+        self.assertEqual(self.catalog.sync()['updated'], 0)
+        os.remove(first)
+        self.assertEqual(self.catalog.sync(), {'updated': 0, 'removed': 1, 'total': 1})
+
+    def test_query_filters_and_paginates_newest_first(self):
+        for day in range(1, 6):
+            self.write_output('hilbert', f'202401{day:02d}-120000.svg')
+        self.write_output('voronoi', '20240110-120000.svg', config={'paper': {'id': 'a3'}})
+        self.catalog.sync()
+        page = self.catalog.query(drawing='hilbert', page=2, page_size=2)
+        self.assertEqual(page['total'], 5)
+        self.assertEqual(page['pages'], 3)
+        self.assertEqual([item['path'] for item in page['items']],
+                         ['hilbert/20240103-120000.svg', 'hilbert/20240102-120000.svg'])
+        self.assertEqual(self.catalog.query(paper='a3')['items'][0]['drawing'], 'voronoi')
+        self.assertEqual(self.catalog.query(search='Gelly')['total'], 5)
+        self.assertEqual(self.catalog.facets()['drawings'], ['hilbert', 'voronoi'])
+        self.assertEqual(page['items'][0]['layers'], 2)
+
+    @unittest.skipUnless(output_catalog.Image is not None, 'Pillow is required for thumbnails')
+    def test_thumbnail_is_rendered_in_background(self):
+        path = self.write_output('hilbert', '20240101-120000.svg')
+        self.catalog.record(path)
+        self.catalog.close()
+        self.catalog = OutputCatalog(self.output_root)
+        item = self.catalog.query()['items'][0]
+        self.assertIsNotNone(item['thumbnail'])
+        thumbnail = os.path.join(self.output_root, 'thumbnails', item['thumbnail'])
+        with output_catalog.Image.open(thumbnail) as image:
+            self.assertEqual(image.size, (256, 256))
+            colours = {colour for _, colour in image.getcolors(maxcolors=256 * 256)}
+        self.assertIn((255, 0, 0), colours)
+        self.assertIn((0, 0, 255), colours)
+
+    @unittest.skipIf(output_catalog.Image is None, 'Pillow is not installed')
+    def test_failed_thumbnails_are_recorded_and_retried_on_sync(self):
+        path = self.write_output('hilbert', '20240101-120000.svg')
+        failing = mock.patch.object(output_catalog, 'render_thumbnail',
+                                    side_effect=OSError('disk full'))
+        with failing:
+            self.catalog.record(path)
+            self.reopen()
+            item = self.catalog.query()['items'][0]
+            self.assertIsNone(item['thumbnail'])
+            self.assertEqual(item['thumbnail_error'], 'disk full')
+            self.assertEqual(item['thumbnail_attempts'], 1)
+            for _ in range(output_catalog.MAX_THUMBNAIL_ATTEMPTS + 1):
+                self.catalog.sync()
+                self.reopen()
+            # Gives up after the limit instead of re-rendering a broken file on every sync
+            self.assertEqual(self.catalog.query()['items'][0]['thumbnail_attempts'],
+                             output_catalog.MAX_THUMBNAIL_ATTEMPTS)
+        with self.catalog.lock, self.catalog.connection:
+            self.catalog.connection.execute('UPDATE outputs SET thumbnail_attempts = 0')
+        self.catalog.sync()
+        self.reopen()
+        item = self.catalog.query()['items'][0]
+        self.assertIsNotNone(item['thumbnail'])
+        self.assertIsNone(item['thumbnail_error'])
+
+    def test_sync_prunes_thumbnails_no_output_refers_to(self):
+        path = self.write_output('hilbert', '20240101-120000.svg')
+        self.catalog.sync()
+        self.reopen()
+        thumbnails = os.path.join(self.output_root, 'thumbnails')
+        os.makedirs(thumbnails, exist_ok=True)
+        kept = self.catalog.thumbnail_name('hilbert/20240101-120000.svg', os.stat(path).st_mtime)
+        orphan = 'f' * 40 + '.png'
+        unrelated = 'notes.txt'
+        for name in (kept, orphan, unrelated):
+            with open(os.path.join(thumbnails, name), 'wb') as handle:
+                handle.write(b'x')
+        self.catalog.sync()
+        self.assertEqual(sorted(os.listdir(thumbnails)), sorted([kept, unrelated]))
+        os.remove(path)
+        self.catalog.sync()
+        self.assertEqual(os.listdir(thumbnails), [unrelated])
+
+
+if __name__ == '__main__':
+    unittest.main()
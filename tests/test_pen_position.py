@@ -0,0 +1,61 @@
+import unittest
+
+from helpers import FakeClock, layer, layered_svg, recording_handler
+from server.pen_position import PenPositionStream, TravelIndex
+from server.server import PlotterHandler
+
+SVG = layered_svg(layer('0-Black', '<path d="M 0 10 L 10 10"/>'))
+PROGRESS_LINE = "Plot Progress:  50%|#####     | 15/30 [00:01<00:01, 5.0 mm/s]"
+
+
+class TravelIndexTests(unittest.TestCase):
+    def test_index_includes_pen_up_travel_to_and_from_home(self):
+        index = TravelIndex([[(0, 10), (10, 10)]])
+        self.assertAlmostEqual(index.total, 10 + 10 + (200 ** 0.5))
+
+    def test_position_interpolates_along_drawn_segment(self):
+        index = TravelIndex([[(0, 10), (10, 10)]])
+        x, y, pen_down = index.position_at(15 / index.total)
+        self.assertAlmostEqual(x, 5)
+        self.assertAlmostEqual(y, 10)
+        self.assertTrue(pen_down)
+        x, y, pen_down = index.position_at(5 / index.total)
+        self.assertAlmostEqual((x, y), (0, 5))
+        self.assertFalse(pen_down)
+
+    def test_stream_is_rate_limited(self):
+        clock = FakeClock()
+        stream = PenPositionStream(TravelIndex([[(0, 0), (100, 0)]]), min_interval=1.0, clock=clock)
+        self.assertIsNotNone(stream.update(10, 200))
+        clock.now = 0.5
+        self.assertIsNone(stream.update(20, 200))
+        clock.now = 1.5
+        self.assertEqual(stream.update(50, 200)['x'], 50)
+        self.assertIsNone(stream.update(10, 0))
+
+
+class PenPositionEventTests(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        PlotterHandler.last_progress_bar = None
+        self.handler = recording_handler(self.events)
+
+    def tearDown(self):
+        PlotterHandler.stop_pen_tracking()
+
+    def test_progress_bar_emits_pen_position_when_tracking(self):
+        PlotterHandler.start_pen_tracking(SVG, 0)
+        self.handler._handle_plot_stdout_line(PROGRESS_LINE)
+        messages = [message for message, _ in self.events]
+        self.assertEqual(messages, ['CLI_PROGRESS_BAR', 'PEN_POSITION'])
+        position = self.events[1][1]
+        self.assertAlmostEqual(position['fraction'], 0.5)
+
+    def test_invalid_svg_disables_tracking(self):
+        self.assertIsNone(PlotterHandler.start_pen_tracking('<svg', 0))
+        self.handler._handle_plot_stdout_line(PROGRESS_LINE)
+        self.assertEqual([message for message, _ in self.events], ['CLI_PROGRESS_BAR'])
+
+
+if __name__ == '__main__':
+    unittest.main()
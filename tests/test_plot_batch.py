@@ -0,0 +1,143 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from helpers import layer, layered_svg
+from server.plot_batch import (BatchError, list_layers, main, plan_layers, pen_rate_modifier,
+                               resolve_pen_rate_lower)
+from server.server import PlotterHandler, build_config_comment, create_server
+
+DRAWING = layered_svg(
+    layer('0-Black', '<path d="M 0 0 L 100 0"/><line x1="0" y1="10" x2="50" y2="10"/>',
+          stroke='#000000'),
+    layer('1-Empty', ''),
+    layer('2-Red', '<path d="M 0 20 L 30 20"/>', stroke='#ff0000'),
+)
+
+
+class PenSettingsTests(unittest.TestCase):
+    def test_matches_the_browser_defaults_for_a_pairing(self):
+        smooth = {'absorbency': 'low-medium', 'surfaceStrength': 'good'}
+        self.assertEqual(pen_rate_modifier(smooth), 5)
+        self.assertEqual(pen_rate_modifier({'absorbency': 'medium-high'}), -3)
+        sakura = {'plotterDefaults': {'penRateLower': 12}}
+        self.assertEqual(resolve_pen_rate_lower(smooth, 'dalersmootha3', sakura, 'sakura'), 17)
+        # The pair override table applies on top of the paper's modifier
+        molotow = {'plotterDefaults': {'penRateLower': 20}}
+        self.assertEqual(resolve_pen_rate_lower(smooth, 'dalersmootha3', molotow, 'molotow'), 30)
+        delicate = {'absorbency': 'high', 'surfaceStrength': 'delicate'}
+        self.assertEqual(resolve_pen_rate_lower(delicate, 'x', {}, 'y'), 1)
+
+
+class LayerPlanTests(unittest.TestCase):
+    def test_lists_layers_by_number_with_their_drawn_length(self):
+        layers = list_layers(DRAWING)
+        self.assertEqual([(entry['layer'], entry['elements'], entry['lengthMm'])
+                          for entry in layers], [(0, 2, 150.0), (1, 0, 0.0), (2, 1, 30.0)])
+        self.assertEqual(layers[2]['stroke'], '#ff0000')
+
+    def test_plan_skips_empty_layers_and_honours_order_and_start(self):
+        layers = list_layers(DRAWING)
+        self.assertEqual([entry['layer'] for entry in plan_layers(layers)], [0, 2])
+        self.assertEqual([entry['layer'] for entry in plan_layers(layers, [2, 0])], [2, 0])
+        self.assertEqual([entry['layer'] for entry in plan_layers(layers, start_at=2)], [2])
+        with self.assertRaisesRegex(BatchError, 'No layer 5'):
+            plan_layers(layers, [0, 5])
+
+
+class BatchRunTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._original_output_root = PlotterHandler.OUTPUT_ROOT
+        cls.temp_output = tempfile.mkdtemp(prefix='plotter-batch-')
+        PlotterHandler.OUTPUT_ROOT = cls.temp_output
+        cls.temp_token_dir = tempfile.mkdtemp(prefix='plotter-token-')
+        PlotterHandler.DEBUG_TOKEN_DIR = cls.temp_token_dir
+        os.makedirs(os.path.join(cls.temp_output, 'demo'))
+        header = build_config_comment('demo', {'paperId': 'dalersmootha3',
+                                               'medium': {'id': 'molotow'}})
+        with open(os.path.join(cls.temp_output, 'demo', 'demo_20250101_120000.svg'), 'w',
+                  encoding='utf-8') as handle:
+            handle.write(header + DRAWING)
+        cls.httpd = create_server(host='127.0.0.1', port=0)
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        PlotterHandler.OUTPUT_ROOT = cls._original_output_root
+        if PlotterHandler.archive_scheduler is not None:
+            PlotterHandler.archive_scheduler.stop()
+            PlotterHandler.archive_scheduler = None
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        PlotterHandler.DEBUG_TOKEN_DIR = None
+        shutil.rmtree(cls.temp_output, ignore_errors=True)
+        shutil.rmtree(cls.temp_token_dir, ignore_errors=True)
+
+    def _run(self, *argv, outcome='PLOT_COMPLETE'):
+        commands = []
+
+        def fake_command(handler, command_data):
+            commands.append(command_data)
+            if command_data['command'] != 'plot':
+                return {'status': 'success', 'message': 'Plot stopped'}
+            # Finish before the ack is sent, as a layer with nothing new to plot does
+            handler.send_progress_update('CLI_PROGRESS_BAR', {
+                'status': '50%', 'metrics': {'percent': 50.0, 'done': 1, 'total': 2}})
+            handler.send_progress_update(outcome)
+            return {'status': 'success', 'message': 'Plot command started'}
+        output = io.StringIO()
+        with patch.object(PlotterHandler, 'handle_command', fake_command):
+            status = main(['--server', self.url, *argv], stream=output)
+        return status, commands, output.getvalue()
+
+    def test_plots_each_layer_in_order_with_the_saved_pairing(self):
+        status, commands, output = self._run('plot', 'demo/demo_20250101_120000.svg',
+                                             '--no-wait')
+        self.assertEqual(status, 0, output)
+        self.assertEqual([(command['layer'], command['layerLabel']) for command in commands],
+                         [(0, '0-Black'), (2, '2-Red')])
+        self.assertEqual({command['pen_rate_lower'] for command in commands}, {30})
+        self.assertEqual((commands[0]['pen_pos_up'], commands[0]['pen_pos_down']), (95, 50))
+        self.assertIn('on dalersmootha3 with molotow', output)
+        self.assertIn(' 50.0%  1/2', output)
+        self.assertIn('All layers plotted', output)
+
+    def test_a_failed_layer_stops_the_run(self):
+        status, commands, output = self._run('plot', 'demo/demo_20250101_120000.svg',
+                                             '--no-wait', '--medium', 'sakura',
+                                             outcome='PLOT_ERROR')
+        self.assertEqual(status, 1)
+        self.assertEqual(len(commands), 1)
+        self.assertEqual(commands[0]['pen_rate_lower'], 17)
+        self.assertIn("run 'resume'", output)
+        self.assertIn('--start-at 2', output)
+
+    def test_lists_outputs_and_layers_and_reports_missing_files(self):
+        status, _, output = self._run('list')
+        self.assertEqual(status, 0)
+        self.assertIn('demo/demo_20250101_120000.svg  dalersmootha3  molotow', output)
+        status, _, output = self._run('layers', 'demo/demo_20250101_120000.svg')
+        self.assertIn('2  2-Red  #ff0000  1 element(s)', output)
+        status, _, output = self._run('plot', 'demo/missing.svg')
+        self.assertEqual(status, 1)
+        self.assertIn('Not found', output)
+
+    def test_stop_and_status_go_through_the_control_channel(self):
+        status, commands, output = self._run('stop')
+        self.assertEqual((status, commands), (0, [{'command': 'stop_plot'}]))
+        status, _, output = self._run('status')
+        self.assertIn('No plot to resume', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
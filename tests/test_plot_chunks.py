@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from helpers import layer, layered_svg, recording_handler
+from server.plot_chunks import ChunkCheckpoint, ChunkPreparer, plan_chunks, resume_log_is_usable
+from server.server import PlotterHandler
+from server.svg_layers import find_layers, iter_stroke_elements, parse_svg, path_polylines
+
+
+def build_svg(segment_lengths, layer_label='0-Black'):
+    paths = ''.join(
+        f'<path d="M 0 {index} L {length} {index}" fill="none"/>'
+        for index, length in enumerate(segment_lengths)
+    )
+    content = layer(layer_label, paths) + layer('1-Red', '<path d="M 5 5 L 6 6"/>')
+    return layered_svg(f'<g data-role="drawing-content">{content}</g>',
+                       attributes='viewBox="0 0 100 100"')
+
+
+class SvgLayerTests(unittest.TestCase):
+    def test_path_polylines_handles_relative_and_closed_paths(self):
+        polylines = path_polylines('M 0 0 l 10 0 v 10 h -10 z M 20 20 L 30 30')
+        self.assertEqual(polylines[0], [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)])
+        self.assertEqual(polylines[1], [(20, 20), (30, 30)])
+
+    def test_find_layers_matches_leading_number(self):
+        root = parse_svg(build_svg([10]))
+        self.assertEqual(len(find_layers(root, '0')), 1)
+        self.assertEqual(len(find_layers(root, 1)), 1)
+        self.assertEqual(find_layers(root, 7), [])
+
+
+class PlanChunksTests(unittest.TestCase):
+    def test_chunks_are_balanced_by_length_and_keep_order(self):
+        root = parse_svg(build_svg([10, 10, 10, 10, 40]))
+        plan = plan_chunks(root, 0, 2)
+        self.assertEqual(len(plan), 2)
+        self.assertEqual([len(chunk['elements']) for chunk in plan], [4, 1])
+        self.assertAlmostEqual(plan[0]['length'], 40)
+
+    def test_chunk_count_is_capped_by_stroke_count(self):
+        root = parse_svg(build_svg([5, 5]))
+        self.assertEqual(len(plan_chunks(root, 0, 10)), 2)
+        self.assertEqual(plan_chunks(root, 9, 3), [])
+
+
+class ChunkCheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='chunks_test_')
+        self.chunk_dir = os.path.join(self.temp_dir, 'plot_chunks')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_checkpoint_round_trip_and_progress(self):
+        svg = build_svg([10, 30])
+        plan = plan_chunks(parse_svg(svg), 0, 2)
+        checkpoint = ChunkCheckpoint.create(self.chunk_dir, svg, plan, 0, layer_label='0-Black',
+                                            settings={'pen_pos_up': 90, 'pen_pos_down': 40})
+        checkpoint.mark_complete(0)
+        loaded = ChunkCheckpoint.load(self.chunk_dir)
+        self.assertEqual(loaded.completed, 1)
+        self.assertEqual(loaded.remaining, 1)
+        self.assertEqual(loaded.settings['pen_pos_up'], 90)
+        self.assertAlmostEqual(loaded.overall_progress(1, 0.5), 25 / 40)
+
+    def test_corrupt_checkpoint_is_ignored(self):
+        os.makedirs(self.chunk_dir)
+        with open(ChunkCheckpoint.path_for(self.chunk_dir), 'w', encoding='utf-8') as handle:
+            handle.write('{not json')
+        self.assertIsNone(ChunkCheckpoint.load(self.chunk_dir))
+
+    def test_preparer_writes_chunk_files_with_only_their_strokes(self):
+        svg = build_svg([10, 10, 10])
+        plan = plan_chunks(parse_svg(svg), 0, 3)
+        checkpoint = ChunkCheckpoint.create(self.chunk_dir, svg, plan, 0)
+        preparer = ChunkPreparer(checkpoint, start_index=1).start()
+        first = preparer.next()
+        second = preparer.next()
+        self.assertIsNone(preparer.next())
+        self.assertEqual([first[0], second[0]], [1, 2])
+        with open(first[1], 'r', encoding='utf-8') as handle:
+            chunk_root = parse_svg(handle.read())
+        strokes = [element for group in find_layers(chunk_root, 0)
+                   for element in iter_stroke_elements(group)]
+        self.assertEqual(len(strokes), 1)
+        self.assertEqual(find_layers(chunk_root, 1), [])
+
+    def test_resume_log_usability(self):
+        log_path = os.path.join(self.temp_dir, 'plot_resume.log')
+        self.assertFalse(resume_log_is_usable(log_path))
+        with open(log_path, 'w', encoding='utf-8') as handle:
+            handle.write('<svg')
+        self.assertFalse(resume_log_is_usable(log_path))
+        with open(log_path, 'w', encoding='utf-8') as handle:
+            handle.write('<svg xmlns="http://www.w3.org/2000/svg"/>')
+        self.assertTrue(resume_log_is_usable(log_path))
+
+
+class ChunkedPlotRunTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='chunked_plot_')
+        self.original_output_root = PlotterHandler.OUTPUT_ROOT
+        PlotterHandler.OUTPUT_ROOT = self.temp_dir
+        PlotterHandler.clear_resume_state(remove_file=False)
+        PlotterHandler.plot_interrupted = False
+        self.events = []
+        self.handler = recording_handler(self.events)
+
+    def tearDown(self):
+        PlotterHandler.OUTPUT_ROOT = self.original_output_root
+        PlotterHandler.clear_resume_state(remove_file=False)
+        PlotterHandler.plot_interrupted = False
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _create_checkpoint(self, chunks=3):
+        svg = build_svg([10] * chunks)
+        root = parse_svg(svg)
+        return ChunkCheckpoint.create(
+            PlotterHandler._chunk_dir(), svg, plan_chunks(root, 0, chunks), 0,
+            layer_label='0-Black', settings={'pen_pos_up': 90, 'pen_pos_down': 40}
+        )
+
+    def test_failed_chunk_leaves_checkpoint_for_resume(self):
+        checkpoint = self._create_checkpoint()
+        plotted = []
+
+        def fake_run(cmd):
+            plotted.append(cmd)
+            return 0 if len(plotted) < 2 else 1
+
+        with patch.object(PlotterHandler, '_run_axidraw_process', side_effect=fake_run):
+            self.handler._run_chunked_plot(checkpoint)
+        self.assertEqual(len(plotted), 2)
+        self.assertEqual(self.events[-1][0], 'PLOT_ERROR')
+        status = PlotterHandler.get_resume_status()
+        self.assertTrue(status['available'])
+        self.assertEqual(status['chunks'], {'completed': 1, 'total': 3})
+
+    def test_resume_without_resume_log_replots_from_last_finished_chunk(self):
+        checkpoint = self._create_checkpoint()
+        checkpoint.mark_complete(0)
+        checkpoint.mark_started(1)
+        PlotterHandler.mark_resume_available(layer=0, layer_label='0-Black')
+        plotted = []
+
+        def fake_run(cmd):
+            plotted.append(cmd)
+            return 0
+
+        finished = threading.Event()
+        record = self.handler.send_progress_update
+
+        def recorder(message, payload=None):
+            record(message, payload)
+            if message in ('PLOT_COMPLETE', 'PLOT_ERROR'):
+                finished.set()
+
+        self.handler.send_progress_update = recorder
+        with patch.object(PlotterHandler, '_run_axidraw_process', side_effect=fake_run), \
+                patch.object(PlotterHandler, 'execute_home_sequence') as mock_home:
+            response = self.handler.handle_command({'command': 'resume_plot'})
+            self.assertTrue(finished.wait(timeout=5))
+        self.assertEqual(response['status'], 'success')
+        mock_home.assert_called_once_with(90, clear_resume=False)
+        self.assertEqual(len(plotted), 2)
+        self.assertTrue(all('layers' in cmd for cmd in plotted))
+        self.assertEqual(self.events[-1][0], 'PLOT_COMPLETE')
+        self.assertFalse(ChunkCheckpoint.exists(PlotterHandler._chunk_dir()))
+
+    def test_progress_bar_reports_overall_fraction_across_chunks(self):
+        checkpoint = self._create_checkpoint(chunks=4)
+        PlotterHandler.last_progress_bar = None
+        PlotterHandler.active_chunk = (checkpoint, 2)
+        try:
+            self.handler._handle_plot_stdout_line(
+                "Plot Progress:  50%|#####     | 5/10 [00:01<00:01, 5.0 mm/s]")
+        finally:
+            PlotterHandler.active_chunk = None
+        payload = self.events[0][1]
+        self.assertEqual(payload['source'], 'chunk 3/4')
+        self.assertAlmostEqual(payload['overall'], 2.5 / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
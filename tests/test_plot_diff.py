@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from helpers import layer, layered_svg
+from server.plot_diff import PlottedStore, diff_svg, geometry_hash, svg_hash
+from server.svg_layers import find_layers, iter_stroke_elements, layer_polylines, parse_svg
+
+
+class DiffTests(unittest.TestCase):
+    BASE = layered_svg(
+        layer('0-Black', '<path d="M 0 0 L 10 0 L 10 10"/><line x1="20" y1="0" x2="30" y2="0"/>'),
+        layer('1-Red', '<path d="M 0 50 L 40 50"/>'),
+    )
+
+    def _diff(self, new_svg, **kwargs):
+        root = parse_svg(new_svg)
+        return root, diff_svg(parse_svg(self.BASE), root, **kwargs)
+
+    def test_identical_document_leaves_nothing_to_plot(self):
+        root, summary = self._diff(self.BASE)
+        self.assertEqual((summary['added'], summary['unchanged'], summary['removed']), (0, 3, 0))
+        self.assertEqual(layer_polylines(root, 0), [])
+        self.assertEqual(layer_polylines(root, 1), [])
+
+    def test_reversed_and_slightly_moved_strokes_count_as_plotted(self):
+        self.assertEqual(geometry_hash([(0, 0), (1, 1)]), geometry_hash([(1, 1), (0, 0)]))
+        new_svg = layered_svg(
+            layer('0-Black', '<path d="M 10 10 L 10 0 L 0 0"/>'
+                             '<line x1="20.02" y1="0.01" x2="30" y2="0"/>'),
+            layer('1-Red', '<path d="M 0 50 L 40 50"/>'),
+        )
+        _, summary = self._diff(new_svg)
+        self.assertEqual(summary['added'], 0)
+        _, summary = self._diff(new_svg, tolerance=0.01)
+        self.assertEqual(summary['added'], 1)
+
+    def test_only_new_subpaths_of_a_changed_path_remain(self):
+        new_svg = layered_svg(
+            layer('0-Black', '<path stroke-width="0.3" d="M 0 0 L 10 0 L 10 10 M 5 5 L 6 6"/>'
+                             '<line x1="20" y1="0" x2="30" y2="0"/>'),
+            layer('1-Red', '<path d="M 0 50 L 40 50"/><path d="M 0 50 L 40 50"/>'),
+        )
+        root, summary = self._diff(new_svg)
+        self.assertEqual(layer_polylines(root, 0), [[(5.0, 5.0), (6.0, 6.0)]])
+        kept = list(iter_stroke_elements(find_layers(root, 0)[0]))
+        self.assertEqual(len(kept), 1)
+        self.assertEqual(kept[0].get('stroke-width'), '0.3')
+        # A stroke drawn twice is plotted once more
+        self.assertEqual(len(layer_polylines(root, 1)), 1)
+        self.assertEqual([(entry['layer'], entry['added']) for entry in summary['layers']],
+                         [(0, 1), (1, 1)])
+
+    def test_layer_filter_and_removed_strokes(self):
+        new_svg = layered_svg(layer('0-Black', '<path d="M 0 0 L 10 0 L 10 10"/>'),
+                              layer('1-Red', '<path d="M 0 60 L 40 60"/>'))
+        root, summary = self._diff(new_svg, layer=0)
+        self.assertEqual([entry['layer'] for entry in summary['layers']], [0])
+        self.assertEqual(summary['removed'], 1)
+        self.assertEqual(len(layer_polylines(root, 1)), 1)
+
+
+class PlottedStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='plotted-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_round_trips_by_content_hash(self):
+        store = PlottedStore(self.directory, max_entries=2)
+        keys = []
+        for index in range(3):
+            keys.append(store.put(f'<svg id="{index}"/>'))
+            os.utime(store.path_for(keys[-1]), (1000 + index, 1000 + index))
+        self.assertEqual(keys[2], svg_hash('<svg id="2"/>'))
+        self.assertEqual(store.get(keys[2]), '<svg id="2"/>')
+        self.assertIsNone(store.get(keys[0]))
+        self.assertIsNone(store.get('../../etc/passwd'))
+
+
+if __name__ == '__main__':
+    unittest.main()
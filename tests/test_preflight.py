@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch
+
+from helpers import layer, layered_svg
+from server import preflight
+from server.preflight import (PreflightError, check_plot_svg, clip_polyline, document_frame,
+                              plot_envelope, stroke_extents)
+from server.svg_layers import layer_polylines, parse_svg
+
+A3_LANDSCAPE = 'width="420mm" height="297mm" viewBox="0 0 420 297"'
+TRAVEL = (430, 297)
+
+
+class EnvelopeTests(unittest.TestCase):
+    def test_document_units_and_travel_follow_the_sheet(self):
+        root = parse_svg(layered_svg(attributes='width="8in" height="4in" viewBox="0 0 400 200"'))
+        self.assertEqual(document_frame(root), (0.0, 0.0, 0.508, 203.2, 101.6))
+        self.assertEqual(document_frame(parse_svg(layered_svg()))[2:], (25.4 / 96, None, None))
+        self.assertEqual(plot_envelope(420, 297, 20, TRAVEL), (20, 20, 400, 277))
+        # A portrait sheet turns the travel with it; a larger one is cut to the carriage's reach
+        self.assertEqual(plot_envelope(297, 420, 0, TRAVEL), (0, 0, 297, 420))
+        self.assertEqual(plot_envelope(500, 297, 10, TRAVEL), (10, 10, 430, 287))
+        with self.assertRaisesRegex(PreflightError, 'no printable area'):
+            plot_envelope(30, 30, 20)
+
+
+class ClipTests(unittest.TestCase):
+    BOX = (0, 0, 10, 10)
+
+    def test_segments_are_cut_at_the_box_edges(self):
+        self.assertEqual(clip_polyline([(-5, 5), (5, 5), (15, 5)], self.BOX),
+                         [[(0.0, 5.0), (5, 5), (10.0, 5.0)]])
+        self.assertEqual(clip_polyline([(2, 2), (2, 20), (8, 20), (8, 2)], self.BOX),
+                         [[(2, 2), (2.0, 10.0)], [(8.0, 10.0), (8, 2)]])
+        self.assertEqual(clip_polyline([(20, 0), (20, 10)], self.BOX), [])
+
+    def test_closed_outlines_rejoin_across_their_start(self):
+        square = [(5, 5), (15, 5), (15, 8), (5, 8), (5, 5)]
+        self.assertEqual(clip_polyline(square, self.BOX),
+                         [[(10.0, 8.0), (5, 8), (5, 5), (10.0, 5.0)]])
+
+    def test_vectorized_extents_match_the_python_fallback(self):
+        strokes = [[[(x, x % 7 - 3) for x in range(200)]], [[(5, 5), (6, -9)], [(-1, 0), (0, 0)]]]
+        vectorized = stroke_extents(strokes)
+        with patch.object(preflight, 'np', None):
+            self.assertEqual(stroke_extents(strokes), vectorized)
+        self.assertEqual(vectorized, [(0, -3, 199, 3), (-1, -9, 6, 5)])
+
+
+class CheckPlotSvgTests(unittest.TestCase):
+    SVG = layered_svg(
+        layer('0-Black', '<path d="M 30 30 L 100 30"/><path d="M 380 50 L 410 50 L 410 80"/>'
+                         '<line x1="405" y1="100" x2="415" y2="100"/>'),
+        layer('1-Red', '<path d="M -50 -50 L 500 500"/>'),
+        attributes=A3_LANDSCAPE)
+
+    def test_geometry_inside_the_envelope_passes_untouched(self):
+        svg, report = check_plot_svg(self.SVG, 0, margin=5, travel=TRAVEL)
+        self.assertIs(svg, self.SVG)
+        self.assertEqual((report['strokes'], report['outside']), (3, 0))
+        self.assertEqual(report['extents'], {'minX': 30, 'minY': 30, 'maxX': 415, 'maxY': 100})
+
+    def test_out_of_bounds_layers_are_rejected_with_their_extents(self):
+        with self.assertRaisesRegex(PreflightError, r'2 of 3 strokes .*\(right 15mm over\)') as ctx:
+            check_plot_svg(self.SVG, 0, margin=20, travel=TRAVEL)
+        report = ctx.exception.report
+        self.assertEqual(report['area'], {'x': 20, 'y': 20, 'width': 380, 'height': 257})
+        self.assertEqual([entry['stroke'] for entry in report['offending']], [1, 2])
+        self.assertEqual(report['offending'][1],
+                         {'stroke': 2, 'minX': 405, 'minY': 100, 'maxX': 415, 'maxY': 100})
+
+    def test_clip_mode_cuts_strokes_back_to_the_envelope(self):
+        svg, report = check_plot_svg(self.SVG, 0, margin=20, travel=TRAVEL, mode='clip')
+        self.assertEqual((report['clipped'], report['removed']), (1, 1))
+        self.assertEqual(layer_polylines(parse_svg(svg), 0),
+                         [[(30.0, 30.0), (100.0, 30.0)], [(380.0, 50.0), (400.0, 50.0)]])
+        # Other layers are not the plot's concern
+        self.assertEqual(len(layer_polylines(parse_svg(svg), 1)), 1)
+
+    def test_unknown_modes_are_refused(self):
+        with self.assertRaisesRegex(PreflightError, 'bounds must be one of'):
+            check_plot_svg(self.SVG, 0, mode='ignore')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from server import process_registry
+from server.process_registry import ProcessRegistry, process_start_time
+
+SLEEPER = [sys.executable, '-c', 'import time; time.sleep(30)']
+
+
+@unittest.skipUnless(os.name == 'posix', 'process groups are POSIX-only')
+class ProcessRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='registry-')
+        self.registry = ProcessRegistry(self.directory)
+        self.children = []
+
+    def tearDown(self):
+        for child in self.children:
+            if child.poll() is None:
+                child.kill()
+            child.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _spawn(self):
+        child = subprocess.Popen(SLEEPER, start_new_session=True)
+        self.children.append(child)
+        return child
+
+    def test_register_records_group_and_owner(self):
+        child = self._spawn()
+        record = self.registry.register(child, command=SLEEPER)
+        self.assertEqual(record['pgid'], child.pid)
+        self.assertEqual(record['server'], os.getpid())
+        self.assertEqual([r['pid'] for r in self.registry.live()], [child.pid])
+        self.assertEqual(self.registry.foreign(), [])
+        self.registry.unregister(child.pid)
+        self.assertFalse(os.path.exists(self.registry.path))
+
+    def test_stop_signals_the_recorded_group(self):
+        child = self._spawn()
+        record = self.registry.register(child)
+        self.assertTrue(self.registry.stop(record, timeout=2))
+        self.assertIsNotNone(child.wait(timeout=2))
+        self.assertEqual(self.registry.live(), [])
+
+    def test_reap_drops_dead_records(self):
+        child = self._spawn()
+        self.registry.register(child)
+        child.kill()
+        child.wait()
+        self.assertEqual(self.registry.reap(), [])
+        self.assertFalse(os.path.exists(self.registry.path))
+
+    @unittest.skipIf(process_start_time(os.getpid()) is None, 'needs /proc start times')
+    def test_reused_pid_is_not_treated_as_the_plot(self):
+        child = self._spawn()
+        self.registry.register(child)
+        # A different start time means the pid now belongs to some unrelated process
+        self.registry._update(
+            lambda records: [dict(r, startTime=r['startTime'] - 1) for r in records])
+        self.assertEqual(self.registry.live(), [])
+
+    def test_without_proc_the_ps_start_time_guards_signalling(self):
+        if process_registry._ps_start_time(os.getpid()) is None:
+            self.skipTest('needs ps -o lstart=')
+        child = self._spawn()
+        with mock.patch.object(process_registry, '_proc_stat_fields', return_value=None):
+            record = self.registry.register(child)
+            self.assertIsInstance(record['startTime'], str)
+            self.assertEqual([r['pid'] for r in self.registry.live()], [child.pid])
+            reused = dict(record, startTime='Thu Jan  1 00:00:00 1970')
+            # A different start time means the plot is gone and the pid belongs to someone else
+            self.assertTrue(self.registry.stop(reused, timeout=0.5))
+            self.assertIsNone(child.poll())
+            self.assertTrue(self.registry.stop(record, timeout=2))
+        self.assertIsNotNone(child.wait(timeout=2))
+
+    def test_stop_refuses_to_signal_an_unverifiable_process(self):
+        child = self._spawn()
+        record = self.registry.register(child)
+        with mock.patch.object(process_registry, '_proc_stat_fields', return_value=None), \
+                mock.patch.object(process_registry, '_ps_start_time', return_value=None):
+            self.assertEqual([r['pid'] for r in self.registry.live()], [child.pid])
+            self.assertFalse(self.registry.stop(record, timeout=0.5))
+        self.assertFalse(self.registry.stop(dict(record, startTime=None), timeout=0.5))
+        self.assertIsNone(child.poll())
+
+    def test_reap_reports_orphans_of_exited_servers(self):
+        child = self._spawn()
+        self.registry.register(child)
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        self.registry._update(lambda records: [dict(r, server=exited.pid) for r in records])
+        self.assertEqual([r['pid'] for r in self.registry.reap()], [child.pid])
+
+
+if __name__ == '__main__':
+    unittest.main()
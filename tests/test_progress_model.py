@@ -0,0 +1,100 @@
+import unittest
+
+from helpers import FakeClock, recording_handler
+from server.progress_model import ProgressTracker, parse_duration, parse_progress_bar
+from server.server import PlotterHandler
+
+
+def sample(done, total=1000):
+    return {'percent': done / total * 100, 'done': float(done), 'total': float(total),
+            'elapsed': None, 'eta': None, 'rate': None, 'unit': 'mm/s'}
+
+
+class ParseProgressBarTests(unittest.TestCase):
+    def test_parses_typical_bar(self):
+        parsed = parse_progress_bar('3%|###       | 200/6530 [00:03<02:00, 50.0 mm/s]')
+        self.assertEqual(parsed['percent'], 3.0)
+        self.assertEqual(parsed['done'], 200.0)
+        self.assertEqual(parsed['total'], 6530.0)
+        self.assertEqual(parsed['elapsed'], 3.0)
+        self.assertEqual(parsed['eta'], 120.0)
+        self.assertEqual(parsed['rate'], 50.0)
+        self.assertEqual(parsed['unit'], 'mm/s')
+
+    def test_unknown_rate_and_eta_are_none(self):
+        parsed = parse_progress_bar('0%|          | 0/6530 [00:00<?, ?mm/s]')
+        self.assertIsNone(parsed['eta'])
+        self.assertIsNone(parsed['rate'])
+
+    def test_inverted_rate_and_suffixes_are_normalised(self):
+        parsed = parse_progress_bar('100%|##########| 6.5k/6.5k [1:02:03<00:00, 2.0s/mm]')
+        self.assertEqual(parsed['done'], 6500.0)
+        self.assertEqual(parsed['elapsed'], 3723.0)
+        self.assertAlmostEqual(parsed['rate'], 0.5)
+        self.assertEqual(parsed['unit'], 'mm/s')
+
+    def test_rejects_non_bar_text(self):
+        self.assertIsNone(parse_progress_bar('Estimated print time: 3 minutes'))
+        self.assertIsNone(parse_duration('??'))
+
+
+class ProgressTrackerTests(unittest.TestCase):
+    def test_rolling_rate_uses_recent_window(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(window_seconds=10, clock=clock)
+        tracker.update(sample(0))
+        clock.now = 5
+        metrics = tracker.update(sample(100))
+        self.assertAlmostEqual(metrics['avgRate'], 20.0)
+        self.assertFalse(metrics['stalled'])
+
+    def test_stall_is_reported_once_until_progress_resumes(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(stall_seconds=5, clock=clock)
+        tracker.update(sample(100))
+        clock.now = 3
+        tracker.update(sample(100))
+        self.assertFalse(tracker.check_stall())
+        clock.now = 6
+        self.assertTrue(tracker.check_stall())
+        self.assertFalse(tracker.check_stall())
+        tracker.update(sample(150))
+        self.assertFalse(tracker.stalled)
+
+    def test_finished_plot_is_not_a_stall(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(stall_seconds=1, clock=clock)
+        tracker.update(sample(1000))
+        clock.now = 10
+        self.assertFalse(tracker.check_stall())
+
+
+class StallMonitorTests(unittest.TestCase):
+    def test_monitor_emits_plot_stalled(self):
+        clock = FakeClock()
+        events = []
+        handler = recording_handler(events)
+        handler.STALL_CHECK_INTERVAL = 0
+
+        class FakeProcess:
+            def __init__(self):
+                self.polls = 0
+
+            def poll(self):
+                self.polls += 1
+                clock.now += 10
+                return None if self.polls < 3 else 0
+
+        tracker = ProgressTracker(stall_seconds=5, clock=clock)
+        tracker.update(sample(10))
+        PlotterHandler.progress_tracker = tracker
+        try:
+            handler._monitor_progress_stall(FakeProcess())
+        finally:
+            PlotterHandler.progress_tracker = None
+        self.assertEqual([message for message, _ in events], ['PLOT_STALLED'])
+        self.assertEqual(events[0][1]['done'], 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
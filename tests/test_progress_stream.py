@@ -1,3 +1,5 @@
+import io
+import threading
 import unittest
 
 from server.server import PlotterHandler
@@ -22,6 +24,16 @@ class ProgressStreamHandlerTests(unittest.TestCase):
         self.assertEqual(self.events[0][0], 'CLI_PROGRESS_BAR')
         self.assertIn('3%', self.events[0][1]['status'])
 
+    def test_progress_bar_payload_includes_numeric_metrics(self):
+        PlotterHandler.progress_tracker = None
+        line = "Plot Progress:  10%|#         | 653/6530 [00:10<01:30, 65.3 mm/s]"
+        self.handler._handle_plot_stdout_line(line)
+        metrics = self.events[0][1]['metrics']
+        self.assertEqual(metrics['done'], 653.0)
+        self.assertEqual(metrics['total'], 6530.0)
+        self.assertEqual(metrics['eta'], 90.0)
+        self.assertFalse(metrics['stalled'])
+
     def test_stderr_progress_bar_is_forwarded_once(self):
         line = "Plot Progress:   5%|#####     | 320/6530 [00:05<01:45, 55.0 mm/s]"
         self.handler._handle_plot_stderr_line(line)
@@ -64,6 +76,20 @@ class ProgressStreamHandlerTests(unittest.TestCase):
         self.assertTrue(handler.wfile.wrote)
         PlotterHandler.keep_sse_alive = True
 
+    def test_stream_terminator_waits_for_in_flight_frames(self):
+        handler = PlotterHandler.__new__(PlotterHandler)
+        handler.wfile = io.BytesIO()
+        handler.sse_write_lock = threading.Lock()
+        with handler.sse_write_lock:
+            closer = threading.Thread(target=handler.end_sse_stream)
+            closer.start()
+            closer.join(timeout=0.1)
+            # A progress frame holding the lock must finish before the terminator goes out
+            self.assertTrue(closer.is_alive())
+            handler.wfile.write(b'frame')
+        closer.join(timeout=2)
+        self.assertEqual(handler.wfile.getvalue(), b'frame0\r\n\r\n')
+
 
 if __name__ == '__main__':
     unittest.main()
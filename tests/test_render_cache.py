@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.request
+from unittest.mock import patch
+from urllib.error import HTTPError
+
+from server.render_cache import RenderCache, render_key
+from server.server import PlotterHandler, create_server
+
+REQUEST = {
+    'drawingKey': 'voronoiRelaxed',
+    'modulePath': '/drawings/core/voronoi.js',
+    'controlValues': {'seed': 3, 'pointCount': 400},
+    'paper': {'width': 297, 'height': 420, 'margin': 20},
+    'orientation': 'landscape',
+    'lineOverrides': {'strokeWidth': 0.45, 'hatchStyle': 'skeleton'},
+}
+RESULT = {
+    'svgInfo': {'paperWidth': 420, 'paperHeight': 297, 'margin': 20,
+                'orientation': 'landscape'},
+    'passes': [{'label': 'Black', 'stroke': '#000', 'paths': [{'points': [{'x': 0, 'y': 0}]}]}],
+    'travelSummary': {'limitMeters': 7.5, 'splitLayers': 0, 'totalLayers': 1},
+}
+
+
+class RenderKeyTests(unittest.TestCase):
+    def test_key_covers_the_render_inputs_only(self):
+        key = render_key(REQUEST, 'c6d9ade0a9cb')
+        reordered = dict(reversed(list(REQUEST.items())),
+                         controlValues={'pointCount': 400, 'seed': 3}, requestId=99)
+        self.assertEqual(render_key(reordered, 'c6d9ade0a9cb'), key)
+        self.assertNotEqual(render_key(REQUEST, 'a1b2c3d4e5f6'), key)
+        for field, value in (('controlValues', {'seed': 4, 'pointCount': 400}),
+                             ('orientation', 'portrait'),
+                             ('paletteOverride', {'black': '#000'}),
+                             ('lineOverrides', {'strokeWidth': 0.45, 'hatchStyle': 'contour'})):
+            self.assertNotEqual(render_key(dict(REQUEST, **{field: value}), 'c6d9ade0a9cb'), key)
+
+
+class RenderCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='plotter-render-cache-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_round_trips_results_and_evicts_least_recently_used(self):
+        cache = RenderCache(self.directory, max_entries=2)
+        keys = [render_key(dict(REQUEST, controlValues={'seed': seed}), 'v') for seed in range(3)]
+        cache.put(keys[0], RESULT)
+        cache.put(keys[1], RESULT)
+        os.utime(cache.path_for(keys[0]), (1, 1))
+        os.utime(cache.path_for(keys[1]), (2, 2))
+        self.assertEqual(json.loads(cache.get(keys[0])), RESULT)  # Now the most recent
+        cache.put(keys[2], RESULT)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get('../../etc/passwd'))
+        self.assertEqual(cache.clear(), 2)
+
+
+class RenderCacheEndpointTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._original_output_root = PlotterHandler.OUTPUT_ROOT
+        cls.temp_output = tempfile.mkdtemp(prefix='plotter-render-cache-out-')
+        PlotterHandler.OUTPUT_ROOT = cls.temp_output
+        cls.temp_token_dir = tempfile.mkdtemp(prefix='plotter-token-')
+        PlotterHandler.DEBUG_TOKEN_DIR = cls.temp_token_dir
+        PlotterHandler.render_cache = None
+        cls.httpd = create_server(host='127.0.0.1', port=0)
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        PlotterHandler.OUTPUT_ROOT = cls._original_output_root
+        PlotterHandler.render_cache = None
+        if PlotterHandler.archive_scheduler is not None:
+            PlotterHandler.archive_scheduler.stop()
+            PlotterHandler.archive_scheduler = None
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        PlotterHandler.DEBUG_TOKEN_DIR = None
+        shutil.rmtree(cls.temp_output, ignore_errors=True)
+        shutil.rmtree(cls.temp_token_dir, ignore_errors=True)
+
+    def _post(self, path, data):
+        request = urllib.request.Request(f"{self.url}{path}", data=json.dumps(data).encode(),
+                                         method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_results_are_stored_then_returned_until_the_manifest_changes(self):
+        status, response = self._post('/render-cache/lookup', REQUEST)
+        self.assertEqual((status, response['hit']), (200, False))
+        status, stored = self._post('/render-cache', {'request': REQUEST,
+                                                      'result': dict(RESULT, elapsedMs=812)})
+        self.assertEqual((status, stored['key']), (200, response['key']))
+        status, response = self._post('/render-cache/lookup', REQUEST)
+        self.assertTrue(response['hit'])
+        self.assertEqual(response['result'], RESULT)
+        with patch.object(PlotterHandler, 'load_drawings_manifest',
+                          classmethod(lambda cls: {'version': 'edited'})):
+            self.assertFalse(self._post('/render-cache/lookup', REQUEST)[1]['hit'])
+        self.assertEqual(self._post('/render-cache/clear', {})[1]['removed'], 1)
+        self.assertFalse(self._post('/render-cache/lookup', REQUEST)[1]['hit'])
+
+    def test_rejects_incomplete_and_oversized_entries(self):
+        self.assertEqual(self._post('/render-cache/lookup', {'controlValues': {}})[0], 400)
+        self.assertEqual(self._post('/render-cache', {'request': REQUEST, 'result': {}})[0], 400)
+        with patch.object(PlotterHandler, 'RENDER_CACHE_MAX_ENTRY_BYTES', 100):
+            status, _ = self._post('/render-cache', {'request': REQUEST, 'result': RESULT})
+        self.assertEqual(status, 413)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+import urllib.request
+from concurrent.futures import Future
+from urllib.error import HTTPError
+
+from server.output_catalog import parse_header
+from server.render_pool import RenderError, RenderJobManager, RenderPool, expand_sweep
+from server.server import PlotterHandler, create_server
+
+# Speaks the render worker protocol; controlValues pick how each job misbehaves
+FAKE_WORKER = textwrap.dedent('''
+    import json, os, sys, time
+    print(json.dumps({'type': 'ready', 'drawings': ['fake']}), flush=True)
+    for line in sys.stdin:
+        job = json.loads(line)
+        controls = job.get('controlValues') or {}
+        if controls.get('crash'):
+            print('drawing exploded', file=sys.stderr, flush=True)
+            sys.exit(3)
+        time.sleep(controls.get('sleep', 0))
+        if 'fail' in controls:
+            reply = {'type': 'result', 'id': job['id'], 'error': controls['fail']}
+        else:
+            reply = {'type': 'result', 'id': job['id'], 'pid': os.getpid(),
+                     'drawingKey': job['drawingKey'], 'svg': '<svg/>'}
+        print(json.dumps(reply), flush=True)
+''')
+
+
+class ExpandSweepTests(unittest.TestCase):
+    def test_combines_lists_and_inclusive_ranges(self):
+        self.assertEqual(expand_sweep(None), [{}])
+        self.assertEqual(expand_sweep({'seed': {'from': 1, 'to': 3}, 'jitter': [0, 0.5]}), [
+            {'seed': 1, 'jitter': 0}, {'seed': 1, 'jitter': 0.5},
+            {'seed': 2, 'jitter': 0}, {'seed': 2, 'jitter': 0.5},
+            {'seed': 3, 'jitter': 0}, {'seed': 3, 'jitter': 0.5}])
+        self.assertEqual(expand_sweep({'inset': {'from': 0, 'to': 0.3, 'step': 0.1}}),
+                         [{'inset': 0.0}, {'inset': 0.1}, {'inset': 0.2}, {'inset': 0.3}])
+
+    def test_rejects_bad_and_oversized_sweeps(self):
+        with self.assertRaisesRegex(RenderError, '12 variants; the limit is 10'):
+            expand_sweep({'a': [1, 2, 3], 'b': [1, 2, 3, 4]}, limit=10)
+        for sweep in ({'seed': []}, {'seed': 5}, {'seed': {'from': 1}},
+                      {'seed': {'from': 1, 'to': 5, 'step': 0}}, ['seed']):
+            with self.assertRaises(RenderError):
+                expand_sweep(sweep)
+
+
+class RenderPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='plotter-render-')
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        script = os.path.join(self.temp_dir, 'worker.py')
+        with open(script, 'w', encoding='utf-8') as handle:
+            handle.write(FAKE_WORKER)
+        self.command = [sys.executable, script]
+
+    def _pool(self, size=1, timeout=5.0):
+        pool = RenderPool('http://127.0.0.1:1', size=size, command=self.command,
+                          timeout=timeout)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def _render(self, pool, **controls):
+        return pool.submit({'drawingKey': 'fake', 'controlValues': controls}).result(10)
+
+    def test_workers_stay_warm_and_report_drawing_errors(self):
+        pool = self._pool()
+        first = self._render(pool)
+        self.assertEqual(first['svg'], '<svg/>')
+        with self.assertRaisesRegex(RenderError, 'Unknown controls'):
+            self._render(pool, fail='Unknown controls')
+        self.assertEqual(self._render(pool)['pid'], first['pid'])
+
+    def test_crashed_and_stuck_workers_are_replaced(self):
+        pool = self._pool(timeout=0.5)
+        first = self._render(pool)
+        with self.assertRaisesRegex(RenderError, 'exited with 3.*drawing exploded'):
+            self._render(pool, crash=True)
+        second = self._render(pool)
+        self.assertNotEqual(second['pid'], first['pid'])
+        with self.assertRaisesRegex(RenderError, 'timed out after 0.5s'):
+            self._render(pool, sleep=3)
+        self.assertNotEqual(self._render(pool)['pid'], second['pid'])
+
+    def test_jobs_run_in_parallel_across_workers(self):
+        pool = self._pool(size=3)
+        for result in [pool.submit({'drawingKey': 'fake'}) for _ in range(3)]:
+            result.result(10)  # Workers are warm from here on
+        started = time.monotonic()
+        futures = [pool.submit({'drawingKey': 'fake', 'controlValues': {'sleep': 0.4}})
+                   for _ in range(3)]
+        pids = {future.result(10)['pid'] for future in futures}
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(len(pids), 3)
+
+
+class FakePool:
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, job):
+        future = Future()
+        self.futures.append((job, future))
+        return future
+
+
+class RenderJobManagerTests(unittest.TestCase):
+    def test_variants_are_saved_as_they_finish_and_cancel_drops_the_rest(self):
+        pool = FakePool()
+        saved, updates = [], []
+
+        def save(job, index, controls, result):
+            saved.append((index, controls, result['svg']))
+            return f"out/{index}.svg"
+        manager = RenderJobManager(pool, save, notify=updates.append)
+        job = manager.start('voronoi', {'drawingKey': 'voronoi', 'controlValues': {'seed': 1}},
+                            [{'pointCount': 10}, {'pointCount': 20}, {'pointCount': 30}])
+        self.assertEqual([entry[0]['controlValues'] for entry in pool.futures],
+                         [{'seed': 1, 'pointCount': 10}, {'seed': 1, 'pointCount': 20},
+                          {'seed': 1, 'pointCount': 30}])
+        pool.futures[0][1].set_result({'svg': '<svg/>'})
+        pool.futures[1][1].set_running_or_notify_cancel()
+        manager.cancel(job.id)
+        pool.futures[1][1].set_exception(RenderError('boom'))
+        summary = manager.get(job.id).summary()
+        self.assertEqual((summary['state'], summary['completed'], summary['failed'],
+                          summary['cancelled']), ('cancelled', 1, 1, 1))
+        self.assertEqual(summary['files'], ['out/0.svg'])
+        self.assertIn('Variant 1 {"pointCount": 20}: boom', summary['errors'][0])
+        self.assertEqual(saved, [(0, {'pointCount': 10}, '<svg/>')])
+        self.assertEqual(updates[-1]['state'], 'cancelled')
+        self.assertEqual(manager.summaries()[0]['id'], job.id)
+
+
+class RenderJobEndpointTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._original_output_root = PlotterHandler.OUTPUT_ROOT
+        cls.temp_output = tempfile.mkdtemp(prefix='plotter-render-out-')
+        PlotterHandler.OUTPUT_ROOT = cls.temp_output
+        cls.temp_token_dir = tempfile.mkdtemp(prefix='plotter-token-')
+        PlotterHandler.DEBUG_TOKEN_DIR = cls.temp_token_dir
+        PlotterHandler.RENDER_WORKERS = 2
+        cls.httpd = create_server(host='127.0.0.1', port=0)
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        PlotterHandler.stop_render_pool()
+        PlotterHandler.RENDER_WORKERS = None
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        PlotterHandler.OUTPUT_ROOT = cls._original_output_root
+        if PlotterHandler.archive_scheduler is not None:
+            PlotterHandler.archive_scheduler.stop()
+            PlotterHandler.archive_scheduler = None
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        PlotterHandler.DEBUG_TOKEN_DIR = None
+        shutil.rmtree(cls.temp_output, ignore_errors=True)
+        shutil.rmtree(cls.temp_token_dir, ignore_errors=True)
+
+    def _request(self, path, data=None):
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        request = urllib.request.Request(f"{self.url}{path}", data=body,
+                                         method='POST' if data is not None else 'GET')
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_rejects_bad_jobs_before_starting_workers(self):
+        status, response = self._request('/render-jobs', {'drawing': 'voronoi',
+                                                          'sweep': {'seed': []}})
+        self.assertEqual(status, 400)
+        self.assertIn('non-empty list', response['message'])
+        status, response = self._request('/render-jobs', {'drawing': 'voronoi',
+                                                          'paperId': 'napkin'})
+        self.assertEqual((status, response['message']), (400, 'Unknown paper napkin'))
+        self.assertEqual(self._request('/render-jobs/nope'),
+                         (404, {'status': 'error', 'message': 'No render job nope'}))
+
+    @unittest.skipIf(shutil.which('node') is None, 'needs Node.js')
+    def test_sweep_renders_each_variant_into_output(self):
+        status, job = self._request('/render-jobs', {
+            'drawing': 'voronoi', 'controls': {'pointCount': 40},
+            'sweep': {'seed': {'from': 1, 'to': 3}}, 'mediumId': 'sakura'})
+        self.assertEqual(status, 202, job)
+        deadline = time.monotonic() + 90
+        while job['state'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(0.2)
+            job = self._request(f"/render-jobs/{job['id']}")[1]
+        self.assertEqual((job['state'], job['completed']), ('done', 3), job['errors'])
+        texts = []
+        for filename in job['files']:
+            self.assertEqual(os.path.basename(os.path.dirname(filename)), 'voronoiRelaxed')
+            with open(filename, encoding='utf-8') as handle:
+                texts.append(handle.read())
+        header = parse_header(texts[0])
+        self.assertEqual((header['paper_id'], header['medium_id']), ('dalersmootha3', 'sakura'))
+        self.assertIn('inkscape:groupmode="layer"', texts[0])
+        # Files are listed as variants finish, which need not be in sweep order
+        for seed in (1, 2, 3):
+            self.assertTrue(any(f"{{'pointCount': 40, 'seed': {seed}}}" in text
+                                for text in texts))
+        self.assertEqual(len(set(text.split('-->', 1)[1] for text in texts)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
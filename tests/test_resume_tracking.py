@@ -4,7 +4,8 @@ import tempfile
 import unittest
 from unittest.mock import patch, call
 
-from server.server import PlotterHandler, PLOTTER_CONFIGS, CURRENT_PLOTTER
+from server.output_archive import OutputArchive
+from server.server import PlotterHandler
 
 
 class TestResumeTracking(unittest.TestCase):
@@ -40,6 +41,24 @@ class TestResumeTracking(unittest.TestCase):
         self.assertEqual(status['layerLabel'], 'Blue Layer')
         self.assertEqual(status['path'], self.resume_file)
 
+    def test_archiving_never_moves_the_resume_target_or_diff_base(self):
+        saves = {}
+        for name in ('resume', 'base', 'other'):
+            saves[name] = os.path.join(self.temp_dir, 'hilbert', f'{name}.svg')
+            os.makedirs(os.path.dirname(saves[name]), exist_ok=True)
+            with open(saves[name], 'w', encoding='utf-8') as handle:
+                handle.write(f'<svg id="{name}"/>')
+            os.utime(saves[name], (0, 0))
+        PlotterHandler.register_resume_tracking(saves['resume'], layer=1)
+        PlotterHandler.diff_base_path = saves['base']
+        self.addCleanup(setattr, PlotterHandler, 'diff_base_path', None)
+        summary = OutputArchive(self.temp_dir).archive(
+            30, skip_paths=PlotterHandler.archive_protected_paths())
+        self.assertEqual((summary['archived'], summary['skipped']), (1, 2))
+        self.assertTrue(os.path.exists(saves['resume']))
+        self.assertTrue(os.path.exists(saves['base']))
+        self.assertTrue(os.path.exists(f"{saves['other']}z"))
+
     def test_clear_resume_state_removes_log(self):
         with open(self.resume_file, 'w', encoding='utf-8') as handle:
             handle.write('resume data')
@@ -96,8 +115,9 @@ class TestHomeSequence(unittest.TestCase):
 
     def test_execute_home_sequence_executes_commands_and_clears_resume(self):
         PlotterHandler.execute_home_sequence(95)
-        expected_model = PLOTTER_CONFIGS[CURRENT_PLOTTER]['model']
-        expected_penlift = PLOTTER_CONFIGS[CURRENT_PLOTTER]['penlift']
+        plotter = PlotterHandler.get_config_registry().snapshot().plotter
+        expected_model = plotter['model']
+        expected_penlift = plotter['penlift']
         expected_calls = [
             call([
                 PlotterHandler.AXIDRAW_PATH,
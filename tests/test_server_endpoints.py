@@ -1,6 +1,11 @@
+import gzip
+import http.client
 import json
 import os
 import shutil
+import socket
+import subprocess
+import sys
 import tempfile
 import threading
 import time
@@ -10,6 +15,8 @@ from subprocess import CompletedProcess
 from unittest import TestCase
 from unittest.mock import patch
 
+from server import plot_diff
+from server.output_archive import OutputArchive
 from server.server import create_server, PlotterHandler
 
 
@@ -19,6 +26,13 @@ class ServerEndpointTests(TestCase):
         cls._original_output_root = PlotterHandler.OUTPUT_ROOT
         cls.temp_output = tempfile.mkdtemp(prefix='plotter-output-')
         PlotterHandler.OUTPUT_ROOT = cls.temp_output
+        cls.temp_token_dir = tempfile.mkdtemp(prefix='plotter-token-')
+        PlotterHandler.DEBUG_TOKEN_DIR = cls.temp_token_dir
+        # A token file left in output/ by an older version
+        with open(os.path.join(cls.temp_output, 'debug_token'), 'w', encoding='utf-8') as handle:
+            handle.write('legacy-token\n')
+        PlotterHandler.tsp_cache = None
+        PlotterHandler.plotted_store = None
         cls.httpd = create_server(host='127.0.0.1', port=0)
         cls.port = cls.httpd.server_address[1]
         cls.server_thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
@@ -32,7 +46,17 @@ class ServerEndpointTests(TestCase):
         cls.httpd.server_close()
         cls.server_thread.join(timeout=2)
         PlotterHandler.OUTPUT_ROOT = cls._original_output_root
+        PlotterHandler.tsp_cache = None
+        PlotterHandler.plotted_store = None
+        if PlotterHandler.archive_scheduler is not None:
+            PlotterHandler.archive_scheduler.stop()
+            PlotterHandler.archive_scheduler = None
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        PlotterHandler.DEBUG_TOKEN_DIR = None
         shutil.rmtree(cls.temp_output, ignore_errors=True)
+        shutil.rmtree(cls.temp_token_dir, ignore_errors=True)
 
     def _base_url(self, path):
         return f'http://127.0.0.1:{self.port}{path}'
@@ -77,7 +101,441 @@ class ServerEndpointTests(TestCase):
         self.assertEqual(body['status'], 'success')
         self.assertTrue(os.path.exists(body['filename']))
 
+    def test_outputs_lists_saved_drawings(self):
+        payload = {
+            'name': 'catalogTest',
+            'svg': '<svg xmlns="http://www.w3.org/2000/svg"></svg>',
+            'config': {'paper': {'id': 'catalog-paper'}}
+        }
+        with self._post_json('/save-svg', payload) as resp:
+            json.loads(resp.read().decode('utf-8'))
+        url = self._base_url('/outputs?drawing=catalogTest&pageSize=5')
+        with urllib.request.urlopen(url, timeout=2) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(body['status'], 'success')
+        self.assertEqual(body['total'], 1)
+        item = body['items'][0]
+        self.assertEqual(item['paper_id'], 'catalog-paper')
+        with urllib.request.urlopen(self._base_url(item['url']), timeout=2) as resp:
+            self.assertIn(b'<svg', resp.read())
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(self._base_url('/outputs/files/..%2F..%2Fetc%2Fpasswd'),
+                                   timeout=2)
+        self.assertEqual(ctx.exception.code, 404)
+
+    def test_impose_packs_saved_drawings_onto_one_sheet(self):
+        saved = []
+        for name, stroke in (('imposeA', '#000000'), ('imposeB', '#000000')):
+            svg = ('<svg xmlns="http://www.w3.org/2000/svg" '
+                   'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape">'
+                   f'<g inkscape:groupmode="layer" inkscape:label="0-Black" stroke="{stroke}">'
+                   '<path d="M 50 50 L 150 50 L 150 120"/></g></svg>')
+            payload = {'name': name, 'svg': svg, 'config': {'medium': 'sakura'}}
+            with self._post_json('/save-svg', payload) as resp:
+                filename = json.loads(resp.read().decode('utf-8'))['filename']
+            saved.append(os.path.relpath(filename, self.temp_output).replace(os.sep, '/'))
+        payload = {'files': saved, 'paperId': 'dalersmootha3', 'gap': 10}
+        with self._post_json('/impose', payload) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(body['status'], 'success')
+        self.assertEqual([entry['label'] for entry in body['layers']], ['0-Black'])
+        self.assertEqual(len(body['drawings']), 2)
+        with open(body['filename'], 'r', encoding='utf-8') as handle:
+            text = handle.read()
+        self.assertIn('Drawing: imposed', text)
+        self.assertIn('Medium: id=sakura', text)
+        self.assertEqual(text.count('<path'), 2)
+
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self._post_json('/impose', {'files': saved * 20, 'paperId': 'dalersmootha3'})
+        self.assertEqual(ctx.exception.code, 422)
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self._post_json('/impose', {'files': ['../../etc/passwd']})
+        self.assertEqual(ctx.exception.code, 404)
+
+    @patch('server.server.subprocess.run')
+    def test_plot_diff_against_a_previously_plotted_svg(self, mock_run):
+        base = ('<svg xmlns="http://www.w3.org/2000/svg" '
+                'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape">'
+                '<g inkscape:groupmode="layer" inkscape:label="0-Black">'
+                '<path d="M 0 0 L 10 0"/></g></svg>')
+        base_hash = PlotterHandler.remember_plotted_svg(base)
+        extended = base.replace('</g>', '<path d="M 0 5 L 10 5"/></g>')
+        with self._post_json('/plot-diff', {'svg': extended, 'baseHash': base_hash}) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual((body['added'], body['unchanged']), (1, 1))
+        self.assertIn('M 0 5', body['svg'])
+        self.assertNotIn('M 0 0', body['svg'])
+
+        payload = {'command': 'plot', 'layer': 0, 'svg': base, 'diff_base_hash': base_hash,
+                   'pen_pos_up': 60, 'pen_pos_down': 30}
+        with self._post_json('/plotter', payload) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(body['status'], 'success')
+        self.assertEqual(body['diff']['added'], 0)
+        mock_run.assert_not_called()  # Nothing new, so the plotter is not even homed
+
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self._post_json('/plot-diff', {'svg': base, 'baseHash': '0' * 64})
+        self.assertEqual(ctx.exception.code, 404)
+
+    def test_plotted_svg_is_kept_only_once_the_plot_completes(self):
+        svg = ('<svg xmlns="http://www.w3.org/2000/svg" '
+               'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" '
+               'width="420mm" height="297mm" viewBox="0 0 420 297">'
+               '<g inkscape:groupmode="layer" inkscape:label="0-Black">'
+               '<path d="M 10 150 L 200 150"/></g></svg>')
+        payload = {'command': 'plot', 'layer': 0, 'svg': svg, 'margin': 20, 'bounds': 'clip',
+                   'pen_pos_up': 60, 'pen_pos_down': 30}
+        store = PlotterHandler.get_plotted_store()
+        for returncode in (1, 0):
+            with patch.object(PlotterHandler, 'execute_home_sequence'), \
+                    patch.object(PlotterHandler, '_run_axidraw_process', return_value=returncode):
+                with self._post_json('/plotter', payload) as resp:
+                    body = json.loads(resp.read().decode('utf-8'))
+                for thread in list(PlotterHandler.plot_threads):
+                    thread.join(timeout=5)
+            self.assertEqual(body['status'], 'success')
+            plotted = store.get(body['plottedHash'])
+            if returncode:
+                self.assertIsNone(plotted)  # A failed plot never reached the paper
+        PlotterHandler.clear_resume_state()
+        # The clipped SVG axicli drew is kept, not the request
+        self.assertIn('M 20.000 150.000', plotted)
+        self.assertIsNone(store.get(plot_diff.svg_hash(svg)))
+
+    @patch('server.server.subprocess.run')
+    def test_plot_diff_base_is_protected_from_archiving(self, mock_run):
+        directory = os.path.join(self.temp_output, 'protectedDiff')
+        os.makedirs(directory, exist_ok=True)
+        base = ('<svg xmlns="http://www.w3.org/2000/svg" '
+                'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape">'
+                '<g inkscape:groupmode="layer" inkscape:label="0-Black">'
+                '<path d="M 0 0 L 10 0"/></g></svg>')
+        base_path = os.path.join(directory, 'base.svg')
+        with open(base_path, 'w', encoding='utf-8') as handle:
+            handle.write(base)
+        os.utime(base_path, (0, 0))
+        payload = {'command': 'plot', 'layer': 0, 'svg': base,
+                   'diff_base': 'protectedDiff/base.svg', 'pen_pos_up': 60, 'pen_pos_down': 30}
+        with self._post_json('/plotter', payload) as resp:
+            self.assertEqual(json.loads(resp.read().decode('utf-8'))['diff']['added'], 0)
+        self.addCleanup(setattr, PlotterHandler, 'diff_base_path', None)
+        OutputArchive(self.temp_output).archive(
+            30, skip_paths=PlotterHandler.archive_protected_paths())
+        self.assertTrue(os.path.exists(base_path))
+
+    def test_plot_diff_against_an_archived_save(self):
+        directory = os.path.join(self.temp_output, 'archivedDiff')
+        os.makedirs(directory, exist_ok=True)
+        base = ('<svg xmlns="http://www.w3.org/2000/svg" '
+                'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape">'
+                '<g inkscape:groupmode="layer" inkscape:label="0-Black">'
+                '<path d="M 0 0 L 10 0"/></g></svg>')
+        with open(os.path.join(directory, 'base.svgz'), 'wb') as handle:
+            handle.write(gzip.compress(base.encode('utf-8')))
+        extended = base.replace('</g>', '<path d="M 0 5 L 10 5"/></g>')
+        # Listed as .svg before the archiver gzipped it
+        payload = {'svg': extended, 'base': 'archivedDiff/base.svg'}
+        with self._post_json('/plot-diff', payload) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual((body['added'], body['unchanged']), (1, 1))
+
+    @patch('server.server.subprocess.run')
+    def test_plot_outside_the_margin_is_refused_before_homing(self, mock_run):
+        svg = ('<svg xmlns="http://www.w3.org/2000/svg" '
+               'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" '
+               'width="420mm" height="297mm" viewBox="0 0 420 297">'
+               '<g inkscape:groupmode="layer" inkscape:label="0-Black">'
+               '<path d="M 10 150 L 200 150"/></g></svg>')
+        payload = {'command': 'plot', 'layer': 0, 'svg': svg, 'margin': 20,
+                   'pen_pos_up': 60, 'pen_pos_down': 30}
+        with self._post_json('/plotter', payload) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(body['status'], 'error')
+        self.assertIn('left 10mm over', body['message'])
+        self.assertEqual(body['preflight']['extents']['minX'], 10)
+        mock_run.assert_not_called()
+
+    def test_outputs_routes_only_serve_saved_drawings_and_thumbnails(self):
+        PlotterHandler.get_output_catalog()
+        PlotterHandler.get_process_registry()._write([{'pid': 1}])
+        os.makedirs(os.path.join(self.temp_output, 'cache', 'tsp'), exist_ok=True)
+        with open(os.path.join(self.temp_output, 'cache', 'tsp', 'route.svg'), 'w') as handle:
+            handle.write('<svg/>')
+        private = (
+            '/outputs/files/catalog.sqlite3',
+            '/outputs/files/processes.json',
+            '/outputs/files/cache/tsp/route.svg',
+            '/outputs/files/cache/tsp/route.json',
+            '/outputs/files/archive/index.json',
+            '/outputs/thumbnails/..%2Fcatalog.sqlite3',
+            '/outputs/thumbnails/notes.txt',
+        )
+        try:
+            for path in private:
+                with self.assertRaises(urllib.error.HTTPError, msg=path) as ctx:
+                    urllib.request.urlopen(self._base_url(path), timeout=2)
+                self.assertEqual(ctx.exception.code, 404, path)
+        finally:
+            PlotterHandler.get_process_registry()._write([])
+
+    def test_responses_are_sent_with_nagle_disabled(self):
+        # Small keep-alive responses otherwise wait out the client's delayed ACK (~40 ms each)
+        nodelay = []
+        original_setup = PlotterHandler.setup
+
+        def setup(handler):
+            original_setup(handler)
+            nodelay.append(handler.connection.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+        with patch.object(PlotterHandler, 'setup', setup):
+            with urllib.request.urlopen(self._base_url('/outputs'), timeout=2) as resp:
+                resp.read()
+        self.assertTrue(nodelay)
+        self.assertTrue(all(nodelay))
+
+    def test_static_fallback_never_serves_the_output_directory(self):
+        handler = PlotterHandler.__new__(PlotterHandler)
+        handler.directory = os.path.dirname(self.temp_output)
+        handler.path = f'/{os.path.basename(self.temp_output)}/catalog.sqlite3'
+        errors = []
+        handler.send_error = lambda code, message=None: errors.append(code)
+        self.assertIsNone(handler.send_head())
+        self.assertEqual(errors, [404])
+
+    def test_archived_outputs_are_served_transparently(self):
+        directory = os.path.join(self.temp_output, 'archivedTest')
+        os.makedirs(directory, exist_ok=True)
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+        with open(os.path.join(directory, 'old.svgz'), 'wb') as handle:
+            handle.write(gzip.compress(svg))
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+        try:
+            conn.request('GET', '/outputs/files/archivedTest/old.svg')
+            resp = conn.getresponse()
+            self.assertEqual(resp.read(), svg)
+            self.assertIsNone(resp.getheader('Content-Encoding'))
+            conn.request('GET', '/outputs/files/archivedTest/old.svgz',
+                         headers={'Accept-Encoding': 'gzip'})
+            resp = conn.getresponse()
+            self.assertEqual(resp.getheader('Content-Encoding'), 'gzip')
+            self.assertEqual(gzip.decompress(resp.read()), svg)
+        finally:
+            conn.close()
+
     def test_drawings_path_traversal_blocked(self):
         with self.assertRaises(urllib.error.HTTPError) as ctx:
             urllib.request.urlopen(self._base_url('/drawings/../config/papers.json'), timeout=2)
         self.assertEqual(ctx.exception.code, 403)
+
+    def test_tsp_route_is_solved_then_cached(self):
+        payload = {'points': [[0, 0], [10, 0], [1, 0], [9, 0], [5, 0]],
+                   'options': {'timeBudget': 1}}
+        with self._post_json('/tsp-route', payload) as resp:
+            first = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(first['status'], 'success')
+        self.assertEqual(sorted(first['route']), [0, 1, 2, 3, 4])
+        self.assertAlmostEqual(first['length'], 10.0)
+        self.assertFalse(first['cached'])
+        with self._post_json('/tsp-route', payload) as resp:
+            second = json.loads(resp.read().decode('utf-8'))
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['route'], first['route'])
+
+    def test_tsp_route_rejects_bad_points(self):
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self._post_json('/tsp-route', {'points': 'nope'})
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_asset_upload_is_served_with_long_lived_caching(self):
+        png = b'\x89PNG\r\n\x1a\n' + b'endpoint-test'
+        request = urllib.request.Request(
+            self._base_url('/assets'), data=png, method='POST',
+            headers={'Content-Type': 'image/png'})
+        with urllib.request.urlopen(request, timeout=2) as resp:
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(body['status'], 'success')
+        self.assertTrue(body['url'].startswith('/assets/'))
+
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+        try:
+            conn.request('GET', body['url'])
+            resp = conn.getresponse()
+            self.assertEqual(resp.read(), png)
+            self.assertEqual(resp.getheader('Content-Type'), 'image/png')
+            self.assertIn('immutable', resp.getheader('Cache-Control'))
+            etag = resp.getheader('ETag')
+            conn.request('GET', body['url'], headers={'If-None-Match': etag})
+            resp = conn.getresponse()
+            resp.read()
+            self.assertEqual(resp.status, 304)
+        finally:
+            conn.close()
+
+    def test_asset_upload_rejects_non_images(self):
+        request = urllib.request.Request(self._base_url('/assets'), data=b'hello', method='POST')
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(request, timeout=2)
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_keep_alive_reuses_connection_across_routes(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+        try:
+            for path in ('/resume-status', '/js/main.js', '/favicon.ico',
+                         '/drawings-manifest.json'):
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                body = resp.read()
+                self.assertEqual(resp.status, 200, path)
+                self.assertEqual(resp.version, 11)
+                self.assertEqual(int(resp.getheader('Content-Length')), len(body), path)
+            first_socket = conn.sock
+            conn.request('POST', '/unknown', body=b'{}',
+                         headers={'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            self.assertEqual(resp.status, 404)
+            self.assertEqual(resp.read(), b'Not Found')
+            conn.request('GET', '/resume-status')
+            resp = conn.getresponse()
+            resp.read()
+            self.assertIs(conn.sock, first_socket)
+        finally:
+            conn.close()
+
+    def test_plot_progress_stream_is_chunked(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+        try:
+            conn.request('GET', '/plot-progress')
+            resp = conn.getresponse()
+            self.assertEqual(resp.getheader('Transfer-Encoding'), 'chunked')
+            self.assertEqual(resp.read1(64)[:1], b':')
+        finally:
+            conn.close()
+
+    def test_server_adopts_inherited_listening_socket(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        port = listener.getsockname()[1]
+        httpd = create_server(host='127.0.0.1', listen_fd=listener.detach())
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        try:
+            self.assertEqual(httpd.server_address[1], port)
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/outputs', timeout=2) as resp:
+                self.assertEqual(resp.status, 200)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join(timeout=2)
+
+    def test_commands_are_refused_while_a_previous_server_plots(self):
+        registry = PlotterHandler.get_process_registry()
+        self.assertIs(PlotterHandler.get_process_registry(), registry)
+        plot = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'],
+                                start_new_session=True)
+        try:
+            record = registry.register(plot)
+            # The previous server's axicli wrote the shared resume log before being interrupted
+            with open(PlotterHandler._default_resume_path(), 'w', encoding='utf-8') as handle:
+                handle.write('resume data')
+            # Recording another server as the owner stands in for a plot left by a draining worker
+            registry._update(lambda records: [dict(r, server=os.getpid() + 1) for r in records])
+            with self._post_json('/plotter', {'command': 'toggle'}) as resp:
+                body = json.loads(resp.read().decode('utf-8'))
+            self.assertEqual(body['status'], 'error')
+            self.assertIn(str(plot.pid), body['message'])
+            with urllib.request.urlopen(self._base_url('/resume-status'), timeout=2) as resp:
+                self.assertEqual(json.loads(resp.read())['foreignPlotPid'], record['pid'])
+            with self._post_json('/plotter', {'command': 'stop_plot'}, timeout=10) as resp:
+                body = json.loads(resp.read().decode('utf-8'))
+            self.assertEqual(body['status'], 'success')
+            self.assertIn(str(record['pid']), body['message'])
+            self.assertIsNotNone(plot.wait(timeout=5))
+            self.assertTrue(PlotterHandler.get_resume_status()['available'])
+        finally:
+            if plot.poll() is None:
+                plot.kill()
+            plot.wait()
+            registry.unregister(plot.pid)
+            PlotterHandler.clear_resume_state()
+        self.assertIsNone(PlotterHandler.foreign_plot_pid())
+
+    def test_config_endpoint_is_versioned_and_revalidates(self):
+        with urllib.request.urlopen(self._base_url('/config'), timeout=2) as resp:
+            etag = resp.getheader('ETag')
+            body = json.loads(resp.read().decode('utf-8'))
+        self.assertEqual(set(body), {'version', 'plotters', 'papers', 'mediums', 'previewProfiles'})
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+        try:
+            conn.request('GET', '/config', headers={'If-None-Match': etag})
+            resp = conn.getresponse()
+            resp.read()
+            self.assertEqual(resp.status, 304)
+        finally:
+            conn.close()
+
+    def _debug_request(self, method, path, token=None, payload=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        headers = {'X-Debug-Token': token} if token else {}
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read().decode('utf-8')
+        finally:
+            conn.close()
+
+    def test_debug_endpoints_require_the_local_token(self):
+        status, _ = self._debug_request('GET', '/debug/threads')
+        self.assertEqual(status, 401)
+        status, _ = self._debug_request('GET', '/debug/threads', token='wrong')
+        self.assertEqual(status, 401)
+        token_path = os.path.join(self.temp_token_dir, 'debug_token')
+        with open(token_path, 'r', encoding='utf-8') as handle:
+            token = handle.read().strip()
+        status, body = self._debug_request('GET', '/debug/threads', token=token)
+        self.assertEqual(status, 200)
+        names = [thread['name'] for thread in json.loads(body)['threads']]
+        self.assertIn('MainThread', names)
+        status, body = self._debug_request('GET', '/debug/threads?format=text', token=token)
+        self.assertIn('Thread MainThread', body)
+
+    def test_debug_token_is_never_served(self):
+        token = PlotterHandler.get_debug_token()
+        self.assertFalse(os.path.exists(os.path.join(self.temp_output, 'debug_token')))
+        for path in ('/output/debug_token', '/outputs/files/debug_token', '/debug_token'):
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(self._base_url(path), timeout=2)
+            self.assertEqual(ctx.exception.code, 404, path)
+        status, _ = self._debug_request('GET', '/debug/threads', token='legacy-token')
+        self.assertEqual(status, 401)
+        self.assertEqual(self._debug_request('GET', '/debug/threads', token=token)[0], 200)
+
+    def test_debug_profile_and_memory_sessions(self):
+        token = PlotterHandler.get_debug_token()
+        status, _ = self._debug_request('POST', '/debug/profile/start', token, {'interval': 0.002})
+        self.assertEqual(status, 200)
+        status, _ = self._debug_request('POST', '/debug/profile/start', token)
+        self.assertEqual(status, 409)
+        time.sleep(0.1)
+        status, body = self._debug_request('POST', '/debug/profile/stop', token)
+        report = json.loads(body)
+        self.assertEqual(status, 200)
+        self.assertFalse(report['running'])
+        self.assertGreater(report['samples'], 0)
+        self.assertTrue(report['functions'])
+
+        try:
+            self._debug_request('POST', '/debug/memory/start', token, {'frames': 5})
+            status, body = self._debug_request('POST', '/debug/memory/snapshot', token)
+            first = json.loads(body)['id']
+            status, body = self._debug_request('POST', '/debug/memory/diff', token,
+                                               {'from': first, 'limit': 5})
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)['from'], first)
+            status, _ = self._debug_request('POST', '/debug/memory/diff', token, {'from': 999})
+            self.assertEqual(status, 400)
+        finally:
+            self._debug_request('POST', '/debug/memory/stop', token)
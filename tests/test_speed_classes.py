@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+from helpers import layer, layered_svg
+from server.server import PlotterHandler
+from server.speed_classes import (AXICLI_DEFAULT_SETTINGS, classify_stroke, plan_speed_classes,
+                                  resolve_class_settings)
+from server.svg_layers import parse_svg
+
+
+def zigzag(count, step):
+    points = ' '.join(f'L {i * step} {(i % 2) * step}' for i in range(1, count))
+    return f'M 0 0 {points}'
+
+
+SVG = layered_svg(layer(
+    '0-Black',
+    '<path d="M 0 0 L 200 0"/>'
+    f'<path d="{zigzag(40, 0.5)}"/>'
+    '<path d="M 0 10 L 20 10 L 20 30 L 40 30"/>'
+    '<path d="M 0 20 L 150 20"/>'
+))
+
+
+class SpeedClassTests(unittest.TestCase):
+    def test_classify_stroke_separates_detail_and_long_runs(self):
+        root = parse_svg(SVG)
+        paths = list(root.iter('{http://www.w3.org/2000/svg}path'))
+        self.assertEqual(classify_stroke(paths[0])[0], 'long')
+        self.assertEqual(classify_stroke(paths[1])[0], 'detail')
+        self.assertEqual(classify_stroke(paths[2])[0], 'standard')
+
+    def test_plan_groups_strokes_in_document_order(self):
+        plan = plan_speed_classes(parse_svg(SVG), 0, {})
+        self.assertEqual([entry['speedClass'] for entry in plan], ['long', 'standard', 'detail'])
+        self.assertEqual(plan[0]['indices'], [0, 3])
+        self.assertEqual(plan[0]['settings'], {'speed_pendown': 25, 'accel': 75})
+
+    def test_unconfigured_mediums_never_exceed_axicli_defaults(self):
+        for medium in ({}, {'plotterDefaults': {'penRateLower': 12}}):
+            for speed_class in ('long', 'standard', 'detail'):
+                settings = resolve_class_settings(medium, speed_class)
+                self.assertLessEqual(settings['speed_pendown'],
+                                     AXICLI_DEFAULT_SETTINGS['speedPendown'])
+                self.assertLessEqual(settings['accel'], AXICLI_DEFAULT_SETTINGS['accel'])
+
+    def test_mediums_opt_in_to_faster_classes(self):
+        medium = {'plotterDefaults': {'speedClasses': {'long': {'speedPendown': 50, 'accel': 90}}}}
+        self.assertEqual(resolve_class_settings(medium, 'long'), {'speed_pendown': 50, 'accel': 90})
+        # Classes the medium leaves out fall back to the conservative defaults
+        self.assertEqual(resolve_class_settings(medium, 'standard'),
+                         {'speed_pendown': 25, 'accel': 75})
+
+    def test_medium_limits_clamp_class_settings(self):
+        medium = {
+            'plotterDefaults': {
+                'speedClasses': {'long': {'speedPendown': 80, 'accel': 95, 'penRateLower': 30}},
+                'speedLimits': {'speedPendownMax': 35}
+            }
+        }
+        settings = resolve_class_settings(medium, 'long')
+        self.assertEqual(settings, {'speed_pendown': 35, 'accel': 95, 'pen_rate_lower': 30})
+
+    def test_layer_plot_command_includes_speed_overrides(self):
+        handler = PlotterHandler.__new__(PlotterHandler)
+        with patch('server.server.wrap_command_with_sleep_blocker', side_effect=lambda cmd: cmd):
+            cmd = handler._layer_plot_command('chunk.svg', 0, {
+                'pen_pos_up': 90,
+                'pen_pos_down': 40,
+                'speed_pendown': 25,
+                'accel': 60
+            })
+        self.assertEqual(cmd[cmd.index('--speed_pendown') + 1], '25')
+        self.assertEqual(cmd[cmd.index('--accel') + 1], '60')
+
+
+if __name__ == '__main__':
+    unittest.main()
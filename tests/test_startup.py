@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.request
+from unittest.mock import patch
+
+from helpers import FakeClock
+from server.lazy_import import LOAD_TIMES, LazyModule, is_loaded, load, optional_module
+from server.server import PlotterHandler, create_server
+from server.startup_profile import StartupProfile
+
+PROBE_MODULE = 'def load():\n    return "the module\'s own load"\n\nVALUE = 42\n'
+
+
+class LazyModuleTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='lazy-import-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        with open(os.path.join(self.directory, 'lazy_probe.py'), 'w', encoding='utf-8') as handle:
+            handle.write(PROBE_MODULE)
+        sys.path.insert(0, self.directory)
+        self.addCleanup(sys.path.remove, self.directory)
+        self.addCleanup(sys.modules.pop, 'lazy_probe', None)
+
+    def test_module_is_imported_by_the_first_attribute_read(self):
+        probe = LazyModule('lazy_probe')
+        self.assertNotIn('lazy_probe', sys.modules)
+        self.assertFalse(is_loaded(probe))
+        self.assertEqual(probe.VALUE, 42)
+        # Module attributes win over anything the stand-in could define
+        self.assertEqual(probe.load(), "the module's own load")
+        self.assertTrue(is_loaded(probe))
+        self.assertIs(load(probe), sys.modules['lazy_probe'])
+        self.assertIn('lazy_probe', LOAD_TIMES)
+
+    def test_missing_optional_modules_are_none(self):
+        self.assertIsNone(optional_module('plotter_no_such_package'))
+        self.assertFalse(is_loaded(optional_module('lazy_probe')))
+        self.assertIs(load(json), json)
+
+
+class StartupProfileTests(unittest.TestCase):
+    def test_steps_are_reported_by_phase(self):
+        clock = FakeClock()
+        profile = StartupProfile(clock=clock)
+        with profile.step('reap plot processes', 'background'):
+            clock.now += 0.004
+        with profile.step('bind'):
+            clock.now += 0.002
+        profile.mark_listening()
+        profile.record('import', 'server modules', 0.0305)
+        lines = profile.format().splitlines()
+        self.assertEqual([line.split()[0] for line in lines[1:]],
+                         ['import', 'startup', 'listening', 'background'])
+        self.assertTrue(lines[1].endswith('30.5'))
+        self.assertTrue(lines[3].endswith('6.0'))
+
+
+class BackgroundStartupTests(unittest.TestCase):
+    def setUp(self):
+        self._original_output_root = PlotterHandler.OUTPUT_ROOT
+        self.temp_output = tempfile.mkdtemp(prefix='plotter-startup-')
+        PlotterHandler.OUTPUT_ROOT = self.temp_output
+        self.temp_token_dir = tempfile.mkdtemp(prefix='plotter-token-')
+        PlotterHandler.DEBUG_TOKEN_DIR = self.temp_token_dir
+
+    def tearDown(self):
+        PlotterHandler.OUTPUT_ROOT = self._original_output_root
+        if PlotterHandler.archive_scheduler is not None:
+            PlotterHandler.archive_scheduler.stop()
+            PlotterHandler.archive_scheduler = None
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        PlotterHandler.DEBUG_TOKEN_DIR = None
+        shutil.rmtree(self.temp_output, ignore_errors=True)
+        shutil.rmtree(self.temp_token_dir, ignore_errors=True)
+
+    def test_server_answers_before_the_resume_bootstrap_finishes(self):
+        release = threading.Event()
+        original = PlotterHandler.bootstrap_resume_state
+        with patch.object(PlotterHandler, 'bootstrap_resume_state',
+                          classmethod(lambda cls: (release.wait(10), original()))):
+            httpd = create_server(host='127.0.0.1', port=0)
+            self.addCleanup(httpd.server_close)
+            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+            thread.start()
+            self.addCleanup(httpd.shutdown)
+            url = f"http://127.0.0.1:{httpd.server_address[1]}"
+            with urllib.request.urlopen(f"{url}/config", timeout=5) as response:
+                self.assertEqual(response.status, 200)
+            self.assertFalse(PlotterHandler.startup_ready.is_set())
+            # Resume status waits for the bootstrap rather than answering from stale state
+            statuses = []
+            waiter = threading.Thread(target=lambda: statuses.append(
+                json.loads(urllib.request.urlopen(f"{url}/resume-status", timeout=10).read())))
+            waiter.start()
+            waiter.join(0.2)
+            self.assertEqual(statuses, [])
+            release.set()
+            waiter.join(10)
+        self.assertTrue(PlotterHandler.startup_ready.is_set())
+        self.assertFalse(statuses[0]['available'])
+        PlotterHandler.startup_thread.join(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
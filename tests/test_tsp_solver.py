@@ -0,0 +1,122 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from server import tsp_solver
+from server.tsp_solver import (
+    GridIndex,
+    RouteCache,
+    nearest_neighbour_route,
+    normalize_points,
+    point_set_hash,
+    route_length,
+    solve_route,
+)
+
+
+def random_points(count, seed=7):
+    rng = random.Random(seed)
+    return [(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(count)]
+
+
+class TspSolverTests(unittest.TestCase):
+    def test_normalize_accepts_pairs_dicts_and_flat_lists(self):
+        expected = [(1.0, 2.0), (3.0, 4.0)]
+        self.assertEqual(normalize_points([[1, 2], [3, 4]]), expected)
+        self.assertEqual(normalize_points([{'x': 1, 'y': 2}, {'x': 3, 'y': 4}]), expected)
+        self.assertEqual(normalize_points([1, 2, 3, 4]), expected)
+        with self.assertRaises(ValueError):
+            normalize_points([1, 2, 3])
+
+    def test_grid_neighbours_match_brute_force(self):
+        points = random_points(300)
+        grid = GridIndex(points)
+        for index in (0, 57, 299):
+            x, y = points[index]
+            brute = sorted(
+                (other for other in range(len(points)) if other != index),
+                key=lambda other: (points[other][0] - x) ** 2 + (points[other][1] - y) ** 2
+            )[:6]
+            self.assertEqual(grid.neighbours(index, 6), brute)
+
+    def test_nearest_neighbour_route_visits_every_point(self):
+        points = random_points(500)
+        route = nearest_neighbour_route(points)
+        self.assertEqual(sorted(route), list(range(len(points))))
+
+    def test_improvement_shortens_route(self):
+        points = random_points(800)
+        baseline = route_length(points, nearest_neighbour_route(points))
+        route = solve_route(points, time_budget=5, parallel=False)
+        self.assertEqual(sorted(route), list(range(len(points))))
+        self.assertLess(route_length(points, route), baseline)
+
+    def test_tiled_parallel_solve_returns_permutation(self):
+        points = random_points(1200)
+        try:
+            route = solve_route(points, time_budget=2, tile_size=300, parallel=True)
+        finally:
+            tsp_solver.shutdown_executor()
+        self.assertEqual(sorted(route), list(range(len(points))))
+
+    def test_worker_pool_spawns_instead_of_forking(self):
+        try:
+            executor = tsp_solver.get_executor()
+            self.assertEqual(executor._mp_context.get_start_method(), 'spawn')
+        finally:
+            tsp_solver.shutdown_executor()
+        self.assertIsNone(tsp_solver._executor)
+
+    def test_tiny_inputs(self):
+        self.assertEqual(solve_route([]), [])
+        self.assertEqual(solve_route([(1, 1)]), [0])
+
+
+class RouteCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='tsp-cache-')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_hash_depends_on_coordinates_and_order(self):
+        points = [(0.0, 0.0), (1.0, 1.0)]
+        self.assertEqual(point_set_hash(points), point_set_hash(list(points)))
+        self.assertNotEqual(point_set_hash(points), point_set_hash(points[::-1]))
+
+    def test_entries_survive_a_new_cache_instance(self):
+        RouteCache(self.temp_dir).put('abc', {'route': [1, 0], 'length': 1.5})
+        self.assertEqual(RouteCache(self.temp_dir).get('abc'), {'route': [1, 0], 'length': 1.5})
+        self.assertIsNone(RouteCache(self.temp_dir).get('missing'))
+
+    def test_memory_cache_is_bounded(self):
+        cache = RouteCache(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, {'route': [], 'length': 0})
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_disk_entries_are_pruned_least_recently_used_first(self):
+        cache = RouteCache(self.temp_dir, max_entries=0, max_disk_entries=2)
+        now = time.time()
+        for offset, key in enumerate(('a', 'b')):
+            cache.put(key, {'route': [], 'length': 0})
+            mtime = now - 100 + offset
+            os.utime(os.path.join(self.temp_dir, f'{key}.json'), (mtime, mtime))
+        cache.get('a')  # A disk hit refreshes 'a', leaving 'b' the oldest
+        cache.put('c', {'route': [], 'length': 0})
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['a.json', 'c.json'])
+
+    def test_expired_disk_entries_are_dropped(self):
+        cache = RouteCache(self.temp_dir, max_age_days=1)
+        cache.put('old', {'route': [], 'length': 0})
+        os.utime(os.path.join(self.temp_dir, 'old.json'), (0, 0))
+        cache.put('new', {'route': [], 'length': 0})
+        self.assertEqual(os.listdir(self.temp_dir), ['new.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+import base64
+import io
+import json
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from helpers import FakeClock
+from server import ws_channel
+from server.server import PlotterHandler, create_server
+from server.ws_channel import (OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, ControlChannel,
+                               WebSocketConnection, WebSocketError, accept_key, encode_frame,
+                               read_frame)
+
+
+def client_frame(opcode, payload, fin=True, mask=b'\x01\x02\x03\x04'):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', (0x80 if fin else 0) | opcode, 0x80 | length)
+    else:
+        header = struct.pack('!BBH', (0x80 if fin else 0) | opcode, 0x80 | 126, length)
+    masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+    return header + mask + masked
+
+
+def read_server_frame(stream):
+    first, second = stream.read(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', stream.read(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', stream.read(8))[0]
+    return first & 0x0F, stream.read(length)
+
+
+class BlockedWriter:
+    """A wfile whose writes wait until the test releases them."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.frames = []
+
+    def write(self, data):
+        self.release.wait(5)
+        self.frames.append(data)
+
+    def flush(self):
+        pass
+
+
+class FramingTests(unittest.TestCase):
+    def test_accept_key_matches_rfc_6455_example(self):
+        self.assertEqual(accept_key('dGhlIHNhbXBsZSBub25jZQ=='), 's3pPLMBiTxaQ9kYGzzhZRbK+xOo=')
+
+    def test_masked_frames_round_trip_at_every_length_encoding(self):
+        for size in (0, 5, 125, 126, 70000):
+            payload = os.urandom(size)
+            frame = client_frame(OP_TEXT, payload) if size < 1 << 16 else (
+                struct.pack('!BBQ', 0x80 | OP_TEXT, 0x80 | 127, size) + b'\0\0\0\0' + payload)
+            self.assertEqual(read_frame(io.BytesIO(frame)), (True, OP_TEXT, payload))
+        self.assertEqual(encode_frame(OP_TEXT, b'hi'), b'\x81\x02hi')
+
+    def test_client_frames_are_masked_and_read_back_unmasked(self):
+        frame = encode_frame(OP_TEXT, b'{"type": "ping"}', mask=b'\x01\x02\x03\x04')
+        self.assertEqual(frame, client_frame(OP_TEXT, b'{"type": "ping"}'))
+        self.assertEqual(read_frame(io.BytesIO(frame)), (True, OP_TEXT, b'{"type": "ping"}'))
+        self.assertEqual(read_frame(io.BytesIO(b'\x81\x02hi'), require_mask=False),
+                         (True, OP_TEXT, b'hi'))
+
+    def test_rejects_unmasked_and_oversized_frames(self):
+        with self.assertRaises(WebSocketError):
+            read_frame(io.BytesIO(b'\x81\x02hi'))
+        with self.assertRaises(WebSocketError) as ctx:
+            read_frame(io.BytesIO(client_frame(OP_TEXT, b'x' * 200)), max_bytes=100)
+        self.assertEqual(ctx.exception.code, ws_channel.CLOSE_TOO_BIG)
+
+    def test_fragmented_messages_are_reassembled_and_pings_answered(self):
+        stream = io.BytesIO(client_frame(OP_TEXT, b'{"type": ', fin=False)
+                            + client_frame(OP_PING, b'p')
+                            + client_frame(ws_channel.OP_CONTINUATION, b'"ping"}')
+                            + client_frame(OP_CLOSE, struct.pack('!H', 1000)))
+        output = io.BytesIO()
+        connection = WebSocketConnection(stream, output)
+        self.assertEqual(list(connection.messages()), [{'type': 'ping'}])
+        connection.join(2)
+        replies = io.BytesIO(output.getvalue())
+        self.assertEqual(read_server_frame(replies), (OP_PONG, b'p'))
+        self.assertEqual(read_server_frame(replies), (OP_CLOSE, struct.pack('!H', 1000)))
+
+
+class BackpressureTests(unittest.TestCase):
+    def test_coalesces_progress_and_drops_clients_that_fall_behind(self):
+        writer = BlockedWriter()
+        closed = threading.Event()
+        connection = WebSocketConnection(io.BytesIO(), writer, max_queue=3,
+                                         on_close=closed.set)
+        connection.send({'n': 0})
+        time.sleep(0.05)  # The writer takes message 0 and blocks on it
+        for value in range(5):
+            connection.send({'bar': value}, coalesce='CLI_PROGRESS_BAR')
+        connection.send({'n': 1})
+        self.assertEqual(connection.dropped, 4)
+        self.assertTrue(connection.send({'n': 2}))
+        self.assertFalse(connection.send({'n': 3}))  # Queue full: the client is cut off
+        self.assertEqual(connection.close_code, ws_channel.CLOSE_TRY_AGAIN_LATER)
+        writer.release.set()
+        self.assertTrue(closed.wait(2))
+        self.assertEqual(writer.frames[-1][0] & 0x0F, OP_CLOSE)
+
+    def test_silent_peers_are_pinged_then_dropped(self):
+        clock = FakeClock()
+        output = io.BytesIO()
+        connection = WebSocketConnection(io.BytesIO(), output, ping_interval=0.02, clock=clock)
+        clock.now = 0.03
+        time.sleep(0.1)
+        self.assertFalse(connection.closed)
+        clock.now = 1.0
+        connection.join(2)
+        self.assertEqual(connection.close_code, ws_channel.CLOSE_GOING_AWAY)
+        frames = io.BytesIO(output.getvalue())
+        self.assertEqual(read_server_frame(frames)[0], OP_PING)
+
+    def test_channel_pushes_watched_state_only_when_it_changes(self):
+        state = {'available': False}
+        channel = ControlChannel()
+        channel.watch('resume', lambda: dict(state))
+        sent = []
+
+        class Recorder:
+            def send(self, message, coalesce=None):
+                sent.append((message, coalesce))
+        channel.connections.add(Recorder())
+        channel.poll()
+        channel.poll()
+        state['available'] = True
+        channel.poll()
+        self.assertEqual(sent, [({'type': 'resume', 'available': False}, 'resume'),
+                                ({'type': 'resume', 'available': True}, 'resume')])
+
+
+class ControlEndpointTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._original_output_root = PlotterHandler.OUTPUT_ROOT
+        cls.temp_output = tempfile.mkdtemp(prefix='plotter-ws-')
+        PlotterHandler.OUTPUT_ROOT = cls.temp_output
+        cls.temp_token_dir = tempfile.mkdtemp(prefix='plotter-token-')
+        PlotterHandler.DEBUG_TOKEN_DIR = cls.temp_token_dir
+        cls.httpd = create_server(host='127.0.0.1', port=0)
+        cls.port = cls.httpd.server_address[1]
+        cls.thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        PlotterHandler.OUTPUT_ROOT = cls._original_output_root
+        if PlotterHandler.archive_scheduler is not None:
+            PlotterHandler.archive_scheduler.stop()
+            PlotterHandler.archive_scheduler = None
+        if PlotterHandler.output_catalog is not None:
+            PlotterHandler.output_catalog.close()
+            PlotterHandler.output_catalog = None
+        PlotterHandler.DEBUG_TOKEN_DIR = None
+        shutil.rmtree(cls.temp_output, ignore_errors=True)
+        shutil.rmtree(cls.temp_token_dir, ignore_errors=True)
+
+    def _connect(self, key=None):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.addCleanup(sock.close)
+        key = key or base64.b64encode(os.urandom(16)).decode('ascii')
+        sock.sendall((f'GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n'
+                      f'Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n'
+                      f'Sec-WebSocket-Version: 13\r\n\r\n').encode('ascii'))
+        stream = sock.makefile('rb')
+        status = stream.readline()
+        headers = {}
+        for line in iter(stream.readline, b'\r\n'):
+            name, value = line.decode('ascii').split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+        return sock, stream, status, headers, key
+
+    def _receive(self, stream):
+        opcode, payload = read_server_frame(stream)
+        self.assertEqual(opcode, OP_TEXT)
+        return json.loads(payload)
+
+    def test_commands_acks_and_progress_share_one_connection(self):
+        sock, stream, status, headers, key = self._connect()
+        self.assertIn(b'101', status)
+        self.assertEqual(headers['sec-websocket-accept'], accept_key(key))
+        greeting = [self._receive(stream) for _ in range(3)]
+        self.assertEqual([message['type'] for message in greeting], ['hello', 'resume', 'config'])
+        self.assertFalse(greeting[1]['available'])
+
+        sock.sendall(client_frame(OP_TEXT, json.dumps(
+            {'type': 'command', 'id': 7, 'command': 'no_such_command'}).encode()))
+        ack = self._receive(stream)
+        self.assertEqual((ack['type'], ack['id'], ack['status']), ('ack', 7, 'error'))
+
+        PlotterHandler.__new__(PlotterHandler).send_progress_update('PLOT_COMPLETE')
+        self.assertEqual(self._receive(stream), {'type': 'progress', 'progress': 'PLOT_COMPLETE'})
+
+        sock.sendall(client_frame(OP_PING, b'are you there'))
+        self.assertEqual(read_server_frame(stream), (OP_PONG, b'are you there'))
+        sock.sendall(client_frame(OP_CLOSE, struct.pack('!H', 1000)))
+        self.assertEqual(read_server_frame(stream), (OP_CLOSE, struct.pack('!H', 1000)))
+        deadline = time.monotonic() + 2
+        while len(PlotterHandler.control_channel) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(PlotterHandler.control_channel), 0)
+
+    def test_a_blocking_command_leaves_pings_and_stop_plot_answered(self):
+        sock, stream, _, _, _ = self._connect()
+        for _ in range(3):
+            self._receive(stream)  # hello, resume, config
+        release = threading.Event()
+
+        def handle_command(handler, params):
+            if params['command'] == 'home':
+                release.wait(5)  # Stands in for axicli walking home
+            return {'status': 'success', 'message': params['command']}
+
+        with patch.object(PlotterHandler, 'handle_command', handle_command):
+            for message in ({'type': 'command', 'id': 1, 'command': 'home'},
+                            {'type': 'ping', 'id': 2},
+                            {'type': 'command', 'id': 3, 'command': 'stop_plot'}):
+                sock.sendall(client_frame(OP_TEXT, json.dumps(message).encode()))
+            self.assertEqual(self._receive(stream), {'type': 'pong', 'id': 2})
+            self.assertEqual(self._receive(stream)['id'], 3)
+            release.set()
+            ack = self._receive(stream)
+        self.assertEqual((ack['type'], ack['id'], ack['message']), ('ack', 1, 'home'))
+
+    def test_plain_requests_to_the_channel_are_refused(self):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.addCleanup(sock.close)
+        sock.sendall(b'GET /ws HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        self.assertIn(b'400', sock.makefile('rb').readline())
+
+
+if __name__ == '__main__':
+    unittest.main()